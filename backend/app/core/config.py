@@ -20,6 +20,9 @@ class Settings(BaseSettings):
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    # Usernames or emails (comma-separated) allowed to manage shared data
+    # such as the column-mapping cache; empty (the default) allows nobody
+    ADMIN_USERS: str = ""
     
     # OpenAI / LLM
     OPENAI_API_KEY: str = ""
@@ -27,6 +30,70 @@ class Settings(BaseSettings):
     OLLAMA_BASE_URL: str = "http://localhost:11434/v1"
     OLLAMA_MODEL: str = "qwen2.5"
     
+    # AWS scanning - concurrent scan worker pool size, how many scanners
+    # may call the same AWS service at once and how many may run in one
+    # region at once during a multi-region scan
+    AWS_SCAN_MAX_WORKERS: int = 8
+    AWS_SCAN_SERVICE_CONCURRENCY: int = 2
+    AWS_SCAN_REGION_CONCURRENCY: int = 4
+    # Multi-account scans - role assumed in each account, accounts scanned at
+    # once and service scanners running at once across all accounts
+    AWS_SCAN_ROLE_NAME: str = "OrganizationAccountAccessRole"
+    AWS_SCAN_MAX_ACCOUNTS: int = 4
+    AWS_SCAN_GLOBAL_CONCURRENCY: int = 16
+    # Adaptive rate control - requests per second per (account, region,
+    # service) start at AWS_SCAN_INITIAL_RATE, grow by AWS_SCAN_RATE_INCREASE
+    # per successful call and halve on throttling, within min/max
+    AWS_SCAN_INITIAL_RATE: float = 10.0
+    AWS_SCAN_MIN_RATE: float = 0.5
+    AWS_SCAN_MAX_RATE: float = 100.0
+    AWS_SCAN_RATE_INCREASE: float = 0.5
+    # botocore client config for scans - retry mode (standard, adaptive or
+    # legacy), attempts per call including the first, connection pool size
+    AWS_SCAN_RETRY_MODE: str = "standard"
+    AWS_SCAN_MAX_ATTEMPTS: int = 8
+    AWS_SCAN_MAX_POOL_CONNECTIONS: int = 32
+    # Background scan jobs - scans running at once and how often a running
+    # job writes its progress (seconds)
+    AWS_SCAN_JOB_WORKERS: int = 2
+    AWS_SCAN_JOB_PROGRESS_INTERVAL: float = 1.0
+    
+    # File imports - rows written (and committed) per bulk batch
+    IMPORT_BATCH_SIZE: int = 500
+    # CSV and Parquet uploads are parsed this many rows at a time
+    IMPORT_CSV_CHUNK_ROWS: int = 10000
+    # Excel workbooks of several sheets and at least this many bytes are
+    # parsed a sheet per worker process (capped at the CPU count; on a single
+    # CPU they are parsed in-process); the engine may be "calamine" where
+    # python-calamine is installed
+    IMPORT_EXCEL_WORKERS: int = 4
+    IMPORT_EXCEL_PARALLEL_MIN_BYTES: int = 1024 * 1024
+    IMPORT_EXCEL_ENGINE: str = "openpyxl"
+    # Import sessions - where uploaded files are kept between the upload,
+    # preview and execute steps, and how long an unused session lives
+    IMPORT_SESSION_DIR: str = "data/import_sessions"
+    IMPORT_SESSION_TTL_SECONDS: int = 3600
+    # Background import jobs - imports running at once, and how often a
+    # running job writes its progress and its event stream checks for it (seconds)
+    IMPORT_JOB_WORKERS: int = 2
+    IMPORT_JOB_PROGRESS_INTERVAL: float = 1.0
+    # Parquet exports of the inventory - rows per row group (also the rows
+    # held in memory at once) and the codec (snappy, zstd, gzip or none)
+    EXPORT_PARQUET_ROW_GROUP_ROWS: int = 50000
+    EXPORT_PARQUET_COMPRESSION: str = "snappy"
+    # NDJSON and JSON array exports - rows fetched and encoded per chunk
+    EXPORT_STREAM_BATCH_ROWS: int = 1000
+    # LLM column mappings are reused for sheets with the same columns;
+    # unpinned entries unused for this many days are ignored and replaced
+    IMPORT_MAPPING_CACHE_ENABLED: bool = True
+    IMPORT_MAPPING_CACHE_TTL_DAYS: int = 90
+    # URL flow index - more changed resources and relationships than this
+    # since the last refresh rebuild the whole index instead of updating it
+    URL_FLOW_INCREMENTAL_MAX_CHANGES: int = 5000
+    # Dashboard stats are kept until resources change, and at most this many
+    # seconds so that writes from other processes show up
+    RESOURCE_STATS_MAX_AGE_SECONDS: int = 300
+    
     @property
     def LLM_PROVIDER(self) -> str:
         """Auto-detect LLM provider based on configuration"""
@@ -1,8 +1,12 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.database import engine, Base, is_sqlite
+from app.database import engine, Base, is_sqlite, SessionLocal
 from app.routers import auth, resources, ai, import_router, relationships, ai_layout, relationship_discovery, iac_export, aws_connect, icon_proxy
+from app.services.aws_scanner import reset_outdated_fingerprints
+from app.services.scan_jobs import fail_interrupted_jobs
+from app.services.import_jobs import fail_interrupted_import_jobs
+from app.services.url_flow_index import url_flow_index
 import logging
 
 # Configure logging
@@ -15,8 +19,22 @@ try:
     logger.info(f"Database type: {db_type}")
     logger.info(f"Database URL: {settings.DATABASE_URL}")
     logger.info("Creating database tables...")
+    # Incremental scan fingerprints were keyed without their region before
+    reset_outdated_fingerprints(engine)
     Base.metadata.create_all(bind=engine)
     logger.info(f"✅ Database tables created successfully ({db_type})")
+    
+    # Scan and import jobs do not survive a restart
+    with SessionLocal() as db:
+        interrupted = fail_interrupted_jobs(db)
+        interrupted_imports = fail_interrupted_import_jobs(db)
+    if interrupted:
+        logger.info(f"Marked {interrupted} interrupted scan jobs as failed")
+    if interrupted_imports:
+        logger.info(f"Marked {interrupted_imports} interrupted import jobs as failed")
+    
+    # Builds the URL flow index if missing or made by an older version
+    url_flow_index.schedule_refresh()
 except Exception as e:
     logger.error(f"❌ Database initialization error: {e}")
     raise
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON, Boolean, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -24,7 +24,7 @@ class Resource(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False, index=True)
     type = Column(String, nullable=False, index=True)
-    region = Column(String, nullable=True, default="unknown")
+    region = Column(String, nullable=True, default="unknown", index=True)
     
     # AWS Identifiers
     arn = Column(String, index=True)  # Amazon Resource Name
@@ -33,7 +33,7 @@ class Resource(Base):
     
     # Resource Details
     status = Column(String, default="unknown")  # running, stopped, available, etc.
-    environment = Column(String)  # dev, staging, prod, test
+    environment = Column(String, index=True)  # dev, staging, prod, test
     cost_center = Column(String)  # For billing and cost tracking
     owner = Column(String)  # Resource owner/team name
     application = Column(String)  # Application name this resource belongs to
@@ -145,3 +145,132 @@ class ResourceRelationship(Base):
     # Relationships
     source = relationship("Resource", foreign_keys=[source_resource_id], back_populates="outgoing_relationships")
     target = relationship("Resource", foreign_keys=[target_resource_id], back_populates="incoming_relationships")
+
+
+class ResourceFingerprint(Base):
+    """Hash of the last scanned state of a resource, compared by incremental scans"""
+    __tablename__ = "resource_fingerprints"
+    __table_args__ = (
+        UniqueConstraint("created_by", "account_id", "resource_id", "region", name="uq_resource_fingerprint"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    account_id = Column(String, index=True)  # AWS Account ID
+    resource_id = Column(String, nullable=False, index=True)  # Actual AWS resource ID
+    scan_key = Column(String, nullable=False)  # Scanner that produced it (ec2, s3, route53, ...)
+    region = Column(String)  # Region it was scanned in, None for global resources (bulk_upsert.match_region)
+    fingerprint = Column(String(64), nullable=False)  # sha256 of the normalized scan result
+    resource_pk = Column(Integer, ForeignKey("resources.id", ondelete="CASCADE"), nullable=False, index=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    resource = relationship("Resource")
+
+
+class ScanJob(Base):
+    """A background AWS scan, polled by the client while a worker runs it"""
+    __tablename__ = "scan_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    status = Column(String, nullable=False, default="queued", index=True)  # queued, running, succeeded, failed, cancelled
+    params = Column(JSON, default=dict)  # Scan options, credentials are never stored
+    progress = Column(JSON, default=dict)  # Result key -> resources scanned so far
+    resources_found = Column(Integer, default=0)
+    import_stats = Column(JSON)
+    scan_stats = Column(JSON)
+    error = Column(Text)
+    cancel_requested = Column(Boolean, default=False, nullable=False)
+    
+    # Timings
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+
+
+class ImportJob(Base):
+    """A background file import, polled or streamed by the client while a worker runs it"""
+    __tablename__ = "import_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    status = Column(String, nullable=False, default="queued", index=True)  # queued, running, succeeded, failed, cancelled
+    phase = Column(String)  # import, relationships
+    params = Column(JSON, default=dict)  # Session, selected types and batch size
+    progress = Column(JSON, default=dict)  # Phase -> status and counts so far
+    result = Column(JSON)  # What /import/execute returns, once finished
+    error = Column(Text)
+    cancel_requested = Column(Boolean, default=False, nullable=False)
+    
+    # Timings
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+
+
+class ColumnMappingCacheEntry(Base):
+    """LLM column mappings for a set of sheet columns, reused instead of asking again"""
+    __tablename__ = "column_mapping_cache"
+    __table_args__ = (
+        UniqueConstraint("signature", "schema_version", name="uq_column_mapping_signature"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    signature = Column(String(64), nullable=False, index=True)  # sha256 of the column names the LLM is shown, in order
+    schema_version = Column(String(16), nullable=False)  # Hash of the fields the LLM may map to
+    columns = Column(JSON, nullable=False)  # Column names the LLM is shown, in sheet order
+    analysis = Column(JSON, nullable=False)  # detected_resource_type, field_mappings (by column), arn_column
+    model = Column(String)  # LLM that produced it
+    pinned = Column(Boolean, default=False, nullable=False)  # Never replaced or expired
+    hit_count = Column(Integer, default=0, nullable=False)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class UrlFlow(Base):
+    """A DNS record's precomputed URL flow, as /api/resources/url-flows returns it"""
+    __tablename__ = "url_flows"
+    
+    record_id = Column(Integer, ForeignKey("resources.id", ondelete="CASCADE"), primary_key=True)
+    url = Column(String, nullable=False)  # Record name
+    record_type = Column(String)  # A, AAAA, CNAME, ...
+    zone_name = Column(String, index=True)
+    account_id = Column(String, index=True)
+    important_path_count = Column(Integer, nullable=False, default=0)  # CloudFront, S3 and pipelines in the chain
+    has_connections = Column(Boolean, nullable=False, default=False)
+    has_invalid_a_target = Column(Boolean, nullable=False, default=False)
+    match_values = Column(JSON, default=list)  # Alias target and record values, lowercase without trailing dot
+    flow = Column(Text, nullable=False)  # The flow, serialized as JSON
+    built_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class UrlFlowMember(Base):
+    """A resource a URL flow depends on: the record, its chain and the resources related to them"""
+    __tablename__ = "url_flow_members"
+    
+    record_id = Column(Integer, ForeignKey("url_flows.record_id", ondelete="CASCADE"), primary_key=True)
+    resource_id = Column(Integer, primary_key=True, index=True)
+    related = Column(Boolean, nullable=False, default=False)  # Only related to the record or chain, not in it
+
+
+class UrlFlowKey(Base):
+    """A DNS name, IP or load balancer name DNS record values are matched against"""
+    __tablename__ = "url_flow_keys"
+    
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)  # dns, public_ip, private_ip, elb
+    key = Column(String, nullable=False)  # Lowercase without trailing dot for dns and elb
+    resource_id = Column(Integer, ForeignKey("resources.id", ondelete="CASCADE"), nullable=False, index=True)
+
+
+class UrlFlowIndexState(Base):
+    """How far the URL flow index is built (a single row)"""
+    __tablename__ = "url_flow_index_state"
+    
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)  # Flow format the index was built with
+    resource_watermark = Column(Integer, nullable=False, default=0)  # Highest resource id indexed
+    built_at = Column(DateTime(timezone=True))  # Last full build
+    refreshed_at = Column(DateTime(timezone=True))  # Last incremental update
@@ -73,6 +73,17 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     return user
 
 
+def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
+    """The current user, if ADMIN_USERS lists them; nobody is an admin while it is empty"""
+    admins = {name.strip().lower() for name in settings.ADMIN_USERS.split(',') if name.strip()}
+    if current_user.username.lower() not in admins and current_user.email.lower() not in admins:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return current_user
+
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 def register(user_data: UserCreate, db: Session = Depends(get_db)):
     logger.info(f"🔐 REGISTER attempt for email: {user_data.email}, username: {user_data.username}")
@@ -2,16 +2,19 @@
 AWS Connection and Scanning API Router
 Handles AWS credential configuration and resource scanning
 """
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
 from typing import Optional, Dict, List, Any
+from datetime import datetime
 import logging
 
 from app.database import get_db
-from app.models import User
+from app.models import User, ScanJob
 from app.routers.auth import get_current_user
 from app.services.aws_scanner import AWSScanner
+from app.services.aws_accounts import MultiAccountScanner
+from app.services.scan_jobs import ScanJobProgress, scan_job_runner, cancel_scan_job
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +33,14 @@ class ScanRequest(BaseModel):
     """Request to scan AWS resources"""
     credentials: AWSCredentials
     resource_types: Optional[List[str]] = None  # If None, scan all
+    concurrent: bool = True  # Run the per-service scanners on a worker pool
+    max_workers: Optional[int] = None  # Defaults to AWS_SCAN_MAX_WORKERS
+    service_concurrency: Optional[Dict[str, int]] = None  # e.g. {"ec2": 1}
+    streaming: bool = False  # Import resources while the scan is still running
+    regions: Optional[List[str]] = None  # Scan these regions instead of credentials.region
+    all_regions: bool = False  # Scan every region enabled for the account
+    region_concurrency: Optional[int] = None  # Defaults to AWS_SCAN_REGION_CONCURRENCY
+    incremental: bool = False  # Only write resources whose fingerprint changed since the last scan
 
 
 class ScanResponse(BaseModel):
@@ -38,6 +49,60 @@ class ScanResponse(BaseModel):
     message: str
     resources_found: Dict[str, int]
     import_stats: Optional[Dict[str, int]] = None
+    scan_stats: Optional[Dict[str, Any]] = None
+    regions_scanned: Optional[List[str]] = None
+
+
+class MultiAccountScanRequest(BaseModel):
+    """Request to scan several AWS accounts by assuming a role in each"""
+    credentials: AWSCredentials  # Source credentials allowed to assume the roles
+    accounts: List[str]  # Account IDs or full role ARNs
+    role_name: Optional[str] = None  # Role assumed for bare account IDs, defaults to AWS_SCAN_ROLE_NAME
+    external_id: Optional[str] = None
+    resource_types: Optional[List[str]] = None  # If None, scan all
+    regions: Optional[List[str]] = None
+    all_regions: bool = False
+    service_concurrency: Optional[Dict[str, int]] = None
+    region_concurrency: Optional[int] = None
+    max_accounts: Optional[int] = None  # Accounts scanned at once, defaults to AWS_SCAN_MAX_ACCOUNTS
+    global_concurrency: Optional[int] = None  # Service scanners across all accounts, defaults to AWS_SCAN_GLOBAL_CONCURRENCY
+    incremental: bool = False  # Only write resources whose fingerprint changed since the last scan
+
+
+class MultiAccountScanResponse(BaseModel):
+    """Response from a multi-account scan"""
+    status: str
+    message: str
+    resources_found: Dict[str, Dict[str, int]]  # account ID -> resource type -> count
+    import_stats: Optional[Dict[str, int]] = None
+    scan_stats: Optional[Dict[str, Any]] = None
+    errors: Dict[str, str] = {}  # account/role -> reason it was skipped
+
+
+class ScanJobResponse(BaseModel):
+    """A background scan job and its progress"""
+    id: int
+    status: str  # queued, running, succeeded, failed, cancelled
+    params: Dict[str, Any] = {}  # Scan options, without credentials
+    progress: Dict[str, int] = {}  # Result key -> resources scanned so far
+    resources_found: int = 0
+    import_stats: Optional[Dict[str, Any]] = None
+    scan_stats: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    cancel_requested: bool = False
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+
+def resolve_scan_regions(scanner: AWSScanner, scan_request: ScanRequest) -> Optional[List[str]]:
+    """Regions for a multi-region scan, or None for a single-region scan"""
+    if scan_request.all_regions:
+        return scanner.list_regions()
+    return scan_request.regions or None
 
 
 @router.post("/test-connection", response_model=Dict[str, Any])
@@ -57,20 +122,17 @@ async def test_aws_connection(
             session_token=credentials.aws_session_token
         )
         
-        account_id = scanner.get_account_id()
+        identity = scanner.get_caller_identity()
         
         # Get available regions
-        import boto3
-        ec2 = boto3.client('ec2', region_name=credentials.region,
-                          aws_access_key_id=credentials.aws_access_key_id,
-                          aws_secret_access_key=credentials.aws_secret_access_key,
-                          aws_session_token=credentials.aws_session_token)
-        regions = [region['RegionName'] for region in ec2.describe_regions()['Regions']]
+        regions = scanner.list_regions()
         
         return {
             "status": "success",
             "message": "Successfully connected to AWS",
-            "account_id": account_id,
+            "account_id": identity['account_id'],
+            "partition": identity['partition'],
+            "caller_arn": identity['arn'],
             "current_region": credentials.region,
             "available_regions": regions
         }
@@ -98,57 +160,73 @@ async def scan_aws_resources(
             session_token=credentials.aws_session_token
         )
         
+        regions = resolve_scan_regions(scanner, scan_request)
+        
         # Scan resources
-        logger.info(f"Starting AWS scan for user {current_user.id} in region {credentials.region}")
+        logger.info(f"Starting AWS scan for user {current_user.id} in region(s) {', '.join(regions or [credentials.region])}")
         
-        if scan_request.resource_types:
-            # Scan specific resource types
-            resources = {}
-            for resource_type in scan_request.resource_types:
-                if resource_type == 'ec2':
-                    resources['ec2'] = scanner.scan_ec2_instances()
-                elif resource_type == 'rds':
-                    resources['rds'] = scanner.scan_rds_instances()
-                elif resource_type == 'lambda':
-                    resources['lambda'] = scanner.scan_lambda_functions()
-                elif resource_type == 's3':
-                    resources['s3'] = scanner.scan_s3_buckets()
-                elif resource_type == 'elb':
-                    resources['elb'] = scanner.scan_load_balancers()
-                elif resource_type == 'vpc':
-                    resources['vpc'] = scanner.scan_vpcs()
-                elif resource_type == 'ecs':
-                    resources['ecs'] = scanner.scan_ecs_clusters()
-                elif resource_type == 'eks':
-                    resources['eks'] = scanner.scan_eks_clusters()
-                elif resource_type == 'dynamodb':
-                    resources['dynamodb'] = scanner.scan_dynamodb_tables()
-                elif resource_type == 'sns':
-                    resources['sns'] = scanner.scan_sns_topics()
-                elif resource_type == 'sqs':
-                    resources['sqs'] = scanner.scan_sqs_queues()
-                elif resource_type == 'apigateway':
-                    resources['apigateway'] = scanner.scan_api_gateways()
-                elif resource_type == 'codepipeline':
-                    resources['codepipeline'] = scanner.scan_codepipeline()
+        if scan_request.streaming or scan_request.incremental:
+            # Stream scanner pages straight into the importer
+            resources_found = {}
+            
+            def counted_stream():
+                for resource_type, resource in scanner.iter_resources(
+                    scan_request.resource_types,
+                    concurrent=scan_request.concurrent,
+                    max_workers=scan_request.max_workers,
+                    service_concurrency=scan_request.service_concurrency,
+                    regions=regions,
+                    region_concurrency=scan_request.region_concurrency
+                ):
+                    resources_found[resource_type] = resources_found.get(resource_type, 0) + 1
+                    yield resource_type, resource
+            
+            if scan_request.incremental:
+                import_stats = scanner.import_resource_delta(
+                    db, current_user.id, counted_stream(),
+                    scope=lambda: scanner.scan_scope(scan_request.resource_types, regions)
+                )
+            else:
+                import_stats = scanner.import_resource_stream(
+                    db, current_user.id, (resource for _, resource in counted_stream())
+                )
         else:
-            # Scan all resources
-            resources = scanner.scan_all_resources()
-        
-        # Count resources found
-        resources_found = {
-            resource_type: len(resource_list) 
-            for resource_type, resource_list in resources.items()
-        }
-        
-        # Import to database
-        import_stats = scanner.import_resources_to_db(db, current_user.id, resources)
+            if scan_request.resource_types:
+                # Scan specific resource types
+                resources = scanner.scan_resource_types(
+                    scan_request.resource_types,
+                    concurrent=scan_request.concurrent,
+                    max_workers=scan_request.max_workers,
+                    service_concurrency=scan_request.service_concurrency,
+                    regions=regions,
+                    region_concurrency=scan_request.region_concurrency
+                )
+            else:
+                # Scan all resources
+                resources = scanner.scan_all_resources(
+                    concurrent=scan_request.concurrent,
+                    max_workers=scan_request.max_workers,
+                    service_concurrency=scan_request.service_concurrency,
+                    regions=regions,
+                    region_concurrency=scan_request.region_concurrency
+                )
+            
+            # Count resources found
+            resources_found = {
+                resource_type: len(resource_list) 
+                for resource_type, resource_list in resources.items()
+            }
+            
+            # Import to database
+            import_stats = scanner.import_resources_to_db(db, current_user.id, resources)
         
         return ScanResponse(
             status="success",
             message=f"Scan complete. Found {sum(resources_found.values())} resources.",
             resources_found=resources_found,
-            import_stats=import_stats
+            import_stats=import_stats,
+            scan_stats=scanner.get_scan_stats(),
+            regions_scanned=regions or [credentials.region]
         )
         
     except Exception as e:
@@ -156,40 +234,170 @@ async def scan_aws_resources(
         raise HTTPException(status_code=500, detail=f"Failed to scan AWS resources: {str(e)}")
 
 
-@router.post("/scan-async")
+@router.post("/scan-async", response_model=ScanJobResponse, status_code=202)
 async def scan_aws_resources_async(
     scan_request: ScanRequest,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Start an asynchronous AWS scan (for large accounts)
-    Returns immediately and processes in background
+    Returns the queued scan job at once; poll GET /aws/scan-jobs/{job_id}
+    for its progress and result
     """
-    def run_scan():
-        try:
-            credentials = scan_request.credentials
-            scanner = AWSScanner(
-                aws_access_key_id=credentials.aws_access_key_id,
-                aws_secret_access_key=credentials.aws_secret_access_key,
-                region=credentials.region,
-                session_token=credentials.aws_session_token
+    user_id = current_user.id
+    params = scan_request.model_dump(exclude={'credentials'})
+    params['region'] = scan_request.credentials.region
+    job = ScanJob(created_by=user_id, status='queued', params=params, progress={})
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    
+    def run_scan(job_db: Session, progress: ScanJobProgress) -> Dict[str, int]:
+        credentials = scan_request.credentials
+        scanner = AWSScanner(
+            aws_access_key_id=credentials.aws_access_key_id,
+            aws_secret_access_key=credentials.aws_secret_access_key,
+            region=credentials.region,
+            session_token=credentials.aws_session_token
+        )
+        
+        regions = resolve_scan_regions(scanner, scan_request)
+        resource_stream = progress.track(
+            scanner.iter_resources(
+                scan_request.resource_types,
+                concurrent=scan_request.concurrent,
+                max_workers=scan_request.max_workers,
+                service_concurrency=scan_request.service_concurrency,
+                regions=regions,
+                region_concurrency=scan_request.region_concurrency
+            ),
+            stats=scanner.get_scan_stats
+        )
+        if scan_request.incremental:
+            return scanner.import_resource_delta(
+                job_db, user_id, resource_stream,
+                scope=lambda: scanner.scan_scope(scan_request.resource_types, regions)
             )
-            
-            resources = scanner.scan_all_resources()
-            scanner.import_resources_to_db(db, current_user.id, resources)
-            
-            logger.info(f"Background AWS scan completed for user {current_user.id}")
-        except Exception as e:
-            logger.error(f"Background AWS scan failed: {e}")
+        return scanner.import_resource_stream(job_db, user_id, (resource for _, resource in resource_stream))
     
-    background_tasks.add_task(run_scan)
+    scan_job_runner.submit(job.id, run_scan)
+    logger.info(f"Queued AWS scan job {job.id} for user {user_id}")
     
-    return {
-        "status": "started",
-        "message": "AWS scan started in background. Resources will be imported automatically."
-    }
+    return job
+
+
+def get_user_scan_job(db: Session, job_id: int, user_id: int) -> ScanJob:
+    job = db.query(ScanJob).filter(ScanJob.id == job_id, ScanJob.created_by == user_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    return job
+
+
+@router.get("/scan-jobs", response_model=List[ScanJobResponse])
+async def list_scan_jobs(
+    status: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """List the current user's scan jobs, newest first"""
+    query = db.query(ScanJob).filter(ScanJob.created_by == current_user.id)
+    if status:
+        query = query.filter(ScanJob.status == status)
+    return query.order_by(ScanJob.id.desc()).limit(limit).all()
+
+
+@router.get("/scan-jobs/{job_id}", response_model=ScanJobResponse)
+async def get_scan_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Status, per-service progress and (once finished) result of a scan job"""
+    return get_user_scan_job(db, job_id, current_user.id)
+
+
+@router.post("/scan-jobs/{job_id}/cancel", response_model=ScanJobResponse)
+async def cancel_aws_scan_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Cancel a scan job
+    A queued job is cancelled at once; a running job stops at its next
+    progress update, keeping the resources already imported
+    """
+    return cancel_scan_job(db, get_user_scan_job(db, job_id, current_user.id))
+
+
+@router.post("/scan-accounts", response_model=MultiAccountScanResponse)
+async def scan_aws_accounts(
+    scan_request: MultiAccountScanRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Assume a role into each listed account, scan them in parallel and
+    stream every resource into the inventory tagged with its account_id
+    """
+    try:
+        credentials = scan_request.credentials
+        source = AWSScanner(
+            aws_access_key_id=credentials.aws_access_key_id,
+            aws_secret_access_key=credentials.aws_secret_access_key,
+            region=credentials.region,
+            session_token=credentials.aws_session_token
+        )
+        scanner = MultiAccountScanner(
+            source,
+            scan_request.accounts,
+            role_name=scan_request.role_name,
+            external_id=scan_request.external_id,
+            max_accounts=scan_request.max_accounts,
+            global_concurrency=scan_request.global_concurrency,
+            owner=current_user.id
+        )
+        
+        logger.info(f"Starting multi-account AWS scan of {len(scanner.targets)} accounts for user {current_user.id}")
+        resources_found = {}
+        
+        def counted_stream():
+            for account_id, resource_type, resource in scanner.iter_resources(
+                scan_request.resource_types,
+                regions=scan_request.regions,
+                all_regions=scan_request.all_regions,
+                service_concurrency=scan_request.service_concurrency,
+                region_concurrency=scan_request.region_concurrency
+            ):
+                counts = resources_found.setdefault(account_id, {})
+                counts[resource_type] = counts.get(resource_type, 0) + 1
+                yield resource_type, resource
+        
+        if scan_request.incremental:
+            import_stats = source.import_resource_delta(
+                db, current_user.id, counted_stream(),
+                scope=lambda: scanner.scan_scope(scan_request.resource_types)
+            )
+        else:
+            import_stats = source.import_resource_stream(
+                db, current_user.id, (resource for _, resource in counted_stream())
+            )
+        total = sum(sum(counts.values()) for counts in resources_found.values())
+        
+        return MultiAccountScanResponse(
+            status="success" if not scanner.errors else "partial",
+            message=f"Scan complete. Found {total} resources in {len(resources_found)} accounts.",
+            resources_found=resources_found,
+            import_stats=import_stats,
+            scan_stats=scanner.get_scan_stats(),
+            errors=scanner.errors
+        )
+        
+    except Exception as e:
+        logger.error(f"Multi-account AWS scan failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to scan AWS accounts: {str(e)}")
 
 
 @router.get("/supported-resources")
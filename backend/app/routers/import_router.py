@@ -1,108 +1,263 @@
 """
 Import Router - Handle file uploads and data imports
 """
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Form
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Form, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any, Optional
+from datetime import datetime
 from pydantic import BaseModel
+import asyncio
 
-from ..database import get_db
-from ..models import Resource, User
+from ..database import get_db, SessionLocal
+from ..models import User, ImportJob, ColumnMappingCacheEntry
 from ..services.import_service import import_service
-from ..routers.auth import get_current_user
+from ..services.import_sessions import import_sessions, ImportSessionNotFound
+from ..services.import_jobs import ACTIVE_STATUSES, import_job_runner, cancel_import_job, run_import
+from ..services.import_diff import diff_import
+from ..services.mapping_cache import mapping_cache
+from ..core.config import settings
+from ..routers.auth import get_current_user, get_admin_user
 
 router = APIRouter(prefix="/import", tags=["import"])
 
 
+# Datasets of an import session: one per sheet, plus the resources to import
+# and the changes a dry run found importing them would make
+RESOURCES_DATASET = "resources"
+DIFF_DATASET = "diff"
+# Rows of each dataset returned to the client when working from a session
+SESSION_SAMPLE_ROWS = 10
+
+
+def sheet_dataset(sheet_name: str) -> str:
+    return f"sheet:{sheet_name}"
+
+
 class AnalyzeRequest(BaseModel):
     sheet_name: str
-    sample_data: List[Dict[str, Any]]
+    sample_data: Optional[List[Dict[str, Any]]] = None
+    session_id: Optional[str] = None  # Sample the sheet stored by /upload instead
+    refresh: bool = False  # Ask the LLM even if these columns were mapped before
 
 
 class ImportRequest(BaseModel):
-    resources: List[Dict[str, Any]]
+    resources: Optional[List[Dict[str, Any]]] = None
+    session_id: Optional[str] = None  # Import the resources stored by /upload or /preview instead
+    resource_types: Optional[List[str]] = None  # With session_id, only import these types
+    batch_size: Optional[int] = None  # Rows per bulk write and commit, defaults to IMPORT_BATCH_SIZE
+
+
+class ImportJobResponse(BaseModel):
+    """A background import job and its progress"""
+    id: int
+    status: str  # queued, running, succeeded, failed, cancelled
+    phase: Optional[str] = None  # import, relationships
+    params: Dict[str, Any] = {}
+    progress: Dict[str, Any] = {}  # Phase -> status, row counts / relationship step
+    result: Optional[Dict[str, Any]] = None  # As returned by /execute
+    error: Optional[str] = None
+    cancel_requested: bool = False
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class MappingCacheEntryResponse(BaseModel):
+    """Cached LLM mappings for one set of column names"""
+    id: int
+    signature: str
+    schema_version: str
+    columns: List[str]
+    analysis: Dict[str, Any]
+    model: Optional[str] = None
+    pinned: bool = False
+    hit_count: int = 0
+    created_by: Optional[int] = None
+    created_at: Optional[datetime] = None
+    last_used_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class PinRequest(BaseModel):
+    pinned: bool = True
 
 
 class PreviewRequest(BaseModel):
-    sheet_data: List[Dict[str, Any]]
+    sheet_data: Optional[List[Dict[str, Any]]] = None
+    session_id: Optional[str] = None  # Preview a sheet stored by /upload instead
+    sheet_name: Optional[str] = None
     field_mappings: Dict[str, str]
     type_specific_mappings: Optional[Dict[str, str]] = None
     resource_type: str
 
 
+def get_session_rows(session_id: str, user: User, dataset: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    try:
+        return import_sessions.get_rows(session_id, user.id, dataset, limit=limit)
+    except ImportSessionNotFound:
+        raise HTTPException(status_code=404, detail="Import session not found or expired. Please upload the file again.")
+
+
+def select_resource_types(resources: List[Dict[str, Any]], resource_types: Optional[List[str]]) -> List[Dict[str, Any]]:
+    if resource_types is None:
+        return resources
+    selected = {t.lower() for t in resource_types}
+    return [r for r in resources if str(r.get('type') or '').lower() in selected]
+
+
+def type_counts(resources: List[Dict[str, Any]]) -> Dict[str, int]:
+    counts = {}
+    for r in resources:
+        t = r.get('type', 'unknown')
+        counts[t] = counts.get(t, 0) + 1
+    return counts
+
+
 @router.post("/upload")
 async def upload_file(
     file: UploadFile = File(...),
     use_ai: Optional[str] = Form("false"),
+    include_rows: Optional[str] = Form("false"),
     current_user: User = Depends(get_current_user)
 ):
     """
     Upload Excel or CSV file and parse it
     Auto-detects AWS Resource Explorer format for direct import
     Optional AI parsing to clean and validate data
+    The parsed rows are kept in an import session; the response carries the
+    session_id and the first rows of each sheet (all of them with
+    include_rows=true) for /analyze, /preview and /execute to refer to.
     """
     import logging
     logger = logging.getLogger(__name__)
     
-    # Read file content
-    content = await file.read()
+    # CSV and Parquet are read from the spooled upload; Excel needs the whole file
+    file_type = {'csv': 'csv', 'parquet': 'parquet'}.get(file.filename.lower().rsplit('.', 1)[-1], 'excel')
+    if file_type != 'excel':
+        content = file.file
+    else:
+        content = await file.read()
     
-    # Convert string to boolean
+    # Convert strings to booleans
     use_ai_bool = use_ai.lower() == "true"
+    include_rows_bool = include_rows.lower() == "true"
+    
+    # Each sheet goes into the session as it is parsed, a chunk at a time for
+    # CSV and Parquet; the result only keeps a sample unless every row is asked for
+    session_id = import_sessions.create(current_user.id, file.filename, info={"file_type": file_type})
     
-    # Parse file with optional AI
-    result = import_service.parse_file(content, file.filename, use_ai=use_ai_bool)
+    def store_sheet(sheet_name: str, sheet_data: List[Dict[str, Any]]):
+        import_sessions.append_rows(session_id, current_user.id, sheet_dataset(sheet_name), sheet_data)
+    
+    # Resources of an AWS Resource Explorer sheet go into the session a part at a time
+    explorer = {"sheet": None, "resources": [], "resource_types": {}, "resource_count": 0}
+    
+    def store_resources(sheet_name: str, part_resources: List[Dict[str, Any]]):
+        explorer["sheet"] = sheet_name
+        import_sessions.append_rows(session_id, current_user.id, RESOURCES_DATASET, part_resources)
+        for resource_type, count in type_counts(part_resources).items():
+            explorer["resource_types"][resource_type] = explorer["resource_types"].get(resource_type, 0) + count
+        explorer["resource_count"] += len(part_resources)
+        if include_rows_bool:
+            explorer["resources"] += part_resources
+        elif len(explorer["resources"]) < SESSION_SAMPLE_ROWS:
+            explorer["resources"] += part_resources[:SESSION_SAMPLE_ROWS - len(explorer["resources"])]
+    
+    # Parse file with optional AI; Resource Explorer CSVs are parsed into resources as they are read
+    result = import_service.parse_file(
+        content, file.filename, use_ai=use_ai_bool, on_sheet=store_sheet,
+        sample_rows=None if include_rows_bool else SESSION_SAMPLE_ROWS, on_resources=store_resources
+    )
     
     if not result.get("success"):
+        import_sessions.delete(session_id, current_user.id)
         raise HTTPException(status_code=400, detail=result.get("error"))
     
-    # Check if this is AWS Resource Explorer format
     sheets = result.get("sheets", {})
-    if not sheets and result.get("file_type") == "csv":
-        # For CSV, the data is in a single "default" sheet
-        sheets = {"data": result.get("data", [])}
-    
-    # Check first sheet for AWS Resource Explorer columns
-    for sheet_name, sheet_data in sheets.items():
-        if sheet_data and len(sheet_data) > 0:
-            columns = list(sheet_data[0].keys())
-            
-            if import_service.is_aws_resource_explorer_format(columns):
-                logger.info(f"Detected AWS Resource Explorer format in {file.filename}")
-                
-                # Parse using AWS Resource Explorer parser
-                parsed_resources = import_service.parse_aws_resource_explorer(sheet_data)
-                
-                # Get resource type summary
-                type_counts = {}
-                for r in parsed_resources:
-                    t = r.get('type', 'unknown')
-                    type_counts[t] = type_counts.get(t, 0) + 1
-                
-                result["aws_resource_explorer"] = True
-                result["parsed_resources"] = parsed_resources
-                result["resource_count"] = len(parsed_resources)
-                result["resource_types"] = type_counts
-                result["auto_mapped"] = True
-                result["message"] = f"Detected AWS Resource Explorer format. Found {len(parsed_resources)} resources across {len(type_counts)} resource types."
-                
-                logger.info(f"Parsed {len(parsed_resources)} resources: {type_counts}")
+    result["session_id"] = session_id
+    
+    # Check first sheet for AWS Resource Explorer columns; other than CSVs,
+    # it is parsed from the session, a stored part of the sheet at a time
+    if explorer["sheet"] is None:
+        for sheet_name, sheet_data in sheets.items():
+            if sheet_data and import_service.is_aws_resource_explorer_format(list(sheet_data[0].keys())):
+                for part in import_sessions.iter_rows(session_id, current_user.id, sheet_dataset(sheet_name)):
+                    store_resources(sheet_name, import_service.parse_aws_resource_explorer(part))
                 break
     
+    if explorer["sheet"] is not None:
+        logger.info(f"Detected AWS Resource Explorer format in {file.filename}")
+        resource_count = explorer["resource_count"]
+        resource_types = explorer["resource_types"]
+        result["aws_resource_explorer"] = True
+        result["parsed_resources"] = explorer["resources"]
+        result["resource_count"] = resource_count
+        result["resource_types"] = resource_types
+        result["auto_mapped"] = True
+        result["message"] = f"Detected AWS Resource Explorer format. Found {resource_count} resources across {len(resource_types)} resource types."
+        
+        logger.info(f"Parsed {resource_count} resources: {resource_types}")
+    
     return result
 
 
+@router.get("/sessions/{session_id}")
+async def get_import_session(
+    session_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Datasets, row counts and expiry of an import session"""
+    try:
+        meta = import_sessions.get(session_id, current_user.id)
+    except ImportSessionNotFound:
+        raise HTTPException(status_code=404, detail="Import session not found or expired")
+    return {
+        "session_id": session_id,
+        "filename": meta["filename"],
+        "expires_at": meta["expires_at"],
+        "datasets": {name: {"rows": entry["rows"]} for name, entry in meta["datasets"].items()}
+    }
+
+
+@router.delete("/sessions/{session_id}")
+async def delete_import_session(
+    session_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Discard an import session before it expires"""
+    try:
+        import_sessions.delete(session_id, current_user.id)
+    except ImportSessionNotFound:
+        raise HTTPException(status_code=404, detail="Import session not found or expired")
+    return {"success": True}
+
+
 @router.post("/analyze")
 async def analyze_data(
     request: AnalyzeRequest,
+    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Use LLM to analyze data and suggest field mappings with intelligent ARN extraction
+    Sheets with the same columns as an earlier one get its mappings from the
+    column-mapping cache instead; refresh=true asks the LLM again
     """
-    result = import_service.analyze_with_llm(
-        sample_data=request.sample_data,
-        sheet_name=request.sheet_name
+    sample_data = request.sample_data
+    if request.session_id:
+        sample_data = get_session_rows(request.session_id, current_user, sheet_dataset(request.sheet_name), limit=5)
+    if sample_data is None:
+        raise HTTPException(status_code=400, detail="Either sample_data or session_id is required")
+    
+    result = mapping_cache.analyze(
+        db, import_service, sample_data, request.sheet_name,
+        user_id=current_user.id, refresh=request.refresh
     )
     
     if not result.get("success"):
@@ -141,6 +296,78 @@ async def analyze_data(
     return result
 
 
+def get_mapping_cache_entry(db: Session, entry_id: int) -> ColumnMappingCacheEntry:
+    entry = db.get(ColumnMappingCacheEntry, entry_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Mapping cache entry not found")
+    return entry
+
+
+@router.get("/mapping-cache", response_model=List[MappingCacheEntryResponse])
+async def list_mapping_cache(
+    pinned: Optional[bool] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_admin_user)
+):
+    """Cached column mappings, most recently used first"""
+    query = db.query(ColumnMappingCacheEntry)
+    if pinned is not None:
+        query = query.filter(ColumnMappingCacheEntry.pinned.is_(pinned))
+    return query.order_by(ColumnMappingCacheEntry.last_used_at.desc()).limit(limit).all()
+
+
+@router.get("/mapping-cache/metrics")
+async def get_mapping_cache_metrics(
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_admin_user)
+):
+    """Hits, misses and stores since startup, hit rate and entry counts"""
+    return mapping_cache.get_metrics(db)
+
+
+@router.post("/mapping-cache/{entry_id}/pin", response_model=MappingCacheEntryResponse)
+async def pin_mapping_cache_entry(
+    entry_id: int,
+    request: PinRequest,
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_admin_user)
+):
+    """Pin an entry (never replaced by a new analysis or expired), or unpin it"""
+    entry = get_mapping_cache_entry(db, entry_id)
+    entry.pinned = request.pinned
+    db.commit()
+    db.refresh(entry)
+    return entry
+
+
+@router.delete("/mapping-cache/{entry_id}")
+async def delete_mapping_cache_entry(
+    entry_id: int,
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_admin_user)
+):
+    """Invalidate one entry, pinned or not; the next analysis of its columns asks the LLM"""
+    db.delete(get_mapping_cache_entry(db, entry_id))
+    db.commit()
+    return {"success": True}
+
+
+@router.delete("/mapping-cache")
+async def clear_mapping_cache(
+    include_pinned: bool = False,
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_admin_user)
+):
+    """Invalidate every unpinned entry (every entry with include_pinned=true)"""
+    query = db.query(ColumnMappingCacheEntry)
+    if not include_pinned:
+        query = query.filter(ColumnMappingCacheEntry.pinned.is_(False))
+    deleted = query.delete(synchronize_session=False)
+    db.commit()
+    return {"success": True, "deleted": deleted}
+
+
 @router.post("/preview")
 async def preview_import(
     request: PreviewRequest,
@@ -148,10 +375,21 @@ async def preview_import(
 ):
     """
     Apply mappings and validate data before actual import
+    With session_id the sheet is read from the session, the valid resources
+    are stored back in it for /execute and only their first rows and type
+    counts are returned.
     """
+    sheet_data = request.sheet_data
+    if request.session_id:
+        if not request.sheet_name:
+            raise HTTPException(status_code=400, detail="sheet_name is required with session_id")
+        sheet_data = get_session_rows(request.session_id, current_user, sheet_dataset(request.sheet_name))
+    if sheet_data is None:
+        raise HTTPException(status_code=400, detail="Either sheet_data or session_id is required")
+    
     # Apply mappings
     transformed = import_service.apply_mappings(
-        data=request.sheet_data,
+        data=sheet_data,
         mappings=request.field_mappings,
         type_specific_mappings=request.type_specific_mappings or {},
         resource_type=request.resource_type
@@ -160,6 +398,13 @@ async def preview_import(
     # Validate
     validation_result = import_service.validate_resources(transformed)
     
+    if request.session_id:
+        valid_resources = validation_result["valid_resources"]
+        import_sessions.put_rows(request.session_id, current_user.id, RESOURCES_DATASET, valid_resources)
+        validation_result["valid_resources"] = valid_resources[:SESSION_SAMPLE_ROWS]
+        validation_result["resource_types"] = type_counts(valid_resources)
+        validation_result["session_id"] = request.session_id
+    
     return validation_result
 
 
@@ -178,232 +423,222 @@ async def execute_import(
 ):
     """
     Execute the actual import of validated resources
+    Large imports should use /execute-async, which does the same in a
+    background job
     """
     import logging
-    import re
     logger = logging.getLogger(__name__)
     
-    print(f"\n\n=== IMPORT EXECUTE CALLED === Resources: {len(request.resources)} ===\n\n")
-    
-    created_count = 0
-    updated_count = 0
-    errors = []
-    
-    logger.info(f"Starting import of {len(request.resources)} resources for user {current_user.id}")
-    
-    if len(request.resources) > 0:
-        logger.info(f"First resource sample: {list(request.resources[0].keys())[:10]}")
-    
-    for idx, resource_data in enumerate(request.resources):
-        try:
-            # Remove import warnings if present
-            resource_data.pop('_import_warnings', None)
-            
-            # Add current user as creator
-            resource_data['created_by'] = current_user.id
-            
-            logger.info(f"Creating resource: {resource_data.get('name', 'Unknown')}")
-            
-            # Get valid Resource model fields (all fields from enhanced model)
-            valid_fields = {
-                'name', 'type', 'region', 'arn', 'account_id', 'resource_id',
-                'status', 'environment', 'cost_center', 'owner', 'application', 'project',
-                'vpc_id', 'subnet_id', 'availability_zone', 'security_groups',
-                'public_ip', 'private_ip', 'dns_name', 'endpoint',
-                'instance_type', 'resource_creation_date',
-                'type_specific_properties', 
-                'dependencies', 'connected_resources', 'attached_to', 'parent_resource',
-                'child_resources', 'target_resources', 'source_resources',
-                'encryption_enabled', 'public_access', 'compliance_status',
-                'monthly_cost_estimate', 'last_cost_update',
-                'tags', 'description', 'notes', 'created_by',
-                'aws_service', 'aws_resource_type', 'last_reported_at'
-            }
-            
-            # Extract type_specific_properties from resource_data
-            type_specific_props = resource_data.get('type_specific_properties', {})
-            if not isinstance(type_specific_props, dict):
-                type_specific_props = {}
-            
-            # Move 'os' and other EC2-specific fields to type_specific_properties
-            ec2_specific_fields = ['os', 'ami_id', 'key_pair', 'ebs_optimized', 'monitoring', 'platform']
-            for field in ec2_specific_fields:
-                if field in resource_data and resource_data[field]:
-                    type_specific_props[field] = resource_data[field]
-            
-            # Filter resource_data to only include valid fields
-            filtered_data = {k: v for k, v in resource_data.items() if k in valid_fields}
-            
-            # SMART: Save ALL unmapped columns to description (don't lose any data!)
-            unmapped_fields = {}
-            for key, value in resource_data.items():
-                if key not in valid_fields and key not in ec2_specific_fields and value is not None and value != '':
-                    unmapped_fields[key] = value
-            
-            if unmapped_fields:
-                # Convert unmapped fields to readable description
-                unmapped_desc = ", ".join([f"{k}: {v}" for k, v in unmapped_fields.items()])
-                existing_desc = filtered_data.get('description', '')
-                if existing_desc:
-                    filtered_data['description'] = f"{existing_desc} | Additional: {unmapped_desc}"
-                else:
-                    filtered_data['description'] = f"Additional fields: {unmapped_desc}"
-                logger.info(f"  Saved {len(unmapped_fields)} unmapped fields to description")
-            
-            # Parse ARN if present to extract account_id and region
-            arn = filtered_data.get('arn') or resource_data.get('arn')
-            if arn and isinstance(arn, str):
-                # ARN format: arn:aws:service:region:account-id:resource-type/resource-id
-                arn_match = re.match(r'arn:aws:[^:]+:([^:]*):([^:]+):(.+)', arn)
-                if arn_match:
-                    arn_region, arn_account, arn_resource = arn_match.groups()
-                    
-                    # Extract account_id from ARN if not already set
-                    if not filtered_data.get('account_id') and arn_account:
-                        filtered_data['account_id'] = arn_account
-                        logger.info(f"  Extracted account_id from ARN: {arn_account}")
-                    
-                    # Extract region from ARN if not already set
-                    if not filtered_data.get('region') and arn_region:
-                        filtered_data['region'] = arn_region
-                        logger.info(f"  Extracted region from ARN: {arn_region}")
-                    
-                    # Extract resource_id from ARN if not already set
-                    if not filtered_data.get('resource_id') and arn_resource:
-                        # Handle different ARN formats (e.g., "instance/i-123" or "i-123")
-                        if '/' in arn_resource:
-                            filtered_data['resource_id'] = arn_resource.split('/')[-1]
-                        else:
-                            filtered_data['resource_id'] = arn_resource
-            
-            # Auto-fill required fields with smart defaults
-            if not filtered_data.get('region'):
-                # Try to extract from availability_zone (e.g., "eu-west-3c" -> "eu-west-3")
-                az = filtered_data.get('availability_zone', '')
-                if az and len(az) > 1:
-                    filtered_data['region'] = az[:-1]  # Remove last character (zone letter)
-                    logger.info(f"  Extracted region from AZ: {filtered_data['region']}")
-                else:
-                    filtered_data['region'] = 'unknown'
-            
-            if not filtered_data.get('name'):
-                filtered_data['name'] = f"Resource-{resource_data.get('resource_id', 'Unknown')}"
-            
-            if not filtered_data.get('type'):
-                # Try to detect type from ARN
-                if arn and isinstance(arn, str):
-                    arn_parts = arn.split(':')
-                    if len(arn_parts) >= 3:
-                        service = arn_parts[2]
-                        # Map AWS service to resource type
-                        service_map = {
-                            'ec2': 'ec2',
-                            'rds': 'rds',
-                            's3': 's3',
-                            'lambda': 'lambda',
-                            'elasticloadbalancing': 'elb',
-                            'ecs': 'ecs',
-                            'eks': 'eks'
-                        }
-                        filtered_data['type'] = service_map.get(service, service)
-                        logger.info(f"  Detected type from ARN: {filtered_data['type']}")
-                else:
-                    filtered_data['type'] = 'unknown'
-            
-            # Auto-detect status from state field if present
-            if not filtered_data.get('status') or filtered_data.get('status') == 'unknown':
-                state = resource_data.get('state') or resource_data.get('instance_state')
-                if state:
-                    filtered_data['status'] = state.lower()
-                    logger.info(f"  Detected status: {state}")
-            
-            # Auto-detect environment from name or tags
-            if not filtered_data.get('environment'):
-                name = filtered_data.get('name', '').lower()
-                # Check for common environment indicators in name
-                env_keywords = {
-                    'prod': 'production',
-                    'production': 'production',
-                    'stg': 'staging',
-                    'staging': 'staging',
-                    'stage': 'staging',
-                    'dev': 'development',
-                    'development': 'development',
-                    'test': 'testing',
-                    'testing': 'testing',
-                    'qa': 'qa',
-                    'uat': 'uat'
-                }
-                for keyword, env in env_keywords.items():
-                    if keyword in name:
-                        filtered_data['environment'] = env
-                        logger.info(f"  Detected environment from name: {env}")
-                        break
-            
-            # Add type_specific_properties if we collected any
-            if type_specific_props:
-                filtered_data['type_specific_properties'] = type_specific_props
-                logger.info(f"  Added type_specific_properties: {list(type_specific_props.keys())}")
-            
-            # SMART UPSERT: Check if resource already exists by resource_id
-            existing_resource = None
-            if filtered_data.get('resource_id'):
-                existing_resource = db.query(Resource).filter(
-                    Resource.resource_id == filtered_data['resource_id'],
-                    Resource.created_by == current_user.id
-                ).first()
-            
-            if existing_resource:
-                # UPDATE existing resource
-                logger.info(f"  ⚠️  Resource exists! Updating: {existing_resource.name}")
-                for key, value in filtered_data.items():
-                    if key != 'created_by':  # Don't change creator
-                        setattr(existing_resource, key, value)
-                db.commit()  # Commit each update individually
-                logger.info(f"  ✅ Updated existing resource")
-                updated_count += 1
-            else:
-                # CREATE new resource
-                resource = Resource(**filtered_data)
-                db.add(resource)
-                db.commit()  # Commit each insert individually
-                logger.info(f"  ✅ Created new resource")
-                created_count += 1
-            
-        except Exception as e:
-            db.rollback()  # Rollback failed transaction
-            logger.error(f"Failed to create resource: {str(e)}")
-            errors.append({
-                "resource": resource_data.get("name", "Unknown"),
-                "error": str(e)[:200]  # Truncate error message
-            })
-            # Continue with next resource instead of failing all
-            continue
-    
-    # Auto-extract relationships after import
-    relationships_count = 0
-    try:
-        from app.services.relationship_extractor import RelationshipExtractor
-        logger.info("Extracting relationships from imported resources...")
-        relationships_count = RelationshipExtractor.extract_all_relationships(db)
-        logger.info(f"Extracted {relationships_count} relationships")
-    except Exception as e:
-        logger.warning(f"Relationship extraction failed (non-critical): {str(e)}")
+    resources = request.resources
+    if request.session_id:
+        resources = select_resource_types(
+            get_session_rows(request.session_id, current_user, RESOURCES_DATASET), request.resource_types
+        )
+    if resources is None:
+        raise HTTPException(status_code=400, detail="Either resources or session_id is required")
+    
+    logger.info(f"Starting import of {len(resources)} resources for user {current_user.id}")
+    
+    if len(resources) > 0:
+        logger.info(f"First resource sample: {list(resources[0].keys())[:10]}")
     
+    # Existing rows are resolved per batch with one IN query, and each batch
+    # is written with bulk statements in a savepoint and committed once;
+    # relationships are extracted afterwards
     try:
-        total_count = created_count + updated_count
-        logger.info(f"Import complete: {total_count} resources ({created_count} new, {updated_count} updated), {len(errors)} errors")
-        return {
-            "success": True,
-            "imported_count": total_count,
-            "created_count": created_count,
-            "updated_count": updated_count,
-            "error_count": len(errors),
-            "errors": errors,
-            "relationships_extracted": relationships_count,
-            "message": f"Successfully imported {total_count} resources ({created_count} created, {updated_count} updated) and extracted {relationships_count} relationships"
-        }
+        result = run_import(db, current_user.id, resources, request.batch_size or settings.IMPORT_BATCH_SIZE)
     except Exception as e:
         logger.error(f"Database commit failed: {str(e)}")
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+    
+    logger.info(
+        f"Import complete: {result['imported_count']} resources ({result['created_count']} new, "
+        f"{result['updated_count']} updated), {result['error_count']} errors in {result['elapsed_ms']} ms "
+        f"({result['rows_per_sec']} rows/sec)"
+    )
+    return result
+
+
+@router.post("/dry-run")
+async def dry_run_import(
+    request: ImportRequest,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    What /execute would do with the same request, without writing anything
+    Returns created/updated/unchanged counts, errors, a histogram of field
+    changes and one page of the changed resources. With session_id the
+    changes are kept in the session; page through them with
+    GET /import/sessions/{session_id}/diff.
+    """
+    resources = request.resources
+    if request.session_id:
+        resources = select_resource_types(
+            get_session_rows(request.session_id, current_user, RESOURCES_DATASET), request.resource_types
+        )
+    if resources is None:
+        raise HTTPException(status_code=400, detail="Either resources or session_id is required")
+    
+    result = diff_import(db, current_user.id, resources)
+    changes = result.pop("changes")
+    if request.session_id:
+        summary = {key: value for key, value in result.items() if key != "errors"}
+        import_sessions.put_rows(request.session_id, current_user.id, DIFF_DATASET, changes, info={"summary": summary})
+        result["session_id"] = request.session_id
+    result.update(offset=offset, limit=limit, changes=changes[offset:offset + limit])
+    return result
+
+
+@router.get("/sessions/{session_id}/diff")
+async def get_import_diff(
+    session_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(get_current_user)
+):
+    """A page of the changes the session's last dry run found, with its summary"""
+    try:
+        meta = import_sessions.get(session_id, current_user.id)
+    except ImportSessionNotFound:
+        raise HTTPException(status_code=404, detail="Import session not found or expired")
+    if DIFF_DATASET not in meta["datasets"]:
+        raise HTTPException(status_code=404, detail="No dry run in this import session")
+    changes = get_session_rows(session_id, current_user, DIFF_DATASET, limit=offset + limit)
+    return {
+        **meta["datasets"][DIFF_DATASET]["summary"],
+        "session_id": session_id,
+        "offset": offset,
+        "limit": limit,
+        "changes": changes[offset:offset + limit]
+    }
+
+
+@router.post("/execute-async", response_model=ImportJobResponse, status_code=202)
+async def execute_import_async(
+    request: ImportRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Start the import in a background job
+    Returns the queued job at once; poll GET /import/jobs/{job_id} or follow
+    GET /import/jobs/{job_id}/events for its progress and result
+    """
+    user_id = current_user.id
+    if request.session_id:
+        # Fail fast on an unknown session; the rows are read by the worker
+        get_session_rows(request.session_id, current_user, RESOURCES_DATASET, limit=0)
+        session_id, resource_types = request.session_id, request.resource_types
+        
+        def load_rows() -> List[Dict[str, Any]]:
+            return select_resource_types(
+                import_sessions.get_rows(session_id, user_id, RESOURCES_DATASET), resource_types
+            )
+    elif request.resources is not None:
+        resources = request.resources
+        
+        def load_rows() -> List[Dict[str, Any]]:
+            return resources
+    else:
+        raise HTTPException(status_code=400, detail="Either resources or session_id is required")
+    
+    job = ImportJob(
+        created_by=user_id,
+        status='queued',
+        params=request.model_dump(exclude={'resources'}),
+        progress={}
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    
+    import_job_runner.submit(job.id, load_rows)
+    return job
+
+
+def get_user_import_job(db: Session, job_id: int, user_id: int) -> ImportJob:
+    job = db.query(ImportJob).filter(ImportJob.id == job_id, ImportJob.created_by == user_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+
+@router.get("/jobs", response_model=List[ImportJobResponse])
+async def list_import_jobs(
+    status: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """List the current user's import jobs, newest first"""
+    query = db.query(ImportJob).filter(ImportJob.created_by == current_user.id)
+    if status:
+        query = query.filter(ImportJob.status == status)
+    return query.order_by(ImportJob.id.desc()).limit(limit).all()
+
+
+@router.get("/jobs/{job_id}", response_model=ImportJobResponse)
+async def get_import_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Status, phase progress and (once finished) result of an import job"""
+    return get_user_import_job(db, job_id, current_user.id)
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_import_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Server-Sent Events stream of an import job
+    Sends a "progress" event with the job whenever it changes and a final
+    "done" event once it has finished, then closes
+    """
+    get_user_import_job(db, job_id, current_user.id)
+    user_id = current_user.id
+    
+    async def events():
+        last = None
+        while True:
+            with SessionLocal() as job_db:
+                job = get_user_import_job(job_db, job_id, user_id)
+                payload = ImportJobResponse.model_validate(job).model_dump_json()
+                finished = job.status not in ACTIVE_STATUSES
+            if finished:
+                yield f"event: done\ndata: {payload}\n\n"
+                return
+            if payload != last:
+                yield f"event: progress\ndata: {payload}\n\n"
+                last = payload
+            else:
+                # Keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(settings.IMPORT_JOB_PROGRESS_INTERVAL)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/jobs/{job_id}/cancel", response_model=ImportJobResponse)
+async def cancel_import(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Cancel an import job
+    A queued job is cancelled at once; a running job stops at its next
+    progress update, keeping the batches already committed
+    """
+    return cancel_import_job(db, get_user_import_job(db, job_id, current_user.id))
@@ -1,10 +1,11 @@
 """
 API endpoints for managing resource relationships
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.database import get_db
+from app.database import get_db, SessionLocal
 from app.models import ResourceRelationship, Resource
 from app.schemas import (
     ResourceRelationshipCreate,
@@ -13,6 +14,7 @@ from app.schemas import (
     ResourceRelationshipWithResources
 )
 from app.routers.auth import get_current_user
+from app.services.inventory_stream import STREAM_MEDIA_TYPES, iter_relationships_stream
 from app.services.relationship_extractor import RelationshipExtractor
 
 router = APIRouter(prefix="/relationships", tags=["relationships"])
@@ -85,6 +87,25 @@ def get_relationships_with_resources(
     return relationships
 
 
+@router.get("/export")
+def export_relationships_stream(
+    format: str = Query("ndjson", pattern="^(ndjson|json)$"),
+    source_id: Optional[int] = None,
+    target_id: Optional[int] = None,
+    relationship_type: Optional[str] = None,
+    current_user = Depends(get_current_user)
+):
+    """All relationships, or those matching the filters, streamed as NDJSON or a JSON array in id order"""
+    def chunks():
+        # Its own session: the response outlives the request's
+        with SessionLocal() as db:
+            yield from iter_relationships_stream(
+                db, format, source_id=source_id, target_id=target_id, relationship_type=relationship_type
+            )
+
+    return StreamingResponse(chunks(), media_type=STREAM_MEDIA_TYPES[format])
+
+
 @router.get("/{relationship_id}", response_model=ResourceRelationshipWithResources)
 def get_relationship(
     relationship_id: int,
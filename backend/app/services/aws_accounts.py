@@ -0,0 +1,235 @@
+"""
+Multi-account AWS scanning
+Assumes a role into each target account from one set of source credentials
+and scans the accounts in parallel under a shared concurrency budget
+"""
+import hashlib
+import re
+import threading
+from contextlib import closing
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from botocore.credentials import RefreshableCredentials
+
+from app.core.config import settings
+from app.services.aws_pagination import merge_streams
+from app.services.aws_scanner import AWSScanner
+import logging
+
+logger = logging.getLogger(__name__)
+
+ROLE_SESSION_NAME = 'aws-architect-scan'
+
+
+def role_arn_for(target: str, role_name: str, partition: str = 'aws') -> str:
+    """Turn an account ID into the ARN of role_name in it; role ARNs pass through"""
+    if target.startswith('arn:'):
+        return target
+    if not re.fullmatch(r'\d{12}', target):
+        raise ValueError(f"Not an AWS account ID or role ARN: {target}")
+    return f"arn:{partition}:iam::{target}:role/{role_name}"
+
+
+def identity_from_assumed_role(assumed_role_user: Dict[str, str]) -> Dict[str, str]:
+    """Caller identity (as AWSScanner.get_caller_identity) from an AssumeRole response"""
+    arn = assumed_role_user['Arn']
+    parts = arn.split(':')
+    return {
+        'account_id': parts[4],
+        'partition': parts[1],
+        'arn': arn,
+        'user_id': assumed_role_user.get('AssumedRoleId')
+    }
+
+
+def source_fingerprint(source: AWSScanner) -> str:
+    """sha256 of the whole of source's credentials (access key, secret key and session token)"""
+    material = '\0'.join(
+        source._session_kwargs.get(name) or ''
+        for name in ('aws_access_key_id', 'aws_secret_access_key', 'aws_session_token')
+    )
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class AssumeRoleCredentialCache:
+    """
+    Temporary credentials per (app user, source credentials, role ARN,
+    external ID)
+    The source credentials are keyed by a hash of all of them, so a request
+    naming a known access key ID with any other secret or token never gets
+    an entry it did not assume itself. Entries are botocore
+    RefreshableCredentials: every session built from them re-assumes the
+    role shortly before the credentials expire, so one entry serves any
+    number of scans and worker threads.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self,
+        source: AWSScanner,
+        role_arn: str,
+        external_id: Optional[str] = None,
+        duration_seconds: int = 3600,
+        owner: Optional[int] = None
+    ) -> Tuple[RefreshableCredentials, Dict[str, str]]:
+        """Credentials and caller identity for role_arn, assuming it on first use by owner (an app user ID)"""
+        key = (owner, source_fingerprint(source), role_arn, external_id)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+
+        identity = {}
+
+        def assume_role() -> Dict[str, str]:
+            params = {
+                'RoleArn': role_arn,
+                'RoleSessionName': ROLE_SESSION_NAME,
+                'DurationSeconds': duration_seconds
+            }
+            if external_id:
+                params['ExternalId'] = external_id
+            response = source._client('sts').assume_role(**params)
+            identity.update(identity_from_assumed_role(response['AssumedRoleUser']))
+            credentials = response['Credentials']
+            expiration = credentials['Expiration']
+            if isinstance(expiration, datetime):
+                expiration = expiration.astimezone(timezone.utc).isoformat()
+            logger.info(f"Assumed role {role_arn} until {expiration}")
+            return {
+                'access_key': credentials['AccessKeyId'],
+                'secret_key': credentials['SecretAccessKey'],
+                'token': credentials['SessionToken'],
+                'expiry_time': expiration
+            }
+
+        credentials = RefreshableCredentials.create_from_metadata(
+            metadata=assume_role(),
+            refresh_using=assume_role,
+            method='sts-assume-role'
+        )
+        with self._lock:
+            entry = self._entries.setdefault(key, (credentials, identity))
+        return entry
+
+    def invalidate(self, role_arn: Optional[str] = None):
+        """Drop cached credentials for role_arn, or all of them"""
+        with self._lock:
+            for key in [key for key in self._entries if role_arn is None or key[2] == role_arn]:
+                del self._entries[key]
+
+
+credential_cache = AssumeRoleCredentialCache()
+
+
+class MultiAccountScanner:
+    """
+    Scans several accounts by assuming a role into each from source
+
+    At most max_accounts accounts are scanned at once and, across all of
+    them, at most global_concurrency service scanners run at any moment.
+    Accounts whose role cannot be assumed are skipped and listed in errors.
+    Assumed-role credentials are cached per owner (the app user scanning).
+    """
+
+    def __init__(
+        self,
+        source: AWSScanner,
+        targets: List[str],
+        role_name: Optional[str] = None,
+        external_id: Optional[str] = None,
+        max_accounts: Optional[int] = None,
+        global_concurrency: Optional[int] = None,
+        credentials: Optional[AssumeRoleCredentialCache] = None,
+        owner: Optional[int] = None
+    ):
+        self.source = source
+        self.targets = list(dict.fromkeys(targets))
+        self.role_name = role_name or settings.AWS_SCAN_ROLE_NAME
+        self.external_id = external_id
+        self.max_accounts = max_accounts or settings.AWS_SCAN_MAX_ACCOUNTS
+        self.global_concurrency = global_concurrency or settings.AWS_SCAN_GLOBAL_CONCURRENCY
+        self.credentials = credentials or credential_cache
+        self.owner = owner
+        self.errors = {}
+        # account ID -> (scanner, regions scanned) for the last iter_resources
+        self._scanned = {}
+        self._budget = threading.BoundedSemaphore(max(1, self.global_concurrency))
+
+    def account_scanner(self, target: str) -> AWSScanner:
+        """Scanner working in target (account ID or role ARN) through an assumed role"""
+        role_arn = role_arn_for(target, self.role_name, self.source.partition)
+        credentials, identity = self.credentials.get(self.source, role_arn, self.external_id, owner=self.owner)
+        scanner = self.source.for_account(credentials, identity)
+        scanner._scan_budget = self._budget
+        return scanner
+
+    def iter_resources(
+        self,
+        resource_types: Optional[List[str]] = None,
+        regions: Optional[List[str]] = None,
+        all_regions: bool = False,
+        service_concurrency: Optional[Dict[str, int]] = None,
+        region_concurrency: Optional[int] = None,
+        buffer_size: int = 500
+    ) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """
+        Stream (account ID, result key, resource) from every target account
+        Every resource carries the account_id of the account it was found in.
+        """
+        self.errors = {}
+        self._scanned = {}
+
+        def scan_account(target: str) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+            try:
+                scanner = self.account_scanner(target)
+                account_regions = scanner.list_regions() if all_regions else regions
+            except Exception as e:
+                logger.error(f"Skipping account {target}: {e}")
+                self.errors[target] = str(e)
+                return
+
+            logger.info(f"Scanning account {scanner.account_id}")
+            self._scanned[scanner.account_id] = (scanner, account_regions)
+            with closing(scanner.iter_resources(
+                resource_types,
+                concurrent=True,
+                max_workers=self.global_concurrency,
+                service_concurrency=service_concurrency,
+                buffer_size=buffer_size,
+                regions=account_regions,
+                region_concurrency=region_concurrency
+            )) as resources:
+                for key, resource in resources:
+                    yield scanner.account_id, key, resource
+
+        yield from merge_streams(
+            [partial(scan_account, target) for target in self.targets],
+            max_workers=self.max_accounts,
+            buffer_size=buffer_size,
+            thread_name_prefix='aws-account'
+        )
+
+    def scan(self, **kwargs) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+        """Scan every target account; {account ID: {result key: [resources]}}"""
+        results = {}
+        for account_id, key, resource in self.iter_resources(**kwargs):
+            results.setdefault(account_id, {}).setdefault(key, []).append(resource)
+        return results
+
+    def scan_scope(self, resource_types: Optional[List[str]] = None) -> List[Tuple[Optional[str], str, Optional[str]]]:
+        """AWSScanner.scan_scope() of every account the last scan reached"""
+        return [
+            entry
+            for scanner, regions in self._scanned.values()
+            for entry in scanner.scan_scope(resource_types, regions)
+        ]
+
+    def get_scan_stats(self) -> Dict[str, Any]:
+        """API call counters across the source and every account scanner"""
+        return self.source.get_scan_stats()
@@ -0,0 +1,123 @@
+"""
+Pagination and streaming helpers shared by the AWS scanners
+Yields items page by page so scanners never hold a full listing in memory
+"""
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, nullcontext
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+
+def paginate(client, operation_name: str, result_key: str, **kwargs) -> Iterator[Any]:
+    """
+    Yield every item under result_key (dotted path, e.g. 'DistributionList.Items')
+    across all pages of operation_name.
+    Falls back to a single call when botocore has no paginator for the operation.
+    """
+    if client.can_paginate(operation_name):
+        pages = client.get_paginator(operation_name).paginate(**kwargs)
+    else:
+        kwargs.pop('PaginationConfig', None)
+        pages = [getattr(client, operation_name)(**kwargs)]
+
+    for page in pages:
+        items: Any = page
+        for key in result_key.split('.'):
+            items = items.get(key, {}) if isinstance(items, dict) else {}
+        for item in items or []:
+            yield item
+
+
+def page_chunks(items: Iterator[Any], size: int) -> Iterator[list]:
+    """Group an item stream into lists of at most size items (for batch describe calls)"""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _ProducerFailure:
+    """Carries a producer's exception through the merge_streams queue"""
+    
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+def merge_streams(
+    producers: List[Callable[[], Iterable[Any]]],
+    max_workers: int,
+    buffer_size: int = 500,
+    thread_name_prefix: str = 'aws-scan',
+    heartbeat: Optional[Callable[[], None]] = None,
+    heartbeat_interval: float = 1.0
+) -> Iterator[Any]:
+    """
+    Run each producer on a thread pool and yield their items in arrival order
+    Producers feed a queue of at most buffer_size items, so a slow consumer
+    applies back-pressure instead of letting memory grow. Closing the
+    generator early stops the producers at their next item. An exception
+    raised by a producer is re-raised to the consumer.
+    heartbeat, if given, is called on the consumer's thread every
+    heartbeat_interval seconds while no item arrives. An exception it raises
+    ends the stream without waiting for producers stuck in a slow call.
+    """
+    buffer = queue.Queue(maxsize=buffer_size)
+    stopped = threading.Event()
+    done = object()
+    
+    def put(item) -> bool:
+        # Give up if the consumer has gone away, rather than blocking forever
+        while not stopped.is_set():
+            try:
+                buffer.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def run(producer: Callable[[], Iterable[Any]]):
+        try:
+            items = producer()
+            with closing(items) if hasattr(items, 'close') else nullcontext():
+                for item in items:
+                    if not put(item):
+                        return
+        except Exception as e:
+            put(_ProducerFailure(e))
+        finally:
+            put(done)
+    
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+    wait = True
+    try:
+        for producer in producers:
+            executor.submit(run, producer)
+        remaining = len(producers)
+        while remaining:
+            if heartbeat is None:
+                item = buffer.get()
+            else:
+                try:
+                    item = buffer.get(timeout=heartbeat_interval)
+                except queue.Empty:
+                    try:
+                        heartbeat()
+                    except BaseException:
+                        # Producers see stopped at their next item and exit on their own
+                        wait = False
+                        raise
+                    continue
+            if item is done:
+                remaining -= 1
+                continue
+            if isinstance(item, _ProducerFailure):
+                raise item.error
+            yield item
+    finally:
+        stopped.set()
+        executor.shutdown(wait=wait)
@@ -3,50 +3,244 @@ AWS Resource Scanner Service
 Scans AWS accounts using boto3 and imports resources into the database
 """
 import boto3
-from typing import Dict, List, Optional, Any
-from datetime import datetime
+import botocore.session
+import copy
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Any, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from functools import partial
+from datetime import datetime, timezone
+import hashlib
 import json
+import threading
+import time
+from sqlalchemy import inspect
 from sqlalchemy.orm import Session
-from app.models import Resource
+from app.core.config import settings
+from app.models import Resource, ResourceFingerprint
 import logging
+from app.services.aws_pagination import paginate, page_chunks, merge_streams
+from app.services.bulk_upsert import ResourceIndex, match_region, upsert_resource_batch, throughput
+from app.services.aws_throttle import RateController, scan_client_config
+from app.services.aws_tagging import TagIndexCache, load_tag_index
 from app.services.aws_scanner_additions import (
-    scan_route53_hosted_zones,
-    scan_cloudfront_distributions,
-    scan_amazon_mq_brokers
+    iter_route53_hosted_zones,
+    iter_cloudfront_distributions,
+    iter_amazon_mq_brokers
 )
 
 logger = logging.getLogger(__name__)
 
 
+def fingerprint_resource(resource_data: Dict[str, Any]) -> str:
+    """Stable sha256 of a scanned resource dict, ignoring key order and last_reported_at"""
+    normalized = {key: value for key, value in resource_data.items() if key != 'last_reported_at'}
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def reset_outdated_fingerprints(bind) -> bool:
+    """
+    Drop and recreate resource_fingerprints if its unique key predates the
+    region column being part of it (create_all does not alter tables).
+    Fingerprints only spare writes, so the next incremental scan just
+    writes every resource once.
+    """
+    inspector = inspect(bind)
+    if not inspector.has_table(ResourceFingerprint.__tablename__):
+        return False
+    outdated = any(
+        set(constraint['column_names']) == {'created_by', 'account_id', 'resource_id'}
+        for constraint in inspector.get_unique_constraints(ResourceFingerprint.__tablename__)
+    )
+    if outdated:
+        ResourceFingerprint.__table__.drop(bind)
+        ResourceFingerprint.__table__.create(bind)
+        logger.info("Recreated resource_fingerprints with region in its unique key")
+    return outdated
+
+
 class AWSScanner:
     """Scans AWS resources using boto3 and imports them into the database"""
     
+    # Result key -> (AWS service the scanner talks to, generator method).
+    # The order here is the order results are merged in, whichever
+    # scanner finishes first.
+    SERVICE_SCANNERS = {
+        'ec2': ('ec2', 'iter_ec2_instances'),
+        'rds': ('rds', 'iter_rds_instances'),
+        'lambda': ('lambda', 'iter_lambda_functions'),
+        's3': ('s3', 'iter_s3_buckets'),
+        'elb': ('elbv2', 'iter_load_balancers'),
+        'vpc': ('ec2', 'iter_vpcs'),
+        'ecs': ('ecs', 'iter_ecs_clusters'),
+        'eks': ('eks', 'iter_eks_clusters'),
+        'dynamodb': ('dynamodb', 'iter_dynamodb_tables'),
+        'sns': ('sns', 'iter_sns_topics'),
+        'sqs': ('sqs', 'iter_sqs_queues'),
+        'apigateway': ('apigateway', 'iter_api_gateways'),
+        'codepipeline': ('codepipeline', 'iter_codepipeline'),
+        'route53': ('route53', 'iter_route53_hosted_zones'),
+        'cloudfront': ('cloudfront', 'iter_cloudfront_distributions'),
+        'amazonmq': ('mq', 'iter_amazon_mq_brokers'),
+    }
+    
+    # Services whose listing is account-wide rather than per region: scanned
+    # once per multi-region scan, from the scanner's own region
+    GLOBAL_RESOURCE_TYPES = {'s3', 'route53', 'cloudfront'}
+    
     def __init__(self, aws_access_key_id: str, aws_secret_access_key: str, region: str = 'us-east-1', session_token: Optional[str] = None):
         """Initialize AWS scanner with credentials"""
-        self.session = boto3.Session(
-            aws_access_key_id=aws_access_key_id,
-            aws_secret_access_key=aws_secret_access_key,
-            aws_session_token=session_token,
-            region_name=region
-        )
+        self._session_kwargs = {
+            'aws_access_key_id': aws_access_key_id,
+            'aws_secret_access_key': aws_secret_access_key,
+            'aws_session_token': session_token,
+            'region_name': region
+        }
         self.region = region
         self.account_id = None
+        # Temporary credentials (botocore RefreshableCredentials) when this
+        # scanner works in an assumed-role account, see for_account()
+        self._credentials = None
+        # Optional semaphore shared by several scanners to cap their combined
+        # number of running service scanners (multi-account scans)
+        self._scan_budget = None
+        # Caller identity (account, partition, ARN), resolved once per scanner
+        self._identity = None
+        self._identity_lock = threading.Lock()
+        # API calls made by this scanner, keyed by "service.Operation"
+        self._api_calls = {}
+        self._api_calls_lock = threading.Lock()
+        # Token buckets and throttle/retry counters shared by every client
+        # of this scanner and the scanners derived from it
+        self._rate_controller = RateController()
+        # Bulk-listed tags per (account, region), shared like the controller
+        self._tag_indexes = TagIndexCache()
+        # (account, region, result key) of scanners that hit an error, so an
+        # incremental import never takes their missing resources as deleted
+        self._scan_errors = set()
+        # boto3 sessions are not thread-safe, so each worker thread of a
+        # concurrent scan builds its own session from the same credentials
+        self._local = threading.local()
+        self.session = self._new_session()
+        
+    def _new_session(self) -> boto3.Session:
+        """Create a boto3 session that reports its API calls to this scanner"""
+        botocore_session = None
+        if self._credentials is not None:
+            botocore_session = botocore.session.get_session()
+            botocore_session._credentials = self._credentials
+        session = boto3.Session(botocore_session=botocore_session, **self._session_kwargs)
+        session._session.set_default_client_config(scan_client_config())
+        session.events.register('before-parameter-build', self._count_api_call)
+        session.events.register('before-send', self._pace_attempt)
+        session.events.register('needs-retry', self._record_attempt)
+        return session
+        
+    def _thread_session(self) -> boto3.Session:
+        """Get the boto3 session owned by the calling thread"""
+        if threading.current_thread() is threading.main_thread():
+            return self.session
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._new_session()
+            self._local.session = session
+        return session
+    
+    def _client(self, service_name: str, region: Optional[str] = None):
+        """Create a boto3 client for the calling thread, in region if given"""
+        if region and region != self.region:
+            return self._thread_session().client(service_name, region_name=region)
+        return self._thread_session().client(service_name)
+    
+    def _tags_for(self, arn: str, fallback: Callable[[], Dict[str, str]], region: Optional[str] = None) -> Dict[str, str]:
+        """
+        Tags of the resource arn, looked up in the bulk tag index of its
+        region (this scanner's by default). fallback() makes the service's
+        own per-resource tag call and is only used when the index is not
+        available. Resources missing from the index have no tags.
+        """
+        region = region or self.region
+        index = self._tag_indexes.get(
+            (self.get_account_id(), region),
+            lambda: load_tag_index(self._client('resourcegroupstaggingapi', region))
+        )
+        if index is None:
+            return fallback()
+        return index.get(arn, {})
+    
+    def _count_api_call(self, model, **kwargs):
+        """botocore event hook - fires once per API call, before retries"""
+        key = f"{model.service_model.service_name}.{model.name}"
+        with self._api_calls_lock:
+            self._api_calls[key] = self._api_calls.get(key, 0) + 1
+    
+    def _pace_attempt(self, event_name: str, **kwargs):
+        """botocore event hook - fires before every HTTP attempt, retries included"""
+        self._rate_controller.before_attempt(self.account_id, self.region, event_name.split('.')[1])
+    
+    def _record_attempt(self, event_name: str, response=None, **kwargs):
+        """botocore event hook - sees every attempt's response before the retry handler decides"""
+        if self._rate_controller.after_attempt(self.account_id, self.region, event_name.split('.')[1], response):
+            logger.debug(f"Throttled: {event_name.split('.', 1)[1]} in {self.region}")
+    
+    def _scan_failed(self, key: str, error: Optional[Exception] = None):
+        """Record that the key scanner in this region did not list everything"""
+        try:
+            account_id = self.get_account_id()
+        except Exception:
+            account_id = None
+        # Guarded by the stats lock, shared with the API call counters
+        with self._api_calls_lock:
+            self._scan_errors.add((account_id, self.region, key))
+    
+    def get_scan_stats(self) -> Dict[str, Any]:
+        """API call, throttling and retry counters for everything this scanner has done so far"""
+        with self._api_calls_lock:
+            by_operation = dict(sorted(self._api_calls.items()))
+            failed = sorted(f"{region}/{key}" for _, region, key in self._scan_errors)
+        api_calls = sum(by_operation.values())
+        return {
+            'api_calls': api_calls,
+            'api_calls_by_operation': by_operation,
+            'failed_scanners': failed,
+            **self._rate_controller.get_stats(api_calls)
+        }
+    
+    def get_caller_identity(self) -> Dict[str, str]:
+        """
+        Resolve account ID, partition and caller ARN with a single STS call
+        The result is cached for the lifetime of the scanner and shared by
+        every scanner method and worker thread.
+        """
+        if self._identity is None:
+            with self._identity_lock:
+                if self._identity is None:
+                    identity = self._client('sts').get_caller_identity()
+                    self.account_id = identity['Account']
+                    self._identity = {
+                        'account_id': identity['Account'],
+                        'partition': identity['Arn'].split(':')[1],
+                        'arn': identity['Arn'],
+                        'user_id': identity.get('UserId')
+                    }
+        return self._identity
         
     def get_account_id(self) -> str:
         """Get AWS account ID"""
-        if not self.account_id:
-            sts = self.session.client('sts')
-            self.account_id = sts.get_caller_identity()['Account']
-        return self.account_id
+        return self.get_caller_identity()['account_id']
     
-    def scan_ec2_instances(self) -> List[Dict[str, Any]]:
-        """Scan EC2 instances"""
-        ec2 = self.session.client('ec2')
-        resources = []
+    @property
+    def partition(self) -> str:
+        """AWS partition of the scanned account (aws, aws-cn, aws-us-gov)"""
+        return self.get_caller_identity()['partition']
+    
+    def iter_ec2_instances(self) -> Iterator[Dict[str, Any]]:
+        """Scan EC2 instances, yielding each instance as its page arrives"""
+        ec2 = self._client('ec2')
+        count = 0
         
         try:
-            response = ec2.describe_instances()
-            for reservation in response['Reservations']:
+            for reservation in paginate(ec2, 'describe_instances', 'Reservations'):
                 for instance in reservation['Instances']:
                     tags = {tag['Key']: tag['Value'] for tag in instance.get('Tags', [])}
                     
@@ -73,24 +267,25 @@ class AWSScanner:
                             'platform': instance.get('Platform', 'linux')
                         }
                     }
-                    resources.append(resource)
+                    count += 1
+                    yield resource
                     
-            logger.info(f"Found {len(resources)} EC2 instances")
+            logger.info(f"Found {count} EC2 instances")
         except Exception as e:
             logger.error(f"Error scanning EC2 instances: {e}")
-            
-        return resources
+            self._scan_failed('ec2')
     
-    def scan_rds_instances(self) -> List[Dict[str, Any]]:
+    def iter_rds_instances(self) -> Iterator[Dict[str, Any]]:
         """Scan RDS instances"""
-        rds = self.session.client('rds')
-        resources = []
+        rds = self._client('rds')
+        count = 0
         
         try:
-            response = rds.describe_db_instances()
-            for db in response['DBInstances']:
-                tags_response = rds.list_tags_for_resource(ResourceName=db['DBInstanceArn'])
-                tags = {tag['Key']: tag['Value'] for tag in tags_response.get('TagList', [])}
+            for db in paginate(rds, 'describe_db_instances', 'DBInstances'):
+                tags = self._tags_for(db['DBInstanceArn'], lambda: {
+                    tag['Key']: tag['Value']
+                    for tag in rds.list_tags_for_resource(ResourceName=db['DBInstanceArn']).get('TagList', [])
+                })
                 
                 resource = {
                     'name': db['DBInstanceIdentifier'],
@@ -115,23 +310,22 @@ class AWSScanner:
                         'publicly_accessible': db.get('PubliclyAccessible', False)
                     }
                 }
-                resources.append(resource)
+                count += 1
+                yield resource
                 
-            logger.info(f"Found {len(resources)} RDS instances")
+            logger.info(f"Found {count} RDS instances")
         except Exception as e:
             logger.error(f"Error scanning RDS instances: {e}")
-            
-        return resources
+            self._scan_failed('rds')
     
-    def scan_lambda_functions(self) -> List[Dict[str, Any]]:
+    def iter_lambda_functions(self) -> Iterator[Dict[str, Any]]:
         """Scan Lambda functions"""
-        lambda_client = self.session.client('lambda')
-        resources = []
+        lambda_client = self._client('lambda')
+        count = 0
         
         try:
-            response = lambda_client.list_functions()
-            for func in response['Functions']:
-                tags = lambda_client.list_tags(Resource=func['FunctionArn']).get('Tags', {})
+            for func in paginate(lambda_client, 'list_functions', 'Functions'):
+                tags = self._tags_for(func['FunctionArn'], lambda: lambda_client.list_tags(Resource=func['FunctionArn']).get('Tags', {}))
                 
                 resource = {
                     'name': func['FunctionName'],
@@ -154,34 +348,39 @@ class AWSScanner:
                         'layers': [layer['Arn'] for layer in func.get('Layers', [])]
                     }
                 }
-                resources.append(resource)
+                count += 1
+                yield resource
                 
-            logger.info(f"Found {len(resources)} Lambda functions")
+            logger.info(f"Found {count} Lambda functions")
         except Exception as e:
             logger.error(f"Error scanning Lambda functions: {e}")
-            
-        return resources
+            self._scan_failed('lambda')
     
-    def scan_s3_buckets(self) -> List[Dict[str, Any]]:
+    def iter_s3_buckets(self) -> Iterator[Dict[str, Any]]:
         """Scan S3 buckets"""
-        s3 = self.session.client('s3')
-        resources = []
+        s3 = self._client('s3')
+        count = 0
         
         try:
-            response = s3.list_buckets()
-            for bucket in response['Buckets']:
+            for bucket in paginate(s3, 'list_buckets', 'Buckets'):
                 bucket_name = bucket['Name']
                 
                 try:
-                    location = s3.get_bucket_location(Bucket=bucket_name)
-                    bucket_region = location['LocationConstraint'] or 'us-east-1'
+                    # Newer ListBuckets responses carry the region already
+                    bucket_region = bucket.get('BucketRegion')
+                    if not bucket_region:
+                        location = s3.get_bucket_location(Bucket=bucket_name)
+                        bucket_region = location['LocationConstraint'] or 'us-east-1'
                     
-                    tags = {}
-                    try:
-                        tags_response = s3.get_bucket_tagging(Bucket=bucket_name)
-                        tags = {tag['Key']: tag['Value'] for tag in tags_response.get('TagSet', [])}
-                    except:
-                        pass
+                    def bucket_tags() -> Dict[str, str]:
+                        try:
+                            tags_response = s3.get_bucket_tagging(Bucket=bucket_name)
+                            return {tag['Key']: tag['Value'] for tag in tags_response.get('TagSet', [])}
+                        except:
+                            return {}
+                    
+                    # Buckets are listed by the tagging API of their own region
+                    tags = self._tags_for(f"arn:{self.partition}:s3:::{bucket_name}", bucket_tags, region=bucket_region)
                     
                     resource = {
                         'name': bucket_name,
@@ -195,28 +394,31 @@ class AWSScanner:
                             'creation_date': bucket['CreationDate'].isoformat()
                         }
                     }
-                    resources.append(resource)
+                    count += 1
+                    yield resource
                 except Exception as e:
                     logger.warning(f"Error getting details for bucket {bucket_name}: {e}")
+                    self._scan_failed('s3')
                     
-            logger.info(f"Found {len(resources)} S3 buckets")
+            logger.info(f"Found {count} S3 buckets")
         except Exception as e:
             logger.error(f"Error scanning S3 buckets: {e}")
-            
-        return resources
+            self._scan_failed('s3')
     
-    def scan_load_balancers(self) -> List[Dict[str, Any]]:
+    def iter_load_balancers(self) -> Iterator[Dict[str, Any]]:
         """Scan Application and Network Load Balancers"""
-        elb = self.session.client('elbv2')
-        resources = []
+        elb = self._client('elbv2')
+        count = 0
         
         try:
-            response = elb.describe_load_balancers()
-            for lb in response['LoadBalancers']:
-                tags_response = elb.describe_tags(ResourceArns=[lb['LoadBalancerArn']])
-                tags = {}
-                if tags_response['TagDescriptions']:
-                    tags = {tag['Key']: tag['Value'] for tag in tags_response['TagDescriptions'][0].get('Tags', [])}
+            for lb in paginate(elb, 'describe_load_balancers', 'LoadBalancers'):
+                def lb_tags() -> Dict[str, str]:
+                    tags_response = elb.describe_tags(ResourceArns=[lb['LoadBalancerArn']])
+                    if not tags_response['TagDescriptions']:
+                        return {}
+                    return {tag['Key']: tag['Value'] for tag in tags_response['TagDescriptions'][0].get('Tags', [])}
+                
+                tags = self._tags_for(lb['LoadBalancerArn'], lb_tags)
                 
                 resource = {
                     'name': lb['LoadBalancerName'],
@@ -236,22 +438,21 @@ class AWSScanner:
                         'security_groups': lb.get('SecurityGroups', [])
                     }
                 }
-                resources.append(resource)
+                count += 1
+                yield resource
                 
-            logger.info(f"Found {len(resources)} Load Balancers")
+            logger.info(f"Found {count} Load Balancers")
         except Exception as e:
             logger.error(f"Error scanning Load Balancers: {e}")
-            
-        return resources
+            self._scan_failed('elb')
     
-    def scan_vpcs(self) -> List[Dict[str, Any]]:
+    def iter_vpcs(self) -> Iterator[Dict[str, Any]]:
         """Scan VPCs"""
-        ec2 = self.session.client('ec2')
-        resources = []
+        ec2 = self._client('ec2')
+        count = 0
         
         try:
-            response = ec2.describe_vpcs()
-            for vpc in response['Vpcs']:
+            for vpc in paginate(ec2, 'describe_vpcs', 'Vpcs'):
                 tags = {tag['Key']: tag['Value'] for tag in vpc.get('Tags', [])}
                 
                 resource = {
@@ -270,26 +471,28 @@ class AWSScanner:
                         'instance_tenancy': vpc.get('InstanceTenancy')
                     }
                 }
-                resources.append(resource)
+                count += 1
+                yield resource
                 
-            logger.info(f"Found {len(resources)} VPCs")
+            logger.info(f"Found {count} VPCs")
         except Exception as e:
             logger.error(f"Error scanning VPCs: {e}")
-            
-        return resources
+            self._scan_failed('vpc')
     
-    def scan_ecs_clusters(self) -> List[Dict[str, Any]]:
+    def iter_ecs_clusters(self) -> Iterator[Dict[str, Any]]:
         """Scan ECS Clusters"""
-        ecs = self.session.client('ecs')
-        resources = []
+        ecs = self._client('ecs')
+        count = 0
         
         try:
-            cluster_arns = ecs.list_clusters()['clusterArns']
-            if cluster_arns:
+            # describe_clusters accepts at most 100 clusters per call
+            for cluster_arns in page_chunks(paginate(ecs, 'list_clusters', 'clusterArns'), 100):
                 clusters = ecs.describe_clusters(clusters=cluster_arns)['clusters']
                 for cluster in clusters:
-                    tags_response = ecs.list_tags_for_resource(resourceArn=cluster['clusterArn'])
-                    tags = {tag['key']: tag['value'] for tag in tags_response.get('tags', [])}
+                    tags = self._tags_for(cluster['clusterArn'], lambda: {
+                        tag['key']: tag['value']
+                        for tag in ecs.list_tags_for_resource(resourceArn=cluster['clusterArn']).get('tags', [])
+                    })
                     
                     resource = {
                         'name': cluster['clusterName'],
@@ -306,22 +509,21 @@ class AWSScanner:
                             'registered_container_instances': cluster.get('registeredContainerInstancesCount', 0)
                         }
                     }
-                    resources.append(resource)
+                    count += 1
+                    yield resource
                     
-            logger.info(f"Found {len(resources)} ECS clusters")
+            logger.info(f"Found {count} ECS clusters")
         except Exception as e:
             logger.error(f"Error scanning ECS clusters: {e}")
-            
-        return resources
+            self._scan_failed('ecs')
     
-    def scan_eks_clusters(self) -> List[Dict[str, Any]]:
+    def iter_eks_clusters(self) -> Iterator[Dict[str, Any]]:
         """Scan EKS Clusters"""
-        eks = self.session.client('eks')
-        resources = []
+        eks = self._client('eks')
+        count = 0
         
         try:
-            cluster_names = eks.list_clusters()['clusters']
-            for cluster_name in cluster_names:
+            for cluster_name in paginate(eks, 'list_clusters', 'clusters'):
                 cluster = eks.describe_cluster(name=cluster_name)['cluster']
                 tags = cluster.get('tags', {})
                 
@@ -342,25 +544,26 @@ class AWSScanner:
                         'created_at': cluster.get('createdAt').isoformat() if cluster.get('createdAt') else None
                     }
                 }
-                resources.append(resource)
+                count += 1
+                yield resource
                 
-            logger.info(f"Found {len(resources)} EKS clusters")
+            logger.info(f"Found {count} EKS clusters")
         except Exception as e:
             logger.error(f"Error scanning EKS clusters: {e}")
-            
-        return resources
+            self._scan_failed('eks')
     
-    def scan_dynamodb_tables(self) -> List[Dict[str, Any]]:
+    def iter_dynamodb_tables(self) -> Iterator[Dict[str, Any]]:
         """Scan DynamoDB Tables"""
-        dynamodb = self.session.client('dynamodb')
-        resources = []
+        dynamodb = self._client('dynamodb')
+        count = 0
         
         try:
-            table_names = dynamodb.list_tables()['TableNames']
-            for table_name in table_names:
+            for table_name in paginate(dynamodb, 'list_tables', 'TableNames'):
                 table = dynamodb.describe_table(TableName=table_name)['Table']
-                tags_response = dynamodb.list_tags_of_resource(ResourceArn=table['TableArn'])
-                tags = {tag['Key']: tag['Value'] for tag in tags_response.get('Tags', [])}
+                tags = self._tags_for(table['TableArn'], lambda: {
+                    tag['Key']: tag['Value']
+                    for tag in dynamodb.list_tags_of_resource(ResourceArn=table['TableArn']).get('Tags', [])
+                })
                 
                 resource = {
                     'name': table['TableName'],
@@ -379,30 +582,32 @@ class AWSScanner:
                         'created_at': table.get('CreationDateTime').isoformat() if table.get('CreationDateTime') else None
                     }
                 }
-                resources.append(resource)
+                count += 1
+                yield resource
                 
-            logger.info(f"Found {len(resources)} DynamoDB tables")
+            logger.info(f"Found {count} DynamoDB tables")
         except Exception as e:
             logger.error(f"Error scanning DynamoDB tables: {e}")
-            
-        return resources
+            self._scan_failed('dynamodb')
     
-    def scan_sns_topics(self) -> List[Dict[str, Any]]:
+    def iter_sns_topics(self) -> Iterator[Dict[str, Any]]:
         """Scan SNS Topics"""
-        sns = self.session.client('sns')
-        resources = []
+        sns = self._client('sns')
+        count = 0
         
         try:
-            topics = sns.list_topics()['Topics']
-            for topic in topics:
+            for topic in paginate(sns, 'list_topics', 'Topics'):
                 topic_arn = topic['TopicArn']
                 topic_name = topic_arn.split(':')[-1]
                 
-                try:
-                    tags_response = sns.list_tags_for_resource(ResourceArn=topic_arn)
-                    tags = {tag['Key']: tag['Value'] for tag in tags_response.get('Tags', [])}
-                except:
-                    tags = {}
+                def topic_tags() -> Dict[str, str]:
+                    try:
+                        tags_response = sns.list_tags_for_resource(ResourceArn=topic_arn)
+                        return {tag['Key']: tag['Value'] for tag in tags_response.get('Tags', [])}
+                    except:
+                        return {}
+                
+                tags = self._tags_for(topic_arn, topic_tags)
                 
                 attrs = sns.get_topic_attributes(TopicArn=topic_arn)['Attributes']
                 
@@ -421,21 +626,22 @@ class AWSScanner:
                         'display_name': attrs.get('DisplayName', '')
                     }
                 }
-                resources.append(resource)
+                count += 1
+                yield resource
                 
-            logger.info(f"Found {len(resources)} SNS topics")
+            logger.info(f"Found {count} SNS topics")
         except Exception as e:
             logger.error(f"Error scanning SNS topics: {e}")
-            
-        return resources
+            self._scan_failed('sns')
     
-    def scan_sqs_queues(self) -> List[Dict[str, Any]]:
+    def iter_sqs_queues(self) -> Iterator[Dict[str, Any]]:
         """Scan SQS Queues"""
-        sqs = self.session.client('sqs')
-        resources = []
+        sqs = self._client('sqs')
+        count = 0
         
         try:
-            queue_urls = sqs.list_queues().get('QueueUrls', [])
+            # ListQueues only returns a NextToken when MaxResults is set
+            queue_urls = paginate(sqs, 'list_queues', 'QueueUrls', PaginationConfig={'PageSize': 1000})
             for queue_url in queue_urls:
                 queue_name = queue_url.split('/')[-1]
                 attrs = sqs.get_queue_attributes(
@@ -443,11 +649,14 @@ class AWSScanner:
                     AttributeNames=['All']
                 )['Attributes']
                 
-                try:
-                    tags_response = sqs.list_queue_tags(QueueUrl=queue_url)
-                    tags = tags_response.get('Tags', {})
-                except:
-                    tags = {}
+                def queue_tags() -> Dict[str, str]:
+                    try:
+                        return sqs.list_queue_tags(QueueUrl=queue_url).get('Tags', {})
+                    except:
+                        return {}
+                
+                queue_arn = attrs.get('QueueArn') or f"arn:{self.partition}:sqs:{self.region}:{self.get_account_id()}:{queue_name}"
+                tags = self._tags_for(queue_arn, queue_tags)
                 
                 resource = {
                     'name': queue_name,
@@ -465,22 +674,21 @@ class AWSScanner:
                         'fifo_queue': attrs.get('FifoQueue', 'false')
                     }
                 }
-                resources.append(resource)
+                count += 1
+                yield resource
                 
-            logger.info(f"Found {len(resources)} SQS queues")
+            logger.info(f"Found {count} SQS queues")
         except Exception as e:
             logger.error(f"Error scanning SQS queues: {e}")
-            
-        return resources
+            self._scan_failed('sqs')
     
-    def scan_api_gateways(self) -> List[Dict[str, Any]]:
+    def iter_api_gateways(self) -> Iterator[Dict[str, Any]]:
         """Scan API Gateway REST APIs"""
-        apigateway = self.session.client('apigateway')
-        resources = []
+        apigateway = self._client('apigateway')
+        count = 0
         
         try:
-            apis = apigateway.get_rest_apis()['items']
-            for api in apis:
+            for api in paginate(apigateway, 'get_rest_apis', 'items'):
                 tags = api.get('tags', {})
                 
                 resource = {
@@ -498,35 +706,37 @@ class AWSScanner:
                         'endpoint_configuration': api.get('endpointConfiguration', {}).get('types', [])
                     }
                 }
-                resources.append(resource)
+                count += 1
+                yield resource
                 
-            logger.info(f"Found {len(resources)} API Gateways")
+            logger.info(f"Found {count} API Gateways")
         except Exception as e:
             logger.error(f"Error scanning API Gateways: {e}")
-            
-        return resources
+            self._scan_failed('apigateway')
     
-    def scan_codepipeline(self) -> List[Dict[str, Any]]:
+    def iter_codepipeline(self) -> Iterator[Dict[str, Any]]:
         """Scan CodePipeline pipelines"""
-        codepipeline = self.session.client('codepipeline')
-        resources = []
+        codepipeline = self._client('codepipeline')
+        count = 0
         
         try:
-            pipelines = codepipeline.list_pipelines()['pipelines']
-            for pipeline_summary in pipelines:
+            for pipeline_summary in paginate(codepipeline, 'list_pipelines', 'pipelines'):
                 pipeline_name = pipeline_summary['name']
                 
                 # Get detailed pipeline info
                 pipeline = codepipeline.get_pipeline(name=pipeline_name)['pipeline']
                 
                 # Get pipeline tags
-                try:
-                    tags_response = codepipeline.list_tags_for_resource(
-                        resourceArn=f"arn:aws:codepipeline:{self.region}:{self.get_account_id()}:pipeline:{pipeline_name}"
-                    )
-                    tags = {tag['key']: tag['value'] for tag in tags_response.get('tags', [])}
-                except:
-                    tags = {}
+                pipeline_arn = f"arn:{self.partition}:codepipeline:{self.region}:{self.get_account_id()}:{pipeline_name}"
+                
+                def pipeline_tags() -> Dict[str, str]:
+                    try:
+                        tags_response = codepipeline.list_tags_for_resource(resourceArn=pipeline_arn)
+                        return {tag['key']: tag['value'] for tag in tags_response.get('tags', [])}
+                    except:
+                        return {}
+                
+                tags = self._tags_for(pipeline_arn, pipeline_tags)
                 
                 # Get pipeline state
                 try:
@@ -557,36 +767,290 @@ class AWSScanner:
                         'updated_at': pipeline_summary.get('updated').isoformat() if pipeline_summary.get('updated') else None
                     }
                 }
-                resources.append(resource)
+                count += 1
+                yield resource
                 
-            logger.info(f"Found {len(resources)} CodePipeline pipelines")
+            logger.info(f"Found {count} CodePipeline pipelines")
         except Exception as e:
             logger.error(f"Error scanning CodePipeline: {e}")
-            
-        return resources
+            self._scan_failed('codepipeline')
+    
+    def iter_route53_hosted_zones(self) -> Iterator[Dict[str, Any]]:
+        """Scan Route53 hosted zones and their DNS records"""
+        return iter_route53_hosted_zones(self._thread_session(), self.region, self.get_account_id(),
+                                         on_error=partial(self._scan_failed, 'route53'))
+    
+    def iter_cloudfront_distributions(self) -> Iterator[Dict[str, Any]]:
+        """Scan CloudFront distributions"""
+        return iter_cloudfront_distributions(self._thread_session(), self.region, self.get_account_id(), partition=self.partition,
+                                             on_error=partial(self._scan_failed, 'cloudfront'))
+    
+    def iter_amazon_mq_brokers(self) -> Iterator[Dict[str, Any]]:
+        """Scan Amazon MQ brokers"""
+        return iter_amazon_mq_brokers(self._thread_session(), self.region, self.get_account_id(),
+                                      on_error=partial(self._scan_failed, 'amazonmq'))
+    
+    # List-returning wrappers kept for callers that want the whole result at once
+    def scan_ec2_instances(self) -> List[Dict[str, Any]]:
+        return list(self.iter_ec2_instances())
+    
+    def scan_rds_instances(self) -> List[Dict[str, Any]]:
+        return list(self.iter_rds_instances())
+    
+    def scan_lambda_functions(self) -> List[Dict[str, Any]]:
+        return list(self.iter_lambda_functions())
+    
+    def scan_s3_buckets(self) -> List[Dict[str, Any]]:
+        return list(self.iter_s3_buckets())
+    
+    def scan_load_balancers(self) -> List[Dict[str, Any]]:
+        return list(self.iter_load_balancers())
+    
+    def scan_vpcs(self) -> List[Dict[str, Any]]:
+        return list(self.iter_vpcs())
+    
+    def scan_ecs_clusters(self) -> List[Dict[str, Any]]:
+        return list(self.iter_ecs_clusters())
+    
+    def scan_eks_clusters(self) -> List[Dict[str, Any]]:
+        return list(self.iter_eks_clusters())
+    
+    def scan_dynamodb_tables(self) -> List[Dict[str, Any]]:
+        return list(self.iter_dynamodb_tables())
+    
+    def scan_sns_topics(self) -> List[Dict[str, Any]]:
+        return list(self.iter_sns_topics())
+    
+    def scan_sqs_queues(self) -> List[Dict[str, Any]]:
+        return list(self.iter_sqs_queues())
+    
+    def scan_api_gateways(self) -> List[Dict[str, Any]]:
+        return list(self.iter_api_gateways())
+    
+    def scan_codepipeline(self) -> List[Dict[str, Any]]:
+        return list(self.iter_codepipeline())
+    
+    def scan_route53_hosted_zones(self) -> List[Dict[str, Any]]:
+        return list(self.iter_route53_hosted_zones())
+    
+    def scan_cloudfront_distributions(self) -> List[Dict[str, Any]]:
+        return list(self.iter_cloudfront_distributions())
+    
+    def scan_amazon_mq_brokers(self) -> List[Dict[str, Any]]:
+        return list(self.iter_amazon_mq_brokers())
+    
+    def for_region(self, region: str) -> 'AWSScanner':
+        """
+        Scanner for another region of the same account
+        It shares credentials, the cached caller identity and the API call
+        counters with this scanner, so a multi-region scan makes one STS
+        call and reports one set of stats.
+        """
+        if region == self.region:
+            return self
+        self.get_caller_identity()
+        scanner = copy.copy(self)
+        scanner.region = region
+        scanner._session_kwargs = {**self._session_kwargs, 'region_name': region}
+        scanner._local = threading.local()
+        scanner.session = scanner._new_session()
+        return scanner
+    
+    def for_account(self, credentials, identity: Dict[str, str]) -> 'AWSScanner':
+        """
+        Scanner for another account reached with temporary credentials
+        (e.g. an assumed role). identity is that account's caller identity
+        as returned by get_caller_identity(); API call counters and the scan
+        budget are shared with this scanner.
+        """
+        scanner = copy.copy(self)
+        scanner._session_kwargs = {'region_name': self.region}
+        scanner._credentials = credentials
+        scanner._identity = identity
+        scanner._identity_lock = threading.Lock()
+        scanner.account_id = identity['account_id']
+        scanner._local = threading.local()
+        scanner.session = scanner._new_session()
+        return scanner
+    
+    def list_regions(self) -> List[str]:
+        """Regions enabled for the account (opted-in or not requiring opt-in)"""
+        regions = self._client('ec2').describe_regions()['Regions']
+        return sorted(region['RegionName'] for region in regions)
+    
+    def _plan_scan(
+        self,
+        resource_types: Optional[List[str]],
+        regions: Optional[List[str]]
+    ) -> List[Tuple[str, 'AWSScanner']]:
+        """
+        Work units (result key, scanner) for a scan, in merge order
+        Regional services get one unit per region; GLOBAL_RESOURCE_TYPES are
+        scanned once from this scanner's region whatever regions are given.
+        """
+        resource_types = resource_types or list(self.SERVICE_SCANNERS)
+        keys = [key for key in self.SERVICE_SCANNERS if key in set(resource_types)]
+        # Each scan reads tags afresh
+        self._tag_indexes.forget(self.get_account_id())
+        unknown = set(resource_types) - set(keys)
+        if unknown:
+            logger.warning(f"Skipping unsupported resource types: {sorted(unknown)}")
+        
+        if not regions:
+            return [(key, self) for key in keys]
+        
+        scanners = [self.for_region(region) for region in dict.fromkeys(regions)]
+        units = []
+        for key in keys:
+            if key in self.GLOBAL_RESOURCE_TYPES:
+                units.append((key, self))
+            else:
+                units.extend((key, scanner) for scanner in scanners)
+        return units
+    
+    def _scan_slots(
+        self,
+        units: List[Tuple[str, 'AWSScanner']],
+        service_concurrency: Optional[Dict[str, int]],
+        region_concurrency: Optional[int]
+    ):
+        """
+        Build a context manager factory that caps concurrent scanners per
+        region and per (region, AWS service) - throttling limits are
+        regional, so two regions never wait on each other - and, when set,
+        by the scan budget shared with other accounts' scanners.
+        """
+        service_concurrency = service_concurrency or {}
+        region_limit = max(1, region_concurrency or settings.AWS_SCAN_REGION_CONCURRENCY)
+        region_slots = {}
+        service_slots = {}
+        for key, scanner in units:
+            service = self.SERVICE_SCANNERS[key][0]
+            region_slots.setdefault(scanner.region, threading.BoundedSemaphore(region_limit))
+            if (scanner.region, service) not in service_slots:
+                limit = service_concurrency.get(service, settings.AWS_SCAN_SERVICE_CONCURRENCY)
+                service_slots[(scanner.region, service)] = threading.BoundedSemaphore(max(1, limit))
+        
+        budget = self._scan_budget or nullcontext()
+        
+        @contextmanager
+        def slot(key: str, scanner: 'AWSScanner'):
+            # Always region, then service, then the shared budget, so workers
+            # cannot deadlock
+            with region_slots[scanner.region], service_slots[(scanner.region, self.SERVICE_SCANNERS[key][0])], budget:
+                yield
+        
+        return slot
+    
+    def scan_resource_types(
+        self,
+        resource_types: List[str],
+        concurrent: bool = False,
+        max_workers: Optional[int] = None,
+        service_concurrency: Optional[Dict[str, int]] = None,
+        regions: Optional[List[str]] = None,
+        region_concurrency: Optional[int] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Scan the given resource types (keys of SERVICE_SCANNERS)
+        
+        With concurrent=True the scanners run on a bounded thread pool of
+        max_workers threads, and at most service_concurrency[service]
+        scanners talk to the same AWS service at once. The result is merged
+        in SERVICE_SCANNERS order, so it is identical to a sequential scan.
+        
+        With regions set, regional services are scanned in every region
+        (at most region_concurrency scanners per region at once) and each
+        result key holds the resources of all regions, in regions order.
+        """
+        units = self._plan_scan(resource_types, regions)
+        results = {key: [] for key, _ in units}
+        
+        if not concurrent or len(units) <= 1:
+            for key, scanner in units:
+                results[key].extend(getattr(scanner, self.SERVICE_SCANNERS[key][1])())
+            return results
+        
+        # Resolve the caller identity once up front so the workers only read the cache
+        self.get_caller_identity()
+        
+        max_workers = max_workers or settings.AWS_SCAN_MAX_WORKERS
+        slot = self._scan_slots(units, service_concurrency, region_concurrency)
+        
+        def run(key: str, scanner: 'AWSScanner') -> List[Dict[str, Any]]:
+            with slot(key, scanner):
+                return list(getattr(scanner, self.SERVICE_SCANNERS[key][1])())
+        
+        logger.info(f"Running {len(units)} scanners with {max_workers} workers")
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='aws-scan') as executor:
+            futures = [(key, executor.submit(run, key, scanner)) for key, scanner in units]
+            for key, future in futures:
+                results[key].extend(future.result())
+        return results
+    
+    def iter_resources(
+        self,
+        resource_types: Optional[List[str]] = None,
+        concurrent: bool = False,
+        max_workers: Optional[int] = None,
+        service_concurrency: Optional[Dict[str, int]] = None,
+        buffer_size: int = 500,
+        regions: Optional[List[str]] = None,
+        region_concurrency: Optional[int] = None
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Stream (result key, resource) pairs as scanner pages arrive
+        
+        Nothing is accumulated: a consumer such as import_resource_stream can
+        start writing while the scan is still running. In concurrent mode the
+        workers feed a queue of at most buffer_size resources, so a slow
+        consumer applies back-pressure instead of letting memory grow.
+        Results from different services interleave in arrival order.
+        regions and region_concurrency work as in scan_resource_types.
+        """
+        units = self._plan_scan(resource_types, regions)
+        
+        if not concurrent or len(units) <= 1:
+            for key, scanner in units:
+                for resource in getattr(scanner, self.SERVICE_SCANNERS[key][1])():
+                    yield key, resource
+            return
+        
+        self.get_caller_identity()
+        
+        max_workers = max_workers or settings.AWS_SCAN_MAX_WORKERS
+        slot = self._scan_slots(units, service_concurrency, region_concurrency)
+        
+        def run(key: str, scanner: 'AWSScanner') -> Iterator[Tuple[str, Dict[str, Any]]]:
+            with slot(key, scanner):
+                for resource in getattr(scanner, self.SERVICE_SCANNERS[key][1])():
+                    yield key, resource
+        
+        yield from merge_streams(
+            [partial(run, key, scanner) for key, scanner in units],
+            max_workers=max_workers,
+            buffer_size=buffer_size
+        )
     
-    def scan_all_resources(self) -> Dict[str, List[Dict[str, Any]]]:
+    def scan_all_resources(
+        self,
+        concurrent: bool = False,
+        max_workers: Optional[int] = None,
+        service_concurrency: Optional[Dict[str, int]] = None,
+        regions: Optional[List[str]] = None,
+        region_concurrency: Optional[int] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
         """Scan all supported AWS resources"""
-        logger.info(f"Starting AWS resource scan for region {self.region}")
-        
-        results = {
-            'ec2': self.scan_ec2_instances(),
-            'rds': self.scan_rds_instances(),
-            'lambda': self.scan_lambda_functions(),
-            's3': self.scan_s3_buckets(),
-            'elb': self.scan_load_balancers(),
-            'vpc': self.scan_vpcs(),
-            'ecs': self.scan_ecs_clusters(),
-            'eks': self.scan_eks_clusters(),
-            'dynamodb': self.scan_dynamodb_tables(),
-            'sns': self.scan_sns_topics(),
-            'sqs': self.scan_sqs_queues(),
-            'apigateway': self.scan_api_gateways(),
-            'codepipeline': self.scan_codepipeline(),
-            'route53': scan_route53_hosted_zones(self.session, self.region, self.get_account_id()),
-            'cloudfront': scan_cloudfront_distributions(self.session, self.region, self.get_account_id()),
-            'amazonmq': scan_amazon_mq_brokers(self.session, self.region, self.get_account_id())
-        }
+        logger.info(f"Starting AWS resource scan for region(s) {', '.join(regions or [self.region])}")
+        
+        results = self.scan_resource_types(
+            list(self.SERVICE_SCANNERS),
+            concurrent=concurrent,
+            max_workers=max_workers,
+            service_concurrency=service_concurrency,
+            regions=regions,
+            region_concurrency=region_concurrency
+        )
         
         total = sum(len(resources) for resources in results.values())
         logger.info(f"Scan complete. Found {total} total resources")
@@ -595,71 +1059,218 @@ class AWSScanner:
     
     def import_resources_to_db(self, db: Session, user_id: int, resources: Dict[str, List[Dict[str, Any]]]) -> Dict[str, int]:
         """Import scanned resources into the database"""
+        for resource_type, resource_list in resources.items():
+            logger.info(f"Processing {len(resource_list)} {resource_type} resources...")
+        
+        return self.import_resource_stream(
+            db, user_id,
+            (resource_data for resource_list in resources.values() for resource_data in resource_list)
+        )
+    
+    def import_resource_stream(self, db: Session, user_id: int, resources: Iterable[Dict[str, Any]], batch_size: int = 500) -> Dict[str, int]:
+        """
+        Import scanned resources from any iterable, e.g. iter_resources()
+        Existing rows are matched against one preloaded index of the user's
+        resources and each batch_size batch is written with bulk insert /
+        update statements and committed, so rows land in the database while
+        the scan is still producing them.
+        """
+        started = time.perf_counter()
         stats = {
             'created': 0,
             'updated': 0,
             'errors': 0
         }
+        index = ResourceIndex(db, user_id)
         
-        for resource_type, resource_list in resources.items():
-            logger.info(f"Processing {len(resource_list)} {resource_type} resources...")
-            for resource_data in resource_list:
-                try:
-                    # Check if resource already exists
-                    existing = db.query(Resource).filter(
-                        Resource.resource_id == resource_data['resource_id'],
-                        Resource.created_by == user_id
-                    ).first()
-                    
-                    if existing:
-                        # Update existing resource
-                        for key, value in resource_data.items():
-                            if key == 'type_specific_properties':
-                                existing.type_specific_properties = value
-                            elif key == 'tags':
-                                existing.tags = value
-                            elif hasattr(existing, key):
-                                setattr(existing, key, value)
-                        stats['updated'] += 1
-                        logger.info(f"Updated resource: {resource_data.get('name')} ({resource_data.get('type')})")
-                    else:
-                        # Create new resource - filter valid fields only
-                        valid_fields = {
-                            'name', 'type', 'region', 'arn', 'account_id', 'resource_id',
-                            'status', 'environment', 'cost_center', 'owner', 'application', 'project',
-                            'vpc_id', 'subnet_id', 'availability_zone', 'security_groups',
-                            'public_ip', 'private_ip', 'dns_name', 'endpoint',
-                            'instance_type', 'resource_creation_date',
-                            'type_specific_properties', 'dependencies', 'connected_resources',
-                            'attached_to', 'parent_resource', 'child_resources',
-                            'target_resources', 'source_resources',
-                            'encryption_enabled', 'public_access', 'compliance_status',
-                            'monthly_cost_estimate', 'last_cost_update',
-                            'tags', 'description', 'notes', 'aws_service', 'aws_resource_type',
-                            'last_reported_at'
-                        }
-                        
-                        filtered_data = {k: v for k, v in resource_data.items() if k in valid_fields}
-                        
-                        new_resource = Resource(
-                            created_by=user_id,
-                            **filtered_data
-                        )
-                        db.add(new_resource)
-                        stats['created'] += 1
-                        logger.info(f"Created resource: {resource_data.get('name')} ({resource_data.get('type')})")
-                        
-                except Exception as e:
-                    logger.error(f"Error importing resource {resource_data.get('name')}: {e}")
-                    logger.error(f"Resource data: {resource_data}")
+        for batch in page_chunks(iter(resources), batch_size):
+            for result in upsert_resource_batch(db, user_id, batch, index):
+                if result is None:
                     stats['errors'] += 1
-                    
+                else:
+                    stats['created' if result[1] else 'updated'] += 1
+            self._commit_import(db)
+        
+        stats.update(throughput(stats['created'] + stats['updated'], started))
+        logger.info(
+            f"Import complete: {stats['created']} created, {stats['updated']} updated, "
+            f"{stats['errors']} errors ({stats['rows_per_sec']} rows/sec)"
+        )
+        
+        return stats
+    
+    def import_resource_delta(
+        self,
+        db: Session,
+        user_id: int,
+        resources: Iterable[Tuple[str, Dict[str, Any]]],
+        scope: Callable[[], Iterable[Tuple[Optional[str], str, Optional[str]]]],
+        batch_size: int = 500
+    ) -> Dict[str, int]:
+        """
+        Incremental import of (result key, resource) pairs, e.g. iter_resources()
+        
+        Each resource is fingerprinted and compared with the fingerprint
+        stored for its (account_id, resource_id, region) by the previous scan
+        (region as bulk_upsert.match_region, None for global resources); only
+        new and changed rows are written. Unchanged rows just get their
+        last_reported_at bumped with one UPDATE per batch.
+        
+        Resources covered by scope() but not seen in this scan are counted as
+        vanished and left untouched, so their last_reported_at stays older
+        than the scan - nothing is deleted. scope is called once the stream
+        is exhausted and returns (account, result key, region) triples
+        (region None for global services), see scan_scope().
+        """
+        started = time.perf_counter()
+        scanned_at = datetime.now(timezone.utc)
+        stats = {
+            'new': 0,
+            'changed': 0,
+            'unchanged': 0,
+            'vanished': 0,
+            'errors': 0
+        }
+        index = ResourceIndex(db, user_id)
+        seen = set()
+        
+        for batch in page_chunks(iter(resources), batch_size):
+            resource_ids = {resource_data.get('resource_id') for _, resource_data in batch}
+            stored = {
+                (account_id, resource_id, region): (pk, digest)
+                for pk, account_id, resource_id, region, digest in db.query(
+                    ResourceFingerprint.id,
+                    ResourceFingerprint.account_id,
+                    ResourceFingerprint.resource_id,
+                    ResourceFingerprint.region,
+                    ResourceFingerprint.fingerprint
+                ).filter(
+                    ResourceFingerprint.created_by == user_id,
+                    ResourceFingerprint.resource_id.in_(resource_ids)
+                )
+            }
+            unchanged = []
+            changed = []
+            
+            for key, resource_data in batch:
+                if not resource_data.get('resource_id'):
+                    stats['errors'] += 1
+                    continue
+                identity = (
+                    resource_data.get('account_id'),
+                    resource_data['resource_id'],
+                    match_region(resource_data.get('region'), resource_data.get('type'))
+                )
+                if identity in seen:
+                    continue
+                seen.add(identity)
+                
+                digest = fingerprint_resource(resource_data)
+                previous = stored.get(identity)
+                if previous is not None and previous[1] == digest:
+                    unchanged.append(index.find(identity[1], identity[0] or None, identity[2]))
+                else:
+                    changed.append((key, resource_data, identity, digest, previous))
+            
+            results = upsert_resource_batch(
+                db, user_id,
+                [{**resource_data, 'last_reported_at': scanned_at} for _, resource_data, _, _, _ in changed],
+                index
+            )
+            new_fingerprints = []
+            updated_fingerprints = []
+            for (key, resource_data, identity, digest, previous), result in zip(changed, results):
+                if result is None:
+                    stats['errors'] += 1
+                    continue
+                values = {
+                    'scan_key': key,
+                    'region': identity[2],
+                    'fingerprint': digest,
+                    'resource_pk': result[0]
+                }
+                if previous is None:
+                    new_fingerprints.append({
+                        'created_by': user_id,
+                        'account_id': resource_data.get('account_id'),
+                        'resource_id': resource_data['resource_id'],
+                        **values
+                    })
+                else:
+                    updated_fingerprints.append({'id': previous[0], **values})
+                stats['new' if result[1] else 'changed'] += 1
+            db.bulk_insert_mappings(ResourceFingerprint, new_fingerprints)
+            db.bulk_update_mappings(ResourceFingerprint, updated_fingerprints)
+            
+            unchanged = [pk for pk in unchanged if pk is not None]
+            if unchanged:
+                db.query(Resource).filter(Resource.id.in_(unchanged)).update(
+                    {Resource.last_reported_at: scanned_at}, synchronize_session=False
+                )
+                stats['unchanged'] += len(unchanged)
+            self._commit_import(db)
+        
+        # Everything the scan fully covered but did not return has vanished
+        covered = set(scope())
+        accounts = {account_id for account_id, _, _ in covered}
+        if accounts:
+            candidates = db.query(
+                ResourceFingerprint.account_id,
+                ResourceFingerprint.resource_id,
+                ResourceFingerprint.scan_key,
+                ResourceFingerprint.region
+            ).filter(
+                ResourceFingerprint.created_by == user_id,
+                ResourceFingerprint.account_id.in_(accounts)
+            )
+            stats['vanished'] = sum(
+                1 for account_id, resource_id, key, region in candidates
+                if (account_id, resource_id, region) not in seen
+                and ((account_id, key, None) in covered or (account_id, key, region) in covered)
+            )
+        
+        stats.update(throughput(stats['new'] + stats['changed'] + stats['unchanged'], started))
+        logger.info(
+            f"Incremental import complete: {stats['new']} new, {stats['changed']} changed, "
+            f"{stats['unchanged']} unchanged, {stats['vanished']} vanished, {stats['errors']} errors "
+            f"({stats['rows_per_sec']} rows/sec)"
+        )
+        return stats
+    
+    def scan_scope(
+        self,
+        resource_types: Optional[List[str]] = None,
+        regions: Optional[List[str]] = None
+    ) -> List[Tuple[Optional[str], str, Optional[str]]]:
+        """
+        (account, result key, region) triples a finished scan listed completely
+        Scanners that hit an error are left out, so their resources are never
+        reported as vanished. region is None for GLOBAL_RESOURCE_TYPES.
+        """
+        resource_types = resource_types or list(self.SERVICE_SCANNERS)
+        account_id = self.get_account_id()
+        with self._api_calls_lock:
+            failed = set(self._scan_errors)
+        
+        scope = []
+        for key in self.SERVICE_SCANNERS:
+            if key not in resource_types:
+                continue
+            if key in self.GLOBAL_RESOURCE_TYPES:
+                if (account_id, self.region, key) not in failed:
+                    scope.append((account_id, key, None))
+            else:
+                scope.extend(
+                    (account_id, key, region) for region in dict.fromkeys(regions or [self.region])
+                    if (account_id, region, key) not in failed
+                )
+        return scope
+    
+    def _commit_import(self, db: Session):
+        """Commit one import batch, rolling back on failure"""
         try:
             db.commit()
-            logger.info(f"Import complete: {stats['created']} created, {stats['updated']} updated, {stats['errors']} errors")
         except Exception as e:
             logger.error(f"Database commit failed: {e}")
             db.rollback()
             raise
-        
-        return stats
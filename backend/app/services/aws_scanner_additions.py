@@ -3,20 +3,25 @@ Additional AWS Resource Scanner Methods
 Route53, CloudFront, and Amazon MQ scanning
 """
 import boto3
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, Iterator, List, Optional, Any
 import logging
+from app.services.aws_pagination import paginate
 
 logger = logging.getLogger(__name__)
 
 
-def scan_route53_hosted_zones(session: boto3.Session, region: str, account_id: str) -> List[Dict[str, Any]]:
-    """Scan Route53 Hosted Zones and their individual DNS records"""
+def iter_route53_hosted_zones(session: boto3.Session, region: str, account_id: str, on_error: Optional[Callable[[Exception], None]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Scan Route53 Hosted Zones and their individual DNS records
+    Records are yielded page by page; each zone is yielded after its records,
+    once its record count is known.
+    """
     route53 = session.client('route53')
-    resources = []
+    zones_count = 0
+    records_count = 0
     
     try:
-        hosted_zones = route53.list_hosted_zones()['HostedZones']
-        for zone in hosted_zones:
+        for zone in paginate(route53, 'list_hosted_zones', 'HostedZones'):
             zone_id = zone['Id'].split('/')[-1]
             
             try:
@@ -35,40 +40,10 @@ def scan_route53_hosted_zones(session: boto3.Session, region: str, account_id: s
                 except:
                     tags = {}
                 
-                # Fetch ALL DNS records for this zone (paginated)
-                all_records = []
-                try:
-                    paginator = route53.get_paginator('list_resource_record_sets')
-                    for page in paginator.paginate(HostedZoneId=zone_id):
-                        all_records.extend(page.get('ResourceRecordSets', []))
-                except:
-                    try:
-                        resp = route53.list_resource_record_sets(HostedZoneId=zone_id)
-                        all_records = resp.get('ResourceRecordSets', [])
-                    except:
-                        all_records = []
-                
-                # Save the hosted zone itself
-                resource = {
-                    'name': zone_name,
-                    'resource_id': zone_id,
-                    'type': 'route53',
-                    'status': 'active' if not is_private else 'private',
-                    'region': 'global',
-                    'account_id': account_id,
-                    'tags': tags,
-                    'type_specific_properties': {
-                        'zone_id': zone_id,
-                        'private_zone': is_private,
-                        'record_count': len(all_records),
-                        'caller_reference': zone_info.get('CallerReference'),
-                        'comment': zone_info.get('Config', {}).get('Comment', '')
-                    }
-                }
-                resources.append(resource)
-                
-                # Save each DNS record as a separate route53_record resource
-                for record in all_records:
+                # Stream ALL DNS records for this zone (paginated)
+                zone_record_count = 0
+                for record in paginate(route53, 'list_resource_record_sets', 'ResourceRecordSets', HostedZoneId=zone_id):
+                    zone_record_count += 1
                     rec_name = record.get('Name', '').rstrip('.')
                     rec_type = record.get('Type', '')
                     
@@ -118,85 +93,104 @@ def scan_route53_hosted_zones(session: boto3.Session, region: str, account_id: s
                             'failover': record.get('Failover'),
                         }
                     }
-                    resources.append(rec_resource)
+                    records_count += 1
+                    yield rec_resource
                 
-                logger.info(f"Zone {zone_name}: {len(all_records)} records scanned")
+                # Save the hosted zone itself
+                resource = {
+                    'name': zone_name,
+                    'resource_id': zone_id,
+                    'type': 'route53',
+                    'status': 'active' if not is_private else 'private',
+                    'region': 'global',
+                    'account_id': account_id,
+                    'tags': tags,
+                    'type_specific_properties': {
+                        'zone_id': zone_id,
+                        'private_zone': is_private,
+                        'record_count': zone_record_count,
+                        'caller_reference': zone_info.get('CallerReference'),
+                        'comment': zone_info.get('Config', {}).get('Comment', '')
+                    }
+                }
+                zones_count += 1
+                yield resource
+                
+                logger.info(f"Zone {zone_name}: {zone_record_count} records scanned")
                 
             except Exception as e:
                 logger.error(f"Error getting details for hosted zone {zone_id}: {e}")
+                if on_error:
+                    on_error(e)
                 
-        zones_count = sum(1 for r in resources if r['type'] == 'route53')
-        records_count = sum(1 for r in resources if r['type'] == 'route53_record')
         logger.info(f"Found {zones_count} Route53 hosted zones with {records_count} DNS records")
     except Exception as e:
         logger.error(f"Error scanning Route53: {e}")
-        
-    return resources
+        if on_error:
+            on_error(e)
 
 
-def scan_cloudfront_distributions(session: boto3.Session, region: str, account_id: str) -> List[Dict[str, Any]]:
+def iter_cloudfront_distributions(session: boto3.Session, region: str, account_id: str, partition: str = 'aws', on_error: Optional[Callable[[Exception], None]] = None) -> Iterator[Dict[str, Any]]:
     """Scan CloudFront Distributions"""
     cloudfront = session.client('cloudfront')
-    resources = []
+    count = 0
     
     try:
-        distributions = cloudfront.list_distributions()
-        if 'DistributionList' in distributions and 'Items' in distributions['DistributionList']:
-            for dist in distributions['DistributionList']['Items']:
-                dist_id = dist['Id']
-                
-                # Get distribution tags
-                try:
-                    tags_response = cloudfront.list_tags_for_resource(
-                        Resource=f"arn:aws:cloudfront::{account_id}:distribution/{dist_id}"
-                    )
-                    tags = {tag['Key']: tag['Value'] for tag in tags_response.get('Tags', {}).get('Items', [])}
-                except:
-                    tags = {}
-                
-                # Get origins
-                origins = []
-                if 'Origins' in dist and 'Items' in dist['Origins']:
-                    origins = [origin.get('DomainName', '') for origin in dist['Origins']['Items']]
-                
-                resource = {
-                    'name': dist.get('Aliases', {}).get('Items', [dist_id])[0] if dist.get('Aliases', {}).get('Items') else dist_id,
-                    'resource_id': dist_id,
-                    'type': 'cloudfront',
-                    'status': dist['Status'].lower(),
-                    'region': 'global',  # CloudFront is global
-                    'account_id': account_id,
-                    'tags': tags,
-                    'type_specific_properties': {
-                        'domain_name': dist['DomainName'],
-                        'enabled': dist.get('Enabled', False),
-                        'price_class': dist.get('PriceClass', 'Unknown'),
-                        'origins': origins,
-                        'origin_count': len(origins),
-                        'aliases': dist.get('Aliases', {}).get('Items', []),
-                        'default_root_object': dist.get('DefaultRootObject', ''),
-                        'http_version': dist.get('HttpVersion', 'http2'),
-                        'is_ipv6_enabled': dist.get('IsIPV6Enabled', False),
-                        'comment': dist.get('Comment', '')
-                    }
+        for dist in paginate(cloudfront, 'list_distributions', 'DistributionList.Items'):
+            dist_id = dist['Id']
+            
+            # Get distribution tags
+            try:
+                tags_response = cloudfront.list_tags_for_resource(
+                    Resource=dist.get('ARN') or f"arn:{partition}:cloudfront::{account_id}:distribution/{dist_id}"
+                )
+                tags = {tag['Key']: tag['Value'] for tag in tags_response.get('Tags', {}).get('Items', [])}
+            except:
+                tags = {}
+            
+            # Get origins
+            origins = []
+            if 'Origins' in dist and 'Items' in dist['Origins']:
+                origins = [origin.get('DomainName', '') for origin in dist['Origins']['Items']]
+            
+            resource = {
+                'name': dist.get('Aliases', {}).get('Items', [dist_id])[0] if dist.get('Aliases', {}).get('Items') else dist_id,
+                'resource_id': dist_id,
+                'type': 'cloudfront',
+                'status': dist['Status'].lower(),
+                'region': 'global',  # CloudFront is global
+                'account_id': account_id,
+                'tags': tags,
+                'type_specific_properties': {
+                    'domain_name': dist['DomainName'],
+                    'enabled': dist.get('Enabled', False),
+                    'price_class': dist.get('PriceClass', 'Unknown'),
+                    'origins': origins,
+                    'origin_count': len(origins),
+                    'aliases': dist.get('Aliases', {}).get('Items', []),
+                    'default_root_object': dist.get('DefaultRootObject', ''),
+                    'http_version': dist.get('HttpVersion', 'http2'),
+                    'is_ipv6_enabled': dist.get('IsIPV6Enabled', False),
+                    'comment': dist.get('Comment', '')
                 }
-                resources.append(resource)
-                
-        logger.info(f"Found {len(resources)} CloudFront distributions")
+            }
+            count += 1
+            yield resource
+            
+        logger.info(f"Found {count} CloudFront distributions")
     except Exception as e:
         logger.error(f"Error scanning CloudFront: {e}")
-        
-    return resources
+        if on_error:
+            on_error(e)
 
 
-def scan_amazon_mq_brokers(session: boto3.Session, region: str, account_id: str) -> List[Dict[str, Any]]:
+def iter_amazon_mq_brokers(session: boto3.Session, region: str, account_id: str, on_error: Optional[Callable[[Exception], None]] = None) -> Iterator[Dict[str, Any]]:
     """Scan Amazon MQ Brokers"""
     mq = session.client('mq')
-    resources = []
+    count = 0
     
     try:
-        brokers = mq.list_brokers()['BrokerSummaries']
-        for broker_summary in brokers:
+        for broker_summary in paginate(mq, 'list_brokers', 'BrokerSummaries'):
             broker_id = broker_summary['BrokerId']
             
             # Get detailed broker info
@@ -238,12 +232,30 @@ def scan_amazon_mq_brokers(session: boto3.Session, region: str, account_id: str)
                         'maintenance_window': broker.get('MaintenanceWindowStartTime', {})
                     }
                 }
-                resources.append(resource)
+                count += 1
+                yield resource
             except Exception as e:
                 logger.error(f"Error getting details for MQ broker {broker_id}: {e}")
+                if on_error:
+                    on_error(e)
                 
-        logger.info(f"Found {len(resources)} Amazon MQ brokers")
+        logger.info(f"Found {count} Amazon MQ brokers")
     except Exception as e:
         logger.error(f"Error scanning Amazon MQ: {e}")
-        
-    return resources
+        if on_error:
+            on_error(e)
+
+
+def scan_route53_hosted_zones(session: boto3.Session, region: str, account_id: str) -> List[Dict[str, Any]]:
+    """Scan Route53 Hosted Zones and their individual DNS records"""
+    return list(iter_route53_hosted_zones(session, region, account_id))
+
+
+def scan_cloudfront_distributions(session: boto3.Session, region: str, account_id: str, partition: str = 'aws') -> List[Dict[str, Any]]:
+    """Scan CloudFront Distributions"""
+    return list(iter_cloudfront_distributions(session, region, account_id, partition=partition))
+
+
+def scan_amazon_mq_brokers(session: boto3.Session, region: str, account_id: str) -> List[Dict[str, Any]]:
+    """Scan Amazon MQ Brokers"""
+    return list(iter_amazon_mq_brokers(session, region, account_id))
@@ -0,0 +1,79 @@
+"""
+Bulk tag lookup through the Resource Groups Tagging API
+One paginated tagging:GetResources listing per account and region replaces
+the per-resource tag calls of the scanners; tags are joined onto scanned
+resources by ARN.
+"""
+import threading
+from typing import Callable, Dict, Hashable, Optional
+
+from app.services.aws_pagination import paginate
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Resource types whose tags are read from the bulk listing. Scanners of
+# other services keep their own per-resource calls (or get tags inline).
+TAGGED_RESOURCE_TYPES = [
+    'rds:db',
+    'lambda:function',
+    's3',
+    'elasticloadbalancing:loadbalancer',
+    'ecs:cluster',
+    'dynamodb:table',
+    'sns',
+    'sqs',
+    'codepipeline:pipeline',
+]
+
+
+def load_tag_index(tagging_client) -> Dict[str, Dict[str, str]]:
+    """ARN -> tags of every TAGGED_RESOURCE_TYPES resource in the client's region"""
+    index = {}
+    mappings = paginate(
+        tagging_client, 'get_resources', 'ResourceTagMappingList',
+        ResourceTypeFilters=TAGGED_RESOURCE_TYPES,
+        ResourcesPerPage=100
+    )
+    for mapping in mappings:
+        index[mapping['ResourceARN']] = {tag['Key']: tag['Value'] for tag in mapping.get('Tags', [])}
+    return index
+
+
+class _TagIndexEntry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded = False
+        self.tags = None
+
+
+class TagIndexCache:
+    """
+    Tag indexes per (account, region), loaded once by the first scanner
+    thread that needs one while the others wait for it. An index that
+    could not be loaded (e.g. tag:GetResources denied) is cached as None, so
+    callers fall back to per-resource calls without retrying the listing.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, load: Callable[[], Dict[str, Dict[str, str]]]) -> Optional[Dict[str, Dict[str, str]]]:
+        with self._lock:
+            entry = self._entries.setdefault(key, _TagIndexEntry())
+        with entry.lock:
+            if not entry.loaded:
+                try:
+                    entry.tags = load()
+                    logger.info(f"Loaded tags of {len(entry.tags)} resources for {key}")
+                except Exception as e:
+                    logger.warning(f"Bulk tag listing unavailable for {key}, using per-resource calls: {e}")
+                entry.loaded = True
+        return entry.tags
+
+    def forget(self, account_id: Optional[str]):
+        """Drop the account's indexes so the next scan reads fresh tags"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == account_id]:
+                del self._entries[key]
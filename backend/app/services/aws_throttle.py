@@ -0,0 +1,170 @@
+"""
+Adaptive rate control shared by every boto3 client of a scan
+Requests to one AWS service in one account and region draw from one token
+bucket. The bucket's rate climbs while calls succeed and is cut back on each
+throttling response, so a scan finds the rate AWS accepts instead of
+relying on a fixed guess.
+"""
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from botocore.config import Config
+
+from app.core.config import settings
+
+# Error codes AWS services use to say "slow down"
+THROTTLING_ERROR_CODES = {
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'RequestThrottledException',
+    'TooManyRequestsException',
+    'ProvisionedThroughputExceededException',
+    'TransactionInProgressException',
+    'RequestLimitExceeded',
+    'BandwidthLimitExceeded',
+    'LimitExceededException',
+    'RequestThrottled',
+    'SlowDown',
+    'PriorRequestNotComplete',
+    'EC2ThrottledException',
+}
+
+
+def scan_client_config() -> Config:
+    """
+    botocore client config for scanners
+    Connection pools sized for the concurrent scan workers, and retries
+    handled by botocore in AWS_SCAN_RETRY_MODE while the shared controller
+    paces the attempts.
+    """
+    return Config(
+        max_pool_connections=settings.AWS_SCAN_MAX_POOL_CONNECTIONS,
+        retries={
+            'mode': settings.AWS_SCAN_RETRY_MODE,
+            'max_attempts': settings.AWS_SCAN_MAX_ATTEMPTS
+        },
+        connect_timeout=10,
+        read_timeout=60
+    )
+
+
+def is_throttling_response(response: Optional[Tuple[Any, Dict[str, Any]]]) -> bool:
+    """Whether a needs-retry (http_response, parsed) pair is a throttling error"""
+    if not response:
+        return False
+    http_response, parsed = response
+    if getattr(http_response, 'status_code', None) == 429:
+        return True
+    return (parsed or {}).get('Error', {}).get('Code') in THROTTLING_ERROR_CODES
+
+
+class AdaptiveTokenBucket:
+    """
+    Token bucket with an additive-increase / multiplicative-decrease rate
+    Every successful attempt raises the rate (requests per second) by
+    increase up to max_rate; a throttled attempt halves it down to
+    min_rate. The bucket holds at most one second of tokens.
+    """
+
+    def __init__(self, rate: float, min_rate: float, max_rate: float, increase: float):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self._tokens = rate
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until one is available; returns the seconds waited"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(max(self.rate, 1.0), self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def succeeded(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def throttled(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            # Drop any burst so the retries really slow down
+            self._tokens = min(self._tokens, 0.0)
+
+
+class RateController:
+    """
+    Token buckets per (account, region, service), plus throttle and retry
+    counters. One controller is shared by a scanner and every scanner
+    derived from it (for_region / for_account), across all worker threads.
+    """
+
+    def __init__(
+        self,
+        initial_rate: Optional[float] = None,
+        min_rate: Optional[float] = None,
+        max_rate: Optional[float] = None,
+        increase: Optional[float] = None
+    ):
+        self.initial_rate = initial_rate or settings.AWS_SCAN_INITIAL_RATE
+        self.min_rate = min_rate or settings.AWS_SCAN_MIN_RATE
+        self.max_rate = max_rate or settings.AWS_SCAN_MAX_RATE
+        self.increase = increase or settings.AWS_SCAN_RATE_INCREASE
+        self._buckets = {}
+        self._throttles = {}
+        self._attempts = 0
+        self._waited = 0.0
+        self._lock = threading.Lock()
+
+    def bucket(self, account_id: Optional[str], region: str, service: str) -> AdaptiveTokenBucket:
+        key = (account_id, region, service)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = AdaptiveTokenBucket(self.initial_rate, self.min_rate, self.max_rate, self.increase)
+                self._buckets[key] = bucket
+            return bucket
+
+    def before_attempt(self, account_id: Optional[str], region: str, service: str):
+        """Pace one HTTP attempt (first try or retry)"""
+        waited = self.bucket(account_id, region, service).acquire()
+        with self._lock:
+            self._attempts += 1
+            self._waited += waited
+
+    def after_attempt(self, account_id: Optional[str], region: str, service: str, response) -> bool:
+        """Feed an attempt's outcome back into its bucket; returns whether it was throttled"""
+        bucket = self.bucket(account_id, region, service)
+        if is_throttling_response(response):
+            bucket.throttled()
+            with self._lock:
+                self._throttles[service] = self._throttles.get(service, 0) + 1
+            return True
+        if response is not None:
+            bucket.succeeded()
+        return False
+
+    def get_stats(self, api_calls: int) -> Dict[str, Any]:
+        """Throttle and retry counters; api_calls is the number of logical calls made"""
+        with self._lock:
+            return {
+                'throttled': sum(self._throttles.values()),
+                'throttled_by_service': dict(sorted(self._throttles.items())),
+                'retries': max(0, self._attempts - api_calls) if self._attempts else 0,
+                'rate_limit_wait_seconds': round(self._waited, 3),
+                'request_rates': {
+                    f"{region}/{service}": round(bucket.rate, 2)
+                    for (_, region, service), bucket in sorted(self._buckets.items(), key=lambda item: (item[0][1], item[0][2]))
+                }
+            }
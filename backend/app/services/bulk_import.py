@@ -0,0 +1,297 @@
+"""
+Bulk execution of file imports (/api/import/execute)
+Rows are normalized one by one, then matched against existing resources
+with one IN query per batch and written with bulk statements inside a
+savepoint. A batch that fails is split and retried in smaller savepoints,
+so one bad row is reported without losing the rest of its batch.
+"""
+import re
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import String
+from sqlalchemy.orm import Session
+
+from app.models import Resource
+from app.services.aws_pagination import page_chunks
+from app.services.bulk_upsert import RESOURCE_IMPORT_FIELDS, grouped_mappings, throughput
+from app.services.resource_stats import resource_stats
+from app.services.url_flow_index import url_flow_index
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Columns an imported row may set; everything else goes to the description
+VALID_IMPORT_FIELDS = RESOURCE_IMPORT_FIELDS | {'created_by'}
+
+# Text columns; numbers a spreadsheet typed as such (account IDs, numeric names) are imported as their text
+TEXT_IMPORT_FIELDS = {
+    column.name for column in Resource.__table__.columns
+    if isinstance(column.type, String) and column.name in VALID_IMPORT_FIELDS
+}
+
+# Date columns; imported as ISO 8601 text (how every parser hands dates over)
+DATETIME_IMPORT_FIELDS = ['resource_creation_date', 'last_cost_update', 'last_reported_at']
+
+# Moved into type_specific_properties
+EC2_SPECIFIC_FIELDS = ['os', 'ami_id', 'key_pair', 'ebs_optimized', 'monitoring', 'platform']
+
+ARN_SERVICE_TYPES = {
+    'ec2': 'ec2',
+    'rds': 'rds',
+    's3': 's3',
+    'lambda': 'lambda',
+    'elasticloadbalancing': 'elb',
+    'ecs': 'ecs',
+    'eks': 'eks'
+}
+
+ENV_KEYWORDS = {
+    'prod': 'production',
+    'production': 'production',
+    'stg': 'staging',
+    'staging': 'staging',
+    'stage': 'staging',
+    'dev': 'development',
+    'development': 'development',
+    'test': 'testing',
+    'testing': 'testing',
+    'qa': 'qa',
+    'uat': 'uat'
+}
+
+
+def _import_text(value: Any) -> Any:
+    """A number as the text it was typed as (1001.0 -> '1001'); anything else as it is"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def prepare_import_resource(resource_data: Dict[str, Any], user_id: int) -> Dict[str, Any]:
+    """
+    Turn one imported row into Resource column values
+    Unknown columns are kept in the description, and account, region,
+    resource ID, type, status and environment are filled in from the ARN,
+    availability zone, state and name where missing.
+    """
+    resource_data = {key: value for key, value in resource_data.items() if key != '_import_warnings'}
+    resource_data['created_by'] = user_id
+
+    # Extract type_specific_properties from resource_data
+    type_specific_props = resource_data.get('type_specific_properties', {})
+    if not isinstance(type_specific_props, dict):
+        type_specific_props = {}
+
+    # Move 'os' and other EC2-specific fields to type_specific_properties
+    for field in EC2_SPECIFIC_FIELDS:
+        if field in resource_data and resource_data[field]:
+            type_specific_props[field] = resource_data[field]
+
+    # Filter resource_data to only include valid fields
+    filtered_data = {k: v for k, v in resource_data.items() if k in VALID_IMPORT_FIELDS}
+    for field in TEXT_IMPORT_FIELDS.intersection(filtered_data):
+        filtered_data[field] = _import_text(filtered_data[field])
+
+    # SMART: Save ALL unmapped columns to description (don't lose any data!)
+    unmapped_fields = {}
+    for key, value in resource_data.items():
+        if key not in VALID_IMPORT_FIELDS and key not in EC2_SPECIFIC_FIELDS and value is not None and value != '':
+            unmapped_fields[key] = value
+
+    if unmapped_fields:
+        # Convert unmapped fields to readable description
+        unmapped_desc = ", ".join([f"{k}: {v}" for k, v in unmapped_fields.items()])
+        existing_desc = filtered_data.get('description', '')
+        if existing_desc:
+            filtered_data['description'] = f"{existing_desc} | Additional: {unmapped_desc}"
+        else:
+            filtered_data['description'] = f"Additional fields: {unmapped_desc}"
+
+    for field in DATETIME_IMPORT_FIELDS:
+        value = filtered_data.get(field)
+        if isinstance(value, str):
+            try:
+                filtered_data[field] = datetime.fromisoformat(value.replace('Z', '+00:00')) if value.strip() else None
+            except ValueError:
+                raise ValueError(f"Invalid date for {field}: {value[:50]}")
+
+    # Parse ARN if present to extract account_id and region
+    arn = filtered_data.get('arn')
+    if arn and isinstance(arn, str):
+        # ARN format: arn:aws:service:region:account-id:resource-type/resource-id
+        arn_match = re.match(r'arn:aws:[^:]+:([^:]*):([^:]+):(.+)', arn)
+        if arn_match:
+            arn_region, arn_account, arn_resource = arn_match.groups()
+
+            if not filtered_data.get('account_id') and arn_account:
+                filtered_data['account_id'] = arn_account
+
+            if not filtered_data.get('region') and arn_region:
+                filtered_data['region'] = arn_region
+
+            if not filtered_data.get('resource_id') and arn_resource:
+                # Handle different ARN formats (e.g., "instance/i-123" or "i-123")
+                if '/' in arn_resource:
+                    filtered_data['resource_id'] = arn_resource.split('/')[-1]
+                else:
+                    filtered_data['resource_id'] = arn_resource
+
+    # Auto-fill required fields with smart defaults
+    if not filtered_data.get('region'):
+        # Try to extract from availability_zone (e.g., "eu-west-3c" -> "eu-west-3")
+        az = filtered_data.get('availability_zone', '')
+        if az and len(az) > 1:
+            filtered_data['region'] = az[:-1]  # Remove last character (zone letter)
+        else:
+            filtered_data['region'] = 'unknown'
+
+    if not filtered_data.get('name'):
+        filtered_data['name'] = f"Resource-{resource_data.get('resource_id', 'Unknown')}"
+
+    if not filtered_data.get('type'):
+        # Try to detect type from ARN
+        if arn and isinstance(arn, str):
+            arn_parts = arn.split(':')
+            if len(arn_parts) >= 3:
+                service = arn_parts[2]
+                filtered_data['type'] = ARN_SERVICE_TYPES.get(service, service)
+        else:
+            filtered_data['type'] = 'unknown'
+
+    # Auto-detect status from state field if present
+    if not filtered_data.get('status') or filtered_data.get('status') == 'unknown':
+        state = resource_data.get('state') or resource_data.get('instance_state')
+        if state:
+            filtered_data['status'] = str(_import_text(state)).lower()
+
+    # Auto-detect environment from name
+    if not filtered_data.get('environment'):
+        name = filtered_data.get('name', '').lower()
+        for keyword, env in ENV_KEYWORDS.items():
+            if keyword in name:
+                filtered_data['environment'] = env
+                break
+
+    # Add type_specific_properties if we collected any
+    if type_specific_props:
+        filtered_data['type_specific_properties'] = type_specific_props
+
+    # Caught here rather than by the database, which would fail the whole batch
+    if not filtered_data.get('type'):
+        raise ValueError("Missing required field: type (not given and not derivable from the ARN)")
+
+    return filtered_data
+
+
+def find_existing_resources(db: Session, user_id: int, resource_ids: List[str]) -> Dict[str, int]:
+    """resource_id -> id of the user's oldest row with it, for the given IDs in one IN query"""
+    existing = {}
+    if not resource_ids:
+        return existing
+    rows = db.query(Resource.id, Resource.resource_id).filter(
+        Resource.created_by == user_id,
+        Resource.resource_id.in_(resource_ids)
+    ).order_by(Resource.id)
+    for pk, resource_id in rows:
+        existing.setdefault(resource_id, pk)
+    return existing
+
+
+def _import_error(resource_data: Dict[str, Any], row: int, error: Exception) -> Dict[str, Any]:
+    return {
+        "row": row + 1,
+        "resource": resource_data.get("name", "Unknown"),
+        "error": str(error)[:200]  # Truncate error message
+    }
+
+
+def bulk_import_resources(
+    db: Session,
+    user_id: int,
+    resources: List[Dict[str, Any]],
+    batch_size: int = 500,
+    on_batch: Optional[Callable[[int, Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Insert or update imported rows batch_size at a time, one commit per batch
+    Rows are matched to existing resources by resource_id; a resource_id
+    repeated within the import updates the row its first occurrence wrote.
+    on_batch(rows processed, stats) is called after each commit; whatever it
+    raises stops the import, keeping the batches already committed.
+    Returns created/updated counts, per-row errors and throughput.
+    """
+    started = time.perf_counter()
+    stats = {'created': 0, 'updated': 0, 'errors': []}
+    processed = 0
+
+    for batch in page_chunks(iter(enumerate(resources)), batch_size):
+        prepared = []
+        for row, resource_data in batch:
+            try:
+                prepared.append((row, resource_data, prepare_import_resource(resource_data, user_id)))
+            except Exception as e:
+                stats['errors'].append(_import_error(resource_data, row, e))
+
+        _write_rows(db, user_id, prepared, stats)
+        db.commit()
+        processed += len(batch)
+        if on_batch:
+            on_batch(processed, stats)
+
+    stats.update(throughput(stats['created'] + stats['updated'], started))
+    return stats
+
+
+def _write_rows(db: Session, user_id: int, prepared: List[tuple], stats: Dict[str, Any]):
+    """
+    Write prepared (row, resource_data, values) rows with one bulk insert and
+    one bulk update in a savepoint. If that fails the rows are split in half
+    and each half retried, down to the single rows that cannot be written.
+    """
+    existing = find_existing_resources(
+        db, user_id, list({values['resource_id'] for _, _, values in prepared if values.get('resource_id')})
+    )
+
+    # One insert per new resource_id, one update per row id; later rows for
+    # the same resource are merged into earlier ones
+    inserts = {}
+    updates = {}
+    planned = []
+    for row, resource_data, values in prepared:
+        resource_id = values.get('resource_id')
+        pk = existing.get(resource_id) if resource_id else None
+        if pk is not None:
+            update = {key: value for key, value in values.items() if key != 'created_by'}
+            updates.setdefault(pk, {'id': pk}).update(update)
+            planned.append(False)
+        elif resource_id and resource_id in inserts:
+            inserts[resource_id].update(values)
+            planned.append(False)
+        else:
+            inserts[resource_id or ('row', row)] = dict(values)
+            planned.append(True)
+
+    try:
+        with db.begin_nested():
+            db.bulk_insert_mappings(Resource, grouped_mappings(inserts.values()))
+            db.bulk_update_mappings(Resource, grouped_mappings(updates.values()))
+    except Exception as e:
+        if len(prepared) == 1:
+            row, resource_data, _ = prepared[0]
+            stats['errors'].append(_import_error(resource_data, row, e))
+            return
+        logger.debug(f"Bulk write of {len(prepared)} rows failed, splitting it: {str(e).splitlines()[0]}")
+        middle = len(prepared) // 2
+        _write_rows(db, user_id, prepared[:middle], stats)
+        _write_rows(db, user_id, prepared[middle:], stats)
+        return
+
+    # New resources are found by the URL flow index by their ids
+    url_flow_index.track_resources(db, updates)
+    resource_stats.invalidate(db)
+    for created in planned:
+        stats['created' if created else 'updated'] += 1
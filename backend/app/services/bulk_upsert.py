@@ -0,0 +1,174 @@
+"""
+Bulk resource upsert
+Matches incoming resource dicts against one preloaded index of a user's rows
+and writes them with bulk_insert_mappings / bulk_update_mappings per batch,
+instead of one SELECT (and one flush) per row.
+"""
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.models import Resource
+from app.services.resource_stats import resource_stats
+from app.services.url_flow_index import url_flow_index
+
+# Resource columns an imported resource dict may set
+RESOURCE_IMPORT_FIELDS = {
+    'name', 'type', 'region', 'arn', 'account_id', 'resource_id',
+    'status', 'environment', 'cost_center', 'owner', 'application', 'project',
+    'vpc_id', 'subnet_id', 'availability_zone', 'security_groups',
+    'public_ip', 'private_ip', 'dns_name', 'endpoint',
+    'instance_type', 'resource_creation_date',
+    'type_specific_properties', 'dependencies', 'connected_resources',
+    'attached_to', 'parent_resource', 'child_resources',
+    'target_resources', 'source_resources',
+    'encryption_enabled', 'public_access', 'compliance_status',
+    'monthly_cost_estimate', 'last_cost_update',
+    'tags', 'description', 'notes', 'aws_service', 'aws_resource_type',
+    'last_reported_at'
+}
+
+
+# Types listed account-wide: their region is only where the scan ran from,
+# so they are matched without it
+UNREGIONED_TYPES = {'route53', 'route53_record', 'cloudfront'}
+
+
+def match_region(region: Optional[str], resource_type: Optional[str]) -> Optional[str]:
+    """The region a resource is matched in, None for global resources and rows without one"""
+    if resource_type in UNREGIONED_TYPES or region in (None, '', 'unknown', 'global'):
+        return None
+    return region
+
+
+class ResourceIndex:
+    """
+    (resource_id, account_id, region) -> row id for every resource of one user
+
+    Loaded with a single query. Names such as Lambda functions, RDS
+    instances or DynamoDB tables repeat across regions, so a resource
+    matches a row of its own region; failing that a row without a region,
+    which it claims. Accounts match the same way: a resource with an
+    account_id matches the rows of that account first, then rows without an
+    account (which it claims); one without an account_id matches rows of
+    any account. A resource without a region matches the first row.
+    """
+
+    def __init__(self, db: Session, user_id: int):
+        # resource_id -> [[row id, account_id, match region], ...] in row order
+        self._rows = {}
+        rows = db.query(Resource.id, Resource.resource_id, Resource.account_id, Resource.region, Resource.type).filter(
+            Resource.created_by == user_id
+        ).order_by(Resource.id)
+        for pk, resource_id, account_id, region, resource_type in rows:
+            self.add(resource_id, account_id or None, match_region(region, resource_type), pk)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._rows.values())
+
+    def add(self, resource_id: str, account_id: Optional[str], region: Optional[str], pk: int):
+        """Index a row; region is its match_region()"""
+        self._rows.setdefault(resource_id, []).append([pk, account_id, region])
+
+    def find(self, resource_id: str, account_id: Optional[str], region: Optional[str] = None) -> Optional[int]:
+        """The row a resource matches, region being its match_region()"""
+        entries = self._rows.get(resource_id, ())
+        pools = [[e for e in entries if e[1] == account_id], [e for e in entries if e[1] is None]] if account_id else [entries]
+        for pool in pools:
+            if not pool:
+                continue
+            if region is None:
+                entry = pool[0]
+            else:
+                entry = next((e for e in pool if e[2] == region), None) or next((e for e in pool if e[2] is None), None)
+            if entry is not None:
+                # The row now belongs to this account and region
+                entry[1] = entry[1] or account_id
+                entry[2] = entry[2] or region
+                return entry[0]
+        return None
+
+
+def upsert_resource_batch(
+    db: Session,
+    user_id: int,
+    batch: List[Dict[str, Any]],
+    index: ResourceIndex,
+    fields: Iterable[str] = RESOURCE_IMPORT_FIELDS
+) -> List[Optional[Tuple[int, bool]]]:
+    """
+    Insert or update one batch of resource dicts with bulk statements
+
+    Returns (row id, created) per input dict, or None for a dict that could
+    not be imported (no resource_id). Several dicts for the same resource
+    (resource_id, account and region, see ResourceIndex) in one batch are
+    merged into one row, later values winning. The caller commits.
+    """
+    fields = set(fields)
+    inserts = {}
+    updates = {}
+    planned = []
+
+    for resource_data in batch:
+        resource_id = resource_data.get('resource_id')
+        if not resource_id:
+            planned.append(None)
+            continue
+        account_id = resource_data.get('account_id') or None
+        region = match_region(resource_data.get('region'), resource_data.get('type'))
+        values = {key: value for key, value in resource_data.items() if key in fields}
+
+        pk = index.find(resource_id, account_id, region)
+        if pk is not None:
+            updates.setdefault(pk, {'id': pk}).update(values)
+            planned.append((pk, False))
+        else:
+            key = (resource_id, account_id, region)
+            created = key not in inserts
+            inserts.setdefault(key, {'created_by': user_id}).update(values)
+            planned.append((key, created))
+
+    if inserts:
+        # Without return_defaults each key set is one executemany; the new
+        # ids are read back with one query instead
+        db.bulk_insert_mappings(Resource, grouped_mappings(inserts.values()))
+        created_ids = {}
+        rows = db.query(Resource.id, Resource.resource_id, Resource.account_id, Resource.region, Resource.type).filter(
+            Resource.created_by == user_id,
+            Resource.resource_id.in_({resource_id for resource_id, _, _ in inserts})
+        ).order_by(Resource.id)
+        for pk, resource_id, account_id, region, resource_type in rows:
+            created_ids[(resource_id, account_id or None, match_region(region, resource_type))] = pk
+        for key in inserts:
+            inserts[key]['id'] = created_ids[key]
+            index.add(*key, created_ids[key])
+    if updates:
+        db.bulk_update_mappings(Resource, grouped_mappings(updates.values()))
+        url_flow_index.track_resources(db, updates)
+    if inserts or updates:
+        resource_stats.invalidate(db)
+
+    return [
+        None if entry is None
+        else entry if isinstance(entry[0], int)
+        else (inserts[entry[0]]['id'], entry[1])
+        for entry in planned
+    ]
+
+
+def grouped_mappings(mappings: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Order mappings by their key set - the bulk methods emit one executemany
+    per run of identically-keyed mappings, and services interleave in a scan
+    """
+    return sorted(mappings, key=lambda mapping: sorted(mapping))
+
+
+def throughput(rows: int, started: float) -> Dict[str, int]:
+    """elapsed_ms and rows_per_sec since started (a time.perf_counter() value)"""
+    elapsed = time.perf_counter() - started
+    return {
+        'elapsed_ms': int(elapsed * 1000),
+        'rows_per_sec': int(rows / elapsed) if elapsed > 0 else rows
+    }
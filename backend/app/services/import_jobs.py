@@ -0,0 +1,244 @@
+"""
+Background import jobs
+/api/import/execute-async hands an import to a worker pool with its own
+database session. The import_jobs row carries the current phase (the bulk
+import, then relationship extraction), per-phase progress, the result and
+timings, so clients poll it or follow its event stream instead of holding
+a request open.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models import ImportJob
+from app.services.bulk_import import bulk_import_resources
+from app.services.relationship_extractor import RelationshipExtractor
+from app.services.url_flow_index import session_factory_for, url_flow_index
+import logging
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('queued', 'running')
+PHASES = ('import', 'relationships')
+
+
+class ImportCancelled(Exception):
+    """Raised into a running import once its job has been cancelled"""
+
+
+def import_summary(stats: Dict[str, Any], relationships_count: int) -> Dict[str, Any]:
+    """The /import/execute response for bulk_import_resources stats"""
+    created_count = stats['created']
+    updated_count = stats['updated']
+    total_count = created_count + updated_count
+    return {
+        "success": True,
+        "imported_count": total_count,
+        "created_count": created_count,
+        "updated_count": updated_count,
+        "error_count": len(stats['errors']),
+        "errors": stats['errors'],
+        "relationships_extracted": relationships_count,
+        "elapsed_ms": stats['elapsed_ms'],
+        "rows_per_sec": stats['rows_per_sec'],
+        "message": f"Successfully imported {total_count} resources ({created_count} created, {updated_count} updated) and extracted {relationships_count} relationships"
+    }
+
+
+class ImportJobProgress:
+    """
+    Phase and counts of a running import job
+    Progress is written to the job row at most every interval seconds (and
+    whenever a phase starts or ends), from a session of its own so it never
+    mixes with the import's transaction. Each write also picks up a cancel
+    request.
+    """
+
+    def __init__(self, job_id: int, interval: Optional[float] = None):
+        self.job_id = job_id
+        self.interval = settings.IMPORT_JOB_PROGRESS_INTERVAL if interval is None else interval
+        self.phase = None
+        self.progress = {
+            'import': {'status': 'pending', 'rows_total': 0, 'rows_processed': 0, 'created': 0, 'updated': 0, 'errors': 0},
+            'relationships': {'status': 'pending', 'step': None, 'extracted': 0}
+        }
+        self._db = SessionLocal()
+        self._flushed = time.monotonic()
+
+    def start(self, phase: str, **values):
+        self.phase = phase
+        self.progress[phase].update(status='running', **values)
+        self.flush()
+
+    def finish(self, phase: str, status: str = 'succeeded', **values):
+        self.progress[phase].update(status=status, **values)
+        self.flush(check_cancel=False)
+
+    def batch(self, rows_processed: int, stats: Dict[str, Any]):
+        """bulk_import_resources' on_batch"""
+        self.progress['import'].update(
+            rows_processed=rows_processed,
+            created=stats['created'],
+            updated=stats['updated'],
+            errors=len(stats['errors'])
+        )
+        if time.monotonic() - self._flushed >= self.interval:
+            self.flush()
+
+    def step(self, name: str):
+        """RelationshipExtractor.extract_all_relationships' on_step"""
+        self.progress['relationships']['step'] = name
+        self.flush()
+
+    def flush(self, check_cancel: bool = True):
+        """Write the progress so far; raises ImportCancelled if the job was cancelled"""
+        self._flushed = time.monotonic()
+        job = self._db.get(ImportJob, self.job_id)
+        self._db.refresh(job)
+        job.phase = self.phase
+        job.progress = {phase: dict(values) for phase, values in self.progress.items()}
+        self._db.commit()
+        if check_cancel and job.cancel_requested:
+            raise ImportCancelled(f"Import job {self.job_id} was cancelled")
+
+    def close(self):
+        self._db.close()
+
+
+RowsLoader = Callable[[], List[Dict[str, Any]]]
+
+
+def run_import(db: Session, user_id: int, resources: List[Dict[str, Any]], batch_size: int,
+               progress: Optional[ImportJobProgress] = None) -> Dict[str, Any]:
+    """
+    Bulk import resources, then extract relationships, as /import/execute
+    does; with progress each phase is tracked on the job. A failed
+    extraction does not fail the import.
+    """
+    if progress:
+        progress.start('import', rows_total=len(resources))
+    stats = bulk_import_resources(db, user_id, resources, batch_size=batch_size,
+                                  on_batch=progress.batch if progress else None)
+    if progress:
+        progress.finish('import')
+
+    relationships_count = 0
+    try:
+        if progress:
+            progress.start('relationships')
+        logger.info("Extracting relationships from imported resources...")
+        relationships_count = RelationshipExtractor.extract_all_relationships(db, on_step=progress.step if progress else None)
+        logger.info(f"Extracted {relationships_count} relationships")
+        if progress:
+            progress.finish('relationships', extracted=relationships_count)
+    except ImportCancelled:
+        raise
+    except Exception as e:
+        logger.warning(f"Relationship extraction failed (non-critical): {str(e)}")
+        db.rollback()
+        if progress:
+            progress.finish('relationships', 'failed', error=str(e)[:200])
+
+    # Rebuild the affected URL flows now rather than on the next request for them
+    url_flow_index.schedule_refresh(session_factory=session_factory_for(db))
+    return import_summary(stats, relationships_count)
+
+
+class ImportJobRunner:
+    """Runs import jobs on a bounded worker pool"""
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or settings.IMPORT_JOB_WORKERS
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, job_id: int, load_rows: RowsLoader):
+        """Queue the job; load_rows() returns the rows to import and runs on the worker"""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='import-job')
+        self._executor.submit(self._run, job_id, load_rows)
+
+    def _run(self, job_id: int, load_rows: RowsLoader):
+        db = SessionLocal()
+        try:
+            job = db.get(ImportJob, job_id)
+            if job is None or job.status != 'queued':
+                # Cancelled before a worker picked it up
+                return
+            job.status = 'running'
+            job.started_at = datetime.now(timezone.utc)
+            db.commit()
+            user_id = job.created_by
+            batch_size = (job.params or {}).get('batch_size') or settings.IMPORT_BATCH_SIZE
+
+            progress = ImportJobProgress(job_id)
+            result = None
+            error = None
+            try:
+                result = run_import(db, user_id, load_rows(), batch_size, progress)
+                status = 'succeeded'
+            except ImportCancelled:
+                db.rollback()
+                status = 'cancelled'
+            except Exception as e:
+                logger.exception(f"Import job {job_id} failed")
+                db.rollback()
+                status = 'failed'
+                error = str(e)
+            finally:
+                progress.close()
+
+            job = db.get(ImportJob, job_id)
+            db.refresh(job)
+            if status == 'cancelled' and progress.phase:
+                # Batches committed before the cancel stay imported
+                progress.progress[progress.phase]['status'] = 'cancelled'
+            job.status = status
+            job.error = error
+            job.phase = progress.phase
+            job.progress = {phase: dict(values) for phase, values in progress.progress.items()}
+            job.result = result
+            job.finished_at = datetime.now(timezone.utc)
+            db.commit()
+            logger.info(f"Import job {job_id} {status}: {progress.progress['import']['rows_processed']} rows processed")
+        except Exception as e:
+            logger.error(f"Could not record the result of import job {job_id}: {e}")
+        finally:
+            db.close()
+
+
+def cancel_import_job(db: Session, job: ImportJob) -> ImportJob:
+    """Cancel a queued job at once, or ask a running one to stop at its next progress write"""
+    if job.status not in ACTIVE_STATUSES:
+        return job
+    job.cancel_requested = True
+    if job.status == 'queued':
+        job.status = 'cancelled'
+        job.finished_at = datetime.now(timezone.utc)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def fail_interrupted_import_jobs(db: Session) -> int:
+    """Mark jobs left queued or running by a previous process as failed"""
+    count = db.query(ImportJob).filter(ImportJob.status.in_(ACTIVE_STATUSES)).update(
+        {
+            ImportJob.status: 'failed',
+            ImportJob.error: 'Interrupted by a server restart',
+            ImportJob.finished_at: datetime.now(timezone.utc)
+        },
+        synchronize_session=False
+    )
+    db.commit()
+    return count
+
+
+import_job_runner = ImportJobRunner()
@@ -1,11 +1,19 @@
 """
 Import Service - Handle Excel/CSV imports with LLM assistance
 """
+import codecs
 import io
 import json
-from typing import List, Dict, Any, Optional
+from typing import BinaryIO, Callable, Iterator, List, Dict, Any, Optional, Tuple, Union
 import os
 import logging
+import multiprocessing
+import tempfile
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait
+from itertools import compress
+from operator import itemgetter
 
 # Make numpy optional - import will fail gracefully
 try:
@@ -40,7 +48,75 @@ except ImportError:
     OpenAI = None
     logging.warning("⚠️  openai not installed - AI analysis features will be disabled")
 
+from app.core.config import settings
+from app.services.parquet_io import PYARROW_AVAILABLE, iter_parquet_chunks, pa, pc
+
+
+# parse_aws_resource_explorer_frame's mark for a type or service value it cannot map
+_RE_SKIP = object()
+
+_excel_executor = None
+_excel_executor_lock = threading.Lock()
+
+
+def _excel_worker_count() -> int:
+    """IMPORT_EXCEL_WORKERS, but no more than there are CPUs to run them"""
+    return min(settings.IMPORT_EXCEL_WORKERS, os.cpu_count() or 1)
+
+
+def _excel_workers() -> ProcessPoolExecutor:
+    """Worker processes for Excel sheets, started on first use and kept"""
+    global _excel_executor
+    with _excel_executor_lock:
+        if _excel_executor is None:
+            # spawn, not fork: the server process has threads
+            _excel_executor = ProcessPoolExecutor(
+                max_workers=_excel_worker_count(),
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _excel_executor
+
+
+def _read_excel_sheet(path: str, sheet_name: str, engine: Optional[str],
+                      count_issues: bool = False) -> Tuple[int, List[Any], List[List[Any]], int, Counter]:
+    """
+    Worker process: parse and clean one sheet of the workbook at path
+    Returns the number of dropped columns, the column names, the column
+    values, the row count and (with count_issues) the data issues cleaning
+    found; columns pickle far cheaper than records.
+    """
+    df = pd.read_excel(path, sheet_name=sheet_name, engine=engine)
+    issues = Counter() if count_issues else None
+    cleaned = import_service.clean_frame(df, issues)
+    columns = [cleaned.iloc[:, position].tolist() for position in range(len(cleaned.columns))]
+    return len(df.columns) - len(cleaned.columns), list(cleaned.columns), columns, len(cleaned), issues or Counter()
+
+
+def _latin_1_fallback(error: UnicodeDecodeError):
+    """Decode bytes that are invalid in the sniffed encoding as latin-1 instead of failing mid-stream"""
+    return error.object[error.start:error.end].decode('latin-1'), error.end
+
+
+codecs.register_error('import-latin-1-fallback', _latin_1_fallback)
+
+
 class ImportService:
+    # Encodings tried, in order, on the first CSV_SNIFF_BYTES of a CSV upload
+    CSV_ENCODINGS = ['utf-8', 'utf-8-sig', 'latin-1', 'iso-8859-1', 'cp1252', 'windows-1252']
+    CSV_SNIFF_BYTES = 1024 * 1024
+
+    # Fields analyze_with_llm may map columns to; anything else the LLM suggests is dropped
+    LLM_MAPPING_FIELDS = {
+        'name', 'type', 'region', 'resource_id', 'arn', 'account_id',
+        'status', 'environment', 'vpc_id', 'subnet_id', 'availability_zone',
+        'instance_type', 'public_ip', 'private_ip', 'security_groups',
+        'tags', 'description', 'notes'
+    }
+    # Bump when the analyze_with_llm prompt changes, so cached mappings are not reused
+    LLM_MAPPING_REVISION = 1
+    # Columns of the sample row analyze_with_llm sends, to keep the prompt small
+    LLM_SAMPLE_COLUMNS = 10
+
     # AWS Resource Explorer CSV column names
     AWS_RESOURCE_EXPLORER_COLUMNS = [
         'Identifier', 'ARN', 'Resource type', 'Region', 'AWS Account',
@@ -164,6 +240,9 @@ class ImportService:
     }
     
     def __init__(self):
+        # Initialize schema definition (validation needs it with or without an LLM)
+        self._init_schema()
+        
         # Initialize LLM client - supports both Ollama (local) and OpenAI (cloud)
         if not OPENAI_AVAILABLE:
             self.client = None
@@ -200,9 +279,6 @@ class ImportService:
             self.model = None
             print("WARNING: No LLM configured. AI features will be disabled.")
         
-        # Initialize schema definition
-        self._init_schema()
-        
     def is_aws_resource_explorer_format(self, columns: List[str]) -> bool:
         """
         Detect if the CSV is from AWS Resource Explorer based on column names
@@ -217,8 +293,25 @@ class ImportService:
     def parse_aws_resource_explorer(self, data: List[Dict]) -> List[Dict]:
         """
         Parse AWS Resource Explorer CSV format and extract all possible information
+        What only depends on the columns is worked out once per export: the
+        Tag: columns are found once and read from each row with one
+        itemgetter, keeping only the tagged cells, and resource types are
+        mapped once per distinct type and service. Rows with columns of
+        their own are scanned for tags one by one.
         """
         resources = []
+        if not data:
+            return resources
+        
+        columns = data[0].keys()
+        by_column = all(isinstance(name, str) for name in columns)
+        tag_columns = [name for name in columns if by_column and name.startswith('Tag:')]
+        tag_keys = [name[4:] for name in tag_columns]  # Remove 'Tag:' prefix
+        if len(tag_columns) == 1:
+            tag_values = lambda row: (row[tag_columns[0]],)
+        else:
+            tag_values = itemgetter(*tag_columns) if tag_columns else (lambda row: ())
+        internal_types = {}
         
         for row in data:
             try:
@@ -229,77 +322,35 @@ class ImportService:
                 region = row.get('Region', 'unknown')
                 account_id = str(row.get('AWS Account', ''))
                 application = row.get('Application', '')
-                last_reported = row.get('LastReportedAt', '')
                 service = row.get('Service', '')
-                tag_count = row.get('Tags', 0)
                 
                 # Skip empty rows
                 if not identifier and not arn:
                     continue
                 
-                # Map resource type
-                resource_type_lower = resource_type_raw.lower().strip() if resource_type_raw else ''
-                internal_type = self.AWS_SERVICE_TYPE_MAP.get(resource_type_lower, 'unknown')
-                
-                # If not in map, try to extract the resource type part (after the colon)
-                if internal_type == 'unknown' and ':' in resource_type_lower:
-                    # Extract the part after the colon and convert to snake_case
-                    resource_part = resource_type_lower.split(':')[1] if ':' in resource_type_lower else resource_type_lower
-                    internal_type = resource_part.replace('-', '_')
-                elif internal_type == 'unknown' and service:
-                    internal_type = service.lower()
+                type_key = (resource_type_raw, service)
+                internal_type = internal_types.get(type_key)
+                if internal_type is None:
+                    internal_type = internal_types[type_key] = self._resource_explorer_type(resource_type_raw, service)
                 
                 # Parse ARN for additional info
                 arn_parts = self._parse_arn(arn) if arn else {}
                 
                 # Extract all tags from Tag:* columns
-                tags = {}
-                for col_name, value in row.items():
-                    if col_name.startswith('Tag:') and value and value != '(not tagged)':
-                        tag_key = col_name[4:]  # Remove 'Tag:' prefix
-                        tags[tag_key] = str(value)
-                
-                # Build resource object
-                resource = {
-                    'name': identifier or arn_parts.get('resource_name', 'Unknown'),
-                    'type': internal_type,
-                    'arn': arn,
-                    'region': region if region and region != '-' else arn_parts.get('region', 'global'),
-                    'account_id': account_id or arn_parts.get('account_id', ''),
-                    'resource_id': arn_parts.get('resource_id', identifier),
-                    'status': 'active',  # Default - AWS Resource Explorer only shows active resources
-                    'tags': tags if tags else None,
-                    'aws_service': service if service else None,
-                    'aws_resource_type': resource_type_raw if resource_type_raw else None,
-                    'application': application if application and application != '-' else None,
-                    'type_specific_properties': {}
-                }
-                
-                # Extract environment from tags
-                env_tag = tags.get('Environment') or tags.get('Env.') or tags.get('env')
-                if env_tag:
-                    resource['environment'] = env_tag.lower()
-                
-                # Extract Name tag if different from identifier
-                name_tag = tags.get('Name')
-                if name_tag and name_tag != identifier:
-                    resource['name'] = name_tag
-                    resource['type_specific_properties']['identifier'] = identifier
-                
-                # Extract VPC info from tags or ARN
-                vpc_from_arn = self._extract_vpc_from_arn(arn)
-                if vpc_from_arn:
-                    resource['vpc_id'] = vpc_from_arn
-                
-                # Extract subnet from ARN for subnet resources
-                if internal_type == 'subnet':
-                    resource['subnet_id'] = identifier
-                
-                # Clean up empty type_specific_properties
-                if not resource['type_specific_properties']:
-                    resource['type_specific_properties'] = None
+                if by_column and row.keys() == columns:
+                    values = tag_values(row)
+                    tags = {
+                        tag_key: str(value)
+                        for tag_key, value in zip(compress(tag_keys, values), compress(values, values))
+                        if value != '(not tagged)'
+                    }
+                else:
+                    tags = self._resource_explorer_tags(row)
                 
-                resources.append(resource)
+                resources.append(self._resource_explorer_resource(
+                    identifier, arn, internal_type, region, account_id, application, service,
+                    resource_type_raw, arn_parts, tags
+                ))
                 
             except Exception as e:
                 print(f"WARNING: Failed to parse row: {e}")
@@ -307,6 +358,234 @@ class ImportService:
         
         return resources
     
+    def parse_aws_resource_explorer_frame(self, df: "pd.DataFrame") -> List[Dict]:
+        """
+        parse_aws_resource_explorer for a clean_frame result (values are
+        Python objects, missing ones None), a column at a time
+        Types are mapped once per distinct type and service, ARNs are split
+        with Arrow string kernels and the Tag: columns are pivoted from a mask
+        of their tagged cells; only the resource dicts are built per row.
+        Rows whose type, service or ARN is not text are skipped, as
+        parse_aws_resource_explorer skips them; frames with column names that
+        are not text go to parse_aws_resource_explorer.
+        """
+        if df.empty:
+            return []
+        if not PYARROW_AVAILABLE or not all(isinstance(name, str) for name in df.columns):
+            return self.parse_aws_resource_explorer(self.frame_records(df))
+        
+        def column(name: str, default) -> "np.ndarray":
+            if name in df.columns:
+                return df[name].to_numpy(dtype=object)
+            return np.full(len(df), default, dtype=object)
+        
+        def truthy(values: "np.ndarray") -> "np.ndarray":
+            return values.astype(bool)
+        
+        def is_text(values: "np.ndarray") -> "np.ndarray":
+            if pd.api.types.infer_dtype(values, skipna=True) in ('string', 'empty'):
+                return values != None  # noqa: E711 - elementwise
+            return np.array([isinstance(value, str) for value in values], dtype=bool)
+        
+        def per_value(values: "np.ndarray", convert: Callable[[Any], Any]) -> "np.ndarray":
+            # factorize gives None back as NaN, which clean_frame never leaves
+            codes, uniques = pd.factorize(values, use_na_sentinel=False)
+            return np.array([convert(None if pd.isna(value) else value) for value in uniques], dtype=object)[codes]
+        
+        def map_type(value):
+            if value and not isinstance(value, str):
+                return _RE_SKIP
+            resource_type_lower = value.lower().strip() if value else ''
+            if resource_type_lower in self.AWS_SERVICE_TYPE_MAP or ':' in resource_type_lower:
+                return self._resource_explorer_type(value, '')
+            return None  # Mapped from the service
+        
+        def map_service(value):
+            if value and not isinstance(value, str):
+                return _RE_SKIP
+            return value.lower() if value else 'unknown'
+        
+        identifier = column('Identifier', '')
+        arn = column('ARN', '')
+        resource_type_raw = column('Resource type', '')
+        service = column('Service', '')
+        
+        internal_type = per_value(resource_type_raw, map_type)
+        by_service = internal_type == None  # noqa: E711 - elementwise
+        internal_type[by_service] = per_value(service, map_service)[by_service]
+        has_arn = truthy(arn)
+        arn_is_text = is_text(arn)
+        listed = truthy(identifier) | has_arn
+        keep = listed & (arn_is_text | ~has_arn) & (internal_type != _RE_SKIP)
+        skipped = int(listed.sum() - keep.sum())
+        if skipped:
+            print(f"WARNING: Failed to parse {skipped} rows")
+        
+        rows = np.flatnonzero(keep)
+        identifier, arn, resource_type_raw, service = identifier[rows], arn[rows], resource_type_raw[rows], service[rows]
+        internal_type = internal_type[rows]
+        region = column('Region', 'unknown')[rows]
+        account_id = column('AWS Account', '')[rows]
+        if not is_text(account_id).all():
+            account_id = np.array([str(value) for value in account_id], dtype=object)
+        application = column('Application', '')[rows]
+        
+        # Split the ARNs (arn:partition:service:region:account-id:resource) in Arrow
+        arn_text = pa.array(np.where(arn_is_text[rows], arn, ''), type=pa.string(), from_pandas=True)
+        parsed = pc.and_(pc.starts_with(arn_text, 'arn:'), pc.greater_equal(pc.count_substring(arn_text, ':'), 5))
+        arn_parts = pc.split_pattern(pc.if_else(parsed, arn_text, ':::::'), ':', max_splits=5)
+        resource_part = pc.list_element(arn_parts, 5)
+        arn_region = pc.list_element(arn_parts, 3)
+        arn_region = pc.if_else(pc.equal(arn_region, ''), 'global', arn_region)
+        parsed = parsed.to_numpy(zero_copy_only=False)
+        arn_region = arn_region.to_numpy(zero_copy_only=False)
+        arn_account = pc.list_element(arn_parts, 4).to_numpy(zero_copy_only=False)
+        resource_id = pc.replace_substring_regex(resource_part, '^[^/]*/', '', max_replacements=1).to_numpy(zero_copy_only=False)
+        resource_name = pc.replace_substring_regex(resource_part, '^.*/', '').to_numpy(zero_copy_only=False)
+        vpc_id = pc.struct_field(pc.extract_regex(arn_text, '(?P<vpc>vpc-[a-f0-9]+)'), 'vpc').to_numpy(zero_copy_only=False)
+        
+        names = np.where(truthy(identifier), identifier, np.where(parsed, resource_name, 'Unknown'))
+        regions = np.where(truthy(region) & (region != '-'), region, np.where(parsed, arn_region, 'global'))
+        account_ids = np.where(truthy(account_id), account_id, np.where(parsed, arn_account, ''))
+        resource_ids = np.where(parsed, resource_id, identifier)
+        
+        # Pivot the tagged cells of the Tag: columns into a dict per row, a
+        # column at a time so each row gets its tags in column order
+        kept_position = np.full(len(df), -1)
+        kept_position[rows] = np.arange(len(rows))
+        tags = [None] * len(rows)
+        tag_text = {key: np.full(len(rows), None, dtype=object) for key in ('Environment', 'Env.', 'env', 'Name')}
+        for position, name in enumerate(df.columns):
+            if not name.startswith('Tag:'):
+                continue
+            tag_key = name[4:]  # Remove 'Tag:' prefix
+            values = df.iloc[:, position].to_numpy(dtype=object)
+            # Most tag cells are empty: only the filled ones are looked at
+            filled = np.flatnonzero(pd.notna(values) & keep)
+            values = values[filled]
+            tagged = values.astype(bool) & (values != '(not tagged)')
+            tagged_rows = kept_position[filled[tagged]]
+            texts = [str(value) for value in values[tagged].tolist()]
+            for row, text in zip(tagged_rows.tolist(), texts):
+                if tags[row] is None:
+                    tags[row] = {}
+                tags[row][tag_key] = text
+            if tag_key in tag_text:
+                tag_text[tag_key][tagged_rows] = texts
+        
+        environment = tag_text['Environment']
+        for tag_key in ('Env.', 'env'):
+            environment = np.where(environment == None, tag_text[tag_key], environment)  # noqa: E711 - elementwise
+        name_tag = tag_text['Name']
+        renamed = (name_tag != None) & (name_tag != identifier)  # noqa: E711 - elementwise
+        names = np.where(renamed, name_tag, names)
+        properties = np.full(len(rows), None, dtype=object)
+        properties[renamed] = [{'identifier': identifier_value} for identifier_value in identifier[renamed].tolist()]
+        aws_services = np.where(truthy(service), service, None)
+        aws_resource_types = np.where(truthy(resource_type_raw), resource_type_raw, None)
+        applications = np.where(truthy(application) & (application != '-'), application, None)
+        
+        resources = [
+            {
+                'name': name,
+                'type': resource_type,
+                'arn': arn_value,
+                'region': region_value,
+                'account_id': account,
+                'resource_id': resource_id_value,
+                'status': 'active',  # Default - AWS Resource Explorer only shows active resources
+                'tags': row_tags,
+                'aws_service': aws_service,
+                'aws_resource_type': aws_resource_type,
+                'application': application_value,
+                'type_specific_properties': type_specific_properties
+            }
+            for name, resource_type, arn_value, region_value, account, resource_id_value, row_tags, aws_service,
+                aws_resource_type, application_value, type_specific_properties
+            in zip(names.tolist(), internal_type.tolist(), arn.tolist(), regions.tolist(), account_ids.tolist(),
+                   resource_ids.tolist(), tags, aws_services.tolist(), aws_resource_types.tolist(), applications.tolist(),
+                   properties.tolist())
+        ]
+        
+        # The keys only some resources get, in the order parse_aws_resource_explorer adds them
+        for row in np.flatnonzero(environment != None).tolist():  # noqa: E711 - elementwise
+            resources[row]['environment'] = environment[row].lower()
+        for row in np.flatnonzero(vpc_id != None).tolist():  # noqa: E711 - elementwise
+            resources[row]['vpc_id'] = vpc_id[row]
+        for row in np.flatnonzero(internal_type == 'subnet').tolist():
+            resources[row]['subnet_id'] = identifier[row]
+        
+        return resources
+    
+    def _resource_explorer_type(self, resource_type_raw: str, service: str) -> str:
+        """Internal type for a Resource Explorer resource type, e.g. 'ec2:instance' -> 'ec2'"""
+        # Map resource type
+        resource_type_lower = resource_type_raw.lower().strip() if resource_type_raw else ''
+        internal_type = self.AWS_SERVICE_TYPE_MAP.get(resource_type_lower, 'unknown')
+        
+        # If not in map, try to extract the resource type part (after the colon)
+        if internal_type == 'unknown' and ':' in resource_type_lower:
+            # Extract the part after the colon and convert to snake_case
+            resource_part = resource_type_lower.split(':')[1] if ':' in resource_type_lower else resource_type_lower
+            internal_type = resource_part.replace('-', '_')
+        elif internal_type == 'unknown' and service:
+            internal_type = service.lower()
+        
+        return internal_type
+    
+    def _resource_explorer_tags(self, row: Dict) -> Dict[str, str]:
+        """Tags from a row's Tag:* columns"""
+        tags = {}
+        for col_name, value in row.items():
+            if col_name.startswith('Tag:') and value and value != '(not tagged)':
+                tag_key = col_name[4:]  # Remove 'Tag:' prefix
+                tags[tag_key] = str(value)
+        return tags
+    
+    def _resource_explorer_resource(
+        self, identifier, arn, internal_type: str, region, account_id: str, application, service,
+        resource_type_raw, arn_parts: Dict[str, str], tags: Dict[str, str]
+    ) -> Dict:
+        """Build the resource for one Resource Explorer row"""
+        resource = {
+            'name': identifier or arn_parts.get('resource_name', 'Unknown'),
+            'type': internal_type,
+            'arn': arn,
+            'region': region if region and region != '-' else arn_parts.get('region', 'global'),
+            'account_id': account_id or arn_parts.get('account_id', ''),
+            'resource_id': arn_parts.get('resource_id', identifier),
+            'status': 'active',  # Default - AWS Resource Explorer only shows active resources
+            'tags': tags if tags else None,
+            'aws_service': service if service else None,
+            'aws_resource_type': resource_type_raw if resource_type_raw else None,
+            'application': application if application and application != '-' else None,
+            'type_specific_properties': None
+        }
+        
+        if tags:
+            # Extract environment from tags
+            env_tag = tags.get('Environment') or tags.get('Env.') or tags.get('env')
+            if env_tag:
+                resource['environment'] = env_tag.lower()
+            
+            # Extract Name tag if different from identifier
+            name_tag = tags.get('Name')
+            if name_tag and name_tag != identifier:
+                resource['name'] = name_tag
+                resource['type_specific_properties'] = {'identifier': identifier}
+        
+        # Extract VPC info from ARN
+        if arn and 'vpc-' in arn:
+            vpc_from_arn = self._extract_vpc_from_arn(arn)
+            if vpc_from_arn:
+                resource['vpc_id'] = vpc_from_arn
+        
+        # Extract subnet from ARN for subnet resources
+        if internal_type == 'subnet':
+            resource['subnet_id'] = identifier
+        
+        return resource
+    
     def _parse_arn(self, arn: str) -> Dict[str, str]:
         """
         Parse ARN to extract account_id, region, service, and resource info
@@ -395,9 +674,208 @@ class ImportService:
             }
         }
     
-    def parse_file(self, file_content: bytes, filename: str, use_ai: bool = False) -> Dict[str, Any]:
+    def sniff_csv_encoding(self, prefix: bytes) -> Optional[str]:
+        """
+        First of CSV_ENCODINGS that decodes prefix (the start of a file)
+        A multi-byte character cut off at the end of the prefix is not an error.
+        """
+        if prefix.startswith(codecs.BOM_UTF8):
+            return 'utf-8-sig'
+        for encoding in self.CSV_ENCODINGS:
+            try:
+                codecs.getincrementaldecoder(encoding)().decode(prefix, final=False)
+                return encoding
+            except (UnicodeDecodeError, UnicodeError):
+                continue
+        return None
+    
+    def clean_frame(self, df: "pd.DataFrame", issues: Optional[Counter] = None) -> "pd.DataFrame":
+        """
+        Clean a parsed sheet column by column, ready for frame_records
+        "Unnamed:" columns are dropped, text is stripped (and stays text: the
+        readers already type real numeric cells, so account IDs and names
+        such as "1001" keep their type), whole-number columns that are float
+        only because of missing values become ints, dates become ISO strings
+        (with the UTC offset of timezone-aware ones) and NaN/NaT/inf/empty
+        text become None.
+        With issues, the missing values, empty text and text with stray
+        spaces found before cleaning are added to it (for _ai_clean_summary).
+        """
+        unnamed = df.columns.astype(str).str.contains('^Unnamed:', na=False)
+        df = df.loc[:, ~unnamed]
+        return pd.DataFrame(
+            {name: self._clean_column(column, issues) for name, column in df.items()},
+            index=df.index,
+            columns=df.columns
+        )
+    
+    def _clean_column(self, column: "pd.Series", issues: Optional[Counter] = None) -> "pd.Series":
+        if issues is not None:
+            issues['null'] += int(column.isna().sum())
+        if pd.api.types.is_datetime64_any_dtype(column):
+            if column.dt.tz is not None:
+                # As parquet_io formats timezone-aware timestamps
+                column = column.dt.strftime('%Y-%m-%dT%H:%M:%S%z')
+            else:
+                has_time = (column.dropna() != column.dropna().dt.normalize()).any()
+                column = column.dt.strftime('%Y-%m-%dT%H:%M:%S' if has_time else '%Y-%m-%d')
+        elif pd.api.types.infer_dtype(column, skipna=True) == 'string':
+            if issues is not None:
+                self._count_text_issues(column.dropna(), issues)
+            column = column.str.strip().replace('', np.nan)
+        elif column.dtype == object:
+            # Mixed text and other values (typical of Excel); strip the text only
+            text = column.map(lambda value: isinstance(value, str))
+            if text.any():
+                if issues is not None:
+                    self._count_text_issues(column[text], issues)
+                column = column.where(~text, column[text].str.strip().replace('', np.nan))
+        
+        if pd.api.types.is_float_dtype(column):
+            column = column.replace([np.inf, -np.inf], np.nan)
+            finite = column.dropna()
+            # Integers read with gaps come back as floats; a column of floats
+            # that just happen to be whole (1.0, 2.0) stays as it is
+            if (0 < len(finite) < len(column) and (finite == finite.round()).all()
+                    and finite.abs().max() < 2 ** 53):
+                column = column.astype('Int64')
+        
+        return column.astype(object).where(column.notna(), None)
+    
+    @staticmethod
+    def _count_text_issues(text: "pd.Series", issues: Counter):
+        """Add the empty and space-padded values of a series of text to issues"""
+        empty = text.str.strip() == ''
+        issues['empty_string'] += int(empty.sum())
+        issues['formatting'] += int(((text.str.startswith(' ') | text.str.endswith(' ')) & ~empty).sum())
+    
+    @staticmethod
+    def frame_records(df: "pd.DataFrame") -> List[Dict[str, Any]]:
+        """
+        df.to_dict('records') for a clean_frame result, built from column
+        lists: the values are already plain Python objects, so pandas' per-value
+        boxing is skipped
+        """
+        columns = [df.iloc[:, position].tolist() for position in range(len(df.columns))]
+        return ImportService._column_records(list(df.columns), columns, len(df))
+    
+    @staticmethod
+    def _column_records(names: List[Any], columns: List[List[Any]], rows: int) -> List[Dict[str, Any]]:
+        if not names:
+            return [{} for _ in range(rows)]
+        return [dict(zip(names, row)) for row in zip(*columns)]
+    
+    def iter_excel_sheets(self, content: bytes, file_ext: str = 'xlsx',
+                          issues: Optional[Counter] = None) -> Iterator[Tuple[int, str, List[Dict[str, Any]]]]:
+        """
+        Parse the sheets of a workbook, yielding (position, sheet name,
+        cleaned records) as each sheet is done; with issues, the data issues
+        cleaning finds are added to it
+        Workbooks of several sheets and at least IMPORT_EXCEL_PARALLEL_MIN_BYTES
+        are parsed a sheet per worker process (up to IMPORT_EXCEL_WORKERS,
+        and no more than the CPUs),
+        each opening the file read-only for its own sheet, so sheets come
+        back in the order they finish; others are parsed here, in order.
+        """
+        engine = None if file_ext == 'xls' else settings.IMPORT_EXCEL_ENGINE
+        excel_file = pd.ExcelFile(io.BytesIO(content), engine=engine)
+        sheet_names = excel_file.sheet_names
+        
+        if _excel_worker_count() <= 1 or len(sheet_names) <= 1 or len(content) < settings.IMPORT_EXCEL_PARALLEL_MIN_BYTES:
+            for position, sheet_name in enumerate(sheet_names):
+                df = pd.read_excel(excel_file, sheet_name=sheet_name)
+                cleaned = self.clean_frame(df, issues)
+                print(f"Sheet '{sheet_name}': Dropped {len(df.columns) - len(cleaned.columns)} unnamed columns, kept {len(cleaned.columns)} columns")
+                yield position, sheet_name, self.frame_records(cleaned)
+            return
+        excel_file.close()
+        
+        # Workers read the workbook from a file rather than each getting a copy of its bytes
+        with tempfile.NamedTemporaryFile(suffix=f'.{file_ext}', delete=False) as f:
+            f.write(content)
+            path = f.name
+        futures = {}
+        try:
+            executor = _excel_workers()
+            futures = {
+                executor.submit(_read_excel_sheet, path, sheet_name, engine, issues is not None): (position, sheet_name)
+                for position, sheet_name in enumerate(sheet_names)
+            }
+            for future in as_completed(futures):
+                position, sheet_name = futures[future]
+                dropped, names, columns, rows, sheet_issues = future.result()
+                if issues is not None:
+                    issues.update(sheet_issues)
+                print(f"Sheet '{sheet_name}': Dropped {dropped} unnamed columns, kept {len(names)} columns")
+                yield position, sheet_name, self._column_records(names, columns, rows)
+        finally:
+            # On failure, drop the sheets not yet started and let running ones finish with the file
+            for future in futures:
+                future.cancel()
+            wait(futures)
+            os.remove(path)
+    
+    def iter_csv_records(self, source: Union[bytes, BinaryIO], chunk_rows: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """Stream the cleaned records of a CSV file, see iter_csv_chunks"""
+        for chunk in self.iter_csv_chunks(source, chunk_rows):
+            yield from chunk
+    
+    def iter_csv_chunks(self, source: Union[bytes, BinaryIO], chunk_rows: Optional[int] = None,
+                        issues: Optional[Counter] = None,
+                        on_frame: Optional[Callable[["pd.DataFrame"], None]] = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Stream the cleaned records of a CSV file, a list per chunk read
+        The encoding is sniffed once from the first CSV_SNIFF_BYTES; the file
+        is then read chunk_rows rows at a time, so memory stays bounded
+        whatever the file size and the first records are available at once.
+        Every column is read as text, so a column cannot change type from one
+        chunk to the next (numbers early in the file, text later on).
+        Each chunk goes through clean_frame, which adds the data issues it
+        finds to issues if given; on_frame gets the cleaned chunk before its
+        records are made.
+        Raises UnicodeDecodeError when no encoding fits the file.
+        """
+        stream = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else source
+        prefix = stream.read(self.CSV_SNIFF_BYTES)
+        encoding = self.sniff_csv_encoding(prefix)
+        if encoding is None:
+            raise UnicodeDecodeError('utf-8', prefix[:100], 0, 1, 'no supported encoding decodes this file')
+        
+        # Put the sniffed prefix back in front of the rest of the stream
+        if isinstance(stream, io.BytesIO) or stream.seekable():
+            stream.seek(stream.tell() - len(prefix))
+        else:
+            stream = io.BufferedReader(_PrefixedStream(prefix, stream))
+        text = io.TextIOWrapper(stream, encoding=encoding, errors='import-latin-1-fallback', newline='')
+        
+        first = True
+        for chunk in pd.read_csv(text, dtype=str, chunksize=chunk_rows or settings.IMPORT_CSV_CHUNK_ROWS):
+            cleaned = self.clean_frame(chunk, issues)
+            if first:
+                print(f"CSV ({encoding}): Dropped {len(chunk.columns) - len(cleaned.columns)} unnamed columns, kept {len(cleaned.columns)} columns")
+                first = False
+            if on_frame:
+                on_frame(cleaned)
+            yield self.frame_records(cleaned)
+    
+    def parse_file(self, file_content: Union[bytes, BinaryIO], filename: str, use_ai: bool = False,
+                   on_sheet: Optional[Callable[[str, List[Dict[str, Any]]], None]] = None,
+                   sample_rows: Optional[int] = None,
+                   on_resources: Optional[Callable[[str, List[Dict]], None]] = None) -> Dict[str, Any]:
         """
-        Parse Excel or CSV file, handling multiple sheets
+        Parse Excel, CSV or Parquet file, handling multiple sheets
+        file_content is the file's bytes, or for CSV and Parquet also a binary
+        file object that is streamed rather than read into memory
+        on_sheet(sheet name, records) is called with each part of a sheet as
+        soon as it is parsed: a whole Excel sheet, or a chunk of a CSV or
+        Parquet file, in file order. Excel sheets parsed in parallel arrive
+        in any order
+        With sample_rows, the result keeps only the first sample_rows records
+        of each sheet, so a caller that takes the rows through on_sheet never
+        holds the whole file; sheet_row_counts and total_rows count them all
+        on_resources(sheet name, resources) is called with the resources of
+        each chunk of an AWS Resource Explorer CSV, parsed column by column
+        from the chunk's DataFrame as it is read
         Optionally use AI to clean and validate data
         """
         if not PANDAS_AVAILABLE:
@@ -415,139 +893,61 @@ class ImportService:
                         "success": False,
                         "error": "openpyxl library is not installed. Please install openpyxl to import Excel files."
                     }
-                # Excel file - read all sheets
-                excel_file = pd.ExcelFile(io.BytesIO(file_content))
-                sheets = {}
-                
-                for sheet_name in excel_file.sheet_names:
-                    df = pd.read_excel(excel_file, sheet_name=sheet_name)
-                    original_cols = len(df.columns)
-                    
-                    # IMMEDIATELY drop all "Unnamed:" columns - don't need them at all
-                    df = df.loc[:, ~df.columns.str.contains('^Unnamed:', na=False)]
-                    
-                    final_cols = len(df.columns)
-                    print(f"Sheet '{sheet_name}': Dropped {original_cols - final_cols} unnamed columns, kept {final_cols} columns")
-                    
-                    # Replace all non-JSON-compliant values with None
-                    if NUMPY_AVAILABLE:
-                        df = df.replace([np.inf, -np.inf, np.nan], None)
-                    else:
-                        df = df.fillna(None)
-                    # Convert to dict with explicit None for missing values
-                    records = df.to_dict('records')
-                    # Clean any remaining problematic values
-                    cleaned_records = []
-                    for record in records:
-                        cleaned_record = {}
-                        for key, value in record.items():
-                            if pd.isna(value):
-                                cleaned_record[key] = None
-                            elif isinstance(value, float):
-                                if NUMPY_AVAILABLE and (np.isinf(value) or np.isnan(value)):
-                                    cleaned_record[key] = None
-                                elif not NUMPY_AVAILABLE and (value != value or abs(value) == float('inf')):
-                                    cleaned_record[key] = None
-                                else:
-                                    cleaned_record[key] = value
-                            else:
-                                cleaned_record[key] = value
-                        cleaned_records.append(cleaned_record)
-                    sheets[sheet_name] = cleaned_records
+                # Excel file - read all sheets, in parallel for large workbooks
+                parsed = []
+                issues = Counter() if use_ai else None
+                for position, sheet_name, records in self.iter_excel_sheets(file_content, file_ext, issues):
+                    if on_sheet:
+                        on_sheet(sheet_name, records)
+                    parsed.append((position, sheet_name, records[:sample_rows] if sample_rows is not None else records, len(records)))
+                parsed.sort(key=lambda sheet: sheet[0])
+                sheets = {sheet_name: records for _, sheet_name, records, _ in parsed}
+                row_counts = {sheet_name: rows for _, sheet_name, _, rows in parsed}
                 
                 result = {
                     "success": True,
                     "file_type": "excel",
                     "sheets": sheets,
                     "sheet_names": list(sheets.keys()),
-                    "total_rows": sum(len(rows) for rows in sheets.values())
+                    "sheet_row_counts": row_counts,
+                    "total_rows": sum(row_counts.values())
                 }
                 
                 # Apply AI cleaning if requested
                 if use_ai:
-                    ai_result = self._ai_clean_data(sheets)
-                    result["ai_suggestions"] = ai_result
+                    result["ai_suggestions"] = self._ai_clean_summary(issues)
                 
                 return result
                 
             elif file_ext == 'csv':
-                # CSV file - single sheet
-                # Try multiple encodings to handle different file formats
-                encodings = ['utf-8', 'utf-8-sig', 'latin-1', 'iso-8859-1', 'cp1252', 'windows-1252']
-                df = None
-                last_error = None
-                
-                for encoding in encodings:
-                    try:
-                        df = pd.read_csv(io.BytesIO(file_content), encoding=encoding, low_memory=False)
-                        print(f"SUCCESS: Successfully parsed CSV with {encoding} encoding")
-                        break
-                    except (UnicodeDecodeError, UnicodeError) as e:
-                        last_error = e
-                        print(f"WARNING: Failed with {encoding}: {str(e)[:100]}")
-                        continue
-                    except Exception as e:
-                        # Other errors - stop trying
-                        raise e
-                
-                if df is None:
+                # CSV file - single sheet, streamed in chunks
+                try:
+                    issues = Counter() if use_ai else None
+                    on_frame = None
+                    if on_resources:
+                        def on_frame(frame: "pd.DataFrame"):
+                            if not frame.empty and self.is_aws_resource_explorer_format(list(frame.columns)):
+                                on_resources("Sheet1", self.parse_aws_resource_explorer_frame(frame))
+                    chunks = self.iter_csv_chunks(file_content, issues=issues, on_frame=on_frame)
+                    return self._parse_chunks("csv", chunks, issues, on_sheet, sample_rows)
+                except (UnicodeDecodeError, UnicodeError) as e:
                     return {
                         "success": False,
-                        "error": f"Unable to decode file. The file contains characters that cannot be read. Please save the file as UTF-8 CSV and try again. (Error: {str(last_error)[:200]})"
+                        "error": f"Unable to decode file. The file contains characters that cannot be read. Please save the file as UTF-8 CSV and try again. (Error: {str(e)[:200]})"
                     }
-                
-                original_cols = len(df.columns)
-                
-                # IMMEDIATELY drop all "Unnamed:" columns - don't need them at all
-                df = df.loc[:, ~df.columns.str.contains('^Unnamed:', na=False)]
-                
-                final_cols = len(df.columns)
-                print(f"CSV: Dropped {original_cols - final_cols} unnamed columns, kept {final_cols} columns")
-                
-                # Replace all non-JSON-compliant values with None
-                if NUMPY_AVAILABLE:
-                    df = df.replace([np.inf, -np.inf, np.nan], None)
-                else:
-                    df = df.fillna(None)
-                # Convert to dict with explicit None for missing values
-                records = df.to_dict('records')
-                # Clean any remaining problematic values
-                cleaned_records = []
-                for record in records:
-                    cleaned_record = {}
-                    for key, value in record.items():
-                        if pd.isna(value):
-                            cleaned_record[key] = None
-                        elif isinstance(value, float):
-                            if NUMPY_AVAILABLE and (np.isinf(value) or np.isnan(value)):
-                                cleaned_record[key] = None
-                            elif not NUMPY_AVAILABLE and (value != value or abs(value) == float('inf')):
-                                cleaned_record[key] = None
-                            else:
-                                cleaned_record[key] = value
-                        else:
-                            cleaned_record[key] = value
-                    cleaned_records.append(cleaned_record)
-                records = cleaned_records
-                
-                result = {
-                    "success": True,
-                    "file_type": "csv",
-                    "sheets": {"Sheet1": records},
-                    "sheet_names": ["Sheet1"],
-                    "total_rows": len(records)
-                }
-                
-                # Apply AI cleaning if requested
-                if use_ai:
-                    ai_result = self._ai_clean_data({"Sheet1": records})
-                    result["ai_suggestions"] = ai_result
-                
-                return result
+            elif file_ext == 'parquet':
+                if not PYARROW_AVAILABLE:
+                    return {
+                        "success": False,
+                        "error": "pyarrow library is not installed. Please install pyarrow to import Parquet files."
+                    }
+                # Parquet file - single sheet, read a record batch at a time
+                issues = Counter() if use_ai else None
+                return self._parse_chunks("parquet", iter_parquet_chunks(file_content, issues=issues), issues, on_sheet, sample_rows)
             else:
                 return {
                     "success": False,
-                    "error": f"Unsupported file type: {file_ext}. Please upload Excel (.xlsx, .xls) or CSV (.csv) files."
+                    "error": f"Unsupported file type: {file_ext}. Please upload Excel (.xlsx, .xls), CSV (.csv) or Parquet (.parquet) files."
                 }
                 
         except Exception as e:
@@ -556,6 +956,43 @@ class ImportService:
                 "error": f"Error parsing file: {str(e)}"
             }
     
+    def _parse_chunks(self, file_type: str, chunks: Iterator[List[Dict[str, Any]]], issues: Optional[Counter],
+                      on_sheet: Optional[Callable[[str, List[Dict[str, Any]]], None]],
+                      sample_rows: Optional[int]) -> Dict[str, Any]:
+        """
+        parse_file result of a single-sheet file read in chunks, each handed
+        to on_sheet as it is read; issues is the Counter the chunks' cleaning
+        fills when AI cleaning was asked for
+        """
+        records = []
+        total_rows = 0
+        for chunk in chunks:
+            if on_sheet:
+                on_sheet("Sheet1", chunk)
+            if sample_rows is None:
+                records.extend(chunk)
+            elif len(records) < sample_rows:
+                records.extend(chunk[:sample_rows - len(records)])
+            total_rows += len(chunk)
+        if on_sheet and not total_rows:
+            # A file of headers only still has its (empty) sheet
+            on_sheet("Sheet1", records)
+        
+        result = {
+            "success": True,
+            "file_type": file_type,
+            "sheets": {"Sheet1": records},
+            "sheet_names": ["Sheet1"],
+            "sheet_row_counts": {"Sheet1": total_rows},
+            "total_rows": total_rows
+        }
+        
+        # Apply AI cleaning if requested
+        if issues is not None:
+            result["ai_suggestions"] = self._ai_clean_summary(issues)
+        
+        return result
+    
     def analyze_with_llm(self, sample_data: List[Dict], sheet_name: str) -> Dict[str, Any]:
         """
         Use LLM to understand the data structure and suggest field mappings
@@ -570,12 +1007,12 @@ class ImportService:
         # Take ONLY 1 row as sample to keep prompt small
         sample = sample_data[:1] if len(sample_data) > 0 else sample_data
         
-        # Limit columns to max 10 to prevent huge prompts
+        # Limit columns to max LLM_SAMPLE_COLUMNS to prevent huge prompts
         if sample:
             all_columns = list(sample[0].keys())
-            if len(all_columns) > 10:
-                # Take first 10 columns
-                limited_columns = all_columns[:10]
+            if len(all_columns) > self.LLM_SAMPLE_COLUMNS:
+                # Take the first columns, in sheet order
+                limited_columns = all_columns[:self.LLM_SAMPLE_COLUMNS]
                 sample = [{k: row.get(k) for k in limited_columns} for row in sample]
                 print(f"Limited sample to {len(limited_columns)} columns (from {len(all_columns)})")
         
@@ -708,16 +1145,9 @@ Return JSON:
             field_mappings = analysis.get("field_mappings", {})
             cleaned_mappings = {}
             
-            valid_fields = {
-                'name', 'type', 'region', 'resource_id', 'arn', 'account_id',
-                'status', 'environment', 'vpc_id', 'subnet_id', 'availability_zone',
-                'instance_type', 'public_ip', 'private_ip', 'security_groups',
-                'tags', 'description', 'notes'
-            }
-            
             for csv_col, target_field in field_mappings.items():
                 # Skip if target is null, "null", None, or not a valid field
-                if target_field and str(target_field).lower() != "null" and target_field in valid_fields:
+                if target_field and str(target_field).lower() != "null" and target_field in self.LLM_MAPPING_FIELDS:
                     cleaned_mappings[csv_col] = target_field
                 else:
                     print(f"Skipping invalid mapping: {csv_col} → {target_field}")
@@ -858,32 +1288,13 @@ Return JSON:
             "invalid_resources": invalid_resources
         }
     
-    def _ai_clean_data(self, sheets: Dict[str, List[Dict]]) -> Dict[str, Any]:
-        """
-        Use AI to analyze and clean data
-        Returns suggestions and fixes applied
-        """
+    @staticmethod
+    def _ai_clean_summary(issues: Counter) -> Dict[str, Any]:
+        """Suggestions and fixes applied for the data issues clean_frame counted"""
         fixes_applied = []
-        
-        # Count issues found
-        null_count = 0
-        empty_string_count = 0
-        formatting_issues = 0
-        
-        # Analyze data for common issues
-        for sheet_name, records in sheets.items():
-            for record in records:
-                for key, value in record.items():
-                    # Count null values
-                    if value is None:
-                        null_count += 1
-                    # Count empty strings
-                    elif isinstance(value, str) and value.strip() == '':
-                        empty_string_count += 1
-                    # Check for formatting issues
-                    elif isinstance(value, str):
-                        if value.startswith(' ') or value.endswith(' '):
-                            formatting_issues += 1
+        null_count = issues['null']
+        empty_string_count = issues['empty_string']
+        formatting_issues = issues['formatting']
         
         # Generate user-friendly message
         total_issues = null_count + empty_string_count + formatting_issues
@@ -908,5 +1319,26 @@ Return JSON:
         }
 
 
+class _PrefixedStream(io.RawIOBase):
+    """Raw binary stream that replays prefix before reading on from stream"""
+    
+    def __init__(self, prefix: bytes, stream: BinaryIO):
+        self._prefix = prefix
+        self._stream = stream
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        if self._prefix:
+            size = min(len(buffer), len(self._prefix))
+            buffer[:size] = self._prefix[:size]
+            self._prefix = self._prefix[size:]
+            return size
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
 # Singleton instance
 import_service = ImportService()
@@ -0,0 +1,231 @@
+"""
+Server-side import sessions
+/api/import/upload parses a file once and keeps the rows here; /analyze,
+/preview and /execute then refer to the session by ID instead of sending the
+rows back and forth. Each dataset (a sheet, or the resources a preview
+produced) is stored as gzipped JSON columns, one file per part it was
+written in, so a sheet parsed in chunks is stored a chunk at a time; a
+session expires IMPORT_SESSION_TTL_SECONDS after it was last used.
+"""
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core.config import settings
+import logging
+
+logger = logging.getLogger(__name__)
+
+META_FILE = 'meta.json'
+
+# Marks a key a row does not have, as opposed to a key holding None
+_ABSENT = object()
+
+
+class ImportSessionNotFound(KeyError):
+    """No such session for this user, or it has expired"""
+
+
+def rows_to_columns(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Columnar form of rows: the union of their keys in first-seen order, one
+    list of values per key, and the rows that lack a key
+    """
+    columns = {}
+    for row in rows:
+        for key in row:
+            columns.setdefault(key, None)
+    data = {}
+    absent = {}
+    for key in columns:
+        values = [row.get(key, _ABSENT) for row in rows]
+        missing = [index for index, value in enumerate(values) if value is _ABSENT]
+        if missing:
+            absent[key] = missing
+            values = [None if value is _ABSENT else value for value in values]
+        data[key] = values
+    return {'rows': len(rows), 'columns': list(columns), 'data': data, 'absent': absent}
+
+
+def columns_to_rows(table: Dict[str, Any], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Rows back from rows_to_columns, keys in the original order"""
+    count = table['rows'] if limit is None else min(limit, table['rows'])
+    names = table['columns']
+    rows = [dict(zip(names, values)) for values in zip(*(table['data'][name][:count] for name in names))] if names else [{} for _ in range(count)]
+    for key, missing in table.get('absent', {}).items():
+        for index in missing:
+            if index < count:
+                del rows[index][key]
+    return rows
+
+
+class ImportSessionStore:
+    """
+    Import sessions on disk, one directory per session:
+    meta.json (owner, expiry, dataset names, row counts and a few sample
+    rows per dataset) plus the <dataset>.json.gz parts of each dataset.
+    """
+
+    def __init__(self, root: Optional[str] = None, ttl_seconds: Optional[int] = None, sample_rows: int = 10):
+        self.root = root or settings.IMPORT_SESSION_DIR
+        self.ttl_seconds = ttl_seconds or settings.IMPORT_SESSION_TTL_SECONDS
+        self.sample_rows = sample_rows
+        self._lock = threading.Lock()
+
+    def create(self, user_id: int, filename: str, info: Optional[Dict[str, Any]] = None) -> str:
+        """New empty session for user_id; returns its ID"""
+        self.purge_expired()
+        session_id = uuid.uuid4().hex
+        os.makedirs(self._path(session_id), exist_ok=True)
+        now = time.time()
+        self._write_meta(session_id, {
+            'session_id': session_id,
+            'user_id': user_id,
+            'filename': filename,
+            'created_at': now,
+            'expires_at': now + self.ttl_seconds,
+            'info': info or {},
+            'datasets': {}
+        })
+        return session_id
+
+    def get(self, session_id: str, user_id: int) -> Dict[str, Any]:
+        """The session's metadata; using a session extends its expiry"""
+        with self._lock:
+            meta = self._read_meta(session_id)
+            if meta is None or meta['user_id'] != user_id:
+                raise ImportSessionNotFound(session_id)
+            if meta['expires_at'] < time.time():
+                self._remove(session_id)
+                raise ImportSessionNotFound(session_id)
+            meta['expires_at'] = time.time() + self.ttl_seconds
+            self._write_meta(session_id, meta)
+            return meta
+
+    def put_rows(self, session_id: str, user_id: int, dataset: str, rows: List[Dict[str, Any]], info: Optional[Dict[str, Any]] = None):
+        """Store rows as the session's dataset, replacing any earlier version"""
+        self._write_part(session_id, user_id, dataset, rows, info, append=False)
+
+    def append_rows(self, session_id: str, user_id: int, dataset: str, rows: List[Dict[str, Any]], info: Optional[Dict[str, Any]] = None):
+        """Add rows to the end of the session's dataset, creating it if need be"""
+        self._write_part(session_id, user_id, dataset, rows, info, append=True)
+
+    def get_rows(self, session_id: str, user_id: int, dataset: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """The dataset's rows (the first limit of them)"""
+        meta = self.get(session_id, user_id)
+        entry = self._entry(meta, session_id, dataset)
+        if limit is not None and limit <= len(entry['sample']):
+            return entry['sample'][:limit]
+        rows = []
+        for part in self._part_files(entry):
+            if limit is not None and len(rows) >= limit:
+                break
+            rows += self._read_part(session_id, part, None if limit is None else limit - len(rows))
+        return rows
+
+    def iter_rows(self, session_id: str, user_id: int, dataset: str) -> Iterator[List[Dict[str, Any]]]:
+        """The dataset's rows, a list per part it was written in"""
+        entry = self._entry(self.get(session_id, user_id), session_id, dataset)
+        for part in self._part_files(entry):
+            yield self._read_part(session_id, part)
+
+    def delete(self, session_id: str, user_id: int):
+        self.get(session_id, user_id)
+        with self._lock:
+            self._remove(session_id)
+
+    def purge_expired(self) -> int:
+        """Remove every expired session; returns how many"""
+        if not os.path.isdir(self.root):
+            return 0
+        removed = 0
+        now = time.time()
+        with self._lock:
+            for session_id in os.listdir(self.root):
+                meta = self._read_meta(session_id)
+                if meta is None or meta['expires_at'] < now:
+                    self._remove(session_id)
+                    removed += 1
+        if removed:
+            logger.info(f"Removed {removed} expired import sessions")
+        return removed
+
+    def _write_part(self, session_id: str, user_id: int, dataset: str, rows: List[Dict[str, Any]],
+                    info: Optional[Dict[str, Any]], append: bool):
+        self.get(session_id, user_id)
+        with self._lock:
+            meta = self._read_meta(session_id)
+            entry = meta['datasets'].get(dataset) if append else None
+            if entry is None:
+                base = meta['datasets'].get(dataset, {}).get('file') or f"dataset-{len(meta['datasets'])}.json.gz"
+                replaced = self._part_files(meta['datasets'][dataset]) if dataset in meta['datasets'] else []
+                entry = {'file': base, 'files': [], 'rows': 0, 'sample': []}
+            else:
+                replaced = []
+                entry.setdefault('files', [entry['file']])
+            # The first part is <dataset>.json.gz, later ones <dataset>.<n>.json.gz
+            part = entry['file'] if not entry['files'] else entry['file'].replace('.json.gz', f".{len(entry['files'])}.json.gz")
+            path = os.path.join(self._path(session_id), part)
+            with gzip.open(path + '.tmp', 'wt', encoding='utf-8', compresslevel=5) as f:
+                json.dump(rows_to_columns(rows), f, separators=(',', ':'), default=str)
+            os.replace(path + '.tmp', path)
+            for stale in replaced:
+                if stale != part:
+                    os.remove(os.path.join(self._path(session_id), stale))
+            meta['datasets'][dataset] = {
+                **entry,
+                'files': entry['files'] + [part],
+                'rows': entry['rows'] + len(rows),
+                'sample': entry['sample'] + rows[:max(0, self.sample_rows - len(entry['sample']))],
+                **(info or {})
+            }
+            self._write_meta(session_id, meta)
+
+    @staticmethod
+    def _entry(meta: Dict[str, Any], session_id: str, dataset: str) -> Dict[str, Any]:
+        entry = meta['datasets'].get(dataset)
+        if entry is None:
+            raise ImportSessionNotFound(f"{session_id}/{dataset}")
+        return entry
+
+    @staticmethod
+    def _part_files(entry: Dict[str, Any]) -> List[str]:
+        # Sessions written before datasets had parts have just the one file
+        return entry.get('files') or [entry['file']]
+
+    def _read_part(self, session_id: str, part: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        with gzip.open(os.path.join(self._path(session_id), part), 'rt', encoding='utf-8') as f:
+            return columns_to_rows(json.load(f), limit)
+
+    def _path(self, session_id: str) -> str:
+        # IDs come from clients; only ever our own hex UUIDs
+        if not session_id or not all(c in '0123456789abcdef' for c in session_id):
+            raise ImportSessionNotFound(session_id)
+        return os.path.join(self.root, session_id)
+
+    def _read_meta(self, session_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self._path(session_id), META_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError, ImportSessionNotFound):
+            return None
+
+    def _write_meta(self, session_id: str, meta: Dict[str, Any]):
+        path = os.path.join(self._path(session_id), META_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, default=str)
+        os.replace(path + '.tmp', path)
+
+    def _remove(self, session_id: str):
+        try:
+            shutil.rmtree(self._path(session_id), ignore_errors=True)
+        except ImportSessionNotFound:
+            pass
+
+
+import_sessions = ImportSessionStore()
@@ -0,0 +1,98 @@
+"""
+Streamed exports of resources and relationships
+Rows are read in id order through yield_per, a server-side cursor where the
+driver has one, and encoded a batch at a time as NDJSON (a JSON object per
+line) or as a JSON array sent in chunks. Only one batch is held at a time,
+so a full inventory streams in constant memory, and a JSON array starts
+with its opening bracket before the first row is read.
+"""
+import json
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import Resource, ResourceRelationship
+from app.schemas import ResourceRelationshipResponse
+from app.services.resource_listing import filter_resources, parse_fields, resource_row
+import logging
+
+logger = logging.getLogger(__name__)
+
+STREAM_MEDIA_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json',
+}
+# Every field a streamed relationship has, in ResourceRelationshipResponse order
+RELATIONSHIP_FIELDS = tuple(ResourceRelationshipResponse.model_fields)
+
+
+def _encode(row: Dict[str, Any]) -> str:
+    return json.dumps(row, separators=(',', ':'), default=str)
+
+
+def _stream(db: Session, model, fields: Sequence[str], statement, stream_format: str, batch_rows: int) -> Iterator[bytes]:
+    """The rows of statement as stream_format, a chunk per batch of batch_rows"""
+    ndjson = stream_format == 'ndjson'
+    if not ndjson:
+        yield b'['
+    rows_written = 0
+    result = db.execute(statement.order_by(model.id).execution_options(yield_per=batch_rows))
+    for batch in result.partitions():
+        lines = [_encode(resource_row(fields, row)) for row in batch]
+        if ndjson:
+            chunk = '\n'.join(lines) + '\n'
+        else:
+            chunk = (',' if rows_written else '') + ','.join(lines)
+        rows_written += len(batch)
+        yield chunk.encode('utf-8')
+    if not ndjson:
+        yield b']'
+    logger.info(f"Streamed {rows_written} {model.__tablename__} as {stream_format}")
+
+
+def iter_resources_stream(
+    db: Session,
+    stream_format: str = 'ndjson',
+    fields: Optional[str] = None,
+    filters: Optional[Dict[str, Optional[Sequence[str]]]] = None,
+    batch_rows: Optional[int] = None,
+) -> Iterator[bytes]:
+    """
+    Resources as NDJSON or a JSON array, in the shape /resources/page lists
+    them. Raises ValueError on an unknown format, field or filter before
+    anything is read.
+    """
+    if stream_format not in STREAM_MEDIA_TYPES:
+        raise ValueError(f"Unknown format: {stream_format}")
+    names = parse_fields(fields)
+    statement = filter_resources(select(*[getattr(Resource, name) for name in names]), filters or {})
+    return _stream(db, Resource, names, statement, stream_format, batch_rows or settings.EXPORT_STREAM_BATCH_ROWS)
+
+
+def iter_relationships_stream(
+    db: Session,
+    stream_format: str = 'ndjson',
+    source_id: Optional[int] = None,
+    target_id: Optional[int] = None,
+    relationship_type: Optional[str] = None,
+    batch_rows: Optional[int] = None,
+) -> Iterator[bytes]:
+    """
+    Relationships as NDJSON or a JSON array, in the shape /relationships
+    lists them. Raises ValueError on an unknown format before anything is read.
+    """
+    if stream_format not in STREAM_MEDIA_TYPES:
+        raise ValueError(f"Unknown format: {stream_format}")
+    statement = select(*[getattr(ResourceRelationship, name) for name in RELATIONSHIP_FIELDS])
+    if source_id:
+        statement = statement.filter(ResourceRelationship.source_resource_id == source_id)
+    if target_id:
+        statement = statement.filter(ResourceRelationship.target_resource_id == target_id)
+    if relationship_type:
+        statement = statement.filter(ResourceRelationship.relationship_type == relationship_type)
+    return _stream(
+        db, ResourceRelationship, RELATIONSHIP_FIELDS, statement, stream_format,
+        batch_rows or settings.EXPORT_STREAM_BATCH_ROWS
+    )
@@ -0,0 +1,179 @@
+"""
+Cache of LLM column mappings
+Sheets exported from the same tool have the same columns every time, so
+the mappings analyze_with_llm suggests for them are stored in the database
+keyed by a hash of the columns the LLM is shown (the first
+LLM_SAMPLE_COLUMNS, names as written and in sheet order) and of the fields
+the LLM may map to. A later sheet starting with the same columns gets them
+back without an LLM call. Pinned entries are never replaced or expired.
+"""
+import hashlib
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import ColumnMappingCacheEntry
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def llm_columns(importer, sample_data: List[Dict]) -> List[str]:
+    """The column names analyze_with_llm shows the LLM for sample_data, in sheet order"""
+    columns = list(sample_data[0].keys()) if sample_data else []
+    return [str(column) for column in columns[:importer.LLM_SAMPLE_COLUMNS]]
+
+
+def column_signature(columns: List[str]) -> str:
+    """sha256 of the column names, as written and in order"""
+    return hashlib.sha256(json.dumps(columns).encode('utf-8')).hexdigest()
+
+
+def schema_version(fields, revision: int) -> str:
+    """Short hash of the fields columns may map to and of the prompt revision"""
+    key = f"{revision}:" + ','.join(sorted(fields))
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands back naive datetimes
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class MappingCache:
+    """
+    Column-mapping cache in front of ImportService.analyze_with_llm
+    Hit, miss and store counts since startup are kept in memory; each entry
+    also counts its own hits in the database.
+    """
+
+    def __init__(self, ttl_days: Optional[int] = None):
+        self.ttl_days = ttl_days or settings.IMPORT_MAPPING_CACHE_TTL_DAYS
+        self.metrics = {'hits': 0, 'misses': 0, 'stores': 0, 'bypassed': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, metric: str):
+        with self._lock:
+            self.metrics[metric] += 1
+
+    def expired(self, entry: ColumnMappingCacheEntry) -> bool:
+        if entry.pinned:
+            return False
+        last_used = _as_utc(entry.last_used_at) or _as_utc(entry.created_at)
+        return last_used is not None and last_used < datetime.now(timezone.utc) - timedelta(days=self.ttl_days)
+
+    def _entry(self, db: Session, signature: str, version: str) -> Optional[ColumnMappingCacheEntry]:
+        return db.query(ColumnMappingCacheEntry).filter(
+            ColumnMappingCacheEntry.signature == signature,
+            ColumnMappingCacheEntry.schema_version == version
+        ).first()
+
+    def lookup(self, db: Session, columns: List[str], version: str) -> Optional[ColumnMappingCacheEntry]:
+        """The live entry for these columns, counting the hit or miss"""
+        entry = self._entry(db, column_signature(columns), version)
+        if entry is None or self.expired(entry):
+            self._count('misses')
+            return None
+        entry.hit_count = (entry.hit_count or 0) + 1
+        entry.last_used_at = datetime.now(timezone.utc)
+        db.commit()
+        self._count('hits')
+        return entry
+
+    def store(self, db: Session, columns: List[str], version: str, analysis: Dict[str, Any],
+              model: Optional[str] = None, user_id: Optional[int] = None) -> Optional[ColumnMappingCacheEntry]:
+        """Keep an LLM analysis for these columns, unless a pinned entry already covers them"""
+        signature = column_signature(columns)
+        stored = {
+            'detected_resource_type': analysis.get('detected_resource_type'),
+            'field_mappings': analysis.get('field_mappings') if isinstance(analysis.get('field_mappings'), dict) else None,
+            'type_specific_mappings': (analysis.get('type_specific_mappings')
+                                       if isinstance(analysis.get('type_specific_mappings'), dict) else None),
+            'arn_column': analysis.get('arn_column') or None,
+        }
+        entry = self._entry(db, signature, version)
+        if entry is not None and entry.pinned:
+            return entry
+        if entry is None:
+            entry = ColumnMappingCacheEntry(signature=signature, schema_version=version, hit_count=0)
+            db.add(entry)
+        entry.columns = list(columns)
+        entry.analysis = stored
+        entry.model = model
+        entry.created_by = user_id
+        entry.created_at = entry.last_used_at = datetime.now(timezone.utc)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Stored by a concurrent analysis of the same columns
+            db.rollback()
+            return self._entry(db, signature, version)
+        self._count('stores')
+        return entry
+
+    @staticmethod
+    def restore(entry: ColumnMappingCacheEntry) -> Dict[str, Any]:
+        """The analysis stored in the entry"""
+        cached = entry.analysis or {}
+        analysis = {
+            'detected_resource_type': cached.get('detected_resource_type'),
+            'field_mappings': dict(cached.get('field_mappings') or {}),
+            'arn_column': cached.get('arn_column'),
+        }
+        if cached.get('type_specific_mappings') is not None:
+            analysis['type_specific_mappings'] = dict(cached['type_specific_mappings'])
+        return analysis
+
+    def analyze(self, db: Session, importer, sample_data: List[Dict], sheet_name: str,
+                user_id: Optional[int] = None, refresh: bool = False) -> Dict[str, Any]:
+        """
+        importer.analyze_with_llm, answered from the cache when the columns
+        it would show the LLM have been analyzed before. refresh asks the LLM
+        again and replaces the entry (unless it is pinned).
+        """
+        columns = llm_columns(importer, sample_data)
+        if not settings.IMPORT_MAPPING_CACHE_ENABLED or not columns:
+            self._count('bypassed')
+            return importer.analyze_with_llm(sample_data=sample_data, sheet_name=sheet_name)
+
+        version = schema_version(importer.LLM_MAPPING_FIELDS, importer.LLM_MAPPING_REVISION)
+        entry = None if refresh else self.lookup(db, columns, version)
+        if refresh:
+            self._count('bypassed')
+        if entry is not None:
+            logger.info(f"Column mapping cache hit for '{sheet_name}' ({entry.signature[:12]})")
+            return {
+                "success": True,
+                "analysis": self.restore(entry),
+                "cache": {"hit": True, "entry_id": entry.id, "signature": entry.signature, "pinned": entry.pinned}
+            }
+
+        result = importer.analyze_with_llm(sample_data=sample_data, sheet_name=sheet_name)
+        if result.get("success"):
+            entry = self.store(db, columns, version, result["analysis"], model=importer.model, user_id=user_id)
+            result["cache"] = {
+                "hit": False,
+                "entry_id": entry.id if entry else None,
+                "signature": column_signature(columns),
+                "pinned": bool(entry and entry.pinned)
+            }
+        return result
+
+    def get_metrics(self, db: Session) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self.metrics)
+        lookups = metrics['hits'] + metrics['misses']
+        metrics['hit_rate'] = round(metrics['hits'] / lookups, 3) if lookups else None
+        metrics['entries'] = db.query(ColumnMappingCacheEntry).count()
+        metrics['pinned'] = db.query(ColumnMappingCacheEntry).filter(ColumnMappingCacheEntry.pinned.is_(True)).count()
+        return metrics
+
+
+mapping_cache = MappingCache()
@@ -0,0 +1,200 @@
+"""
+Parquet import and export of the resource inventory
+Exports are written straight from column tuples of the resources table, a
+row group at a time, and streamed out as each row group is done; JSON
+columns (tags, type_specific_properties, ...) are stored as JSON text and
+listed in the file's metadata. Uploaded Parquet files are read a record
+batch at a time with Arrow, converting whole columns rather than cells, and
+come back as the rows parse_file returns for CSV and Excel, so an export
+imports back through /api/import unchanged.
+"""
+import json
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Union
+
+from sqlalchemy import DateTime, JSON, Text, cast
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import Resource
+from app.services.bulk_upsert import RESOURCE_IMPORT_FIELDS
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Make pyarrow optional - Parquet import and export need it
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+    pa = None
+    pc = None
+    pq = None
+    logging.warning("⚠️  pyarrow not installed - Parquet import and export will be disabled")
+
+# File metadata key listing the columns that hold JSON text
+JSON_COLUMNS_KEY = b'aws_architect.json_columns'
+
+# Resource columns written to exports, in table order: those an import can set
+EXPORT_COLUMNS = [column for column in Resource.__table__.columns if column.name in RESOURCE_IMPORT_FIELDS]
+
+
+def _export_schema() -> "pa.Schema":
+    fields = []
+    json_columns = []
+    for column in EXPORT_COLUMNS:
+        if isinstance(column.type, DateTime):
+            fields.append(pa.field(column.name, pa.timestamp('us', tz='UTC')))
+        else:
+            fields.append(pa.field(column.name, pa.string()))
+            if isinstance(column.type, JSON):
+                json_columns.append(column.name)
+    return pa.schema(fields, metadata={JSON_COLUMNS_KEY: json.dumps(json_columns).encode('utf-8')})
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands back naive datetimes
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _selected(column):
+    # JSON columns are read as their stored text rather than decoded only to be encoded again
+    return cast(column, Text) if isinstance(column.type, JSON) else column
+
+
+def _export_column(column, values: List[Any]) -> List[Any]:
+    if isinstance(column.type, JSON):
+        return values
+    if isinstance(column.type, DateTime):
+        return [_as_utc(value) for value in values]
+    return [None if value is None else str(value) for value in values]
+
+
+class _ChunkSink:
+    """Write-only file for ParquetWriter whose bytes are taken out as they are written"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_resources_parquet(db: Session, row_group_rows: Optional[int] = None) -> Iterator[bytes]:
+    """
+    The resources table as a Parquet file, yielded a row group at a time
+    Rows are read in id order with keyset pagination, so memory stays at one
+    row group however large the inventory is.
+    """
+    row_group_rows = row_group_rows or settings.EXPORT_PARQUET_ROW_GROUP_ROWS
+    schema = _export_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression=settings.EXPORT_PARQUET_COMPRESSION)
+    last_id = 0
+    rows_written = 0
+    try:
+        while True:
+            rows = db.query(Resource.id, *map(_selected, EXPORT_COLUMNS)).filter(
+                Resource.id > last_id
+            ).order_by(Resource.id).limit(row_group_rows).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            columns = list(zip(*rows))[1:]
+            arrays = [
+                pa.array(_export_column(column, list(values)), type=field.type)
+                for column, values, field in zip(EXPORT_COLUMNS, columns, schema)
+            ]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema), row_group_size=len(rows))
+            rows_written += len(rows)
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+    logger.info(f"Exported {rows_written} resources as Parquet")
+
+
+def _import_column(array: "pa.Array", json_column: bool, issues: Optional[Counter] = None) -> List[Any]:
+    """One column as cleaned Python values, like clean_frame gives for CSV; the cleaning runs in Arrow"""
+    kind = array.type
+    if issues is not None:
+        issues['null'] += array.null_count
+        if pa.types.is_floating(kind):
+            issues['null'] += pc.sum(pc.is_nan(array)).as_py() or 0
+    if pa.types.is_timestamp(kind):
+        # %S keeps the fraction of a second
+        array = pc.strftime(array, format='%Y-%m-%dT%H:%M:%S' if kind.tz is None else '%Y-%m-%dT%H:%M:%S%z')
+    elif pa.types.is_date(kind):
+        array = pc.strftime(array, format='%Y-%m-%d')
+    elif pa.types.is_string(kind) or pa.types.is_large_string(kind):
+        if issues is not None:
+            empty = pc.equal(pc.utf8_trim_whitespace(array), '')
+            padded = pc.or_(pc.starts_with(array, ' '), pc.ends_with(array, ' '))
+            issues['empty_string'] += pc.sum(empty).as_py() or 0
+            issues['formatting'] += pc.sum(pc.and_(padded, pc.invert(empty))).as_py() or 0
+        array = pc.utf8_trim_whitespace(array)
+        array = pc.if_else(pc.equal(array, ''), pa.scalar(None, array.type), array)
+        if json_column:
+            # One parse for the whole column instead of one per cell
+            return json.loads('[' + ','.join(pc.fill_null(array, 'null').to_pylist()) + ']')
+    elif pa.types.is_floating(kind):
+        array = pc.if_else(pc.is_finite(array), array, pa.scalar(None, kind))
+    return array.to_pylist()
+
+
+def iter_parquet_records(source: Union[bytes, BinaryIO], batch_rows: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Records of a Parquet file, see iter_parquet_chunks"""
+    for chunk in iter_parquet_chunks(source, batch_rows):
+        yield from chunk
+
+
+def iter_parquet_chunks(source: Union[bytes, BinaryIO], batch_rows: Optional[int] = None,
+                        issues: Optional[Counter] = None) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Records of a Parquet file (its bytes, or a seekable binary file), a list
+    per record batch read
+    Columns without a name or named "Unnamed: ..." (pandas' index) are
+    dropped, text is stripped, empty text and NaN become None, timestamps
+    become ISO strings and columns an export wrote as JSON text are decoded.
+    With issues, the missing values, empty text and text with stray spaces
+    found before cleaning are added to it.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        # Columns are read from the upload's buffer without copying it
+        source = pa.BufferReader(pa.py_buffer(source))
+    parquet_file = pq.ParquetFile(source)
+    metadata = parquet_file.schema_arrow.metadata or {}
+    json_columns = set(json.loads(metadata[JSON_COLUMNS_KEY])) if JSON_COLUMNS_KEY in metadata else set()
+    names = [
+        name for name in parquet_file.schema_arrow.names
+        if name and not name.startswith('Unnamed:') and name != '__index_level_0__'
+    ]
+
+    for batch in parquet_file.iter_batches(batch_size=batch_rows or settings.IMPORT_CSV_CHUNK_ROWS, columns=names):
+        columns = [_import_column(batch.column(position), name in json_columns, issues) for position, name in enumerate(names)]
+        yield [dict(zip(names, row)) for row in zip(*columns)]
@@ -2,7 +2,7 @@
 Service to extract relationships between AWS resources from CSV data.
 Analyzes ARNs, CloudFormation stacks, security groups, and other implicit connections.
 """
-from typing import List, Dict, Tuple, Set
+from typing import Callable, List, Dict, Optional, Tuple, Set
 from sqlalchemy.orm import Session
 from app.models import Resource, ResourceRelationship
 import re
@@ -236,18 +236,28 @@ class RelationshipExtractor:
         return metadata
     
     @staticmethod
-    def extract_all_relationships(db: Session) -> int:
+    def extract_all_relationships(db: Session, on_step: Optional[Callable[[str], None]] = None) -> int:
         """
         Extract all relationships and save to database.
+        on_step(name) is called before each extraction step and before saving;
+        whatever it raises stops the extraction before anything is committed.
         Returns: Number of relationships created
         """
         all_relationships = []
         
         # Extract from different sources
-        all_relationships.extend(RelationshipExtractor.extract_from_cloudformation_stacks(db))
-        all_relationships.extend(RelationshipExtractor.extract_from_vpc_subnet(db))
-        all_relationships.extend(RelationshipExtractor.extract_from_security_groups(db))
-        all_relationships.extend(RelationshipExtractor.extract_from_arn_references(db))
+        steps = [
+            ('cloudformation_stacks', RelationshipExtractor.extract_from_cloudformation_stacks),
+            ('vpc_subnet', RelationshipExtractor.extract_from_vpc_subnet),
+            ('security_groups', RelationshipExtractor.extract_from_security_groups),
+            ('arn_references', RelationshipExtractor.extract_from_arn_references),
+        ]
+        for name, extract in steps:
+            if on_step:
+                on_step(name)
+            all_relationships.extend(extract(db))
+        if on_step:
+            on_step('saving')
         
         # Remove duplicates
         unique_relationships = list(set(all_relationships))
@@ -0,0 +1,78 @@
+"""
+Paged listing of the resource inventory
+Pages follow keyset cursors over resources.id (app/utils/cursors.py), so the
+last page of a large inventory costs what the first does. Filters are IN
+lists on indexed columns, and fields= selects only the requested columns in
+SQL, so the JSON columns are neither read nor decoded unless asked for.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy.orm import Query, Session
+
+from app.models import Resource
+from app.schemas import ResourceResponse
+from app.utils.cursors import decode_cursor, encode_cursor, keyset_after
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Every field a listed resource may have, in ResourceResponse order
+RESOURCE_FIELDS = tuple(ResourceResponse.model_fields)
+# Columns a listing may be filtered by, each one or more values
+FILTER_COLUMNS = ('type', 'account_id', 'region', 'vpc_id', 'environment')
+LIST_ORDER = [(Resource.id, False)]
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """
+    The fields a comma-separated fields= selects, all of them if it is
+    empty; id always comes first. Raises ValueError on an unknown field.
+    """
+    names = [name.strip() for name in (fields or '').split(',') if name.strip()] or RESOURCE_FIELDS
+    unknown = sorted(set(names) - set(RESOURCE_FIELDS))
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return ['id'] + [name for name in dict.fromkeys(names) if name != 'id']
+
+
+def filter_resources(query: Query, filters: Dict[str, Optional[Sequence[str]]]) -> Query:
+    """query narrowed to the resources with one of the given values of each FILTER_COLUMNS filter"""
+    for name, values in filters.items():
+        if name not in FILTER_COLUMNS:
+            raise ValueError(f"Cannot filter by {name}")
+        if values:
+            query = query.filter(getattr(Resource, name).in_(values))
+    return query
+
+
+def resource_row(fields: Sequence[str], row) -> Dict[str, Any]:
+    """A selected row as the JSON object the API returns for it"""
+    return {
+        field: value.isoformat() if isinstance(value, datetime) else value
+        for field, value in zip(fields, row)
+    }
+
+
+def list_resources(
+    db: Session,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    fields: Optional[str] = None,
+    filters: Optional[Dict[str, Optional[Sequence[str]]]] = None,
+) -> Dict[str, Any]:
+    """
+    A page of resources in id order, with the cursor of the next page (None
+    on the last one). Raises ValueError on an invalid cursor, field or filter.
+    """
+    names = parse_fields(fields)
+    query = filter_resources(db.query(*[getattr(Resource, name) for name in names]), filters or {})
+    if cursor:
+        query = query.filter(keyset_after(LIST_ORDER, decode_cursor(cursor, len(LIST_ORDER))))
+    rows = query.order_by(Resource.id).limit(limit + 1).all()
+    next_cursor = encode_cursor([rows[limit - 1][0]]) if len(rows) > limit else None
+    return {
+        'items': [resource_row(names, row) for row in rows[:limit]],
+        'next_cursor': next_cursor,
+        'limit': limit,
+    }
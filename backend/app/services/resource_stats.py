@@ -0,0 +1,171 @@
+"""
+Dashboard statistics for /api/resources/stats
+Every count the dashboard shows comes from one GROUP BY over the columns it
+breaks resources down by, folded in Python, and the result is kept until
+resources change: ORM writes to resources are picked up from the session
+when it commits, bulk writes are reported with invalidate(). Dashboard loads
+between writes only read the cached result.
+
+Changes made outside this process (other workers, scripts) are picked up
+when the cached result is RESOURCE_STATS_MAX_AGE_SECONDS old.
+"""
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from app.core.config import settings
+from app.models import Resource
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Linked/metadata resources - not counted as main resources but shown separately
+LINKED_RESOURCE_TYPES = {
+    'config',                    # AWS Config rules - monitoring/compliance
+    'security_group_rule',       # Rules belong to security groups
+    'rds_snapshot',              # Backups for RDS
+    'rds_backup',                # Auto-backups for RDS
+    'aurora_snapshot',           # Backups for Aurora
+    'snapshot',                  # EBS snapshots
+    'rds_parameter_group',       # RDS config
+    'rds_option_group',          # RDS config
+    'aurora_parameter_group',    # Aurora config
+    'db_subnet_group',           # RDS networking config
+    'dhcp_options',              # VPC config
+    'resource-explorer-2',       # AWS internal indexing
+    'flow_log',                  # VPC logging config
+    'ipam',                      # IP address management
+    'ipam_scope',                # IPAM metadata
+    'ipam_discovery',            # IPAM metadata
+    'ipam_discovery_assoc',      # IPAM metadata
+    'network_insights',          # Analysis tools
+    'route53',                   # Hosted zones - shown in Navigator
+    'route53_record',            # DNS records - shown in Navigator
+}
+
+# Columns the statistics break resources down by, in GROUP BY order
+GROUP_COLUMNS = (
+    Resource.type, Resource.region, Resource.status, Resource.vpc_id,
+    Resource.availability_zone, Resource.account_id, Resource.environment,
+)
+
+# Session.info key of the flag set by a session that wrote resources
+_CHANGED_INFO = 'resource_stats_changed'
+
+
+def _sorted_counts(counts: Counter) -> Dict[str, int]:
+    return {key: counts[key] for key in sorted(counts)}
+
+
+def compute_stats(db: Session) -> Dict[str, Any]:
+    """The dashboard statistics, from one grouped query over resources"""
+    main_types, linked_types = Counter(), Counter()
+    by_region, by_status, by_account, by_environment = Counter(), Counter(), Counter(), Counter()
+    vpcs, availability_zones = set(), set()
+    rows = db.query(*GROUP_COLUMNS, func.count(Resource.id)).group_by(*GROUP_COLUMNS)
+    for resource_type, region, status, vpc_id, availability_zone, account_id, environment, count in rows:
+        # VPCs and availability zones are counted across linked resources too
+        if vpc_id is not None:
+            vpcs.add(vpc_id)
+        if availability_zone is not None:
+            availability_zones.add(availability_zone)
+        if resource_type in LINKED_RESOURCE_TYPES:
+            linked_types[resource_type] += count
+            continue
+        main_types[resource_type] += count
+        if region:
+            by_region[region] += count
+        if status:
+            by_status[status] += count
+        if account_id:
+            by_account[account_id] += count
+        if environment:
+            by_environment[environment] += count
+
+    main_total, linked_total = sum(main_types.values()), sum(linked_types.values())
+    return {
+        "total": main_total,
+        "total_all": main_total + linked_total,
+        "by_type": _sorted_counts(main_types),
+        "by_region": _sorted_counts(by_region),
+        "by_status": _sorted_counts(by_status),
+        "by_account": _sorted_counts(by_account),
+        "by_environment": _sorted_counts(by_environment),
+        "network": {
+            "vpcs": len(vpcs),
+            "subnets": main_types['subnet'],
+            "security_groups": main_types['security_group'],
+            "availability_zones": len(availability_zones)
+        },
+        "type_count": len(main_types),
+        "region_count": len(by_region),
+        "linked": {
+            "total": linked_total,
+            "by_type": _sorted_counts(linked_types)
+        }
+    }
+
+
+class ResourceStats:
+    """compute_stats, kept until resources change"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Bumped by every commit that wrote resources
+        self._generation = 0
+        # (generation it was computed at, monotonic time, stats)
+        self._cached: Optional[Tuple[int, float, Dict[str, Any]]] = None
+
+    def invalidate(self, db: Session):
+        """Report resources written around the ORM (bulk writes); picked up when db commits"""
+        db.info[_CHANGED_INFO] = True
+
+    def _committed(self, db: Session):
+        if db.info.pop(_CHANGED_INFO, False):
+            with self._lock:
+                self._generation += 1
+
+    def get(self, db: Session) -> Dict[str, Any]:
+        """The dashboard statistics, computed again only if resources changed since they were last"""
+        with self._lock:
+            generation, cached = self._generation, self._cached
+        if cached and cached[0] == generation and time.monotonic() - cached[1] < settings.RESOURCE_STATS_MAX_AGE_SECONDS:
+            return cached[2]
+
+        started = time.perf_counter()
+        stats = compute_stats(db)
+        with self._lock:
+            # Kept at the generation read before computing: a commit during
+            # the query leaves it stale for the next load
+            self._cached = (generation, time.monotonic(), stats)
+        logger.info(f"Computed resource stats over {stats['total_all']} resources in "
+                    f"{(time.perf_counter() - started) * 1000:.0f} ms")
+        return stats
+
+
+resource_stats = ResourceStats()
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_flushed_resources(session: Session, flush_context):
+    if any(isinstance(instance, Resource) for instance in (*session.new, *session.dirty, *session.deleted)):
+        session.info[_CHANGED_INFO] = True
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_bulk_statements(orm_execute_state: ORMExecuteState):
+    # query.update() / query.delete() and insert/update/delete statements on resources
+    if orm_execute_state.is_select:
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ is Resource:
+        orm_execute_state.session.info[_CHANGED_INFO] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_committed_resources(session: Session):
+    resource_stats._committed(session)
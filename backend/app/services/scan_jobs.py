@@ -0,0 +1,194 @@
+"""
+Background AWS scan jobs
+Scans run on a worker pool with their own database sessions. The scan_jobs
+row carries status, per-service progress, counts, errors and timings, so
+clients poll it instead of holding a request open.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models import ScanJob
+from app.services.aws_pagination import merge_streams
+from app.services.url_flow_index import session_factory_for, url_flow_index
+import logging
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+
+class ScanCancelled(Exception):
+    """Raised into a running scan once its job has been cancelled"""
+
+
+class ScanJobProgress:
+    """
+    Counts the resources a job streams per result key
+    The counts are written to the job row at most every interval seconds,
+    from a session of their own so they never mix with the import's
+    transaction. Each write also picks up a cancel request. The writes run on
+    a timer too, so a scan stalled in a slow AWS call still reports and can
+    be cancelled.
+    """
+
+    def __init__(self, job_id: int, interval: Optional[float] = None):
+        self.job_id = job_id
+        self.interval = settings.AWS_SCAN_JOB_PROGRESS_INTERVAL if interval is None else interval
+        self.counts = {}
+        self.stats = None
+        self._db = SessionLocal()
+        self._flushed = time.monotonic()
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def track(
+        self,
+        resources: Iterable[Tuple[str, Dict[str, Any]]],
+        stats: Optional[Callable[[], Dict[str, Any]]] = None
+    ) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Pass (result key, resource) pairs through, counting them; stats() is kept for the job row"""
+        self.stats = stats
+        # The source runs on its own thread so the flush timer keeps ticking
+        # while it waits on AWS; counts and the session stay on this thread
+        stream = merge_streams(
+            [lambda: resources],
+            max_workers=1,
+            thread_name_prefix=f'scan-job-{self.job_id}',
+            heartbeat=self._flush_due,
+            heartbeat_interval=max(self.interval, 0.1)
+        )
+        for key, resource in stream:
+            self.counts[key] = self.counts.get(key, 0) + 1
+            self._flush_due()
+            yield key, resource
+        # The scan is complete, a late cancel no longer discards it
+        self.flush(check_cancel=False)
+
+    def _flush_due(self):
+        if time.monotonic() - self._flushed >= self.interval:
+            self.flush()
+
+    def flush(self, check_cancel: bool = True):
+        """Write the counts so far; raises ScanCancelled if the job was cancelled"""
+        self._flushed = time.monotonic()
+        job = self._db.get(ScanJob, self.job_id)
+        self._db.refresh(job)
+        job.progress = dict(self.counts)
+        job.resources_found = self.total
+        job.scan_stats = self.stats() if self.stats else None
+        self._db.commit()
+        if check_cancel and job.cancel_requested:
+            raise ScanCancelled(f"Scan job {self.job_id} was cancelled")
+
+    def close(self):
+        self._db.close()
+
+
+ScanFunction = Callable[[Session, ScanJobProgress], Dict[str, int]]
+
+
+class ScanJobRunner:
+    """
+    Runs scan jobs on a bounded worker pool
+    A scan function receives the job's own session and its ScanJobProgress,
+    streams its resources through progress.track() and returns the import
+    stats.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or settings.AWS_SCAN_JOB_WORKERS
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, job_id: int, scan: ScanFunction):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='scan-job')
+        self._executor.submit(self._run, job_id, scan)
+
+    def _run(self, job_id: int, scan: ScanFunction):
+        db = SessionLocal()
+        try:
+            job = db.get(ScanJob, job_id)
+            if job is None or job.status != 'queued':
+                # Cancelled before a worker picked it up
+                return
+            job.status = 'running'
+            job.started_at = datetime.now(timezone.utc)
+            db.commit()
+
+            progress = ScanJobProgress(job_id)
+            import_stats = None
+            error = None
+            try:
+                import_stats = scan(db, progress)
+                status = 'succeeded'
+            except ScanCancelled:
+                db.rollback()
+                status = 'cancelled'
+            except Exception as e:
+                logger.exception(f"Scan job {job_id} failed")
+                db.rollback()
+                status = 'failed'
+                error = str(e)
+            finally:
+                progress.close()
+
+            job = db.get(ScanJob, job_id)
+            db.refresh(job)
+            job.status = status
+            job.error = error
+            job.progress = dict(progress.counts)
+            job.resources_found = progress.total
+            job.import_stats = import_stats
+            job.scan_stats = progress.stats() if progress.stats else job.scan_stats
+            job.finished_at = datetime.now(timezone.utc)
+            db.commit()
+            logger.info(f"Scan job {job_id} {status}: {progress.total} resources")
+            url_flow_index.schedule_refresh(session_factory=session_factory_for(db))
+        except Exception as e:
+            logger.error(f"Could not record the result of scan job {job_id}: {e}")
+        finally:
+            db.close()
+
+
+def cancel_scan_job(db: Session, job: ScanJob) -> ScanJob:
+    """Cancel a queued job at once, or ask a running one to stop at its next progress write"""
+    if job.status not in ACTIVE_STATUSES:
+        return job
+    job.cancel_requested = True
+    if job.status == 'queued':
+        job.status = 'cancelled'
+        job.finished_at = datetime.now(timezone.utc)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def fail_interrupted_jobs(db: Session) -> int:
+    """
+    Mark jobs left queued or running by a previous process as failed
+    Credentials are never stored, so these jobs cannot be resumed.
+    """
+    count = db.query(ScanJob).filter(ScanJob.status.in_(ACTIVE_STATUSES)).update(
+        {
+            ScanJob.status: 'failed',
+            ScanJob.error: 'Interrupted by a server restart',
+            ScanJob.finished_at: datetime.now(timezone.utc)
+        },
+        synchronize_session=False
+    )
+    db.commit()
+    return count
+
+
+scan_job_runner = ScanJobRunner()
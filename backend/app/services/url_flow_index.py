@@ -0,0 +1,985 @@
+"""
+Precomputed URL flows for /api/resources/url-flows
+Every route53_record's flow (the resources its values and alias target
+resolve to, and the chain reached from them through relationships) is kept
+serialized in url_flows, so the endpoint only reads rows. The names the
+values are matched against (DNS names, IPs and load balancer names) are kept
+in url_flow_keys, and the resources each flow depends on in url_flow_members.
+
+ORM writes to resources and relationships are picked up from the session
+when it commits, bulk writes are reported with track_resources() (resources
+inserted in bulk are found by id, above the highest one indexed), and only
+the flows they can affect are rebuilt on the next refresh: those with a
+changed resource among their members, those with a changed relationship of
+the record or its chain, and those with a value related to a changed
+resource's DNS name, IP or load balancer name. Large changes, a missing
+index or a new INDEX_VERSION rebuild everything.
+
+Reads serve the stored flows as they are and never refresh inline: a read
+that finds changes waiting queues a refresh on a background thread, as
+finished import and scan jobs do, so the index catches up right after.
+
+Flows are listed a page of summaries at a time (list_flows), with keyset
+cursors over the listing order, and expanded one record at a time.
+
+Changes made outside this process (other workers, scripts) are not seen
+until a rebuild; POST /api/resources/url-flows/rebuild runs one.
+"""
+import bisect
+import ipaddress
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models import Resource, ResourceRelationship, UrlFlow, UrlFlowIndexState, UrlFlowKey, UrlFlowMember
+from app.services.aws_pagination import page_chunks
+from app.utils.cursors import decode_cursor, encode_cursor, keyset_after
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bump when the flows or the matching change, to rebuild stored indexes
+INDEX_VERSION = 1
+# ids per IN query, within SQLite's bound-parameter limit
+LOOKUP_CHUNK = 900
+# Session.info keys of the changes a session has flushed but not committed:
+# resource ids, and relationship id -> the resources it related before and after
+_RESOURCES_INFO = 'url_flow_resources'
+_RELATIONSHIPS_INFO = 'url_flow_relationships'
+
+RECORD_TYPE = 'route53_record'
+ZONE_TYPE = 'route53'
+
+# Resource type categorization
+ELB_TYPES = {'elb', 'alb', 'nlb', 'elasticloadbalancing'}
+EC2_TYPES = {'ec2', 'instance'}
+DB_TYPES = {'rds', 'aurora', 'dynamodb', 'elasticache'}
+CF_TYPES = {'cloudfront'}
+S3_TYPES = {'s3'}
+PIPE_TYPES = {'codepipeline', 'codebuild', 'codecommit', 'codedeploy'}
+# A flow's lists of resources, by category
+FLOW_CATEGORIES = ('albs', 'cloudfront', 'ec2_instances', 'databases', 's3_buckets', 'pipelines', 'other')
+# Categories a listing may be filtered by instead of a resource type
+CATEGORY_TYPES = {
+    'albs': ELB_TYPES, 'cloudfront': CF_TYPES, 'ec2_instances': EC2_TYPES,
+    'databases': DB_TYPES, 's3_buckets': S3_TYPES, 'pipelines': PIPE_TYPES,
+}
+# Listing order, (column, descending): demonstrative paths (CloudFront/S3/
+# pipelines) first, then connected ones, then by URL
+LIST_ORDER = [
+    (UrlFlow.important_path_count, True),
+    (UrlFlow.has_connections, True),
+    (UrlFlow.has_invalid_a_target, True),
+    (UrlFlow.url, False),
+    (UrlFlow.record_id, False),
+]
+
+# Columns a flow shows of each resource
+SUMMARY_COLUMNS = [
+    Resource.id, Resource.name, Resource.type, Resource.resource_id, Resource.account_id, Resource.region,
+    Resource.status, Resource.vpc_id, Resource.subnet_id, Resource.private_ip, Resource.public_ip,
+    Resource.dns_name, Resource.instance_type, Resource.environment, Resource.type_specific_properties,
+    Resource.tags,
+]
+# Columns the match keys are taken from
+KEY_COLUMNS = [
+    Resource.id, Resource.type, Resource.name, Resource.dns_name, Resource.public_ip, Resource.private_ip,
+    Resource.type_specific_properties,
+]
+
+
+def get_props(value) -> Any:
+    """type_specific_properties decoded if stored as text"""
+    if not value:
+        return {}
+    try:
+        return json.loads(value) if isinstance(value, str) else value
+    except ValueError:
+        return {}
+
+
+def _dict_props(value) -> dict:
+    props = get_props(value)
+    return props if isinstance(props, dict) else {}
+
+
+def _normalized(value: str) -> str:
+    return value.lower().rstrip('.')
+
+
+def match_keys(type_: str, name: Optional[str], dns_name: Optional[str], public_ip: Optional[str],
+               private_ip: Optional[str], properties) -> List[Tuple[str, str]]:
+    """(kind, key) pairs record values are matched to a resource by; none for hosted zones"""
+    if type_ == ZONE_TYPE:
+        return []
+    props = _dict_props(properties)
+    keys = []
+    for value in (dns_name, props.get('dns_name'), props.get('domain_name')):
+        if value and isinstance(value, str):
+            keys.append(('dns', _normalized(value)))
+    for value in (public_ip, props.get('public_ip')):
+        if value and isinstance(value, str):
+            keys.append(('public_ip', value))
+    if private_ip:
+        keys.append(('private_ip', private_ip))
+    if type_ in ELB_TYPES and name:
+        # ALB dns_name format: name-hash.region.elb.amazonaws.com
+        keys.append(('elb', name.lower()))
+    return list(dict.fromkeys(keys))
+
+
+def record_match_values(properties) -> List[str]:
+    """A record's alias target and values as they are matched: lowercase without trailing dot"""
+    props = _dict_props(properties)
+    values = []
+    alias_target = props.get('alias_target')
+    if isinstance(alias_target, dict) and alias_target.get('dns_name'):
+        values.append(_normalized(str(alias_target['dns_name'])))
+    for value in props.get('record_values') or []:
+        values.append(_normalized(str(value)))
+    return list(dict.fromkeys(values))
+
+
+def is_ip(value) -> bool:
+    try:
+        ipaddress.ip_address(value)
+        return True
+    except Exception:
+        return False
+
+
+def is_public_ip(value) -> bool:
+    try:
+        ip = ipaddress.ip_address(value)
+        return not (ip.is_private or ip.is_loopback or ip.is_link_local or ip.is_multicast or ip.is_reserved)
+    except Exception:
+        return False
+
+
+def is_certificate_validation_record(record_name, record_type, record_values) -> bool:
+    name = (record_name or '').lower()
+    rtype = (record_type or '').upper()
+    values = [str(v).lower() for v in (record_values or [])]
+
+    if rtype != 'CNAME':
+        return False
+    if '_acme-challenge' in name:
+        return True
+    if any('acm-validations.aws' in v for v in values):
+        return True
+    return False
+
+
+def flow_summary(flow: Dict[str, Any]) -> Dict[str, Any]:
+    """A flow without its resources and connections: how many of each, and the resource types in its chain"""
+    return {
+        "url": flow["url"],
+        "record_id": flow["record_id"],
+        "record_type": flow["record_type"],
+        "record_values": flow["record_values"],
+        "zone_name": flow["zone_name"],
+        "account_id": flow["account_id"],
+        "has_connections": flow["has_connections"],
+        "important_path_count": flow["important_path_count"],
+        "classification": flow["classification"],
+        "grouping": flow["grouping"],
+        "counts": {category: len(flow[category]) for category in (*FLOW_CATEGORIES, 'connections')},
+        "target_types": sorted({r["type"] for category in FLOW_CATEGORIES for r in flow[category] if r["type"]}),
+    }
+
+
+def resource_summary(row) -> Dict[str, Any]:
+    """A resource as flows show it, from a SUMMARY_COLUMNS row"""
+    return {
+        "id": row.id,
+        "name": row.name,
+        "type": row.type,
+        "resource_id": row.resource_id,
+        "account_id": row.account_id,
+        "region": row.region,
+        "status": row.status,
+        "vpc_id": row.vpc_id,
+        "subnet_id": row.subnet_id,
+        "private_ip": row.private_ip,
+        "public_ip": row.public_ip,
+        "dns_name": row.dns_name,
+        "instance_type": row.instance_type,
+        "environment": row.environment,
+        "type_specific_properties": get_props(row.type_specific_properties),
+        "tags": row.tags if row.tags else {},
+    }
+
+
+class _SubstringIndex:
+    """
+    Strings, each with the ids it belongs to, searchable for the strings
+    containing a value and the strings contained in one
+    The strings are joined into one text searched with str.find, rebuilt
+    after strings are added or removed.
+    """
+
+    SEPARATOR = '\x00'
+
+    def __init__(self):
+        self.ids: Dict[str, Set[int]] = {}
+        self._text = None
+
+    def add(self, string: str, id_: int):
+        ids = self.ids.setdefault(string, set())
+        if not ids:
+            self._text = None
+        ids.add(id_)
+
+    def discard(self, string: str, id_: int):
+        ids = self.ids.get(string)
+        if ids is None:
+            return
+        ids.discard(id_)
+        if not ids:
+            del self.ids[string]
+            self._text = None
+
+    def _prepare(self):
+        if self._text is not None:
+            return
+        self._strings = list(self.ids)
+        self._starts = []
+        position = 0
+        for string in self._strings:
+            self._starts.append(position)
+            position += len(string) + 1
+        self._text = self.SEPARATOR.join(self._strings)
+        self._lengths = sorted({len(string) for string in self._strings})
+
+    def containing(self, value: str) -> Set[str]:
+        """Strings value is part of"""
+        self._prepare()
+        if not value:
+            return set(self._strings)
+        found = set()
+        position = self._text.find(value)
+        while position != -1:
+            index = bisect.bisect_right(self._starts, position) - 1
+            string = self._strings[index]
+            if position + len(value) <= self._starts[index] + len(string):
+                found.add(string)
+                # Go on from the next string
+                position = self._text.find(value, self._starts[index] + len(string) + 1)
+            else:
+                position = self._text.find(value, position + 1)
+        return found
+
+    def contained_in(self, value: str) -> Set[str]:
+        """Strings that are part of value"""
+        self._prepare()
+        found = set()
+        for length in self._lengths:
+            if length > len(value):
+                break
+            if length == 0:
+                found.add('')
+                continue
+            for start in range(len(value) - length + 1):
+                piece = value[start:start + length]
+                if piece in self.ids:
+                    found.add(piece)
+        return found
+
+    def related(self, value: str) -> Set[str]:
+        return self.containing(value) | self.contained_in(value)
+
+
+class _FlowGraph:
+    """The resources, match keys and relationships flows are built from, in memory"""
+
+    def __init__(self):
+        self.types: Dict[int, str] = {}
+        self.keys: Dict[int, List[Tuple[str, str]]] = {}
+        self.owners: Dict[str, Dict[str, Set[int]]] = {'dns': {}, 'public_ip': {}, 'private_ip': {}, 'elb': {}}
+        self.dns_names = _SubstringIndex()
+        self.elb_name_lengths: Dict[int, int] = {}
+        # record id -> match values, and the values searchable for related keys
+        self.records: Dict[int, List[str]] = {}
+        self.record_values = _SubstringIndex()
+        # relationship id -> (source, target, type, label, auto_detected)
+        self.relationships: Dict[int, tuple] = {}
+        self.outgoing: Dict[int, Dict[int, int]] = {}
+        self.incoming: Dict[int, Dict[int, int]] = {}
+
+    # -- changes --
+
+    def set_resource(self, resource_id: int, type_: str, keys: List[Tuple[str, str]]):
+        self.remove_resource(resource_id)
+        self.types[resource_id] = type_
+        self.keys[resource_id] = keys
+        for kind, key in keys:
+            self.owners[kind].setdefault(key, set()).add(resource_id)
+            if kind == 'dns':
+                self.dns_names.add(key, resource_id)
+            elif kind == 'elb':
+                self.elb_name_lengths[len(key)] = self.elb_name_lengths.get(len(key), 0) + 1
+
+    def remove_resource(self, resource_id: int):
+        self.types.pop(resource_id, None)
+        for kind, key in self.keys.pop(resource_id, []):
+            owners = self.owners[kind][key]
+            owners.discard(resource_id)
+            if not owners:
+                del self.owners[kind][key]
+            if kind == 'dns':
+                self.dns_names.discard(key, resource_id)
+            elif kind == 'elb':
+                self.elb_name_lengths[len(key)] -= 1
+                if not self.elb_name_lengths[len(key)]:
+                    del self.elb_name_lengths[len(key)]
+
+    def set_record(self, record_id: int, values: List[str]):
+        self.remove_record(record_id)
+        self.records[record_id] = values
+        for value in values:
+            self.record_values.add(value, record_id)
+
+    def remove_record(self, record_id: int):
+        for value in self.records.pop(record_id, []):
+            self.record_values.discard(value, record_id)
+
+    def add_relationship(self, rel_id: int, source: int, target: int, type_: str, label: str, auto_detected: str):
+        self.remove_relationship(rel_id)
+        self.relationships[rel_id] = (source, target, type_, label, auto_detected)
+        self.outgoing.setdefault(source, {})[rel_id] = target
+        self.incoming.setdefault(target, {})[rel_id] = source
+
+    def remove_relationship(self, rel_id: int) -> Tuple[int, ...]:
+        """Removes it if known; returns its ends"""
+        rel = self.relationships.pop(rel_id, None)
+        if rel is None:
+            return ()
+        source, target = rel[0], rel[1]
+        for links, resource_id in ((self.outgoing, source), (self.incoming, target)):
+            links[resource_id].pop(rel_id, None)
+            if not links[resource_id]:
+                del links[resource_id]
+        return source, target
+
+    def relationship_ids(self, resource_id: int) -> Set[int]:
+        return set(self.outgoing.get(resource_id, ())) | set(self.incoming.get(resource_id, ()))
+
+    # -- lookups --
+
+    def resolve(self, kind: str, key: str) -> Optional[int]:
+        """The resource a key names; where several share it, the newest"""
+        owners = self.owners[kind].get(key)
+        return max(owners) if owners else None
+
+    def load_balancers_named(self, dns_value: str) -> List[int]:
+        """Load balancers whose name starts dns_value"""
+        found = set()
+        for length in self.elb_name_lengths:
+            owners = self.owners['elb'].get(dns_value[:length]) if length <= len(dns_value) else None
+            if owners:
+                found |= owners
+        return sorted(found)
+
+    def dns_related(self, value: str) -> List[int]:
+        """Resources with a DNS name containing value or contained in it"""
+        return sorted({self.resolve('dns', key) for key in self.dns_names.related(value)})
+
+    def records_related(self, keys: Iterable[Tuple[str, str]]) -> Set[int]:
+        """Records with a value a change to these keys can change the match of"""
+        found = set()
+        for _, key in keys:
+            for value in self.record_values.related(key.lower()):
+                found |= self.record_values.ids[value]
+        return found
+
+    def links(self, resource_id: int, resources_only: bool = True) -> Dict[int, int]:
+        """
+        Related resource -> relationship (the newest where several relate the
+        two), outgoing first; hosted zones only if not resources_only
+        """
+        linked = {}
+        for links in (self.outgoing, self.incoming):
+            for rel_id, other in links.get(resource_id, {}).items():
+                if resources_only and self.types.get(other, ZONE_TYPE) == ZONE_TYPE:
+                    continue
+                if rel_id > linked.get(other, 0):
+                    linked[other] = rel_id
+        return linked
+
+    def related_ids(self, resource_id: int) -> Set[int]:
+        """Both ends of every relationship of a resource"""
+        ids = set(self.outgoing.get(resource_id, {}).values())
+        ids.update(self.incoming.get(resource_id, {}).values())
+        return ids
+
+    def direct_matches(self, record_id: int, props: dict) -> List[int]:
+        """Resources a record's alias target and values resolve to, then those related to the record"""
+        matched = {}
+
+        alias_target = props.get('alias_target')
+        if isinstance(alias_target, dict) and alias_target.get('dns_name'):
+            alias_dns = _normalized(str(alias_target['dns_name']))
+            hit = self.resolve('dns', alias_dns)
+            if hit is not None:
+                matched[hit] = None
+            else:
+                matched.update(dict.fromkeys(self.load_balancers_named(alias_dns)))
+                if not matched:
+                    matched.update(dict.fromkeys(self.dns_related(alias_dns)))
+
+        for value in props.get('record_values') or []:
+            value = str(value)
+            normalized = _normalized(value)
+            hit = self.resolve('dns', normalized)
+            if hit is None:
+                hit = self.resolve('public_ip', value)
+            if hit is None:
+                hit = self.resolve('private_ip', value)
+            if hit is not None:
+                matched[hit] = None
+                continue
+            load_balancers = self.load_balancers_named(normalized)
+            matched.update(dict.fromkeys(load_balancers or self.dns_related(normalized)))
+
+        matched.update(dict.fromkeys(self.links(record_id)))
+        return list(matched)
+
+    def chain(self, record_id: int, start: List[int]) -> Tuple[List[int], Set[int]]:
+        """
+        Resources reachable from start through relationships, not passing
+        through records or zones, and the relationships followed
+        """
+        visited = set(start)
+        visited.add(record_id)
+        queue = deque(start)
+        chain = []
+        rel_ids = set()
+        while queue:
+            resource_id = queue.popleft()
+            if self.types.get(resource_id, ZONE_TYPE) != ZONE_TYPE:
+                chain.append(resource_id)
+            for other, rel_id in self.links(resource_id).items():
+                rel_ids.add(rel_id)
+                if other not in visited and self.types[other] != RECORD_TYPE:
+                    visited.add(other)
+                    queue.append(other)
+        return chain, rel_ids
+
+
+class UrlFlowIndex:
+    """Keeps url_flows up to date with resources and relationships"""
+
+    def __init__(self, session_factory: Callable[[], Session]):
+        # Opens the sessions of background refreshes not given a factory of their own
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self._pending_resources: Set[int] = set()
+        self._pending_relationships: Dict[int, Set[int]] = {}
+        self._graph: Optional[_FlowGraph] = None
+        self._executor = None
+        # The background refresh queued and not yet started, if any
+        self._queued: Optional[Future] = None
+
+    # -- change tracking --
+
+    def track_resources(self, db: Session, resource_ids: Iterable[int]):
+        """Report resources written around the ORM (bulk updates); picked up when db commits"""
+        db.info.setdefault(_RESOURCES_INFO, set()).update(resource_ids)
+
+    def _committed(self, db: Session):
+        resources = db.info.pop(_RESOURCES_INFO, None)
+        relationships = db.info.pop(_RELATIONSHIPS_INFO, None)
+        if resources or relationships:
+            self._restore_pending(resources or set(), relationships or {})
+
+    def _take_pending(self) -> Tuple[Set[int], Dict[int, Set[int]]]:
+        with self._pending_lock:
+            pending = self._pending_resources, self._pending_relationships
+            self._pending_resources, self._pending_relationships = set(), {}
+        return pending
+
+    def _restore_pending(self, resources: Set[int], relationships: Dict[int, Set[int]]):
+        with self._pending_lock:
+            self._pending_resources |= resources
+            for rel_id, ends in relationships.items():
+                self._pending_relationships.setdefault(rel_id, set()).update(ends)
+
+    # -- reads --
+
+    def flows_json(self, db: Session) -> str:
+        """Every flow as a JSON array, in LIST_ORDER"""
+        rows = db.query(UrlFlow.flow).order_by(*_ordering()).all()
+        return '[' + ','.join(flow for flow, in rows) + ']'
+
+    def flow_json(self, db: Session, record_id: int) -> Optional[str]:
+        """A record's flow as JSON, None if it has none"""
+        row = db.query(UrlFlow.flow).filter(UrlFlow.record_id == record_id).first()
+        return row[0] if row else None
+
+    def list_flows(self, db: Session, cursor: Optional[str] = None, limit: int = 100, zone: Optional[str] = None,
+                   account_id: Optional[str] = None, record_type: Optional[str] = None,
+                   target_type: Optional[str] = None, search: Optional[str] = None) -> Dict[str, Any]:
+        """
+        A page of flow summaries in LIST_ORDER, after cursor
+        Filtered by zone name, account (of the record or of a resource in
+        its chain), record type, target type (the type of a resource in the
+        chain, or a category such as albs) and text in the URL. Only the
+        page's flows are decoded. Raises ValueError for an invalid cursor.
+        """
+        query = db.query(UrlFlow.flow, *(column for column, _ in LIST_ORDER))
+        if zone:
+            query = query.filter(UrlFlow.zone_name == zone)
+        if record_type:
+            query = query.filter(UrlFlow.record_type == record_type)
+        if account_id:
+            query = query.filter(_chain_has(db, Resource.account_id == account_id))
+        if target_type:
+            types = CATEGORY_TYPES.get(target_type, {target_type})
+            query = query.filter(_chain_has(db, Resource.type.in_(types), UrlFlowMember.resource_id != UrlFlow.record_id))
+        if search:
+            query = query.filter(func.lower(UrlFlow.url).contains(search.lower(), autoescape=True))
+        total = query.count()
+
+        if cursor:
+            query = query.filter(keyset_after(LIST_ORDER, decode_cursor(cursor, len(LIST_ORDER))))
+        rows = query.order_by(*_ordering()).limit(limit + 1).all()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            "items": [flow_summary(json.loads(row[0])) for row in rows],
+            "next_cursor": encode_cursor(rows[-1][1:]) if more else None,
+            "total": total,
+            "limit": limit,
+        }
+
+    # -- refreshes --
+
+    def schedule_refresh(self, rebuild: bool = False,
+                         session_factory: Optional[Callable[[], Session]] = None) -> Future:
+        """
+        Refresh in the background, so the next request finds the index up to
+        date; the refresh opens its session with session_factory (the
+        index's own by default). A refresh already queued and not yet started
+        covers this one unless a rebuild is asked for. Returns its future.
+        """
+        with self._pending_lock:
+            if self._queued is not None and not rebuild:
+                return self._queued
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='url-flow-index')
+            self._queued = self._executor.submit(
+                self._refresh_in_background, rebuild, session_factory or self.session_factory
+            )
+            return self._queued
+
+    def refresh_soon(self, db: Session) -> Optional[Future]:
+        """
+        Queue a background refresh against db's database if changes committed
+        in this process are waiting for one; reads call this instead of
+        refreshing inline. Returns the refresh's future, None if none is due.
+        """
+        with self._pending_lock:
+            waiting = bool(self._pending_resources or self._pending_relationships)
+        if not waiting:
+            return None
+        return self.schedule_refresh(session_factory=session_factory_for(db))
+
+    def _refresh_in_background(self, rebuild: bool, session_factory: Callable[[], Session]):
+        with self._pending_lock:
+            # Changes committed from here on need a refresh of their own
+            self._queued = None
+        db = session_factory()
+        try:
+            self.refresh(db, rebuild=rebuild)
+        except Exception:
+            logger.exception("URL flow index refresh failed")
+        finally:
+            db.close()
+
+    def refresh(self, db: Session, rebuild: bool = False) -> Dict[str, Any]:
+        """
+        Bring the index up to date with the changes committed since the last
+        refresh, or rebuild it; returns what was done
+        """
+        with self._lock:
+            resources, relationships = self._take_pending()
+            try:
+                state = db.get(UrlFlowIndexState, 1)
+                if rebuild or state is None or state.version != INDEX_VERSION:
+                    return self._rebuild(db, state)
+                highest = db.query(func.max(Resource.id)).scalar() or 0
+                changes = len(resources) + len(relationships) + max(0, highest - state.resource_watermark)
+                if changes > settings.URL_FLOW_INCREMENTAL_MAX_CHANGES:
+                    return self._rebuild(db, state)
+                if not changes and highest == state.resource_watermark:
+                    return {'mode': 'none', 'flows': 0}
+                if self._graph is None:
+                    self._graph = self._load(db)
+                resources.update(range(state.resource_watermark + 1, highest + 1))
+                return self._update(db, state, resources, relationships, highest)
+            except Exception:
+                db.rollback()
+                # The graph may be ahead of the tables; it is loaded again next time
+                self._graph = None
+                self._restore_pending(resources, relationships)
+                raise
+
+    def _load(self, db: Session) -> _FlowGraph:
+        """The graph from the stored keys, resource types and relationships"""
+        started = time.perf_counter()
+        graph = _FlowGraph()
+        keys = {}
+        for resource_id, kind, key in db.query(UrlFlowKey.resource_id, UrlFlowKey.kind, UrlFlowKey.key).order_by(UrlFlowKey.id):
+            keys.setdefault(resource_id, []).append((kind, key))
+        for resource_id, type_ in db.query(Resource.id, Resource.type):
+            graph.set_resource(resource_id, type_, keys.get(resource_id, []))
+        for record_id, values in db.query(UrlFlow.record_id, UrlFlow.match_values):
+            graph.set_record(record_id, values or [])
+        self._load_relationships(db, graph)
+        logger.info(f"Loaded the URL flow graph in {time.perf_counter() - started:.2f}s")
+        return graph
+
+    def _load_relationships(self, db: Session, graph: _FlowGraph, rel_ids: Optional[List[int]] = None):
+        columns = [
+            ResourceRelationship.id, ResourceRelationship.source_resource_id, ResourceRelationship.target_resource_id,
+            ResourceRelationship.relationship_type, ResourceRelationship.label, ResourceRelationship.auto_detected,
+        ]
+        if rel_ids is None:
+            rows = db.query(*columns).order_by(ResourceRelationship.id)
+        else:
+            rows = (
+                row for chunk in page_chunks(iter(rel_ids), LOOKUP_CHUNK)
+                for row in db.query(*columns).filter(ResourceRelationship.id.in_(chunk))
+            )
+        found = set()
+        for row in rows:
+            graph.add_relationship(*row)
+            found.add(row[0])
+        return found
+
+    def _rebuild(self, db: Session, state: Optional[UrlFlowIndexState]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        graph = _FlowGraph()
+        highest = 0
+        for row in db.query(*KEY_COLUMNS):
+            graph.set_resource(row.id, row.type, match_keys(
+                row.type, row.name, row.dns_name, row.public_ip, row.private_ip, row.type_specific_properties
+            ))
+            if row.type == RECORD_TYPE:
+                graph.set_record(row.id, record_match_values(row.type_specific_properties))
+            highest = max(highest, row.id)
+        self._load_relationships(db, graph)
+
+        flows, members = self._build(db, graph, list(graph.records))
+        db.query(UrlFlowMember).delete(synchronize_session=False)
+        db.query(UrlFlow).delete(synchronize_session=False)
+        db.query(UrlFlowKey).delete(synchronize_session=False)
+        db.bulk_insert_mappings(UrlFlowKey, [
+            {'kind': kind, 'key': key, 'resource_id': resource_id}
+            for resource_id, keys in graph.keys.items() for kind, key in keys
+        ])
+        db.bulk_insert_mappings(UrlFlow, flows)
+        db.bulk_insert_mappings(UrlFlowMember, members)
+
+        now = datetime.now(timezone.utc)
+        if state is None:
+            state = UrlFlowIndexState(id=1)
+            db.add(state)
+        state.version = INDEX_VERSION
+        state.resource_watermark = highest
+        state.built_at = now
+        state.refreshed_at = now
+        db.commit()
+        self._graph = graph
+        elapsed = time.perf_counter() - started
+        logger.info(f"Built the URL flow index: {len(flows)} flows from {len(graph.types)} resources in {elapsed:.2f}s")
+        return {'mode': 'rebuild', 'flows': len(flows), 'elapsed_ms': round(elapsed * 1000)}
+
+    def _update(self, db: Session, state: UrlFlowIndexState, resources: Set[int],
+                relationships: Dict[int, Set[int]], highest: int) -> Dict[str, Any]:
+        started = time.perf_counter()
+        graph = self._graph
+        affected = set()
+        # Ends of changed relationships, as they were and are
+        touched = set().union(*relationships.values())
+
+        rows = {
+            row.id: row
+            for chunk in page_chunks(iter(resources), LOOKUP_CHUNK)
+            for row in db.query(*KEY_COLUMNS).filter(Resource.id.in_(chunk))
+        }
+        changed_keys = set()
+        new_keys = []
+        for resource_id in resources:
+            changed_keys.update(graph.keys.get(resource_id, []))
+            if resource_id in graph.records:
+                affected.add(resource_id)
+            row = rows.get(resource_id)
+            if row is None:
+                # Deleted, and its relationships with it
+                for rel_id in graph.relationship_ids(resource_id):
+                    touched.update(graph.remove_relationship(rel_id))
+                graph.remove_resource(resource_id)
+                graph.remove_record(resource_id)
+                continue
+            keys = match_keys(row.type, row.name, row.dns_name, row.public_ip, row.private_ip, row.type_specific_properties)
+            changed_keys.update(keys)
+            new_keys.extend({'kind': kind, 'key': key, 'resource_id': resource_id} for kind, key in keys)
+            graph.set_resource(resource_id, row.type, keys)
+            if row.type == RECORD_TYPE:
+                graph.set_record(resource_id, record_match_values(row.type_specific_properties))
+                affected.add(resource_id)
+            else:
+                graph.remove_record(resource_id)
+
+        for rel_id in relationships:
+            touched.update(graph.remove_relationship(rel_id))
+        for rel_id in self._load_relationships(db, graph, list(relationships)):
+            touched.update(graph.relationships[rel_id][:2])
+
+        for chunk in page_chunks(iter(resources), LOOKUP_CHUNK):
+            affected.update(record_id for record_id, in db.query(UrlFlowMember.record_id).filter(
+                UrlFlowMember.resource_id.in_(chunk)
+            ).distinct())
+        for chunk in page_chunks(iter(touched - resources), LOOKUP_CHUNK):
+            affected.update(record_id for record_id, in db.query(UrlFlowMember.record_id).filter(
+                UrlFlowMember.resource_id.in_(chunk),
+                UrlFlowMember.related.is_(False)
+            ).distinct())
+        affected |= graph.records_related(changed_keys)
+
+        for chunk in page_chunks(iter(resources), LOOKUP_CHUNK):
+            db.query(UrlFlowKey).filter(UrlFlowKey.resource_id.in_(chunk)).delete(synchronize_session=False)
+        db.bulk_insert_mappings(UrlFlowKey, new_keys)
+
+        flows, members = self._build(db, graph, [record_id for record_id in affected if record_id in graph.records])
+        for chunk in page_chunks(iter(affected), LOOKUP_CHUNK):
+            db.query(UrlFlowMember).filter(UrlFlowMember.record_id.in_(chunk)).delete(synchronize_session=False)
+            db.query(UrlFlow).filter(UrlFlow.record_id.in_(chunk)).delete(synchronize_session=False)
+        db.bulk_insert_mappings(UrlFlow, flows)
+        db.bulk_insert_mappings(UrlFlowMember, members)
+
+        state.resource_watermark = highest
+        state.refreshed_at = datetime.now(timezone.utc)
+        db.commit()
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Updated the URL flow index for {len(resources)} resources and {len(relationships)} relationships: "
+            f"{len(flows)} flows rebuilt, {len(affected) - len(flows)} removed in {elapsed:.2f}s"
+        )
+        return {'mode': 'update', 'flows': len(flows), 'elapsed_ms': round(elapsed * 1000)}
+
+    # -- building --
+
+    def _build(self, db: Session, graph: _FlowGraph, record_ids: List[int]) -> Tuple[List[dict], List[dict]]:
+        """url_flows and url_flow_members rows of these records"""
+        chains = {}
+        needed = set(record_ids)
+        record_rows = self._summary_rows(db, record_ids)
+        for record_id in record_ids:
+            props = _dict_props(record_rows[record_id].type_specific_properties)
+            chain, rel_ids = graph.chain(record_id, graph.direct_matches(record_id, props))
+            # Also the relationships of the record itself
+            rel_ids.update(graph.links(record_id, resources_only=False).values())
+            chains[record_id] = (chain, rel_ids)
+            needed.update(chain)
+        rows = self._summary_rows(db, needed - set(record_rows))
+        rows.update(record_rows)
+        summaries = {}
+
+        def summary(resource_id):
+            if resource_id not in summaries:
+                summaries[resource_id] = resource_summary(rows[resource_id])
+            return summaries[resource_id]
+
+        flows = []
+        members = []
+        built_at = datetime.now(timezone.utc)
+        for record_id in record_ids:
+            chain, rel_ids = chains[record_id]
+            flow = self._flow(graph, rows[record_id], summary, chain, rel_ids)
+            flows.append({
+                'record_id': record_id,
+                'url': flow['url'],
+                'record_type': flow['record_type'],
+                'zone_name': flow['zone_name'],
+                'account_id': flow['account_id'],
+                'important_path_count': flow['important_path_count'],
+                'has_connections': flow['has_connections'],
+                'has_invalid_a_target': flow['classification']['has_invalid_a_target'],
+                'match_values': graph.records[record_id],
+                'flow': json.dumps(flow, ensure_ascii=False, separators=(',', ':'), default=str),
+                'built_at': built_at,
+            })
+            # A change to any of these, or to a relationship of those not only related, can change the flow
+            related = set()
+            for resource_id in (record_id, *chain):
+                related |= graph.related_ids(resource_id)
+            dependencies = dict.fromkeys(related, True)
+            dependencies.update(dict.fromkeys((record_id, *chain), False))
+            members.extend(
+                {'record_id': record_id, 'resource_id': resource_id, 'related': only_related}
+                for resource_id, only_related in dependencies.items()
+            )
+        return flows, members
+
+    def _summary_rows(self, db: Session, resource_ids: Iterable[int]) -> Dict[int, Any]:
+        return {
+            row.id: row
+            for chunk in page_chunks(iter(resource_ids), LOOKUP_CHUNK)
+            for row in db.query(*SUMMARY_COLUMNS).filter(Resource.id.in_(chunk))
+        }
+
+    def _flow(self, graph: _FlowGraph, record, summary, chain: List[int], rel_ids: Set[int]) -> Dict[str, Any]:
+        """A record's flow, as /api/resources/url-flows returns it"""
+        props = _dict_props(record.type_specific_properties)
+        record_type = props.get('record_type', '')
+        record_values = props.get('record_values', [])
+        zone_name = props.get('zone_name', '')
+
+        connections = []
+        for rel_id in sorted(rel_ids):
+            source, target, type_, label, auto_detected = graph.relationships[rel_id]
+            connections.append({
+                "id": rel_id,
+                "source_id": source,
+                "target_id": target,
+                "type": type_,
+                "label": label or type_,
+                "auto_detected": auto_detected,
+            })
+
+        # Categorize all collected resources
+        albs, cloudfront_list, ec2_list, db_list = [], [], [], []
+        s3_list, pipeline_list, other_list = [], [], []
+        for resource_id in chain:
+            r = summary(resource_id)
+            if r['type'] in ELB_TYPES:
+                albs.append(r)
+            elif r['type'] in CF_TYPES:
+                cloudfront_list.append(r)
+            elif r['type'] in EC2_TYPES:
+                ec2_list.append(r)
+            elif r['type'] in DB_TYPES:
+                db_list.append(r)
+            elif r['type'] in S3_TYPES:
+                s3_list.append(r)
+            elif r['type'] in PIPE_TYPES:
+                pipeline_list.append(r)
+            else:
+                other_list.append(r)
+
+        total_connections = len(chain)
+
+        ip_targets = [val for val in record_values or [] if isinstance(val, str) and is_ip(val)]
+        unmatched_public_ips = []
+        matched_ip_targets = []
+        for ip_val in ip_targets:
+            if ip_val in graph.owners['public_ip'] or ip_val in graph.owners['private_ip']:
+                matched_ip_targets.append(ip_val)
+            elif is_public_ip(ip_val):
+                unmatched_public_ips.append(ip_val)
+
+        is_cert_validation = is_certificate_validation_record(record.name, record_type, record_values)
+        has_invalid_a_target = record_type in ('A', 'AAAA') and len(unmatched_public_ips) > 0
+        is_provider_or_external_a_record = (
+            record_type in ('A', 'AAAA') and
+            len(unmatched_public_ips) > 0 and
+            total_connections == 0
+        )
+
+        target_accounts = sorted({summary(r)['account_id'] for r in chain if summary(r)['account_id']})
+        load_balancer_names = sorted({r['name'] for r in albs if r['name']})
+        record_target_ips = sorted({val for val in ip_targets})
+        classification_labels = []
+        if is_cert_validation:
+            classification_labels.append('certificate_validation')
+        if has_invalid_a_target:
+            classification_labels.append('invalid_ip_target')
+        if is_provider_or_external_a_record:
+            classification_labels.append('provider_or_external_a_record')
+
+        important_path_count = len(cloudfront_list) + len(s3_list) + len(pipeline_list)
+
+        return {
+            "url": record.name,
+            "record_id": record.id,
+            "record_type": record_type,
+            "record_values": record_values,
+            "zone_name": zone_name,
+            "account_id": record.account_id,
+            "record": summary(record.id),
+            "albs": albs,
+            "cloudfront": cloudfront_list,
+            "ec2_instances": ec2_list,
+            "databases": db_list,
+            "s3_buckets": s3_list,
+            "pipelines": pipeline_list,
+            "other": other_list,
+            "has_connections": total_connections > 0,
+            "connections": connections,
+            "important_path_count": important_path_count,
+            "classification": {
+                "is_certificate_validation": is_cert_validation,
+                "has_invalid_a_target": has_invalid_a_target,
+                "is_provider_or_external_a_record": is_provider_or_external_a_record,
+                "unmatched_public_ips": unmatched_public_ips,
+                "matched_ip_targets": matched_ip_targets,
+                "labels": classification_labels,
+            },
+            "grouping": {
+                "target_accounts": target_accounts,
+                "load_balancers": load_balancer_names,
+                "target_ips": record_target_ips,
+            },
+        }
+
+
+def session_factory_for(db: Session) -> Callable[[], Session]:
+    """A factory of sessions on db's database, for refreshing the index after db's changes"""
+    return sessionmaker(bind=db.get_bind(), autoflush=False)
+
+
+def _ordering():
+    return [column.desc() if descending else column for column, descending in LIST_ORDER]
+
+
+def _chain_has(db: Session, *conditions):
+    """Filter for flows with the record or a resource of their chain meeting conditions"""
+    return db.query(UrlFlowMember.record_id).join(Resource, Resource.id == UrlFlowMember.resource_id).filter(
+        UrlFlowMember.record_id == UrlFlow.record_id,
+        UrlFlowMember.related.is_(False),
+        *conditions
+    ).exists()
+
+
+url_flow_index = UrlFlowIndex(SessionLocal)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_flushed_changes(session: Session, flush_context):
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, Resource):
+            session.info.setdefault(_RESOURCES_INFO, set()).add(instance.id)
+        elif isinstance(instance, ResourceRelationship):
+            # The ends before the flush too; the graph may not know them after a restart
+            ends = session.info.setdefault(_RELATIONSHIPS_INFO, {}).setdefault(instance.id, set())
+            state = inspect(instance)
+            for attribute in ('source_resource_id', 'target_resource_id'):
+                history = state.attrs[attribute].history
+                ends.update(value for value in history.sum() if value is not None)
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_committed_changes(session: Session):
+    url_flow_index._committed(session)
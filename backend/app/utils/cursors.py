@@ -0,0 +1,44 @@
+"""
+Keyset pagination cursors
+A cursor is the sort key of the last row of a page, as URL-safe base64 of
+its JSON; the next page is the rows sorting after it. Unlike OFFSET, each
+page costs the same however deep it is, and rows added or removed between
+requests do not shift the pages.
+"""
+import base64
+import binascii
+import json
+from typing import Any, List, Sequence, Tuple
+
+from sqlalchemy import and_, literal, or_
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """The cursor of a row with these sort key values"""
+    text = json.dumps(list(values), separators=(',', ':'))
+    return base64.urlsafe_b64encode(text.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, length: int) -> List[Any]:
+    """The sort key values of a cursor; raises ValueError if it is not one of length values"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != length:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def keyset_after(order: Sequence[Tuple[Any, bool]], values: Sequence[Any]):
+    """
+    Filter for the rows sorting after values, for an ORDER BY of (column,
+    descending) pairs ending in a unique column
+    """
+    condition = None
+    for (column, descending), value in reversed(list(zip(order, values))):
+        # Bound as parameters, as booleans cannot be compared with < and >
+        value = literal(value, column.type)
+        beyond = column < value if descending else column > value
+        condition = beyond if condition is None else or_(beyond, and_(column == value, condition))
+    return condition
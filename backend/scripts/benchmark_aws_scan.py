@@ -0,0 +1,224 @@
+"""
+Benchmark sequential vs concurrent AWSScanner.scan_all_resources offline
+Every boto3 client is stubbed with botocore's Stubber and each API call
+sleeps for a fixed latency, so the speedup can be measured without AWS.
+
+Usage: python scripts/benchmark_aws_scan.py [--items 5] [--latency 0.05] [--workers 8] [--regions 1]
+"""
+import sys
+import os
+import time
+import argparse
+from datetime import datetime, timedelta, timezone
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from botocore import xform_name
+from botocore.stub import Stubber
+from app.services.aws_scanner import AWSScanner
+
+ACCOUNT_ID = '123456789012'
+REGION = 'us-east-1'
+BENCHMARK_REGIONS = [REGION, 'us-west-2', 'eu-west-1', 'eu-central-1', 'ap-southeast-1', 'ap-northeast-1']
+NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def build_fixtures(items: int):
+    """Canned responses per (service, operation); callables receive the request params"""
+    ids = range(items)
+    arn = lambda service, resource: f"arn:aws:{service}:{REGION}:{ACCOUNT_ID}:{resource}"
+    return {
+        'sts': {
+            'GetCallerIdentity': lambda p: {'Account': ACCOUNT_ID, 'Arn': f"arn:aws:iam::{ACCOUNT_ID}:user/bench", 'UserId': 'AIDABENCH'},
+            'AssumeRole': lambda p: {
+                'Credentials': {'AccessKeyId': 'ASIABENCHMARK0000', 'SecretAccessKey': 'secret', 'SessionToken': 'token',
+                                'Expiration': datetime.now(timezone.utc) + timedelta(hours=1)},
+                'AssumedRoleUser': {'AssumedRoleId': f"AROABENCH:{p['RoleSessionName']}",
+                                    'Arn': f"arn:aws:sts::{p['RoleArn'].split(':')[4]}:assumed-role/{p['RoleArn'].split('/')[-1]}/{p['RoleSessionName']}"}
+            },
+        },
+        'ec2': {
+            'DescribeInstances': lambda p: {'Reservations': [{'Instances': [{
+                'InstanceId': f'i-{i:017x}', 'State': {'Name': 'running'}, 'InstanceType': 't3.micro',
+                'ImageId': 'ami-12345678', 'Placement': {'AvailabilityZone': f'{REGION}a'}, 'LaunchTime': NOW,
+                'VpcId': 'vpc-12345678', 'SubnetId': 'subnet-12345678', 'Tags': [{'Key': 'Name', 'Value': f'web-{i}'}]
+            } for i in ids]}]},
+            'DescribeVpcs': lambda p: {'Vpcs': [{'VpcId': f'vpc-{i:08x}', 'State': 'available', 'CidrBlock': '10.0.0.0/16'} for i in ids]},
+        },
+        'rds': {
+            'DescribeDBInstances': lambda p: {'DBInstances': [{
+                'DBInstanceIdentifier': f'db-{i}', 'DBInstanceArn': arn('rds', f'db:db-{i}'), 'DBInstanceStatus': 'available',
+                'Engine': 'postgres', 'EngineVersion': '15', 'DBInstanceClass': 'db.t3.micro', 'AllocatedStorage': 20
+            } for i in ids]},
+            'ListTagsForResource': lambda p: {'TagList': [{'Key': 'env', 'Value': 'bench'}]},
+        },
+        'lambda': {
+            'ListFunctions': lambda p: {'Functions': [{
+                'FunctionName': f'fn-{i}', 'FunctionArn': arn('lambda', f'function:fn-{i}'), 'State': 'Active',
+                'Runtime': 'python3.11', 'Handler': 'app.handler', 'MemorySize': 128, 'Timeout': 3, 'CodeSize': 1024,
+                'LastModified': '2024-01-01T00:00:00.000+0000', 'Role': f"arn:aws:iam::{ACCOUNT_ID}:role/fn"
+            } for i in ids]},
+            'ListTags': lambda p: {'Tags': {'env': 'bench'}},
+        },
+        's3': {
+            'ListBuckets': lambda p: {'Buckets': [{'Name': f'bench-bucket-{i}', 'CreationDate': NOW} for i in ids]},
+            'GetBucketLocation': lambda p: {'LocationConstraint': 'eu-west-1'},
+            'GetBucketTagging': lambda p: {'TagSet': [{'Key': 'env', 'Value': 'bench'}]},
+        },
+        'elbv2': {
+            'DescribeLoadBalancers': lambda p: {'LoadBalancers': [{
+                'LoadBalancerArn': arn('elasticloadbalancing', f'loadbalancer/app/lb-{i}/{i:016x}'), 'LoadBalancerName': f'lb-{i}',
+                'State': {'Code': 'active'}, 'Type': 'application', 'Scheme': 'internet-facing',
+                'DNSName': f'lb-{i}.{REGION}.elb.amazonaws.com', 'VpcId': 'vpc-12345678'
+            } for i in ids]},
+            'DescribeTags': lambda p: {'TagDescriptions': [{'ResourceArn': resource_arn, 'Tags': [{'Key': 'env', 'Value': 'bench'}]} for resource_arn in p['ResourceArns']]},
+        },
+        'ecs': {
+            'ListClusters': lambda p: {'clusterArns': [arn('ecs', f'cluster/cluster-{i}') for i in ids]},
+            'DescribeClusters': lambda p: {'clusters': [{'clusterArn': cluster_arn, 'clusterName': cluster_arn.split('/')[-1], 'status': 'ACTIVE'} for cluster_arn in p['clusters']]},
+            'ListTagsForResource': lambda p: {'tags': [{'key': 'env', 'value': 'bench'}]},
+        },
+        'eks': {
+            'ListClusters': lambda p: {'clusters': [f'eks-{i}' for i in ids]},
+            'DescribeCluster': lambda p: {'cluster': {'name': p['name'], 'status': 'ACTIVE', 'version': '1.29', 'createdAt': NOW}},
+        },
+        'dynamodb': {
+            'ListTables': lambda p: {'TableNames': [f'table-{i}' for i in ids]},
+            'DescribeTable': lambda p: {'Table': {'TableName': p['TableName'], 'TableArn': arn('dynamodb', f"table/{p['TableName']}"), 'TableStatus': 'ACTIVE', 'CreationDateTime': NOW}},
+            'ListTagsOfResource': lambda p: {'Tags': [{'Key': 'env', 'Value': 'bench'}]},
+        },
+        'sns': {
+            'ListTopics': lambda p: {'Topics': [{'TopicArn': arn('sns', f'topic-{i}')} for i in ids]},
+            'ListTagsForResource': lambda p: {'Tags': [{'Key': 'env', 'Value': 'bench'}]},
+            'GetTopicAttributes': lambda p: {'Attributes': {'SubscriptionsConfirmed': '1', 'DisplayName': 'bench'}},
+        },
+        'sqs': {
+            'ListQueues': lambda p: {'QueueUrls': [f'https://sqs.{REGION}.amazonaws.com/{ACCOUNT_ID}/queue-{i}' for i in ids]},
+            'GetQueueAttributes': lambda p: {'Attributes': {'ApproximateNumberOfMessages': '0'}},
+            'ListQueueTags': lambda p: {'Tags': {'env': 'bench'}},
+        },
+        'apigateway': {
+            'GetRestApis': lambda p: {'items': [{'id': f'api{i}', 'name': f'api-{i}', 'createdDate': NOW} for i in ids]},
+        },
+        'codepipeline': {
+            'ListPipelines': lambda p: {'pipelines': [{'name': f'pipe-{i}', 'created': NOW, 'updated': NOW} for i in ids]},
+            'GetPipeline': lambda p: {'pipeline': {'name': p['name'], 'roleArn': f"arn:aws:iam::{ACCOUNT_ID}:role/pipe", 'version': 1, 'stages': [
+                {'name': 'Source', 'actions': [{'name': 'src', 'actionTypeId': {'category': 'Source', 'owner': 'AWS', 'provider': 'S3', 'version': '1'}}]}
+            ]}},
+            'ListTagsForResource': lambda p: {'tags': [{'key': 'env', 'value': 'bench'}]},
+            'GetPipelineState': lambda p: {'pipelineName': p['name'], 'stageStates': [{'stageName': 'Source', 'latestExecution': {'pipelineExecutionId': 'x', 'status': 'Succeeded'}}]},
+        },
+        'route53': {
+            'ListHostedZones': lambda p: {'HostedZones': [{'Id': f'/hostedzone/Z{i:012d}', 'Name': f'zone{i}.example.com.', 'CallerReference': str(i)} for i in ids],
+                                          'IsTruncated': False, 'MaxItems': '100', 'Marker': ''},
+            'GetHostedZone': lambda p: {'HostedZone': {'Id': p['Id'], 'Name': f"{p['Id'].lower()}.example.com.", 'CallerReference': 'ref'}},
+            'ListTagsForResource': lambda p: {'ResourceTagSet': {'ResourceType': 'hostedzone', 'ResourceId': p['ResourceId'], 'Tags': []}},
+            'ListResourceRecordSets': lambda p: {'ResourceRecordSets': [
+                {'Name': f'www{i}.example.com.', 'Type': 'A', 'TTL': 300, 'ResourceRecords': [{'Value': f'10.0.0.{i % 250}'}]} for i in ids
+            ], 'IsTruncated': False, 'MaxItems': '300'},
+        },
+        'cloudfront': {
+            'ListDistributions': lambda p: {'DistributionList': {'Marker': '', 'MaxItems': 100, 'IsTruncated': False, 'Quantity': items, 'Items': [{
+                'Id': f'E{i:012d}', 'ARN': f"arn:aws:cloudfront::{ACCOUNT_ID}:distribution/E{i:012d}", 'Status': 'Deployed', 'LastModifiedTime': NOW,
+                'DomainName': f'd{i}.cloudfront.net', 'Aliases': {'Quantity': 0}, 'Origins': {'Quantity': 1, 'Items': [{'Id': 'o', 'DomainName': 'origin.example.com'}]},
+                'DefaultCacheBehavior': {'TargetOriginId': 'o', 'ViewerProtocolPolicy': 'allow-all'}, 'CacheBehaviors': {'Quantity': 0},
+                'CustomErrorResponses': {'Quantity': 0}, 'Comment': '', 'PriceClass': 'PriceClass_All', 'Enabled': True,
+                'ViewerCertificate': {}, 'Restrictions': {'GeoRestriction': {'RestrictionType': 'none', 'Quantity': 0}},
+                'WebACLId': '', 'HttpVersion': 'http2', 'IsIPV6Enabled': True, 'Staging': False
+            } for i in ids]}},
+            'ListTagsForResource': lambda p: {'Tags': {'Items': []}},
+        },
+        'resourcegroupstaggingapi': {
+            # Tags of every bulk-tagged resource above, whatever region is asked
+            'GetResources': lambda p: {'ResourceTagMappingList': [
+                {'ResourceARN': resource_arn, 'Tags': [{'Key': 'env', 'Value': 'bench'}]} for resource_arn in [
+                    *(arn('rds', f'db:db-{i}') for i in ids),
+                    *(arn('lambda', f'function:fn-{i}') for i in ids),
+                    *(f'arn:aws:s3:::bench-bucket-{i}' for i in ids),
+                    *(arn('elasticloadbalancing', f'loadbalancer/app/lb-{i}/{i:016x}') for i in ids),
+                    *(arn('ecs', f'cluster/cluster-{i}') for i in ids),
+                    *(arn('dynamodb', f'table/table-{i}') for i in ids),
+                    *(arn('sns', f'topic-{i}') for i in ids),
+                    *(arn('sqs', f'queue-{i}') for i in ids),
+                    *(arn('codepipeline', f'pipe-{i}') for i in ids),
+                ]
+            ]},
+        },
+        'mq': {
+            'ListBrokers': lambda p: {'BrokerSummaries': [{'BrokerId': f'b-{i}', 'DeploymentMode': 'SINGLE_INSTANCE', 'EngineType': 'ACTIVEMQ'} for i in ids]},
+            'DescribeBroker': lambda p: {'BrokerId': p['BrokerId'], 'BrokerName': p['BrokerId'], 'BrokerState': 'RUNNING'},
+            'ListUsers': lambda p: {'Users': []},
+        },
+    }
+
+
+class StubbedSession:
+    """Wraps a boto3 session so every client it creates answers from fixtures"""
+
+    def __init__(self, session, scanner):
+        self._session = session
+        self._scanner = scanner
+
+    def client(self, service_name: str, **kwargs):
+        client = self._session.client(service_name, **kwargs)
+        stubber = Stubber(client)
+        responses = self._scanner.fixtures[service_name]
+
+        def queue_response(params, model, **kwargs):
+            # Queue the canned response just before Stubber pops it, so call
+            # order inside a scanner never has to be declared up front
+            stubber.add_response(xform_name(model.name), responses[model.name](params))
+
+        def simulate_latency(**kwargs):
+            time.sleep(self._scanner.latency)
+
+        client.meta.events.register_first('before-parameter-build.*.*', queue_response)
+        client.meta.events.register_first('before-call.*.*', simulate_latency)
+        stubber.activate()
+        return client
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+class StubbedScanner(AWSScanner):
+    """AWSScanner whose clients answer from fixtures after a simulated network latency"""
+
+    def __init__(self, fixtures, latency: float):
+        super().__init__('AKIABENCHMARK', 'benchmark-secret', region=REGION)
+        self.fixtures = fixtures
+        self.latency = latency
+
+    def _thread_session(self):
+        return StubbedSession(super()._thread_session(), self)
+
+
+def run(label: str, scanner: StubbedScanner, **kwargs):
+    start = time.perf_counter()
+    results = scanner.scan_all_resources(**kwargs)
+    elapsed = time.perf_counter() - start
+    total = sum(len(resources) for resources in results.values())
+    print(f"{label:<12} {elapsed:8.2f}s  {total} resources  {scanner.get_scan_stats()['api_calls']} API calls")
+    return results, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=5, help='resources per service')
+    parser.add_argument('--latency', type=float, default=0.05, help='seconds per API call')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent worker pool size')
+    parser.add_argument('--regions', type=int, default=1, help='regions to fan out over')
+    args = parser.parse_args()
+
+    fixtures = build_fixtures(args.items)
+    regions = BENCHMARK_REGIONS[:args.regions] if args.regions > 1 else None
+    sequential, sequential_time = run('sequential', StubbedScanner(fixtures, args.latency), regions=regions)
+    concurrent, concurrent_time = run('concurrent', StubbedScanner(fixtures, args.latency), concurrent=True, max_workers=args.workers, regions=regions)
+
+    if sequential != concurrent:
+        print("❌ Concurrent scan result differs from sequential scan")
+        sys.exit(1)
+    print(f"✅ Results identical, speedup {sequential_time / concurrent_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
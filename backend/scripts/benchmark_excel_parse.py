@@ -0,0 +1,129 @@
+"""
+Benchmark Excel parsing for /api/import/upload
+Parses a generated multi-sheet workbook the old way (every sheet read in
+turn in the server process) and with parse_file, which reads sheets in
+worker processes, comparing results, time until the first sheet is ready,
+total time and the server process's peak memory. The speedup depends on
+the cores available to the workers; the workers are used here even on a
+single CPU, where the server parses in-process instead.
+
+Usage: python scripts/benchmark_excel_parse.py [--sheets 6] [--rows 20000] [--workers 4]
+"""
+import sys
+import os
+import io
+import time
+import tempfile
+import argparse
+import tracemalloc
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+from openpyxl import Workbook
+from app.core.config import settings
+from app.services import import_service as import_service_module
+from app.services.import_service import import_service
+from checks import check
+
+COLUMNS = ['Identifier', 'ARN', 'Resource type', 'Region', 'AWS Account', 'Application', 'LastReportedAt', 'Service', 'Tags', None]
+
+
+def write_workbook(path: str, sheets: int, rows: int):
+    workbook = Workbook(write_only=True)
+    for s in range(sheets):
+        sheet = workbook.create_sheet(f'Account {s}')
+        sheet.append(COLUMNS)
+        # Sheets of different sizes, so they finish out of order
+        for i in range(rows * (s % 3 + 1) // 2):
+            sheet.append([
+                f'i-{s}-{i:012x}', f'arn:aws:ec2:eu-west-1:{s:012d}:instance/i-{i:012x}', 'ec2:instance',
+                'eu-west-1', f'{s:012d}', 'billing' if i % 3 == 0 else None, '2024-01-01T00:00:00Z',
+                'ec2', i % 5 if i % 7 else None, None
+            ])
+    workbook.save(path)
+
+
+def parse_sequentially(content: bytes):
+    """The previous parse_file Excel branch"""
+    excel_file = pd.ExcelFile(io.BytesIO(content))
+    sheets = {}
+    for sheet_name in excel_file.sheet_names:
+        df = pd.read_excel(excel_file, sheet_name=sheet_name)
+        sheets[sheet_name] = import_service.frame_records(import_service.clean_frame(df))
+    return sheets
+
+
+def measure(label: str, parse):
+    """Times an untraced run (tracing slows only in-process work), then traces another for memory"""
+    first = []
+    start = time.perf_counter()
+
+    def on_sheet(*_):
+        if not first:
+            first.append(time.perf_counter() - start)
+
+    sheets = parse(on_sheet)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    parse(lambda *_: None)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<11} {elapsed:6.2f}s  first sheet {first[0]:6.2f}s  peak {peak / 2 ** 20:7.1f} MiB  "
+          f"{sum(len(rows) for rows in sheets.values())} rows")
+    return sheets, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sheets', type=int, default=6, help='sheets in the generated workbook')
+    parser.add_argument('--rows', type=int, default=20000, help='rows in a mid-sized sheet')
+    parser.add_argument('--workers', type=int, default=4, help='IMPORT_EXCEL_WORKERS')
+    args = parser.parse_args()
+    settings.IMPORT_EXCEL_WORKERS = args.workers
+    settings.IMPORT_EXCEL_PARALLEL_MIN_BYTES = 0
+    # Use the workers even where there are fewer CPUs, to show what they cost there
+    import_service_module._excel_worker_count = lambda: settings.IMPORT_EXCEL_WORKERS
+
+    path = os.path.join(tempfile.mkdtemp(), 'resources.xlsx')
+    write_workbook(path, args.sheets, args.rows)
+    with open(path, 'rb') as f:
+        content = f.read()
+    print(f"{len(content) / 2 ** 20:.1f} MiB workbook, {args.sheets} sheets, {os.cpu_count()} CPUs")
+
+    def sequential(on_sheet):
+        sheets = parse_sequentially(content)
+        for sheet_name, rows in sheets.items():
+            on_sheet(sheet_name, rows)
+        return sheets
+
+    def parallel(on_sheet):
+        return import_service.parse_file(content, 'resources.xlsx', on_sheet=on_sheet)['sheets']
+
+    # Start the workers outside the measurement, as a running server would have
+    small = Workbook()
+    for s in range(args.workers):
+        small.create_sheet(f'warm-up {s}')
+    buffer = io.BytesIO()
+    small.save(buffer)
+    import_service.parse_file(buffer.getvalue(), 'warm-up.xlsx')
+
+    old, old_time = measure('sequential', sequential)
+    new, new_time = measure('parallel', parallel)
+
+    checks = [
+        ("Sheets kept in workbook order", list(old) == list(new)),
+        ("Same rows and cleaning", old == new),
+        ("Blank column dropped and empty cells None",
+         all(None not in rows[0] and rows[1]['Application'] is None for rows in new.values())),
+    ]
+    settings.IMPORT_EXCEL_WORKERS = 1
+    checks.append(("Same result parsed in-process with one worker",
+                   import_service.parse_file(content, 'resources.xlsx')['sheets'] == new))
+    passed = all([check(label, ok) for label, ok in checks])
+    print(f"{old_time / new_time:.1f}x faster")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Offline check of the import dry run
+Seeds a temporary SQLite database, dry-runs an import of changed, unchanged,
+new, repeated and broken rows, then runs the real import and verifies that
+the dry run predicted its counts and exactly the rows and fields it
+changed. Also pages through a dry run kept in an import session.
+
+Usage: python scripts/check_import_diff.py [--existing 30000] [--new 20000]
+"""
+import sys
+import os
+import time
+import asyncio
+import tempfile
+import argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+from app.database import Base
+from app.models import User, Resource
+from app.routers import import_router
+from app.services.bulk_import import bulk_import_resources
+from app.services.bulk_upsert import RESOURCE_IMPORT_FIELDS
+from app.services.import_diff import diff_import
+from app.services.import_sessions import import_sessions
+from checks import check
+
+FIELDS = sorted(RESOURCE_IMPORT_FIELDS)
+
+
+def row(i: int, status: str = 'running', team: str = 'platform'):
+    return {
+        'name': f'web-{i}',
+        'type': 'ec2',
+        'arn': f'arn:aws:ec2:eu-west-1:123456789012:instance/i-{i:017x}',
+        'status': status,
+        'tags': {'team': team},
+        'last_reported_at': '2024-01-01T00:00:00Z',
+        'Owner team': team,
+    }
+
+
+def snapshot(db):
+    columns = [getattr(Resource, field) for field in FIELDS]
+    return {pk: values for pk, *values in db.query(Resource.id, *columns)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--existing', type=int, default=30000, help='resources already imported')
+    parser.add_argument('--new', type=int, default=20000, help='new resources in the import')
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'diff.db')}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    user = User(email='check@example.com', username='check', hashed_password='-')
+    db.add(user)
+    db.commit()
+    bulk_import_resources(db, user.id, [row(i) for i in range(args.existing)])
+
+    # Every third existing resource stopped, every fifth moved team; a few
+    # rows repeat, a few cannot be imported
+    rows = []
+    for i in range(args.existing + args.new):
+        rows.append(row(i, 'stopped' if i % 3 == 0 else 'running', 'data' if i % 5 == 0 else 'platform'))
+    rows += [row(args.existing - 1, 'terminated'), row(args.existing + 1, 'pending')]
+    rows += [{'name': 'broken', 'arn': 'not-an-arn'}] * 3
+
+    before = snapshot(db)
+    start = time.perf_counter()
+    diff = diff_import(db, user.id, rows)
+    elapsed = time.perf_counter() - start
+    print(f"Dry run of {len(rows)} rows in {elapsed:.2f}s: {diff['created']} to create, {diff['updated']} to update, "
+          f"{diff['unchanged']} unchanged, {diff['merged_rows']} merged, {diff['error_count']} errors")
+    untouched = snapshot(db) == before
+
+    # The last existing resource is repeated, ending up terminated
+    changed_existing = sum(1 for i in range(args.existing - 1) if i % 3 == 0 or i % 5 == 0) + 1
+    stopped = sum(1 for i in range(args.existing - 1) if i % 3 == 0)
+    histogram = ', '.join(f"{field}: {changes['count']}" for field, changes in diff['field_changes'].items())
+    passed = all([
+        check("Nothing written", untouched and db.query(Resource).count() == args.existing),
+        check("Counts as generated",
+              diff['created'] == args.new and diff['updated'] == changed_existing
+              and diff['unchanged'] == args.existing - changed_existing and diff['merged_rows'] == 2
+              and diff['error_count'] == 3),
+        check(f"Field histogram ({histogram})",
+              set(diff['field_changes']) == {'status', 'tags', 'description'}
+              and diff['field_changes']['status']['top'][0] == {'old': 'running', 'new': 'stopped', 'count': stopped}),
+    ])
+
+    stats = bulk_import_resources(db, user.id, rows)
+    after = snapshot(db)
+    updates = {change['id']: change['changes'] for change in diff['changes'] if change['action'] == 'update'}
+    modified = {pk for pk, values in before.items() if after[pk] != values}
+    applied = all(
+        after[pk][FIELDS.index(field)] == change['new']
+        for pk, fields in updates.items() for field, change in fields.items()
+    )
+    passed &= all([
+        check(f"Execute matched the prediction ({stats['created']} created, {stats['updated']} updated)",
+              stats['created'] == diff['created']
+              and stats['updated'] == diff['updated'] + diff['unchanged'] + diff['merged_rows']
+              and len(stats['errors']) == diff['error_count']),
+        check("Exactly the predicted resources changed, to the predicted values", modified == set(updates) and applied),
+        check(f"Dry run finished within 5s ({elapsed:.2f}s)", elapsed < 5),
+    ])
+
+    # Kept in an import session and paged
+    settings.IMPORT_SESSION_DIR = tempfile.mkdtemp()
+    import_sessions.root = settings.IMPORT_SESSION_DIR
+    session_id = import_sessions.create(user.id, 'rows.csv')
+    moved = [row(i, team='security') for i in range(5)]
+    import_sessions.put_rows(session_id, user.id, import_router.RESOURCES_DATASET, moved)
+    request = import_router.ImportRequest(session_id=session_id)
+    first = asyncio.run(import_router.dry_run_import(request, offset=0, limit=2, db=db, current_user=user))
+    second = asyncio.run(import_router.get_import_diff(session_id, offset=2, limit=2, current_user=user))
+    expected = diff_import(db, user.id, moved)['changes']
+    passed &= check("Session dry run paged",
+                    first['total_changes'] == second['total_changes'] == len(expected) == 5
+                    and first['changes'] + second['changes'] == expected[:4])
+
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""
+Offline check of background import jobs
+Runs imports on the ImportJobRunner against a temporary SQLite database and
+verifies phase progress, completion with relationship extraction, the
+event stream, cancellation of a running job and failure reporting.
+
+Usage: python scripts/check_import_jobs.py [--rows 5000]
+"""
+import sys
+import os
+import time
+import asyncio
+import tempfile
+import argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from app.core.config import settings
+from app.database import Base, SessionLocal
+from app.models import User, Resource, ImportJob
+from app.routers import import_router
+from app.services.import_jobs import ImportJobRunner, cancel_import_job
+from checks import check
+
+
+def wait_for(job_id: int, done, timeout: float = 120) -> ImportJob:
+    deadline = time.monotonic() + timeout
+    while True:
+        with SessionLocal() as db:
+            job = db.get(ImportJob, job_id)
+            if done(job) or time.monotonic() > deadline:
+                db.expunge(job)
+                return job
+        time.sleep(0.02)
+
+
+def finished(job: ImportJob) -> bool:
+    return job.status in ('succeeded', 'failed', 'cancelled')
+
+
+def build_rows(count: int, prefix: str):
+    rows = []
+    for i in range(count):
+        if i % 1000 == 999:
+            # No type, and none derivable from the ARN
+            rows.append({'name': f'{prefix}-broken-{i}', 'arn': 'not-an-arn'})
+            continue
+        rows.append({
+            'name': f'{prefix}-{i}',
+            'type': 'elb' if i % 500 == 0 else 'ec2',
+            'resource_id': f'{prefix}-{i}',
+            'vpc_id': 'vpc-1',
+            'region': 'eu-west-1',
+        })
+    return rows
+
+
+async def read_events(job_id: int, user: User):
+    with SessionLocal() as db:
+        response = await import_router.stream_import_job(job_id, db=db, current_user=user)
+    events = []
+    async for chunk in response.body_iterator:
+        if chunk.startswith('event: '):
+            events.append(chunk.split('\n', 1)[0][len('event: '):])
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=5000, help='rows per import')
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'import_jobs.db')
+    engine = create_engine(f'sqlite:///{path}', connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    SessionLocal.configure(bind=engine)
+    settings.IMPORT_JOB_PROGRESS_INTERVAL = 0
+    runner = ImportJobRunner(max_workers=2)
+
+    with SessionLocal() as db:
+        user = User(email='check@example.com', username='check', hashed_password='-')
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        db.expunge(user)
+
+    def submit(load_rows, batch_size: int = 100) -> int:
+        with SessionLocal() as db:
+            job = ImportJob(created_by=user.id, status='queued', params={'batch_size': batch_size}, progress={})
+            db.add(job)
+            db.commit()
+            runner.submit(job.id, load_rows)
+            return job.id
+
+    rows = build_rows(args.rows, 'web')
+    job_id = submit(lambda: rows)
+    events = asyncio.run(read_events(job_id, user))
+    done = wait_for(job_id, finished)
+    imported = done.progress['import']
+    relationships = done.progress['relationships']
+    broken = args.rows // 1000
+    with SessionLocal() as db:
+        stored = db.query(Resource).count()
+    passed = all([
+        check(f"Job succeeded ({done.status}, {done.error})", done.status == 'succeeded'),
+        check(f"Import phase counted {imported['rows_processed']} rows, {imported['created']} created, {imported['errors']} errors",
+              imported['status'] == 'succeeded' and imported['rows_processed'] == imported['rows_total'] == args.rows
+              and imported['created'] == stored == args.rows - broken and imported['errors'] == broken),
+        check(f"Relationship phase tracked separately ({relationships['extracted']} extracted, last step {relationships['step']})",
+              done.phase == 'relationships' and relationships['status'] == 'succeeded'
+              and relationships['step'] == 'saving' and relationships['extracted'] > 0),
+        check("Result matches /execute's response",
+              done.result['imported_count'] == stored and done.result['relationships_extracted'] == relationships['extracted']),
+        check(f"Event stream sent progress then done ({len(events)} events)",
+              len(events) >= 2 and events[-1] == 'done' and set(events[:-1]) == {'progress'}),
+        check("Timings recorded", done.started_at is not None and done.finished_at >= done.started_at),
+    ])
+
+    slow_rows = build_rows(args.rows * 4, 'slow')
+    job_id = submit(lambda: slow_rows, batch_size=10)
+    running = wait_for(job_id, lambda job: finished(job) or (job.progress or {}).get('import', {}).get('rows_processed'))
+    with SessionLocal() as db:
+        cancel_import_job(db, db.get(ImportJob, job_id))
+    cancelled = wait_for(job_id, finished)
+    processed = cancelled.progress['import']['rows_processed']
+    passed &= check(f"Running job cancelled after {processed} of {len(slow_rows)} rows, relationships skipped",
+                    running.status == 'running' and cancelled.status == 'cancelled' and 0 < processed < len(slow_rows)
+                    and cancelled.progress['import']['status'] == 'cancelled'
+                    and cancelled.progress['relationships']['status'] == 'pending')
+
+    with SessionLocal() as db:
+        job = ImportJob(created_by=user.id, status='queued', params={}, progress={})
+        db.add(job)
+        db.commit()
+        queued = cancel_import_job(db, job)
+        runner.submit(queued.id, lambda: rows)
+    # Give a worker the chance to (wrongly) pick it up
+    time.sleep(0.2)
+    queued = wait_for(queued.id, lambda job: True)
+    passed &= check("Queued job cancelled before it ran", queued.status == 'cancelled' and queued.started_at is None)
+
+    def broken_session():
+        raise RuntimeError('Import session not found')
+
+    failed = wait_for(submit(broken_session), finished)
+    passed &= check(f"Failure reported ({failed.status}: {failed.error})",
+                    failed.status == 'failed' and failed.error == 'Import session not found')
+
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+"""
+Offline check of the streamed resource and relationship exports
+Seeds a temporary SQLite database, streams resources and relationships as
+NDJSON and as a JSON array and verifies they hold exactly what the list
+endpoints return. Measures peak Python memory (tracemalloc) of a streamed
+export at two inventory sizes against building the full response list, and
+times the first chunk and the whole export.
+
+Usage: python scripts/check_inventory_stream.py [--resources 50000]
+"""
+import sys
+import os
+import gc
+import json
+import time
+import tempfile
+import argparse
+import tracemalloc
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models import User, Resource, ResourceRelationship
+from app.routers import resources as resources_router
+from app.schemas import ResourceResponse, ResourceRelationshipResponse
+from app.services.bulk_import import bulk_import_resources
+from app.services.inventory_stream import iter_relationships_stream, iter_resources_stream
+from checks import bulky_properties, check, resource_row
+
+
+def row(i: int):
+    return resource_row(
+        i,
+        type=['ec2', 'rds', 'alb', 's3'][i % 4],
+        account_id=f'{i % 3:012d}',
+        region='eu-west-1',
+        vpc_id=f'vpc-{i % 25}',
+        tags={'team': f'team-{i % 9}', 'cost': str(i)},
+        type_specific_properties=bulky_properties(i),
+    )
+
+
+def seed(path: str, resources: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    user = User(email='check@example.com', username='check', hashed_password='-')
+    db.add(user)
+    db.commit()
+    bulk_import_resources(db, user.id, [row(i) for i in range(resources)])
+    db.execute(insert(ResourceRelationship), [
+        {'source_resource_id': i + 1, 'target_resource_id': (i * 7) % resources + 1,
+         'relationship_type': ['uses', 'depends_on'][i % 2], 'port': 443, 'properties': {'i': i}}
+        for i in range(resources)
+    ])
+    db.commit()
+    return db
+
+
+def parsed(chunks, stream_format: str):
+    body = b''.join(chunks).decode('utf-8')
+    if stream_format == 'ndjson':
+        return [json.loads(line) for line in body.splitlines()]
+    return json.loads(body)
+
+
+def streamed_timing(db, stream_format: str):
+    """Seconds to the first chunk and in total of a full streamed resource export"""
+    start = time.perf_counter()
+    first = None
+    for _ in iter_resources_stream(db, stream_format):
+        first = first or time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def streamed_peak(db, stream_format: str):
+    """Peak traced memory (bytes) of a full streamed resource export"""
+    gc.collect()
+    tracemalloc.start()
+    for _ in iter_resources_stream(db, stream_format):
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def listed(db):
+    """The /resources list response for the whole inventory, built and encoded"""
+    resources = db.query(Resource).order_by(Resource.id).all()
+    body = json.dumps([ResourceResponse.model_validate(r).model_dump(mode='json') for r in resources])
+    db.expunge_all()
+    return body
+
+
+def listed_peak(db):
+    """Peak traced memory (bytes) of building the /resources list response"""
+    gc.collect()
+    tracemalloc.start()
+    listed(db)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--resources', type=int, default=50000, help='resources (and relationships) in the inventory')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    db = seed(os.path.join(directory, 'stream.db'), args.resources)
+    passed = True
+
+    resources = [
+        ResourceResponse.model_validate(r).model_dump(mode='json') for r in db.query(Resource).order_by(Resource.id)
+    ]
+    relationships = [
+        ResourceRelationshipResponse.model_validate(r).model_dump(mode='json')
+        for r in db.query(ResourceRelationship).order_by(ResourceRelationship.id)
+    ]
+    db.expunge_all()
+    for stream_format in ('ndjson', 'json'):
+        passed &= check(f"Resources as {stream_format} are what /api/resources lists",
+                        parsed(iter_resources_stream(db, stream_format), stream_format) == resources)
+        passed &= check(f"Relationships as {stream_format} are what /api/relationships lists",
+                        parsed(iter_relationships_stream(db, stream_format), stream_format) == relationships)
+    del resources, relationships
+
+    items = parsed(iter_resources_stream(db, 'json', fields='name,type', filters={'type': ['alb']}), 'json')
+    passed &= check("Fields and filters apply as on /api/resources/page",
+                    len(items) == args.resources // 4 and all(set(r) == {'id', 'name', 'type'} and r['type'] == 'alb' for r in items))
+    items = parsed(iter_relationships_stream(db, 'ndjson', relationship_type='depends_on', source_id=2), 'ndjson')
+    passed &= check("Relationship filters apply as on /api/relationships",
+                    [r['id'] for r in items] == [2])
+    passed &= check("Empty JSON array export is valid JSON",
+                    parsed(iter_resources_stream(db, 'json', filters={'type': ['nothing']}), 'json') == [])
+    try:
+        resources_router.export_resources_stream(format='ndjson', fields='name,password', type=None, account_id=None,
+                                                 region=None, vpc_id=None, environment=None, current_user=None)
+        refused = False
+    except HTTPException as e:
+        refused = e.status_code == 400
+    passed &= check("Unknown field refused before streaming", refused)
+
+    # Peak memory of the streamed export should not grow with the inventory
+    small = seed(os.path.join(directory, 'small.db'), args.resources // 5)
+    small_peak = streamed_peak(small, 'ndjson')
+    small.close()
+    for stream_format in ('ndjson', 'json'):
+        first, elapsed = streamed_timing(db, stream_format)
+        print(f"Streamed {args.resources} resources as {stream_format}: first chunk after {first * 1000:.1f} ms, "
+              f"all in {elapsed:.2f}s")
+    start = time.perf_counter()
+    listed(db)
+    print(f"Listed {args.resources} resources in {time.perf_counter() - start:.2f}s")
+    peak, listed_bytes = streamed_peak(db, 'ndjson'), listed_peak(db)
+    print(f"Peak memory: streamed {peak / 2**20:.1f} MiB ({args.resources // 5} resources: "
+          f"{small_peak / 2**20:.1f} MiB), listed {listed_bytes / 2**20:.1f} MiB")
+    passed &= check(f"Streamed peak memory flat across inventory sizes ({small_peak / 2**20:.1f} vs {peak / 2**20:.1f} MiB)",
+                    peak < small_peak * 1.5)
+    passed &= check(f"Streamed peak memory a fraction of the listed response ({peak / listed_bytes:.1%})",
+                    peak < listed_bytes / 10)
+
+    db.close()
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
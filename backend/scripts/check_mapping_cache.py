@@ -0,0 +1,154 @@
+"""
+Offline check of the LLM column-mapping cache
+Analyzes sheets through MappingCache with a stand-in for the LLM that
+counts its calls, on a temporary SQLite database: repeated columns are
+answered from the cache, the same columns in another order or spelling
+are not, columns past those the LLM is shown do not matter, refresh, pinning,
+expiry and schema changes behave, and the admin endpoints list, pin and
+invalidate entries.
+
+Usage: python scripts/check_mapping_cache.py
+"""
+import sys
+import os
+import time
+import asyncio
+import tempfile
+from datetime import datetime, timedelta, timezone
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+from app.database import Base
+from app.models import User, ColumnMappingCacheEntry
+from app.routers import import_router
+from app.routers.auth import get_admin_user
+from app.services.import_service import ImportService
+from app.services.mapping_cache import MappingCache
+from checks import check, timed
+
+SHEET = [{'Instance Name': 'web-1', 'Instance ID': 'i-1', 'ARN': 'arn:aws:ec2:eu-west-1:1:instance/i-1', 'Notes': 'x'}]
+RESHUFFLED = [{'instance_id': 'i-2', 'notes': 'y', 'ARN ': 'arn:aws:ec2:eu-west-1:1:instance/i-2', 'INSTANCE-NAME': 'web-2'}]
+
+
+class CountingAnalyzer:
+    """Answers like analyze_with_llm after a delay, counting the calls"""
+    LLM_MAPPING_FIELDS = ImportService.LLM_MAPPING_FIELDS
+    LLM_MAPPING_REVISION = ImportService.LLM_MAPPING_REVISION
+    LLM_SAMPLE_COLUMNS = ImportService.LLM_SAMPLE_COLUMNS
+    model = 'stand-in'
+
+    def __init__(self, delay: float = 0.2):
+        self.delay = delay
+        self.calls = 0
+
+    def analyze_with_llm(self, sample_data, sheet_name):
+        self.calls += 1
+        time.sleep(self.delay)
+        names = {'instance name': 'name', 'instance id': 'resource_id', 'arn': 'arn'}
+        columns = list(sample_data[0])[:self.LLM_SAMPLE_COLUMNS]
+        return {
+            'success': True,
+            'analysis': {
+                'detected_resource_type': 'ec2',
+                'field_mappings': {c: names[c.lower().strip()] for c in columns if c.lower().strip() in names},
+                'arn_column': next((c for c in columns if c.lower().strip() == 'arn'), None),
+            }
+        }
+
+
+def main():
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'cache.db')}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    admin = User(email='admin@example.com', username='admin', hashed_password='-')
+    user = User(email='user@example.com', username='user', hashed_password='-')
+    db.add_all([admin, user])
+    db.commit()
+
+    cache = MappingCache(ttl_days=30)
+    llm = CountingAnalyzer()
+    passed = True
+
+    first, miss_time = timed(lambda: cache.analyze(db, llm, SHEET, 'Sheet1', user_id=user.id))
+    again, hit_time = timed(lambda: cache.analyze(db, llm, [{**SHEET[0], 'Notes': 'y'}], 'Sheet1'))
+    passed &= check(f"Same columns answered from the cache ({miss_time * 1000:.0f} ms -> {hit_time * 1000:.1f} ms)",
+                    llm.calls == 1 and first['cache']['hit'] is False and again['cache']['hit'] is True)
+    passed &= check("Cached mappings are the LLM's",
+                    again['analysis']['field_mappings'] == {'Instance Name': 'name', 'Instance ID': 'resource_id', 'ARN': 'arn'}
+                    and again['analysis']['arn_column'] == 'ARN')
+
+    reshuffled = cache.analyze(db, llm, RESHUFFLED, 'Sheet1')
+    passed &= check("Same columns in another order and spelling are analyzed again",
+                    llm.calls == 2 and reshuffled['cache']['hit'] is False
+                    and reshuffled['analysis']['field_mappings'] == {'ARN ': 'arn'})
+
+    wide = {f'Column {i}': i for i in range(ImportService.LLM_SAMPLE_COLUMNS)}
+    cache.analyze(db, llm, [{**wide, 'Extra': 1}], 'Wide')
+    past_cap = cache.analyze(db, llm, [{**wide, 'Other': 2}], 'Wide')
+    passed &= check("Columns past those the LLM is shown do not change the entry",
+                    llm.calls == 3 and past_cap['cache']['hit'] is True)
+
+    cache.analyze(db, llm, [{**SHEET[0], 'Owner': 'me'}], 'Sheet2')
+    passed &= check("Different columns miss", llm.calls == 4)
+
+    refreshed = cache.analyze(db, llm, SHEET, 'Sheet1', refresh=True)
+    passed &= check("refresh asks the LLM again", llm.calls == 5 and refreshed['cache']['hit'] is False)
+
+    entry_id = again['cache']['entry_id']
+    entry = db.get(ColumnMappingCacheEntry, entry_id)
+    entry.analysis = {**entry.analysis, 'detected_resource_type': 'curated'}
+    entry.pinned = True
+    entry.last_used_at = datetime.now(timezone.utc) - timedelta(days=365)
+    db.commit()
+    cache.analyze(db, llm, SHEET, 'Sheet1', refresh=True)
+    pinned = cache.analyze(db, llm, SHEET, 'Sheet1')
+    passed &= check("Pinned entries are neither replaced nor expired",
+                    pinned['cache']['hit'] and pinned['analysis']['detected_resource_type'] == 'curated')
+
+    other = next(e for e in db.query(ColumnMappingCacheEntry) if 'Owner' in e.columns)
+    other.last_used_at = datetime.now(timezone.utc) - timedelta(days=31)
+    db.commit()
+    calls = llm.calls
+    cache.analyze(db, llm, [{**SHEET[0], 'Owner': 'me'}], 'Sheet2')
+    passed &= check("Unpinned entries unused past the TTL miss", llm.calls == calls + 1)
+
+    llm.LLM_MAPPING_REVISION = ImportService.LLM_MAPPING_REVISION + 1
+    calls = llm.calls
+    cache.analyze(db, llm, SHEET, 'Sheet1')
+    passed &= check("A new prompt revision misses", llm.calls == calls + 1)
+    llm.LLM_MAPPING_REVISION = ImportService.LLM_MAPPING_REVISION
+
+    metrics = cache.get_metrics(db)
+    passed &= check(f"Metrics counted ({metrics})",
+                    metrics['hits'] == 3 and metrics['misses'] == 6 and metrics['entries'] == 5 and metrics['pinned'] == 1)
+
+    # Admin endpoints
+    def refused(candidate) -> bool:
+        try:
+            get_admin_user(candidate)
+        except HTTPException as e:
+            return e.status_code == 403
+        return False
+
+    settings.ADMIN_USERS = ''
+    passed &= check("Nobody is an admin while ADMIN_USERS is empty", refused(user) and refused(admin))
+    settings.ADMIN_USERS = 'admin'
+    passed &= check("Non-admins are refused when ADMIN_USERS is set", refused(user) and get_admin_user(admin) is admin)
+
+    listed = asyncio.run(import_router.list_mapping_cache(pinned=None, limit=100, db=db, admin=admin))
+    unpinned = asyncio.run(import_router.pin_mapping_cache_entry(entry_id, import_router.PinRequest(pinned=False), db=db, admin=admin))
+    unpinned = unpinned.pinned is False
+    cleared = asyncio.run(import_router.clear_mapping_cache(include_pinned=False, db=db, admin=admin))
+    passed &= check(f"Entries listed, unpinned and invalidated ({cleared['deleted']} deleted)",
+                    len(listed) == 5 and unpinned and cleared['deleted'] == 5
+                    and db.query(ColumnMappingCacheEntry).count() == 0)
+
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == '__main__':
+    main()
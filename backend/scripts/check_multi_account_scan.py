@@ -0,0 +1,150 @@
+"""
+Offline check of MultiAccountScanner against stubbed STS and service responses
+Verifies account tagging, skipped accounts, the credential cache (and that
+it is never shared across other source credentials or app users), the global
+concurrency budget, that identical resource IDs in different accounts import
+as separate rows, and that same-named resources in two regions of one
+account do too, in full and incremental imports.
+
+Usage: python scripts/check_multi_account_scan.py [--accounts 3] [--budget 4]
+"""
+import sys
+import os
+import threading
+import argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models import User, Resource, ResourceFingerprint
+from app.services.aws_accounts import MultiAccountScanner, AssumeRoleCredentialCache
+from benchmark_aws_scan import BENCHMARK_REGIONS, StubbedScanner, build_fixtures
+from checks import check
+
+
+class CountingScanner(StubbedScanner):
+    """Stubbed scanner that records the peak number of API calls in flight"""
+
+    def __init__(self, fixtures, latency: float):
+        super().__init__(fixtures, latency)
+        self.in_flight = {'now': 0, 'peak': 0, 'lock': threading.Lock()}
+
+    def _new_session(self):
+        session = super()._new_session()
+        session.events.register('before-parameter-build', self._call_started)
+        session.events.register('after-call', self._call_finished)
+        return session
+
+    def _call_started(self, **kwargs):
+        with self.in_flight['lock']:
+            self.in_flight['now'] += 1
+            self.in_flight['peak'] = max(self.in_flight['peak'], self.in_flight['now'])
+
+    def _call_finished(self, **kwargs):
+        with self.in_flight['lock']:
+            self.in_flight['now'] -= 1
+
+
+def scanned_id(resources, resource_type: str) -> str:
+    """The resource_id of the first scanned resource of resource_type"""
+    return next(resource['resource_id'] for resource in resources if resource['type'] == resource_type)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--accounts', type=int, default=3, help='target accounts')
+    parser.add_argument('--budget', type=int, default=4, help='global concurrency budget')
+    args = parser.parse_args()
+
+    fixtures = build_fixtures(2)
+    accounts = [f'{100000000000 + i}' for i in range(args.accounts)]
+    cache = AssumeRoleCredentialCache()
+    source = CountingScanner(fixtures, 0.01)
+    scanner = MultiAccountScanner(source, accounts + ['not-an-account'], global_concurrency=args.budget,
+                                  max_accounts=args.accounts, credentials=cache)
+
+    results = scanner.scan()
+    tagged = all(resource['account_id'] == account_id
+                 for account_id, by_type in results.items()
+                 for resources in by_type.values() for resource in resources)
+    counts = {account_id: sum(len(resources) for resources in by_type.values()) for account_id, by_type in results.items()}
+    assume_calls = source.get_scan_stats()['api_calls_by_operation'].get('sts.AssumeRole', 0)
+
+    passed = all([
+        check(f"Scanned accounts {sorted(results)}", sorted(results) == accounts),
+        check("Every resource tagged with its own account_id", tagged),
+        check(f"Same resource count in every account {counts}", len(set(counts.values())) == 1),
+        check(f"Invalid target skipped {scanner.errors}", list(scanner.errors) == ['not-an-account']),
+        check(f"Peak API calls in flight {source.in_flight['peak']} <= budget {args.budget}",
+              source.in_flight['peak'] <= args.budget),
+    ])
+
+    scanner.scan(resource_types=['ec2'])
+    repeat_calls = source.get_scan_stats()['api_calls_by_operation'].get('sts.AssumeRole', 0)
+    passed &= check(f"Roles assumed once per account ({assume_calls}), reused on rescan ({repeat_calls})",
+                    assume_calls == repeat_calls == len(accounts))
+
+    # Same access key ID with another secret or token, or another app user:
+    # the role is assumed again rather than served from the cache
+    role_arn = f'arn:aws:iam::{accounts[0]}:role/OrganizationAccountAccessRole'
+    cached, _ = cache.get(source, role_arn)
+    isolated = True
+    for name, value in [('aws_secret_access_key', 'wrong-secret'), ('aws_session_token', 'other-token')]:
+        other = CountingScanner(fixtures, 0.01)
+        other._session_kwargs[name] = value
+        credentials, _ = cache.get(other, role_arn)
+        isolated &= credentials is not cached and other.get_scan_stats()['api_calls_by_operation'].get('sts.AssumeRole') == 1
+    other_user, _ = cache.get(source, role_arn, owner=2)
+    passed &= check("Cached credentials not served to other source credentials or another user",
+                    isolated and other_user is not cached and cache.get(source, role_arn, owner=2)[0] is other_user)
+
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    user = User(email='check@example.com', username='check', hashed_password='-')
+    db.add(user)
+    db.commit()
+    stats = source.import_resource_stream(db, user.id, (resource for _, _, resource in scanner.iter_resources()))
+    rows = db.query(Resource).count()
+    passed &= check(f"Import kept accounts apart: {stats}, {rows} rows", rows == sum(counts.values()) == stats['created'])
+
+    # The stubs answer every region with the same names (db-0, fn-0, ...)
+    regional = CountingScanner(fixtures, 0.01)
+    regions = BENCHMARK_REGIONS[:2]
+    scanned = [resource for _, resource in regional.iter_resources(concurrent=True, regions=regions)]
+    db = sessionmaker(bind=engine)()
+    user = User(email='regions@example.com', username='regions', hashed_password='-')
+    db.add(user)
+    db.commit()
+    stats = regional.import_resource_stream(db, user.id, scanned)
+    rows = db.query(Resource).filter(Resource.created_by == user.id).count()
+    lambdas = sorted(region for region, in db.query(Resource.region).filter(
+        Resource.created_by == user.id, Resource.type == 'lambda', Resource.resource_id == scanned_id(scanned, 'lambda')))
+    passed &= check(f"Same-named resources in {regions} kept apart: {stats['created']} created, {rows} rows, "
+                    f"lambda in {lambdas}", rows == len(scanned) == stats['created'] and lambdas == sorted(regions))
+    stats = regional.import_resource_stream(db, user.id, scanned)
+    passed &= check(f"Rescan of both regions updates them in place: {stats['created']} created, {stats['updated']} updated",
+                    stats['created'] == 0 and stats['updated'] == len(scanned)
+                    and db.query(Resource).filter(Resource.created_by == user.id).count() == rows)
+
+    # Incremental scans fingerprint each region's copy on its own
+    db = sessionmaker(bind=engine)()
+    user = User(email='delta@example.com', username='delta', hashed_password='-')
+    db.add(user)
+    db.commit()
+    delta = [regional.import_resource_delta(db, user.id, iter(regional.iter_resources(concurrent=True, regions=regions)),
+                                            scope=lambda: regional.scan_scope(None, regions))
+             for _ in range(2)]
+    fingerprints = db.query(ResourceFingerprint).filter(ResourceFingerprint.created_by == user.id).count()
+    passed &= check(f"Incremental scans of both regions: {delta[0]['new']} new, then {delta[1]['unchanged']} unchanged, "
+                    f"{delta[1]['vanished']} vanished, {fingerprints} fingerprints",
+                    delta[0]['new'] == delta[1]['unchanged'] == fingerprints == len(scanned)
+                    and delta[1]['new'] == delta[1]['changed'] == delta[1]['vanished'] == 0)
+
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == '__main__':
+    main()
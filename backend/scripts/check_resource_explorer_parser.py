@@ -0,0 +1,254 @@
+"""
+Golden check of ImportService.parse_aws_resource_explorer and its columnar
+parse_aws_resource_explorer_frame
+Parses a generated export with many sparse Tag: columns, plus hand-written
+edge cases (empty rows, bad ARNs, unknown types, Name/Environment tags, VPC
+ARNs, numeric and missing values, rows with their own columns), with both
+parsers and with a copy of the row-by-row parser they replaced, and checks
+the output is identical - values and key order - before comparing their
+speed. The frame parser gets the cleaned DataFrame a CSV chunk is read into,
+and a CSV upload through parse_file must hand it every resource.
+
+Usage: python scripts/check_resource_explorer_parser.py [--rows 100000]
+"""
+import sys
+import os
+import json
+import random
+import argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from typing import Dict, List
+
+import pandas as pd
+
+from app.core.config import settings
+from app.services.import_service import ImportService, import_service
+from checks import check, timed
+
+TYPES = [
+    ('ec2:instance', 'ec2', 'instance/i-{:017x}'),
+    ('ec2:subnet', 'ec2', 'subnet/subnet-{:08x}'),
+    ('ec2:security-group', 'ec2', 'security-group/sg-{:08x}'),
+    ('rds:db', 'rds', 'db:db-{}'),
+    ('s3:bucket', 's3', 'bucket-{}'),
+    ('lambda:function', 'lambda', 'function:fn-{}'),
+    ('elasticloadbalancing:loadbalancer/app', 'elasticloadbalancing', 'loadbalancer/app/alb-{0}/{0:x}'),
+    ('ec2:vpc-endpoint', 'ec2', 'vpc-endpoint/vpce-{:08x}'),
+    ('memorydb:cluster', 'memorydb', 'cluster/cache-{}'),
+    ('', 'glue', 'job/job-{}'),
+]
+
+TAG_KEYS = 40
+
+EDGE_CASES = [
+    {'Identifier': '', 'ARN': '', 'Resource type': 'ec2:instance'},
+    {'Identifier': None, 'ARN': None, 'Resource type': None},
+    {'Identifier': 'no-arn', 'ARN': None, 'Resource type': None, 'Region': None, 'AWS Account': None, 'Service': None},
+    {'Identifier': 'bad-arn', 'ARN': 'not:an:arn', 'Resource type': 'S3:Bucket ', 'Region': '-', 'AWS Account': ''},
+    {'Identifier': 'short-arn', 'ARN': 'arn:aws:s3:::', 'Resource type': 'unknown-type', 'Service': 'S3'},
+    {'Identifier': 'global', 'ARN': 'arn:aws:iam::123456789012:role/path/to/role', 'Resource type': 'iam:role', 'Region': ''},
+    {'Identifier': 'in-vpc', 'ARN': 'arn:aws:ec2:eu-west-1:123456789012:subnet/subnet-1/vpc-0abc12', 'Resource type': 'ec2:subnet'},
+    {'Identifier': 123456, 'ARN': '', 'Resource type': 'ec2:instance', 'AWS Account': 123456789012},
+    {'Identifier': 'numeric-type', 'ARN': 'arn:aws:ec2:eu-west-1:1:instance/i-1', 'Resource type': 42},
+    {'Identifier': 'nan-arn', 'ARN': float('nan'), 'Resource type': 'ec2:instance'},
+    {'Identifier': 'tags', 'ARN': 'arn:aws:ec2:eu-west-1:1:instance/i-2', 'Resource type': 'ec2:instance',
+     'Tag:Name': 'tags', 'Tag:Env.': 'QA', 'Tag:Owner': 7, 'Application': '-'},
+]
+
+
+def build_rows(count: int):
+    random.seed(7)
+    rows = []
+    for i in range(count):
+        resource_type, service, resource = TYPES[i % len(TYPES)]
+        arn = f"arn:aws:{service}:{'eu-west-1' if i % 13 else ''}:123456789012:{resource.format(i)}"
+        rows.append({
+            'Identifier': resource.format(i).split('/')[-1] if i % 17 else '',
+            'ARN': arn if i % 101 else '',
+            'Resource type': resource_type,
+            'Region': random.choice(['eu-west-1', 'us-east-1', '-', None]),
+            'AWS Account': '123456789012' if i % 19 else None,
+            'Application': random.choice(['billing', '-', None]),
+            'LastReportedAt': '2024-05-01T10:00:00Z',
+            'Service': service if i % 23 else None,
+            'Tags': i % 4,
+            'Tag:Name': f'name-{i}' if i % 3 == 0 else (None if i % 3 == 1 else '(not tagged)'),
+            'Tag:Environment': random.choice(['Prod', 'dev', None, '(not tagged)']),
+            'Tag:env': random.choice(['staging', None]),
+            'Tag:Owner': random.choice(['platform', None]),
+            # Exports get a column per tag key in the account, mostly empty
+            **{f'Tag:team-{k}': 'yes' if (i + k) % TAG_KEYS == 0 else None for k in range(TAG_KEYS)},
+        })
+    return rows
+
+
+def parse_by_row(importer: ImportService, data: List[Dict]) -> List[Dict]:
+    """The parser before columnar work was hoisted out of the row loop"""
+    resources = []
+    
+    for row in data:
+        try:
+            # Get basic fields
+            identifier = row.get('Identifier', '')
+            arn = row.get('ARN', '')
+            resource_type_raw = row.get('Resource type', '')
+            region = row.get('Region', 'unknown')
+            account_id = str(row.get('AWS Account', ''))
+            application = row.get('Application', '')
+            last_reported = row.get('LastReportedAt', '')
+            service = row.get('Service', '')
+            tag_count = row.get('Tags', 0)
+            
+            # Skip empty rows
+            if not identifier and not arn:
+                continue
+            
+            # Map resource type
+            resource_type_lower = resource_type_raw.lower().strip() if resource_type_raw else ''
+            internal_type = importer.AWS_SERVICE_TYPE_MAP.get(resource_type_lower, 'unknown')
+            
+            # If not in map, try to extract the resource type part (after the colon)
+            if internal_type == 'unknown' and ':' in resource_type_lower:
+                # Extract the part after the colon and convert to snake_case
+                resource_part = resource_type_lower.split(':')[1] if ':' in resource_type_lower else resource_type_lower
+                internal_type = resource_part.replace('-', '_')
+            elif internal_type == 'unknown' and service:
+                internal_type = service.lower()
+            
+            # Parse ARN for additional info
+            arn_parts = importer._parse_arn(arn) if arn else {}
+            
+            # Extract all tags from Tag:* columns
+            tags = {}
+            for col_name, value in row.items():
+                if col_name.startswith('Tag:') and value and value != '(not tagged)':
+                    tag_key = col_name[4:]  # Remove 'Tag:' prefix
+                    tags[tag_key] = str(value)
+            
+            # Build resource object
+            resource = {
+                'name': identifier or arn_parts.get('resource_name', 'Unknown'),
+                'type': internal_type,
+                'arn': arn,
+                'region': region if region and region != '-' else arn_parts.get('region', 'global'),
+                'account_id': account_id or arn_parts.get('account_id', ''),
+                'resource_id': arn_parts.get('resource_id', identifier),
+                'status': 'active',  # Default - AWS Resource Explorer only shows active resources
+                'tags': tags if tags else None,
+                'aws_service': service if service else None,
+                'aws_resource_type': resource_type_raw if resource_type_raw else None,
+                'application': application if application and application != '-' else None,
+                'type_specific_properties': {}
+            }
+            
+            # Extract environment from tags
+            env_tag = tags.get('Environment') or tags.get('Env.') or tags.get('env')
+            if env_tag:
+                resource['environment'] = env_tag.lower()
+            
+            # Extract Name tag if different from identifier
+            name_tag = tags.get('Name')
+            if name_tag and name_tag != identifier:
+                resource['name'] = name_tag
+                resource['type_specific_properties']['identifier'] = identifier
+            
+            # Extract VPC info from tags or ARN
+            vpc_from_arn = importer._extract_vpc_from_arn(arn)
+            if vpc_from_arn:
+                resource['vpc_id'] = vpc_from_arn
+            
+            # Extract subnet from ARN for subnet resources
+            if internal_type == 'subnet':
+                resource['subnet_id'] = identifier
+            
+            # Clean up empty type_specific_properties
+            if not resource['type_specific_properties']:
+                resource['type_specific_properties'] = None
+            
+            resources.append(resource)
+            
+        except Exception as e:
+            print(f"WARNING: Failed to parse row: {e}")
+            continue
+    
+    return resources
+
+
+def timed_parse(label: str, parse, rows):
+    resources, elapsed = timed(lambda: parse(rows))
+    print(f"{label:<9} {elapsed:6.3f}s  {len(rows) / elapsed:9.0f} rows/sec  {len(resources)} resources")
+    return resources, elapsed
+
+
+def frame_matches(rows: List[Dict]) -> bool:
+    """The frame parser on rows as a cleaned chunk agrees with the row-by-row parser on its records"""
+    frame = import_service.clean_frame(pd.DataFrame(rows))
+    return same(parse_by_row(import_service, import_service.frame_records(frame)),
+                import_service.parse_aws_resource_explorer_frame(frame))
+
+
+def csv_upload_resources(rows: List[Dict]) -> List[Dict]:
+    """Resources parse_file hands on_resources for rows written as a CSV, read in small chunks"""
+    resources = []
+    content = pd.DataFrame(rows).to_csv(index=False).encode()
+    chunk_rows = settings.IMPORT_CSV_CHUNK_ROWS
+    settings.IMPORT_CSV_CHUNK_ROWS = 1000
+    try:
+        import_service.parse_file(content, 'export.csv', sample_rows=10,
+                                  on_resources=lambda sheet_name, part: resources.extend(part))
+    finally:
+        settings.IMPORT_CSV_CHUNK_ROWS = chunk_rows
+    return resources
+
+
+def same(a, b) -> bool:
+    return json.dumps(a, default=str) == json.dumps(b, default=str)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000, help='rows in the generated export')
+    args = parser.parse_args()
+
+    rows = build_rows(args.rows)
+    edge_rows = build_rows(50) + EDGE_CASES
+    mixed_keys = build_rows(5) + [{'Identifier': 'extra', 'ARN': 'arn:aws:sqs:eu-west-1:1:queue', 'Tag:Extra': 1}]
+    numeric_columns = [{'Identifier': 'x', 'ARN': '', 1: 'a'}]
+
+    frame = import_service.clean_frame(pd.DataFrame(rows))
+    expected, by_row_time = timed_parse('by row', lambda rows: parse_by_row(import_service, rows), rows)
+    parsed, columnar_time = timed_parse('columns', import_service.parse_aws_resource_explorer, rows)
+    from_frame, frame_time = timed_parse('frame', lambda rows: import_service.parse_aws_resource_explorer_frame(frame), rows)
+    speedup = by_row_time / columnar_time
+    frame_speedup = by_row_time / frame_time
+    upload_rows = build_rows(5000)
+
+    checks = [
+        (f"Identical output on {args.rows} generated rows", same(expected, parsed)),
+        ("Identical output on the edge cases",
+         same(parse_by_row(import_service, edge_rows), import_service.parse_aws_resource_explorer(edge_rows))),
+        ("Identical output when rows have different columns",
+         same(parse_by_row(import_service, mixed_keys), import_service.parse_aws_resource_explorer(mixed_keys))),
+        ("Identical output with non-text column names",
+         same(parse_by_row(import_service, numeric_columns), import_service.parse_aws_resource_explorer(numeric_columns))),
+        ("Empty export", import_service.parse_aws_resource_explorer([]) == []),
+        (f"Frame parser identical on {args.rows} generated rows",
+         same(parse_by_row(import_service, import_service.frame_records(frame)), from_frame)),
+        ("Frame parser identical on the edge cases", frame_matches(edge_rows)),
+        ("Frame parser identical when rows have different columns", frame_matches(mixed_keys)),
+        ("Frame parser identical with non-text column names", frame_matches(numeric_columns)),
+        ("Empty frame", import_service.parse_aws_resource_explorer_frame(pd.DataFrame()) == []),
+        ("CSV upload parses every chunk's resources as it is read",
+         same(csv_upload_resources(upload_rows),
+              parse_by_row(import_service, import_service.frame_records(import_service.clean_frame(pd.DataFrame(upload_rows)))))),
+        (f"Faster than row by row ({speedup:.1f}x)", speedup > 1),
+        (f"Frame parser faster than row by row ({frame_speedup:.1f}x)", frame_speedup > 1.5),
+    ]
+    passed = all([check(label, ok) for label, ok in checks])
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""
+Offline check of the paged resource listing
+Seeds a temporary SQLite database and pages through /api/resources/page:
+every resource once and in id order with the fields /api/resources returns,
+each filter against the same filter applied in Python, sparse fieldsets,
+pages staying put while resources are added and deleted, and invalid
+requests refused. Times the first and last page against an OFFSET page at
+the same depth.
+
+Usage: python scripts/check_resource_listing.py [--resources 50000] [--page 1000]
+"""
+import sys
+import os
+import tempfile
+import argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models import User, Resource
+from app.routers import resources as resources_router
+from app.schemas import ResourceResponse
+from app.services.bulk_import import bulk_import_resources
+from app.services.resource_listing import FILTER_COLUMNS
+from checks import bulky_properties, check, latency, resource_row
+
+TYPES = ['ec2', 'rds', 'alb', 's3', 'lambda', 'vpc', 'subnet']
+REGIONS = ['eu-west-1', 'us-east-1', 'ap-southeast-2']
+ENVIRONMENTS = ['prod', 'staging', 'dev', None]
+
+
+def row(i: int):
+    return resource_row(
+        i,
+        type=TYPES[i % len(TYPES)],
+        account_id=f'{i % 4:012d}',
+        region=REGIONS[i % len(REGIONS)],
+        vpc_id=f'vpc-{i % 25}' if i % 10 else None,
+        environment=ENVIRONMENTS[i % len(ENVIRONMENTS)],
+        status='running',
+        tags={'team': f'team-{i % 9}', 'cost': str(i)},
+        type_specific_properties=bulky_properties(i),
+    )
+
+
+def page(db, **params):
+    """GET /api/resources/page, with the query defaults a direct call does not get"""
+    params = {'cursor': None, 'limit': 100, 'fields': None, **{name: None for name in FILTER_COLUMNS}, **params}
+    return resources_router.get_resources_page(db=db, **params)
+
+
+def listed(db, page_size: int, **params):
+    """Every item of every page, and the number of pages"""
+    items, cursor, pages = [], None, 0
+    while True:
+        result = page(db, cursor=cursor, limit=page_size, **params)
+        items += result['items']
+        pages += 1
+        cursor = result['next_cursor']
+        if not cursor:
+            return items, pages
+
+
+def refused(call) -> bool:
+    try:
+        call()
+    except HTTPException as e:
+        return e.status_code == 400
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--resources', type=int, default=50000, help='resources in the inventory')
+    parser.add_argument('--page', type=int, default=1000, help='resources per page')
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'listing.db')}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    user = User(email='check@example.com', username='check', hashed_password='-')
+    db.add(user)
+    db.commit()
+    bulk_import_resources(db, user.id, [row(i) for i in range(args.resources)])
+
+    full = [
+        ResourceResponse.model_validate(resource).model_dump(mode='json')
+        for resource in db.query(Resource).order_by(Resource.id)
+    ]
+    passed = True
+
+    items, pages = listed(db, args.page)
+    passed &= check(f"{pages} pages list every resource once, in id order, as /api/resources does", items == full)
+
+    for name, values in [
+        ('type', ['ec2']), ('type', ['rds', 'alb']), ('account_id', ['000000000002']),
+        ('region', ['us-east-1']), ('vpc_id', ['vpc-3']), ('environment', ['prod', 'dev']),
+    ]:
+        items, _ = listed(db, args.page, **{name: values})
+        expected = [r for r in full if r[name] in values]
+        passed &= check(f"Filtered by {name}={','.join(values)}: {len(expected)} resources", items == expected and bool(expected))
+    items, _ = listed(db, args.page, type=['ec2'], region=['eu-west-1'], environment=['prod'])
+    expected = [r for r in full if r['type'] == 'ec2' and r['region'] == 'eu-west-1' and r['environment'] == 'prod']
+    passed &= check(f"Filters combined: {len(expected)} resources", items == expected and bool(expected))
+
+    fields = ['name', 'type', 'vpc_id', 'last_reported_at']
+    items, _ = listed(db, args.page, fields=','.join(fields), type=['alb'])
+    expected = [{field: r[field] for field in ['id'] + fields} for r in full if r['type'] == 'alb']
+    passed &= check("fields= returns only id and the fields asked for", items == expected)
+    passed &= check("Unknown field refused", refused(lambda: page(db, fields='name,password')))
+    passed &= check("Invalid cursor refused", refused(lambda: page(db, cursor='not-a-cursor')))
+
+    # Pages stay put while the inventory changes between them
+    first = page(db, limit=args.page, fields='name')
+    deleted = first['items'][-1]['id'] + 1
+    db.query(Resource).filter(Resource.id.in_([first['items'][0]['id'], deleted])).delete(synchronize_session=False)
+    db.commit()
+    bulk_import_resources(db, user.id, [row(args.resources)])
+    second = page(db, cursor=first['next_cursor'], limit=args.page, fields='name')
+    expected = [r['id'] for r in full if r['id'] > first['items'][-1]['id'] and r['id'] != deleted][:args.page]
+    passed &= check("Deleting and adding resources does not shift the next page", [r['id'] for r in second['items']] == expected)
+
+    # The last page and an OFFSET page as deep
+    last = None
+    while True:
+        result = page(db, cursor=last, limit=args.page, fields='name,type')
+        if not result['next_cursor']:
+            break
+        last = result['next_cursor']
+    depth = db.query(Resource).count() - args.page
+    first_p50, first_p95 = latency(lambda: page(db, limit=args.page, fields='name,type'))
+    last_p50, last_p95 = latency(lambda: page(db, cursor=last, limit=args.page, fields='name,type'))
+    offset_p50, offset_p95 = latency(lambda: db.query(Resource.id, Resource.name, Resource.type).order_by(Resource.id).offset(depth).limit(args.page).all())
+    full_p50, full_p95 = latency(lambda: page(db, limit=args.page), runs=5)
+    print(f"Pages of {args.page} with fields=name,type: first p50 {first_p50:.1f} ms, p95 {first_p95:.1f} ms; "
+          f"last p50 {last_p50:.1f} ms, p95 {last_p95:.1f} ms; OFFSET {depth} p50 {offset_p50:.1f} ms. "
+          f"All fields p50 {full_p50:.1f} ms")
+    passed &= check(f"Last page costs about what the first does ({last_p50:.1f} ms vs {first_p50:.1f} ms at p50)",
+                    last_p50 < first_p50 * 1.5 + 5)
+
+    db.close()
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
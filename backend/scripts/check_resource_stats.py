@@ -0,0 +1,232 @@
+"""
+Offline check of the cached dashboard statistics
+Seeds a temporary SQLite database and compares /api/resources/stats with the
+nine-query implementation it replaces (kept below), first as computed and
+then after each kind of resource write: ORM create, update and delete, bulk
+import and bulk update, query-level update and delete, and a rolled back
+write. Times cached loads against the old queries.
+
+Usage: python scripts/check_resource_stats.py [--resources 50000]
+"""
+import sys
+import os
+import time
+import tempfile
+import argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models import User, Resource
+from app.routers import resources as resources_router
+from app.services.bulk_import import bulk_import_resources
+from app.services.resource_stats import LINKED_RESOURCE_TYPES
+from checks import check, latency, resource_row
+
+TYPES = ['ec2', 'rds', 'alb', 's3', 'lambda', 'vpc', 'subnet', 'security_group',
+         'snapshot', 'route53_record', 'security_group_rule']
+STATUSES = ['running', 'stopped', 'available', '', None]
+ENVIRONMENTS = ['prod', 'staging', 'dev', '', None]
+
+
+def legacy_stats(db):
+    """/api/resources/stats as it was: nine aggregate queries per load"""
+    from sqlalchemy import func, not_
+
+    # Count by type (all resources) - no user filter
+    type_counts = db.query(
+        Resource.type, func.count(Resource.id)
+    ).group_by(Resource.type).all()
+
+    # Separate main resources from linked resources
+    main_types = {}
+    linked_types = {}
+    main_total = 0
+    linked_total = 0
+
+    for t, c in type_counts:
+        if t in LINKED_RESOURCE_TYPES:
+            linked_types[t] = c
+            linked_total += c
+        else:
+            main_types[t] = c
+            main_total += c
+
+    # Count by region (main resources only) - no user filter
+    region_counts = db.query(
+        Resource.region, func.count(Resource.id)
+    ).filter(
+        not_(Resource.type.in_(LINKED_RESOURCE_TYPES))
+    ).group_by(Resource.region).all()
+    by_region = {r: c for r, c in region_counts if r}
+
+    # Count by status (main resources only) - no user filter
+    status_counts = db.query(
+        Resource.status, func.count(Resource.id)
+    ).filter(
+        not_(Resource.type.in_(LINKED_RESOURCE_TYPES))
+    ).group_by(Resource.status).all()
+    by_status = {s: c for s, c in status_counts if s}
+
+    # Network resources (VPCs, Subnets, Security Groups) - no user filter
+    vpc_count = db.query(func.count(func.distinct(Resource.vpc_id))).filter(
+        Resource.vpc_id.isnot(None)
+    ).scalar()
+
+    subnet_count = db.query(func.count(Resource.id)).filter(
+        Resource.type == 'subnet'
+    ).scalar()
+
+    security_group_count = db.query(func.count(Resource.id)).filter(
+        Resource.type == 'security_group'
+    ).scalar()
+
+    # Count unique availability zones - no user filter
+    az_count = db.query(func.count(func.distinct(Resource.availability_zone))).filter(
+        Resource.availability_zone.isnot(None)
+    ).scalar()
+
+    # Count by account (main resources only) - no user filter
+    account_counts = db.query(
+        Resource.account_id, func.count(Resource.id)
+    ).filter(
+        Resource.account_id.isnot(None),
+        Resource.account_id != '',
+        not_(Resource.type.in_(LINKED_RESOURCE_TYPES))
+    ).group_by(Resource.account_id).all()
+    by_account = {a: c for a, c in account_counts if a}
+
+    # Count by environment (main resources only) - no user filter
+    env_counts = db.query(
+        Resource.environment, func.count(Resource.id)
+    ).filter(
+        Resource.environment.isnot(None),
+        Resource.environment != '',
+        not_(Resource.type.in_(LINKED_RESOURCE_TYPES))
+    ).group_by(Resource.environment).all()
+    by_environment = {e: c for e, c in env_counts if e}
+
+    return {
+        "total": main_total,
+        "total_all": main_total + linked_total,
+        "by_type": main_types,
+        "by_region": by_region,
+        "by_status": by_status,
+        "by_account": by_account,
+        "by_environment": by_environment,
+        "network": {
+            "vpcs": vpc_count,
+            "subnets": subnet_count,
+            "security_groups": security_group_count,
+            "availability_zones": az_count
+        },
+        "type_count": len(main_types),
+        "region_count": len(by_region),
+        "linked": {
+            "total": linked_total,
+            "by_type": linked_types
+        }
+    }
+
+
+def row(i: int, status=None):
+    return resource_row(
+        i,
+        type=TYPES[i % len(TYPES)],
+        account_id=f'{i % 5:012d}' if i % 13 else None,
+        region=['eu-west-1', 'us-east-1', 'ap-southeast-2', 'unknown'][i % 4],
+        status=status or STATUSES[i % len(STATUSES)],
+        environment=ENVIRONMENTS[i % len(ENVIRONMENTS)],
+        vpc_id=f'vpc-{i % 40}' if i % 6 else None,
+        availability_zone=f'eu-west-1{"abc"[i % 3]}' if i % 4 else None,
+    )
+
+
+def stats(db):
+    return resources_router.get_resource_stats(db=db)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--resources', type=int, default=50000, help='resources in the inventory')
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'stats.db')}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    user = User(email='check@example.com', username='check', hashed_password='-')
+    db.add(user)
+    db.commit()
+    bulk_import_resources(db, user.id, [row(i) for i in range(args.resources)])
+
+    passed = check("Computed stats match the nine queries", stats(db) == legacy_stats(db))
+    passed &= check("A load without writes in between is served from the cache", stats(db) is stats(db))
+
+    def after(label: str, write):
+        before = stats(db)
+        write()
+        current = stats(db)
+        return check(f"{label}: stats recomputed and match", current is not before and current == legacy_stats(db))
+
+    def create():
+        db.add(Resource(name='new-sg', type='security_group', region='eu-north-1', status='running',
+                        vpc_id='vpc-new', availability_zone='eu-north-1a', account_id='999999999999',
+                        environment='qa', created_by=user.id))
+        db.commit()
+
+    def update():
+        resource = db.query(Resource).filter(Resource.type == 'ec2').first()
+        resource.type, resource.region, resource.environment = 'snapshot', 'sa-east-1', 'prod'
+        db.commit()
+
+    def delete():
+        db.delete(db.query(Resource).filter(Resource.type == 'subnet').first())
+        db.commit()
+
+    def query_update():
+        db.query(Resource).filter(Resource.type == 'lambda').update({'status': 'retired'}, synchronize_session=False)
+        db.commit()
+
+    def query_delete():
+        db.query(Resource).filter(Resource.region == 'ap-southeast-2', Resource.type == 'rds').delete(synchronize_session=False)
+        db.commit()
+
+    passed &= after("ORM create", create)
+    passed &= after("ORM update", update)
+    passed &= after("ORM delete", delete)
+    passed &= after("Bulk import of new resources",
+                    lambda: bulk_import_resources(db, user.id, [row(i) for i in range(args.resources, args.resources + 500)]))
+    passed &= after("Bulk update through an import",
+                    lambda: bulk_import_resources(db, user.id, [row(i, 'terminated') for i in range(0, 3000, 3)]))
+    passed &= after("Query update", query_update)
+    passed &= after("Query delete", query_delete)
+
+    before = stats(db)
+    db.add(Resource(name='rolled-back', type='ec2', created_by=user.id))
+    db.flush()
+    db.rollback()
+    db.commit()
+    passed &= check("Rolled back write leaves the stats correct", stats(db) == legacy_stats(db) == before)
+
+    total = db.query(Resource).count()
+    linked = db.query(Resource).filter(Resource.type.in_(LINKED_RESOURCE_TYPES)).count()
+    legacy_p50, legacy_p95 = latency(lambda: legacy_stats(db))
+    resources_router.resource_stats._cached = None
+    start = time.perf_counter()
+    stats(db)
+    cold = (time.perf_counter() - start) * 1000
+    cached_p50, cached_p95 = latency(lambda: stats(db), runs=200)
+    print(f"{total} resources ({linked} linked): nine queries p50 {legacy_p50:.1f} ms, p95 {legacy_p95:.1f} ms; "
+          f"one grouped query {cold:.1f} ms; cached p50 {cached_p50:.3f} ms, p95 {cached_p95:.3f} ms")
+    passed &= check(f"Grouped query faster than the nine queries ({cold:.1f} vs {legacy_p50:.1f} ms)", cold < legacy_p50)
+    passed &= check(f"Cached loads under 1 ms at p95 ({cached_p95:.3f} ms)", cached_p95 < 1)
+
+    db.close()
+    if not passed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Offline check of background scan jobs against the stubbed scanner
+Runs jobs on the ScanJobRunner against a temporary SQLite database and
+verifies progress, completion, cancellation of a running job (including one
+stalled in a slow call) and failure reporting.
+
+Usage: python scripts/check_scan_jobs.py [--items 20]
+"""
+import sys
+import os
+import time
+import threading
+import tempfile
+import argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import create_engine
+from app.database import Base, SessionLocal
+from app.models import User, Resource, ScanJob
+from app.services.scan_jobs import ScanJobRunner, cancel_scan_job
+from benchmark_aws_scan import StubbedScanner, build_fixtures
+from checks import check
+
+
+def wait_for(job_id: int, statuses, timeout: float = 60) -> ScanJob:
+    deadline = time.monotonic() + timeout
+    while True:
+        with SessionLocal() as db:
+            job = db.get(ScanJob, job_id)
+            if job.status in statuses or time.monotonic() > deadline:
+                db.expunge(job)
+                return job
+        time.sleep(0.05)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=20, help='resources per service')
+    args = parser.parse_args()
+
+    fixtures = build_fixtures(args.items)
+    path = os.path.join(tempfile.mkdtemp(), 'scan_jobs.db')
+    engine = create_engine(f'sqlite:///{path}', connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    SessionLocal.configure(bind=engine)
+    runner = ScanJobRunner(max_workers=2)
+
+    with SessionLocal() as db:
+        user = User(email='check@example.com', username='check', hashed_password='-')
+        db.add(user)
+        db.commit()
+        user_id = user.id
+
+    def submit(scan) -> int:
+        with SessionLocal() as db:
+            job = ScanJob(created_by=user_id, status='queued', params={}, progress={})
+            db.add(job)
+            db.commit()
+            runner.submit(job.id, scan)
+            return job.id
+
+    def scan_job(latency: float):
+        def run(db, progress):
+            scanner = StubbedScanner(fixtures, latency)
+            stream = progress.track(scanner.iter_resources(concurrent=True), stats=scanner.get_scan_stats)
+            return scanner.import_resource_stream(db, user_id, (resource for _, resource in stream), batch_size=50)
+        return run
+
+    def stalled(release: threading.Event):
+        # A few resources, then a call that never answers until released
+        def resources():
+            for i in range(3):
+                yield 'ec2', {'resource_id': f'i-stalled-{i}'}
+            release.wait(60)
+        def run(db, progress):
+            for _ in progress.track(resources()):
+                pass
+            return {}
+        return run
+
+    def broken(db, progress):
+        raise RuntimeError('AccessDenied')
+
+    done = wait_for(submit(scan_job(0.0)), ('succeeded', 'failed'))
+    with SessionLocal() as db:
+        rows = db.query(Resource).count()
+    passed = all([
+        check(f"Job succeeded ({done.status}, {done.error})", done.status == 'succeeded'),
+        check(f"Progress per service sums to {done.resources_found} resources",
+              sum(done.progress.values()) == done.resources_found == rows > 0),
+        check(f"Import and scan stats recorded ({done.import_stats['created']} created, "
+              f"{done.scan_stats['api_calls']} API calls)", done.import_stats['created'] == rows),
+        check("Timings recorded", done.started_at is not None and done.finished_at >= done.started_at),
+    ])
+
+    job_id = submit(scan_job(0.02))
+    running = wait_for(job_id, ('running',))
+    time.sleep(1.5)
+    with SessionLocal() as db:
+        cancel_scan_job(db, db.get(ScanJob, job_id))
+    cancelled = wait_for(job_id, ('succeeded', 'failed', 'cancelled'))
+    passed &= check(f"Running job cancelled after {cancelled.resources_found} resources",
+                    running.status == 'running' and cancelled.status == 'cancelled')
+
+    release = threading.Event()
+    job_id = submit(stalled(release))
+    wait_for(job_id, ('running',))
+    time.sleep(1.5)
+    with SessionLocal() as db:
+        cancel_scan_job(db, db.get(ScanJob, job_id))
+    requested = time.monotonic()
+    cancelled = wait_for(job_id, ('succeeded', 'failed', 'cancelled'), timeout=10)
+    waited = time.monotonic() - requested
+    release.set()
+    passed &= check(f"Stalled job reported {cancelled.resources_found} resources and cancelled in {waited:.1f}s",
+                    cancelled.status == 'cancelled' and cancelled.resources_found == 3 and waited < 5)
+
+    failed = wait_for(submit(broken), ('succeeded', 'failed'))
+    passed &= check(f"Failure reported ({failed.status}: {failed.error})",
+                    failed.status == 'failed' and failed.error == 'AccessDenied')
+
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == '__main__':
+    main()
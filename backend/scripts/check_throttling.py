@@ -0,0 +1,124 @@
+"""
+Offline check of the adaptive rate controller
+DynamoDB (and the bulk tag listing) is answered by a fake HTTP layer that
+throttles a share of the attempts, so botocore's real retry handling runs. Verifies that every
+table is still scanned, that throttles and retries are reported and that
+the request rate backs off under throttling and climbs again without it.
+
+Usage: python scripts/check_throttling.py [--tables 10] [--throttle-every 4]
+"""
+import sys
+import os
+import json
+import time
+import argparse
+import threading
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from botocore.awsrequest import AWSResponse
+from app.services.aws_scanner import AWSScanner
+from app.services.aws_throttle import AdaptiveTokenBucket
+from checks import check
+
+ACCOUNT_ID = '123456789012'
+REGION = 'us-east-1'
+
+
+class FakeBody:
+    def __init__(self, body: dict):
+        self.body = json.dumps(body).encode()
+
+    def stream(self, **kwargs):
+        yield self.body
+
+
+class ThrottledDynamoDBScanner(AWSScanner):
+    """AWSScanner whose DynamoDB calls are answered locally, every nth attempt throttled"""
+
+    def __init__(self, tables: int, throttle_every: int):
+        super().__init__('AKIACHECK', 'check-secret', region=REGION)
+        self._identity = {'account_id': ACCOUNT_ID, 'partition': 'aws', 'arn': f'arn:aws:iam::{ACCOUNT_ID}:user/check'}
+        self.account_id = ACCOUNT_ID
+        self.tables = [f'table-{i}' for i in range(tables)]
+        self.throttle_every = throttle_every
+        self.attempts = 0
+        self.attempts_lock = threading.Lock()
+
+    def _new_session(self):
+        session = super()._new_session()
+        session.events.register_last('before-send.dynamodb', self._respond)
+        session.events.register_last('before-send.resource-groups-tagging-api', self._respond)
+        return session
+
+    def _respond(self, request, event_name: str, **kwargs):
+        with self.attempts_lock:
+            self.attempts += 1
+            throttle = self.attempts % self.throttle_every == 0
+        if throttle:
+            body = {'__type': 'com.amazonaws.dynamodb.v20120810#ThrottlingException', 'message': 'Rate exceeded'}
+            return AWSResponse(request.url, 400, {}, FakeBody(body))
+        operation = event_name.split('.')[-1]
+        params = json.loads(request.body or b'{}')
+        if operation == 'GetResources':
+            body = {'ResourceTagMappingList': [
+                {'ResourceARN': f"arn:aws:dynamodb:{REGION}:{ACCOUNT_ID}:table/{table}", 'Tags': [{'Key': 'team', 'Value': 'data'}]}
+                for table in self.tables
+            ]}
+        elif operation == 'ListTables':
+            body = {'TableNames': self.tables}
+        elif operation == 'DescribeTable':
+            body = {'Table': {
+                'TableName': params['TableName'],
+                'TableArn': f"arn:aws:dynamodb:{REGION}:{ACCOUNT_ID}:table/{params['TableName']}",
+                'TableStatus': 'ACTIVE'
+            }}
+        else:
+            body = {'Tags': []}
+        return AWSResponse(request.url, 200, {}, FakeBody(body))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tables', type=int, default=10, help='DynamoDB tables')
+    parser.add_argument('--throttle-every', type=int, default=4, help='throttle every nth attempt')
+    args = parser.parse_args()
+
+    scanner = ThrottledDynamoDBScanner(args.tables, args.throttle_every)
+    start = time.perf_counter()
+    tables = scanner.scan_resource_types(['dynamodb'])['dynamodb']
+    elapsed = time.perf_counter() - start
+    stats = scanner.get_scan_stats()
+    rate = stats['request_rates'][f'{REGION}/dynamodb']
+    print(f"{elapsed:.2f}s  {stats['api_calls']} API calls  {stats['throttled']} throttled  "
+          f"{stats['retries']} retries  final rate {rate}/s")
+
+    passed = all([
+        check(f"All {len(tables)} tables scanned despite throttling", len(tables) == args.tables),
+        check("Tags joined from the bulk listing", all(table['tags'] == {'team': 'data'} for table in tables)),
+        check("No scanner reported as failed", stats['failed_scanners'] == []),
+        check(f"Throttles counted ({stats['throttled']}) match the throttled attempts",
+              stats['throttled'] == scanner.attempts // args.throttle_every > 0),
+        check(f"Retries counted ({stats['retries']}) match the throttles", stats['retries'] == stats['throttled']),
+    ])
+
+    bucket = AdaptiveTokenBucket(rate=10, min_rate=1, max_rate=40, increase=1)
+    for _ in range(20):
+        bucket.succeeded()
+    climbed = bucket.rate
+    bucket.throttled()
+    bucket.throttled()
+    backed_off = bucket.rate
+    start = time.perf_counter()
+    for _ in range(int(backed_off) + 3):
+        bucket.acquire()
+    paced = time.perf_counter() - start
+    passed &= check(f"Rate climbs without throttling (10 -> {climbed}/s) and halves on it (-> {backed_off}/s)",
+                    climbed == 30 and backed_off == 7.5)
+    passed &= check(f"Acquiring past the burst waits for tokens ({paced:.2f}s)", paced >= 0.3)
+
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,697 @@
+"""
+Offline check of the URL flow index
+Seeds a temporary SQLite database with DNS records and the load balancers,
+CloudFront distributions, instances, databases and buckets they resolve to,
+and compares GET /api/resources/url-flows with the flows the endpoint used
+to build on every request: after a full build, and after each of a series
+of changes made through the routers and a bulk import, which must update
+the index rather than rebuild it. Reads must serve the stored index and
+leave refreshes to the background. Then times requests against a larger
+inventory, where the old way is too slow to compare with, and checks the
+paged summaries (/url-flows/summaries) and single flows (/url-flows/{id})
+against the full listing, filters included.
+
+Usage: python scripts/check_url_flow_index.py [--compare-resources 5000] [--resources 50000] [--requests 50] [--page 200]
+"""
+import sys
+import os
+import json
+import time
+import tempfile
+import argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from app.database import Base
+from app.models import User, Resource, ResourceRelationship
+from app.routers import resources as resources_router
+from app.services.bulk_import import bulk_import_resources
+from app.services.url_flow_index import CATEGORY_TYPES, FLOW_CATEGORIES, flow_summary, session_factory_for, url_flow_index
+from checks import check, percentile
+
+CATEGORIES = ('albs', 'cloudfront', 'ec2_instances', 'databases', 's3_buckets', 'pipelines', 'other', 'connections')
+
+
+def legacy_url_flows(db):
+    """The flows /url-flows built on every request before the index, verbatim"""
+    import ipaddress
+    import json
+    
+    def get_props(r):
+        if not r.type_specific_properties:
+            return {}
+        try:
+            return json.loads(r.type_specific_properties) if isinstance(r.type_specific_properties, str) else r.type_specific_properties
+        except:
+            return {}
+    
+    def resource_to_dict(r):
+        return {
+            "id": r.id,
+            "name": r.name,
+            "type": r.type,
+            "resource_id": r.resource_id,
+            "account_id": r.account_id,
+            "region": r.region,
+            "status": r.status,
+            "vpc_id": r.vpc_id,
+            "subnet_id": r.subnet_id,
+            "private_ip": r.private_ip,
+            "public_ip": r.public_ip,
+            "dns_name": r.dns_name,
+            "instance_type": r.instance_type,
+            "environment": r.environment,
+            "type_specific_properties": get_props(r),
+            "tags": r.tags if r.tags else {},
+        }
+    
+    # Get all route53_record resources (individual DNS records)
+    dns_records = db.query(Resource).filter(Resource.type == 'route53_record').all()
+    
+    # Get ALL resources across all accounts for matching (exclude only route53 zones, keep everything else)
+    all_resources = db.query(Resource).filter(Resource.type != 'route53').all()
+    
+    # Build lookup indexes for matching DNS record values to resources
+    dns_name_index = {}  # dns_name -> resource (exact lowercase, stripped trailing dot)
+    name_index = {}      # resource name (lowercase) -> resource
+    public_ip_index = {}  # public_ip -> resource
+    private_ip_index = {} # private_ip -> resource
+    resources_by_id = {}
+    resources_by_vpc = {}  # vpc_id -> [resources]
+    elb_resources = []     # all load balancers for name-based matching
+    
+    for r in all_resources:
+        resources_by_id[r.id] = r
+        # Index by top-level dns_name
+        if r.dns_name:
+            dns_name_index[r.dns_name.lower().rstrip('.')] = r
+        # Index by type_specific_properties dns_name / domain_name
+        props = get_props(r)
+        if props.get('dns_name'):
+            dns_name_index[props['dns_name'].lower().rstrip('.')] = r
+        if props.get('domain_name'):
+            dns_name_index[props['domain_name'].lower().rstrip('.')] = r
+        # Index by resource name (useful for ALB name matching)
+        if r.name:
+            name_index[r.name.lower()] = r
+        # Index by public/private IP
+        if r.public_ip:
+            public_ip_index[r.public_ip] = r
+        if r.private_ip:
+            private_ip_index[r.private_ip] = r
+        if props.get('public_ip'):
+            public_ip_index[props['public_ip']] = r
+        # Index by VPC
+        if r.vpc_id:
+            resources_by_vpc.setdefault(r.vpc_id, []).append(r)
+        # Collect ELBs for name-based matching
+        if r.type in ('elb', 'alb', 'nlb', 'elasticloadbalancing'):
+            elb_resources.append(r)
+    
+    # Get all relationships for manual links
+    from app.models import ResourceRelationship
+    relationships = db.query(ResourceRelationship).all()
+    outgoing_map = {}
+    incoming_map = {}
+    rel_lookup = {}  # (source_id, target_id) -> relationship
+    for rel in relationships:
+        outgoing_map.setdefault(rel.source_resource_id, []).append(rel.target_resource_id)
+        incoming_map.setdefault(rel.target_resource_id, []).append(rel.source_resource_id)
+        rel_lookup[(rel.source_resource_id, rel.target_resource_id)] = rel
+        rel_lookup[(rel.target_resource_id, rel.source_resource_id)] = rel
+    
+    def get_neighbors(resource_id):
+        """Get all resources connected via relationships (both directions)"""
+        neighbors = []
+        for tid in outgoing_map.get(resource_id, []):
+            r = resources_by_id.get(tid)
+            if r:
+                neighbors.append(r)
+        for sid in incoming_map.get(resource_id, []):
+            r = resources_by_id.get(sid)
+            if r:
+                neighbors.append(r)
+        return neighbors
+    
+    def try_match_elb_by_name(dns_value):
+        """ALB dns_name format: name-hash.region.elb.amazonaws.com"""
+        dns_lower = dns_value.lower().rstrip('.')
+        results = []
+        for elb in elb_resources:
+            elb_name = (elb.name or '').lower()
+            if not elb_name:
+                continue
+            if dns_lower.startswith(elb_name):
+                results.append(elb)
+                continue
+            elb_dns = (elb.dns_name or '').lower().rstrip('.')
+            if elb_dns and elb_dns == dns_lower:
+                results.append(elb)
+                continue
+            elb_props_dns = (get_props(elb).get('dns_name', '') or '').lower().rstrip('.')
+            if elb_props_dns and elb_props_dns == dns_lower:
+                results.append(elb)
+        return results
+
+    def match_record_direct(record):
+        """Match a DNS record's values to resources via dns_name/IP + ALB name matching"""
+        props = get_props(record)
+        record_values = props.get('record_values', [])
+        alias_target = props.get('alias_target')
+        matched = []
+        seen_ids = set()
+        
+        def add(r):
+            if r.id not in seen_ids:
+                matched.append(r)
+                seen_ids.add(r.id)
+        
+        # 1. Alias target (Route53 ALIAS records)
+        if alias_target and alias_target.get('dns_name'):
+            alias_dns = alias_target['dns_name'].lower().rstrip('.')
+            if alias_dns in dns_name_index:
+                add(dns_name_index[alias_dns])
+            else:
+                for elb in try_match_elb_by_name(alias_dns):
+                    add(elb)
+                if not matched:
+                    for key, r in dns_name_index.items():
+                        if alias_dns in key or key in alias_dns:
+                            add(r)
+        
+        # 2. Record values (IPs, CNAMEs)
+        for val in record_values:
+            v = val.lower().rstrip('.')
+            if v in dns_name_index:
+                add(dns_name_index[v]); continue
+            if val in public_ip_index:
+                add(public_ip_index[val]); continue
+            if val in private_ip_index:
+                add(private_ip_index[val]); continue
+            elb_hits = try_match_elb_by_name(v)
+            if elb_hits:
+                for e in elb_hits: add(e)
+                continue
+            for key, r in dns_name_index.items():
+                if v in key or key in v:
+                    add(r)
+        
+        # 3. Resources linked via relationships to this DNS record
+        for r in get_neighbors(record.id):
+            add(r)
+        
+        return matched
+
+    def bfs_collect(start_ids, record_id):
+        """BFS through ALL relationships starting from start_ids.
+        Returns dict of resource_id -> resource for the entire reachable chain.
+        Skips route53/route53_record types to avoid looping back.
+        Also collects relationship IDs traversed."""
+        visited = set(start_ids)
+        visited.add(record_id)
+        queue = list(start_ids)
+        collected = {}
+        collected_rel_ids = set()
+        
+        while queue:
+            rid = queue.pop(0)
+            r = resources_by_id.get(rid)
+            if r:
+                collected[rid] = r
+            for neighbor in get_neighbors(rid):
+                # Track the relationship
+                rel = rel_lookup.get((rid, neighbor.id))
+                if rel:
+                    collected_rel_ids.add(rel.id)
+                if neighbor.id not in visited and neighbor.type not in ('route53', 'route53_record'):
+                    visited.add(neighbor.id)
+                    queue.append(neighbor.id)
+        
+        return collected, collected_rel_ids
+
+    # Resource type categorization
+    ELB_TYPES = {'elb', 'alb', 'nlb', 'elasticloadbalancing'}
+    EC2_TYPES = {'ec2', 'instance'}
+    DB_TYPES = {'rds', 'aurora', 'dynamodb', 'elasticache'}
+    CF_TYPES = {'cloudfront'}
+    S3_TYPES = {'s3'}
+    PIPE_TYPES = {'codepipeline', 'codebuild', 'codecommit', 'codedeploy'}
+    
+    def is_ip(value):
+        try:
+            ipaddress.ip_address(value)
+            return True
+        except Exception:
+            return False
+
+    def is_public_ip(value):
+        try:
+            ip = ipaddress.ip_address(value)
+            return not (ip.is_private or ip.is_loopback or ip.is_link_local or ip.is_multicast or ip.is_reserved)
+        except Exception:
+            return False
+
+    def is_certificate_validation_record(record_name, record_type, record_values):
+        name = (record_name or '').lower()
+        rtype = (record_type or '').upper()
+        values = [str(v).lower() for v in (record_values or [])]
+
+        if rtype != 'CNAME':
+            return False
+        if '_acme-challenge' in name:
+            return True
+        if any('acm-validations.aws' in v for v in values):
+            return True
+        return False
+
+    url_flows = []
+    
+    for record in dns_records:
+        props = get_props(record)
+        record_type = props.get('record_type', '')
+        record_values = props.get('record_values', [])
+        zone_name = props.get('zone_name', '')
+        
+        # Step 1: Auto-match record values to direct targets (ALBs, CloudFront, etc.)
+        direct_matches = match_record_direct(record)
+        
+        # Step 2: BFS through relationships from all direct matches to find full chain
+        start_ids = {r.id for r in direct_matches}
+        all_chain, chain_rel_ids = bfs_collect(start_ids, record.id)
+        
+        # Also collect relationships from the record itself
+        for tid in outgoing_map.get(record.id, []):
+            rel = rel_lookup.get((record.id, tid))
+            if rel:
+                chain_rel_ids.add(rel.id)
+        for sid in incoming_map.get(record.id, []):
+            rel = rel_lookup.get((record.id, sid))
+            if rel:
+                chain_rel_ids.add(rel.id)
+        
+        # Build connections list with relationship details
+        connections = []
+        for rel_id in chain_rel_ids:
+            for rel in relationships:
+                if rel.id == rel_id:
+                    connections.append({
+                        "id": rel.id,
+                        "source_id": rel.source_resource_id,
+                        "target_id": rel.target_resource_id,
+                        "type": rel.relationship_type,
+                        "label": rel.label or rel.relationship_type,
+                        "auto_detected": rel.auto_detected,
+                    })
+                    break
+        
+        # Categorize all collected resources
+        albs, cloudfront_list, ec2_list, db_list = [], [], [], []
+        s3_list, pipeline_list, other_list = [], [], []
+        
+        for r in all_chain.values():
+            if r.type in ELB_TYPES:
+                albs.append(r)
+            elif r.type in CF_TYPES:
+                cloudfront_list.append(r)
+            elif r.type in EC2_TYPES:
+                ec2_list.append(r)
+            elif r.type in DB_TYPES:
+                db_list.append(r)
+            elif r.type in S3_TYPES:
+                s3_list.append(r)
+            elif r.type in PIPE_TYPES:
+                pipeline_list.append(r)
+            else:
+                other_list.append(r)
+        
+        total_connections = len(all_chain)
+
+        ip_targets = [val for val in record_values if isinstance(val, str) and is_ip(val)]
+        unmatched_public_ips = []
+        matched_ip_targets = []
+        for ip_val in ip_targets:
+            if ip_val in public_ip_index or ip_val in private_ip_index:
+                matched_ip_targets.append(ip_val)
+            elif is_public_ip(ip_val):
+                unmatched_public_ips.append(ip_val)
+
+        is_cert_validation = is_certificate_validation_record(record.name, record_type, record_values)
+        has_invalid_a_target = record_type in ('A', 'AAAA') and len(unmatched_public_ips) > 0
+        is_provider_or_external_a_record = (
+            record_type in ('A', 'AAAA') and
+            len(unmatched_public_ips) > 0 and
+            total_connections == 0
+        )
+
+        target_accounts = sorted({r.account_id for r in all_chain.values() if r.account_id})
+        load_balancer_names = sorted({r.name for r in albs if r.name})
+        record_target_ips = sorted({val for val in ip_targets})
+        classification_labels = []
+        if is_cert_validation:
+            classification_labels.append('certificate_validation')
+        if has_invalid_a_target:
+            classification_labels.append('invalid_ip_target')
+        if is_provider_or_external_a_record:
+            classification_labels.append('provider_or_external_a_record')
+
+        important_path_count = len(cloudfront_list) + len(s3_list) + len(pipeline_list)
+        
+        url_flows.append({
+            "url": record.name,
+            "record_id": record.id,
+            "record_type": record_type,
+            "record_values": record_values,
+            "zone_name": zone_name,
+            "account_id": record.account_id,
+            "record": resource_to_dict(record),
+            "albs": [resource_to_dict(r) for r in albs],
+            "cloudfront": [resource_to_dict(r) for r in cloudfront_list],
+            "ec2_instances": [resource_to_dict(r) for r in ec2_list],
+            "databases": [resource_to_dict(r) for r in db_list],
+            "s3_buckets": [resource_to_dict(r) for r in s3_list],
+            "pipelines": [resource_to_dict(r) for r in pipeline_list],
+            "other": [resource_to_dict(r) for r in other_list],
+            "has_connections": total_connections > 0,
+            "connections": connections,
+            "important_path_count": important_path_count,
+            "classification": {
+                "is_certificate_validation": is_cert_validation,
+                "has_invalid_a_target": has_invalid_a_target,
+                "is_provider_or_external_a_record": is_provider_or_external_a_record,
+                "unmatched_public_ips": unmatched_public_ips,
+                "matched_ip_targets": matched_ip_targets,
+                "labels": classification_labels,
+            },
+            "grouping": {
+                "target_accounts": target_accounts,
+                "load_balancers": load_balancer_names,
+                "target_ips": record_target_ips,
+            },
+        })
+    
+    # Sort with focus on demonstrative paths first (CloudFront/S3/Pipelines), then connected, then URL
+    url_flows.sort(key=lambda f: (
+        -(f.get('important_path_count', 0)),
+        not f['has_connections'],
+        not f.get('classification', {}).get('has_invalid_a_target', False),
+        f['url']
+    ))
+    
+    return url_flows
+
+
+def inventory(count: int):
+    """Resource rows and (source name, target name, type) relationships of an inventory of about count resources"""
+    rows = []
+    links = []
+
+    def add(name, type_, **values):
+        rows.append({'name': name, 'type': type_, 'region': 'eu-west-1', 'account_id': f'{len(rows) % 3:012d}',
+                     'resource_id': name, **values})
+
+    zones, elbs, distributions = 10, max(count // 100, 10), max(count // 250, 5)
+    buckets, databases, pipelines = max(count // 50, 10), max(count // 25, 10), max(count // 500, 2)
+    records = count // 20
+    instances = count - zones - elbs - distributions - buckets - databases - pipelines - records - count // 20
+    for z in range(zones):
+        add(f'zone-{z}', 'route53', type_specific_properties={'zone_name': f'site{z}.example.com'})
+    for e in range(elbs):
+        add(f'web-lb-{e}', 'alb', dns_name=f'web-lb-{e}-123.eu-west-1.elb.amazonaws.com')
+    for d in range(distributions):
+        add(f'cdn-{d}', 'cloudfront', type_specific_properties={'domain_name': f'd{d}.cloudfront.net'})
+        links.append((f'cdn-{d}', f'bucket-{d}', 'origin'))
+    for b in range(buckets):
+        # Every 50th bucket shares its domain with the next, the newer one winning
+        add(f'bucket-{b}', 's3', type_specific_properties={'domain_name': f'bucket-{b - (b % 50 == 1)}.s3.amazonaws.com'})
+    for d in range(databases):
+        add(f'db-{d}', 'rds', type_specific_properties={'dns_name': f'db-{d}.abc.eu-west-1.rds.amazonaws.com'})
+    for p in range(pipelines):
+        add(f'pipeline-{p}', 'codepipeline')
+        links.append((f'pipeline-{p}', f'bucket-{p}', 'deploys_to'))
+    for i in range(instances):
+        add(f'web-{i}', 'ec2', public_ip=f'54.{i // 250 % 250}.{i % 250}.1' if i % 2 else None,
+            private_ip=f'10.{i // 62500}.{i // 250 % 250}.{i % 250}')
+        if i < elbs * 3:
+            # Three targets per load balancer, the rest stand alone
+            links.append((f'web-lb-{i % elbs}', f'web-{i}', 'routes_to'))
+        if i % 10 == 0:
+            links.append((f'web-{i}', f'db-{i // 10 % databases}', 'uses'))
+        if i % 97 == 0 and i < elbs * 3:
+            # Both ways, only the newer relationship is shown
+            links.append((f'web-{i}', f'web-lb-{i % elbs}', 'registered_with'))
+    for f in range(count // 20):
+        add(f'fn-{f}', 'lambda')
+        if f % 3 == 0:
+            links.append((f'fn-{f}', f'db-{f % databases}', 'uses'))
+
+    for r in range(records):
+        kind = r % 10
+        j = r // 10
+        record_type, values, alias = 'CNAME', [], None
+        name = f'app{r}.site{r % zones}.example.com'
+        if kind == 0:
+            values = [f'WEB-LB-{j % elbs}-123.eu-west-1.elb.amazonaws.com.']
+        elif kind == 1:
+            # Not a known DNS name; its prefix names load balancers (web-lb-1 also prefixes web-lb-10...)
+            values = [f'web-lb-{j % elbs}-999.eu-west-1.elb.amazonaws.com']
+        elif kind == 2:
+            record_type, alias = 'A', {'dns_name': f'd{j % distributions}.cloudfront.net.'}
+        elif kind == 3:
+            record_type, values = 'A', [f'54.{(2 * j + 1) // 250 % 250}.{(2 * j + 1) % 250}.1']
+        elif kind == 4:
+            record_type, values = 'A', [f'203.0.113.{j % 250}']
+        elif kind == 5:
+            record_type, values = 'A', [f'10.0.{j // 250 % 250}.{j % 250}', '198.51.100.7']
+        elif kind == 6:
+            # Part of a bucket's domain only
+            values = [f'bucket-{j % buckets}.s3']
+        elif kind == 7:
+            name = f'_acme-challenge.app{r}.site{r % zones}.example.com'
+            values = [f'_x{r}.acm-validations.aws.']
+        elif kind == 8:
+            values = [f'db-{j % databases}.abc.eu-west-1.rds.amazonaws.com']
+        else:
+            values = ['example.org']
+            links.append((name, f'web-lb-{j % elbs}', 'routes_to'))
+        add(f'record-{r}', 'route53_record', type_specific_properties={
+            'record_type': record_type, 'record_values': values, 'zone_name': f'site{r % zones}.example.com',
+            **({'alias_target': alias} if alias else {}),
+        })
+        rows[-1]['name'] = name
+        links.append((name, f'zone-{r % zones}', 'belongs_to'))
+        if r % 250 == 3:
+            links.append((name, f'app{r + 1}.site{(r + 1) % zones}.example.com', 'alias_of'))
+    return rows, links
+
+
+def seed(db: Session, user_id: int, count: int):
+    rows, links = inventory(count)
+    for start in range(0, len(rows), 10000):
+        db.bulk_insert_mappings(Resource, [{**row, 'created_by': user_id} for row in rows[start:start + 10000]])
+    ids = dict(db.query(Resource.name, Resource.id))
+    db.bulk_insert_mappings(ResourceRelationship, [
+        {'source_resource_id': ids[source], 'target_resource_id': ids[target], 'relationship_type': type_,
+         'label': None if type_ == 'uses' else type_, 'auto_detected': 'yes'}
+        for source, target, type_ in links if source in ids and target in ids
+    ])
+    db.commit()
+    return ids
+
+
+def served(db: Session):
+    return json.loads(resources_router.get_url_flows(db=db).body)
+
+
+def comparable(flows):
+    """Flows with their resource lists and connections in id order (the old code listed them in set order)"""
+    flows = json.loads(json.dumps(flows, default=str))
+    for flow in flows:
+        for category in CATEGORIES:
+            flow[category] = sorted(flow[category], key=lambda item: item['id'])
+    return flows
+
+
+def new_database(count: int):
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'flows.db')}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine, autoflush=False)()
+    user = User(email='check@example.com', username='check', hashed_password='-')
+    db.add(user)
+    db.commit()
+    return db, user, seed(db, user.id, count)
+
+
+def check_changes(db: Session, user: User, ids: dict) -> bool:
+    """Changes through the routers and a bulk import, each compared with the old flows"""
+    passed = True
+
+    # A read after a change serves the stored flows and queues a refresh
+    before = served(db)
+    linked = resources_router.link_resources(resources_router.URLLinkRequest(
+        source_resource_id=ids['app8.site8.example.com'], target_resource_id=ids['cdn-1']), db=db)
+    start = time.perf_counter()
+    stale = served(db)
+    elapsed = (time.perf_counter() - start) * 1000
+    # Queued behind the read's refresh on the index's single worker
+    url_flow_index.schedule_refresh(session_factory=session_factory_for(db)).result()
+    passed &= check(f"Read after a change served the stored flows in {elapsed:.0f} ms, refreshed in the background",
+                    stale == before and comparable(served(db)) == comparable(legacy_url_flows(db)) != comparable(before))
+    resources_router.unlink_resources(linked['relationship_id'], db=db)
+    url_flow_index.refresh(db)
+
+    def same(label: str):
+        refresh = url_flow_index.refresh(db)
+        flows = served(db)
+        return check(f"{label} ({refresh['mode']}, {refresh['flows']} flows rebuilt in {refresh.get('elapsed_ms', 0)} ms)",
+                     refresh['mode'] == 'update' and comparable(flows) == comparable(legacy_url_flows(db)))
+
+    linked = resources_router.link_resources(resources_router.URLLinkRequest(
+        source_resource_id=ids['app9.site9.example.com'], target_resource_id=ids['cdn-1']), db=db)
+    passed &= same("Manual link from a record")
+    resources_router.unlink_resources(linked['relationship_id'], db=db)
+    passed &= same("Manual link removed")
+    resources_router.edit_navigator_resource(ids['web-lb-2'], resources_router.EditResourceRequest(name='web-lb-2x'), db=db)
+    passed &= same("Load balancer renamed")
+    resources_router.create_resource(resources_router.ResourceCreate(
+        name='external', type='alb', dns_name='Example.org.'), current_user=user, db=db)
+    passed &= same("Load balancer created with a name records point at")
+    resources_router.delete_resource(ids['cdn-0'], current_user=user, db=db)
+    passed &= same("Distribution deleted with its relationships")
+    resources_router.delete_resource(ids['app0.site0.example.com'], current_user=user, db=db)
+    passed &= same("Record deleted")
+    stats = bulk_import_resources(db, user.id, [
+        {'name': f'imported{i}.site1.example.com', 'type': 'route53_record', 'resource_id': f'imported-{i}',
+         'type_specific_properties': {'record_type': 'CNAME', 'record_values': [f'db-{i}.abc.eu-west-1.rds.amazonaws.com']}}
+        for i in range(20)
+    ] + [
+        {'name': 'web-lb-3', 'type': 'alb', 'resource_id': 'web-lb-3', 'dns_name': 'moved.elb.amazonaws.com'},
+        {'name': 'web-lb-4', 'type': 'alb', 'resource_id': 'web-lb-4', 'dns_name': 'web-lb-4-123.eu-west-1.elb.amazonaws.com',
+         'public_ip': '203.0.113.14'},
+    ])
+    passed &= same(f"Bulk import of {stats['created']} records and {stats['updated']} load balancer updates")
+    # As after a restart: the graph is loaded from the stored keys
+    url_flow_index._graph = None
+    rel = db.query(ResourceRelationship).filter(ResourceRelationship.target_resource_id == ids['web-7']).first()
+    resources_router.remove_connection(resources_router.RemoveConnectionRequest(
+        source_resource_id=rel.source_resource_id, target_resource_id=rel.target_resource_id), db=db)
+    passed &= same("Connection removed mid-chain, after a restart")
+    return passed
+
+
+def listed(db: Session, page_size: int, **filters):
+    """Every summary /url-flows/summaries lists, following the cursors; the pages' sizes in bytes and cursors"""
+    items, sizes, cursors = [], [], [None]
+    while True:
+        page = resources_router.list_url_flows(cursor=cursors[-1], limit=page_size, db=db, **filters)
+        items += page['items']
+        sizes.append(len(json.dumps(page)))
+        if page['next_cursor'] is None:
+            return items, sizes, cursors, page['total']
+        cursors.append(page['next_cursor'])
+
+
+def chain(flow):
+    return [resource for category in FLOW_CATEGORIES for resource in flow[category]]
+
+
+def check_listing(db: Session, flows, page_size: int) -> bool:
+    """Pages and filters against the full listing"""
+    summaries = [flow_summary(flow) for flow in flows]
+    items, sizes, _, total = listed(db, page_size)
+    passed = check(f"{len(sizes)} pages of summaries list every flow in order, "
+                   f"{max(sizes) / 1024:.0f} KiB per page at most", items == summaries and total == len(flows))
+
+    filters = {
+        'zone': ('site3.example.com', lambda flow, value: flow['zone_name'] == value),
+        'account_id': ('000000000001', lambda flow, value: value in [flow['account_id']] + [r['account_id'] for r in chain(flow)]),
+        'record_type': ('A', lambda flow, value: flow['record_type'] == value),
+        'target_type': ('cloudfront', lambda flow, value: any(r['type'] == value for r in chain(flow))),
+        'search': ('APP1', lambda flow, value: value.lower() in flow['url'].lower()),
+    }
+    for name, (value, keep) in filters.items():
+        items, _, _, total = listed(db, page_size, **{name: value})
+        expected = [summary for flow, summary in zip(flows, summaries) if keep(flow, value)]
+        passed &= check(f"Filtered by {name}={value}: {len(expected)} flows", items == expected and total == len(expected) > 0)
+    items, _, _, _ = listed(db, page_size, target_type='databases', zone='site5.example.com')
+    expected = [summary for flow, summary in zip(flows, summaries) if flow['zone_name'] == 'site5.example.com'
+                and any(r['type'] in CATEGORY_TYPES['databases'] for r in chain(flow))]
+    passed &= check(f"Filtered by category and zone: {len(expected)} flows", items == expected and bool(expected))
+
+    record_id = flows[len(flows) // 2]['record_id']
+    flow = json.loads(resources_router.get_url_flow(record_id, db=db).body)
+    passed &= check("A single flow expands to its full chain", flow == flows[len(flows) // 2])
+    try:
+        resources_router.list_url_flows(cursor='not-a-cursor', limit=page_size, db=db)
+        passed &= check("Invalid cursor refused", False)
+    except HTTPException as e:
+        passed &= check("Invalid cursor refused", e.status_code == 400)
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--compare-resources', type=int, default=5000, help='resources in the inventory compared with the old flows')
+    parser.add_argument('--resources', type=int, default=50000, help='resources in the timed inventory')
+    parser.add_argument('--requests', type=int, default=50, help='timed requests')
+    parser.add_argument('--page', type=int, default=200, help='summaries per page')
+    args = parser.parse_args()
+
+    db, user, ids = new_database(args.compare_resources)
+    start = time.perf_counter()
+    expected = legacy_url_flows(db)
+    legacy_time = time.perf_counter() - start
+    passed = check("Reads do not build a missing index inline", served(db) == [])
+    start = time.perf_counter()
+    url_flow_index.refresh(db)
+    flows = served(db)
+    build_time = time.perf_counter() - start
+    connected = sum(1 for flow in flows if flow['has_connections'])
+    print(f"{len(flows)} flows ({connected} connected) from {args.compare_resources} resources: "
+          f"built per request in {legacy_time:.2f}s, index built in {build_time:.2f}s")
+    passed &= check("Built index serves the same flows in the same order", comparable(flows) == comparable(expected))
+    passed &= check_changes(db, user, ids)
+    db.close()
+
+    # Timed at full size, against the index only
+    db, user, ids = new_database(args.resources)
+    start = time.perf_counter()
+    refresh = url_flow_index.refresh(db)
+    build_time = time.perf_counter() - start
+    timings = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        body = resources_router.get_url_flows(db=db).body
+        timings.append((time.perf_counter() - start) * 1000)
+    p50, p95 = percentile(timings, 0.5), percentile(timings, 0.95)
+    print(f"{refresh['flows']} flows from {args.resources} resources: index built in {build_time:.2f}s, "
+          f"{len(body) / 2 ** 20:.1f} MiB per response, p50 {p50:.1f} ms, p95 {p95:.1f} ms")
+    passed &= check(f"p95 under 100 ms at {args.resources} resources ({p95:.1f} ms)", p95 < 100)
+
+    passed &= check_listing(db, json.loads(body), args.page)
+    _, _, cursors, _ = listed(db, args.page)
+    for label, cursor in (('First', None), ('Last', cursors[-1])):
+        timings = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            json.dumps(resources_router.list_url_flows(cursor=cursor, limit=args.page, db=db))
+            timings.append((time.perf_counter() - start) * 1000)
+        p95 = percentile(timings, 0.95)
+        passed &= check(f"{label} page of {args.page} summaries p95 under 50 ms "
+                        f"(p50 {percentile(timings, 0.5):.1f} ms, p95 {p95:.1f} ms)", p95 < 50)
+
+    resources_router.link_resources(resources_router.URLLinkRequest(
+        source_resource_id=ids['app19.site9.example.com'], target_resource_id=ids['cdn-2']), db=db)
+    start = time.perf_counter()
+    refresh = url_flow_index.refresh(db)
+    resources_router.get_url_flows(db=db)
+    elapsed = (time.perf_counter() - start) * 1000
+    passed &= check(f"First request after a manual link within 500 ms ({elapsed:.0f} ms, "
+                    f"{refresh['flows']} flows rebuilt in {refresh['elapsed_ms']} ms)", elapsed < 500)
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Helpers shared by the offline check and benchmark scripts
+Each check prints a ✅ or ❌ line and returns whether it passed, so a script
+can and its results together and exit 1 on any failure.
+"""
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+
+def check(label: str, ok: bool) -> bool:
+    print(f"{'✅' if ok else '❌'} {label}")
+    return ok
+
+
+def timed(call: Callable[[], Any]) -> Tuple[Any, float]:
+    """call()'s result and the seconds it took"""
+    start = time.perf_counter()
+    result = call()
+    return result, time.perf_counter() - start
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def latency(call: Callable[[], Any], runs: int = 20) -> Tuple[float, float]:
+    """p50 and p95 of call() over runs, in milliseconds"""
+    samples = [timed(call)[1] * 1000 for _ in range(runs)]
+    return percentile(samples, 0.5), percentile(samples, 0.95)
+
+
+def resource_row(i: int, **fields) -> Dict[str, Any]:
+    """Import row for resource i (res-<i> with its own resource_id); fields add to or override it"""
+    return {
+        'name': f'res-{i}',
+        'resource_id': f'r-{i:08x}',
+        'last_reported_at': '2024-01-01T00:00:00Z',
+        **fields,
+    }
+
+
+def bulky_properties(i: int) -> Dict[str, Any]:
+    """The type_specific_properties bulk a listing or export should only read when asked for"""
+    return {'config': {f'key{k}': f'value-{i}-{k}' for k in range(40)}}
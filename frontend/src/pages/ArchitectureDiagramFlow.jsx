@@ -34,6 +34,12 @@ import { generateCloudFormation, generateTerraform } from '../utils/iacExport';
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8805';
 const DEBUG_DIAGRAM = import.meta.env.VITE_DEBUG_DIAGRAM === 'true';
+// Resource fields the diagram and its panels use; the JSON configuration
+// columns are left out of the listing
+const DIAGRAM_RESOURCE_FIELDS = [
+  'name', 'type', 'region', 'arn', 'account_id', 'resource_id', 'status', 'environment',
+  'vpc_id', 'subnet_id', 'public_ip', 'private_ip', 'dns_name', 'tags', 'description',
+].join(',');
 
 const debugLog = (...args) => {
   if (DEBUG_DIAGRAM) console.log(...args);
@@ -1293,9 +1299,18 @@ function ArchitectureDiagramFlow() {
   const fetchResources = async () => {
     try {
       const token = localStorage.getItem('access_token');
-      const response = await axios.get(`${API_URL}/api/resources/?limit=10000`, {
-        headers: { Authorization: `Bearer ${token}` }
-      });
+      // Paged by cursor, with only the fields the diagram shows
+      const data = [];
+      let cursor = null;
+      do {
+        const page = await axios.get(`${API_URL}/api/resources/page`, {
+          headers: { Authorization: `Bearer ${token}` },
+          params: { limit: 1000, fields: DIAGRAM_RESOURCE_FIELDS, ...(cursor ? { cursor } : {}) },
+        });
+        data.push(...page.data.items);
+        cursor = page.data.next_cursor;
+      } while (cursor);
+      const response = { data };
       console.log(`📊 Fetched ${response.data.length} total resources from database`);
       
       // Diagnostic: log ALL unique account_id and account_name values from raw data
@@ -3874,8 +3889,14 @@ function ArchitectureDiagramFlow() {
               <button
                 onClick={() => {
                   if (contextMenuNode.type === 'resource') {
-                    setConfigResource(contextMenuNode.data.resource);
-                    setShowConfigPanel(true);
+                    // Diagram resources carry DIAGRAM_RESOURCE_FIELDS only; edit the full resource
+                    const resource = contextMenuNode.data.resource;
+                    axios.get(`${API_URL}/api/resources/${resource.id}`, {
+                      headers: { Authorization: `Bearer ${localStorage.getItem('access_token')}` }
+                    })
+                      .then(res => setConfigResource(res.data))
+                      .catch(() => setConfigResource(resource))
+                      .finally(() => setShowConfigPanel(true));
                   }
                   setContextMenu(null);
                 }}
@@ -133,6 +133,7 @@ function Import() {
   const [uploading, setUploading] = useState(false);
   const [analyzing, setAnalyzing] = useState(false);
   const [importing, setImporting] = useState(false);
+  const [importJob, setImportJob] = useState(null); // Background import job while it runs
   
   // AI options
   const [useAIInParsing, setUseAIInParsing] = useState(true);
@@ -170,6 +171,42 @@ function Import() {
   ]));
   const [resourceTypeCounts, setResourceTypeCounts] = useState({});
 
+  // Server-side import session holding the uploaded rows
+  const [importSessionId, setImportSessionId] = useState(null);
+  // Dry run of a session import, for the resource types it was run with
+  const [dryRun, setDryRun] = useState(null);
+  const [checkingChanges, setCheckingChanges] = useState(false);
+
+  // Lowercased type -> count, from the server's summary of the session rows
+  const countTypes = (resourceTypes) => {
+    const typeCounts = {};
+    Object.entries(resourceTypes || {}).forEach(([type, count]) => {
+      const key = type?.toLowerCase() || 'unknown';
+      typeCounts[key] = (typeCounts[key] || 0) + count;
+    });
+    return typeCounts;
+  };
+
+  // Resources of the selected types; a session preview only holds a sample, so count from the summary
+  const selectedResourceCount = () => {
+    if (previewData?.session_id) {
+      return Object.entries(resourceTypeCounts)
+        .filter(([type]) => selectedResourceTypes.has(type))
+        .reduce((total, [, count]) => total + count, 0);
+    }
+    return (previewData?.valid_resources || []).filter(r => selectedResourceTypes.has(r.type?.toLowerCase())).length;
+  };
+
+  const discardImportSession = () => {
+    if (importSessionId) {
+      const token = localStorage.getItem('access_token');
+      axios.delete(`${API_URL}/api/import/sessions/${importSessionId}`, {
+        headers: { 'Authorization': `Bearer ${token}` }
+      }).catch(() => {});
+      setImportSessionId(null);
+    }
+  };
+
   // Generate CSV template for download
   const downloadTemplate = (templateKey) => {
     const template = IMPORT_TEMPLATES[templateKey];
@@ -364,6 +401,7 @@ function Import() {
   
   // Reset to method selection
   const resetToMethodSelection = () => {
+    discardImportSession();
     setImportMethod(null);
     setStep(1);
     setFile(null);
@@ -384,10 +422,10 @@ function Import() {
     const selectedFile = e.target.files[0];
     if (selectedFile) {
       const ext = selectedFile.name.toLowerCase().split('.').pop();
-      if (['xlsx', 'xls', 'csv'].includes(ext)) {
+      if (['xlsx', 'xls', 'csv', 'parquet'].includes(ext)) {
         setFile(selectedFile);
       } else {
-        alert('Please upload an Excel (.xlsx, .xls) or CSV (.csv) file');
+        alert('Please upload an Excel (.xlsx, .xls), CSV (.csv) or Parquet (.parquet) file');
       }
     }
   };
@@ -410,6 +448,7 @@ function Import() {
       });
 
       setParsedData(response.data);
+      setImportSessionId(response.data.session_id);
       
       // Check if AWS Resource Explorer format was detected
       if (response.data.aws_resource_explorer && response.data.parsed_resources) {
@@ -417,19 +456,13 @@ function Import() {
         
         // Skip directly to preview with auto-mapped resources
         setPreviewData({
+          session_id: response.data.session_id,
           valid_resources: response.data.parsed_resources,
           valid_count: response.data.resource_count,
           invalid_count: 0,
           invalid_resources: []
         });
-        
-        // Calculate resource type counts
-        const typeCounts = {};
-        response.data.parsed_resources.forEach(r => {
-          const type = r.type?.toLowerCase() || 'unknown';
-          typeCounts[type] = (typeCounts[type] || 0) + 1;
-        });
-        setResourceTypeCounts(typeCounts);
+        setResourceTypeCounts(countTypes(response.data.resource_types));
         
         setResourceType('mixed'); // Multiple resource types
         setStep(4); // Go directly to preview
@@ -452,7 +485,7 @@ function Import() {
     }
   };
 
-  const handleAnalyze = async () => {
+  const handleAnalyze = async (refresh = false) => {
     if (!parsedData || !selectedSheet) return;
     
     if (!useAIInAnalyze) {
@@ -462,7 +495,6 @@ function Import() {
     }
     
     setAnalyzing(true);
-    const sheetData = parsedData.sheets[selectedSheet];
 
     try {
       const token = localStorage.getItem('access_token');
@@ -470,14 +502,16 @@ function Import() {
         `${API_URL}/api/import/analyze`,
         {
           sheet_name: selectedSheet,
-          sample_data: sheetData.slice(0, 5)
+          session_id: importSessionId,
+          refresh: refresh === true
         },
         {
           headers: { 'Authorization': `Bearer ${token}` }
         }
       );
 
-      const analysis = response.data.analysis;
+      // Mappings reused from an earlier sheet with the same columns are flagged so they can be re-analyzed
+      const analysis = { ...response.data.analysis, cached: response.data.cache?.hit === true };
       setLlmAnalysis(analysis);
       setFieldMappings(analysis.field_mappings || {});
       setTypeSpecificMappings(analysis.type_specific_mappings || {});
@@ -493,6 +527,8 @@ function Import() {
   
   const handleCancel = () => {
     if (window.confirm('Are you sure you want to cancel? All progress will be lost.')) {
+      // Discard the uploaded rows rather than waiting for the session to expire
+      discardImportSession();
       // Reset to initial state
       setStep(1);
       setFile(null);
@@ -508,14 +544,13 @@ function Import() {
   };
 
   const handlePreview = async () => {
-    const sheetData = parsedData.sheets[selectedSheet];
-
     try {
       const token = localStorage.getItem('access_token');
       const response = await axios.post(
         `${API_URL}/api/import/preview`,
         {
-          sheet_data: sheetData,
+          session_id: importSessionId,
+          sheet_name: selectedSheet,
           field_mappings: fieldMappings,
           type_specific_mappings: typeSpecificMappings,
           resource_type: resourceType
@@ -526,14 +561,7 @@ function Import() {
       );
 
       setPreviewData(response.data);
-      
-      // Calculate resource type counts
-      const typeCounts = {};
-      response.data.valid_resources.forEach(r => {
-        const type = r.type?.toLowerCase() || 'unknown';
-        typeCounts[type] = (typeCounts[type] || 0) + 1;
-      });
-      setResourceTypeCounts(typeCounts);
+      setResourceTypeCounts(countTypes(response.data.resource_types));
       
       setStep(4);
     } catch (error) {
@@ -542,6 +570,129 @@ function Import() {
     }
   };
 
+  // Follow an import job's Server-Sent Events until it finishes; returns the finished job
+  const followImportJob = async (jobId, token) => {
+    const response = await fetch(`${API_URL}/api/import/jobs/${jobId}/events`, {
+      headers: { 'Authorization': `Bearer ${token}` }
+    });
+    if (!response.ok) {
+      throw new Error(`Could not follow import job ${jobId} (${response.status})`);
+    }
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let job = null;
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) return job;
+      buffer += decoder.decode(value, { stream: true });
+      const messages = buffer.split('\n\n');
+      buffer = messages.pop();
+      for (const message of messages) {
+        const data = message.split('\n').find(line => line.startsWith('data: '));
+        if (!data) continue; // keep-alive
+        job = JSON.parse(data.slice('data: '.length));
+        setImportJob(job);
+      }
+    }
+  };
+
+  // The rows are already on the server: the import runs there as a background job
+  const handleSessionImport = async (sessionId) => {
+    const totalSelected = selectedResourceCount();
+    if (totalSelected === 0) {
+      alert('No resources selected for import. Please select at least one resource type.');
+      return;
+    }
+    console.log(`=== STARTING IMPORT === Total: ${totalSelected} resources from session ${sessionId}`);
+    
+    setImporting(true);
+
+    try {
+      const token = localStorage.getItem('access_token');
+      if (!token) {
+        alert('No auth token found. Please login again.');
+        return;
+      }
+      
+      const response = await axios.post(
+        `${API_URL}/api/import/execute-async`,
+        {
+          session_id: sessionId,
+          resource_types: [...selectedResourceTypes]
+        },
+        {
+          headers: { 
+            'Authorization': `Bearer ${token}`,
+            'Content-Type': 'application/json'
+          }
+        }
+      );
+      setImportJob(response.data);
+      
+      const job = await followImportJob(response.data.id, token);
+      if (!job || job.status === 'failed') {
+        alert(`Import failed: ${job?.error || 'the import job stopped unexpectedly'}`);
+        return;
+      }
+      if (job.status === 'cancelled') {
+        const progress = job.progress?.import || {};
+        alert(`Import cancelled after ${progress.rows_processed || 0} of ${progress.rows_total || 0} rows; rows already written were kept.`);
+        return;
+      }
+      
+      const result = job.result;
+      console.log(`=== IMPORT COMPLETE === Imported: ${result.imported_count}, Errors: ${result.error_count}`);
+      setImportResult({
+        success: true,
+        imported_count: result.imported_count || 0,
+        created_count: result.created_count || 0,
+        updated_count: result.updated_count || 0,
+        error_count: result.error_count || 0,
+        message: `Imported ${result.imported_count || 0} resources (${result.created_count || 0} created, ${result.updated_count || 0} updated, ${result.error_count || 0} errors)`
+      });
+    } catch (error) {
+      console.error('Import failed:', error);
+      console.error('Error response:', error.response?.data);
+      alert(error.response?.data?.detail || `Import failed: ${error.message}`);
+    } finally {
+      setImporting(false);
+      setImportJob(null);
+    }
+  };
+
+  // What the import would create and change, without writing anything
+  const handleDryRun = async () => {
+    const resourceTypes = [...selectedResourceTypes].sort();
+    setCheckingChanges(true);
+    try {
+      const token = localStorage.getItem('access_token');
+      const response = await axios.post(
+        `${API_URL}/api/import/dry-run?limit=20`,
+        { session_id: previewData.session_id, resource_types: resourceTypes },
+        { headers: { 'Authorization': `Bearer ${token}` } }
+      );
+      setDryRun({ ...response.data, types: resourceTypes.join(',') });
+    } catch (error) {
+      console.error('Dry run failed:', error);
+      alert(error.response?.data?.detail || `Dry run failed: ${error.message}`);
+    } finally {
+      setCheckingChanges(false);
+    }
+  };
+
+  const handleCancelImportJob = async () => {
+    if (!importJob) return;
+    try {
+      const token = localStorage.getItem('access_token');
+      await axios.post(`${API_URL}/api/import/jobs/${importJob.id}/cancel`, {}, {
+        headers: { 'Authorization': `Bearer ${token}` }
+      });
+    } catch (error) {
+      console.error('Cancel failed:', error);
+    }
+  };
+
   const handleImport = async () => {
     if (!previewData || !previewData.valid_resources) {
       console.error('No valid resources to import', previewData);
@@ -549,6 +700,10 @@ function Import() {
       return;
     }
     
+    if (previewData.session_id) {
+      return handleSessionImport(previewData.session_id);
+    }
+    
     // Filter resources by selected types
     let allResources = previewData.valid_resources.filter(r => {
       const type = r.type?.toLowerCase();
@@ -916,12 +1071,12 @@ function Import() {
                 Drag and drop your file here, or click to browse
               </p>
               <p className="text-sm text-gray-500 mb-4">
-                Supports: Excel (.xlsx, .xls) and CSV (.csv) files
+                Supports: Excel (.xlsx, .xls), CSV (.csv) and Parquet (.parquet) files
               </p>
               <input
                 type="file"
                 onChange={handleFileSelect}
-                accept=".xlsx,.xls,.csv"
+                accept=".xlsx,.xls,.csv,.parquet"
                 className="hidden"
                 id="file-upload"
               />
@@ -1142,6 +1297,18 @@ function Import() {
                       Confidence: {llmAnalysis.confidence}
                     </p>
                   )}
+                  {llmAnalysis.cached && (
+                    <p className="text-sm text-green-700 mt-1">
+                      Mappings reused from an earlier file with the same columns.{' '}
+                      <button
+                        onClick={() => handleAnalyze(true)}
+                        disabled={analyzing}
+                        className="underline hover:text-green-900 disabled:opacity-50"
+                      >
+                        {analyzing ? 'Analyzing...' : 'Analyze again with AI'}
+                      </button>
+                    </p>
+                  )}
                 </div>
               )}
 
@@ -1436,7 +1603,7 @@ function Import() {
                 <div className="mt-3 p-3 bg-blue-50 border border-blue-200 rounded-lg">
                   <p className="text-sm text-blue-800">
                     <strong>{selectedResourceTypes.size}</strong> resource types selected • 
-                    <strong>{previewData.valid_resources.filter(r => selectedResourceTypes.has(r.type?.toLowerCase())).length}</strong> resources will be imported
+                    <strong>{selectedResourceCount()}</strong> resources will be imported
                   </p>
                 </div>
               </div>
@@ -1482,14 +1649,71 @@ function Import() {
                     </tbody>
                   </table>
                 </div>
-                {previewData.valid_resources.length > 10 && (
+                {previewData.valid_count > 10 && (
                   <p className="text-sm text-gray-500 mt-2">
-                    ... and {previewData.valid_resources.length - 10} more resources
+                    ... and {previewData.valid_count - 10} more resources
                   </p>
                 )}
               </div>
             )}
 
+            {previewData.session_id && !importResult && (
+              <div className="mb-4">
+                <button
+                  onClick={handleDryRun}
+                  disabled={checkingChanges || importing || selectedResourceTypes.size === 0}
+                  className="px-4 py-2 text-sm bg-indigo-100 text-indigo-700 rounded hover:bg-indigo-200 font-medium disabled:opacity-50"
+                >
+                  {checkingChanges ? 'Checking changes...' : 'Check Changes (dry run)'}
+                </button>
+                {dryRun && dryRun.types === [...selectedResourceTypes].sort().join(',') && (
+                  <div className="mt-3 p-3 bg-gray-50 border border-gray-200 rounded-lg text-sm text-gray-700">
+                    <p>
+                      <strong>{dryRun.created}</strong> new • <strong>{dryRun.updated}</strong> changed •{' '}
+                      <strong>{dryRun.unchanged}</strong> unchanged • <strong>{dryRun.error_count}</strong> errors
+                    </p>
+                    {Object.keys(dryRun.field_changes).length > 0 && (
+                      <p className="mt-1 text-gray-600">
+                        Fields changing: {Object.entries(dryRun.field_changes).map(([field, change]) => `${field} (${change.count})`).join(', ')}
+                      </p>
+                    )}
+                    {dryRun.changes.filter(change => change.action === 'update').length > 0 && (
+                      <ul className="mt-2 space-y-1 text-xs font-mono text-gray-600 max-h-48 overflow-y-auto">
+                        {dryRun.changes.filter(change => change.action === 'update').map(change => (
+                          <li key={change.id}>
+                            {change.name}: {Object.entries(change.changes).map(([field, value]) => `${field} ${JSON.stringify(value.old)} → ${JSON.stringify(value.new)}`).join('; ')}
+                          </li>
+                        ))}
+                      </ul>
+                    )}
+                  </div>
+                )}
+              </div>
+            )}
+
+            {importJob && importing && (
+              <div className="mb-4">
+                <div className="w-full bg-gray-200 rounded-full h-2 mb-2">
+                  <div
+                    className="bg-green-600 h-2 rounded-full transition-all"
+                    style={{ width: `${Math.round(100 * (importJob.progress?.import?.rows_processed || 0) / Math.max(importJob.progress?.import?.rows_total || 0, 1))}%` }}
+                  ></div>
+                </div>
+                <div className="flex items-center justify-between text-sm text-gray-600">
+                  <span>
+                    {importJob.progress?.import?.created || 0} created • {importJob.progress?.import?.updated || 0} updated • {importJob.progress?.import?.errors || 0} errors
+                  </span>
+                  <button
+                    onClick={handleCancelImportJob}
+                    disabled={importJob.cancel_requested}
+                    className="px-3 py-1 text-sm bg-red-100 text-red-700 rounded hover:bg-red-200 disabled:opacity-50"
+                  >
+                    {importJob.cancel_requested ? 'Cancelling...' : 'Cancel Import'}
+                  </button>
+                </div>
+              </div>
+            )}
+
             {!importResult ? (
               <button
                 onClick={handleImport}
@@ -1499,12 +1723,16 @@ function Import() {
                 {importing ? (
                   <>
                     <div className="animate-spin rounded-full h-5 w-5 border-b-2 border-white mr-2"></div>
-                    Importing...
+                    {importJob?.phase === 'relationships'
+                      ? 'Extracting relationships...'
+                      : importJob?.progress?.import
+                        ? `Importing ${importJob.progress.import.rows_processed} / ${importJob.progress.import.rows_total}...`
+                        : 'Importing...'}
                   </>
                 ) : (
                   <>
                     <Database className="w-5 h-5 mr-2" />
-                    Import {previewData.valid_resources.filter(r => selectedResourceTypes.has(r.type?.toLowerCase())).length} Resources
+                    Import {selectedResourceCount()} Resources
                   </>
                 )}
               </button>
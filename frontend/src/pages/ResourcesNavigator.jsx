@@ -173,27 +173,60 @@ function ResourcesNavigator() {
 
   useEffect(() => { fetchData(); }, []);
 
+  // Bumped by every fetchData so an older, still paging fetch stops appending
+  const fetchGenerationRef = useRef(0);
+
+  // The list loads as summaries a page at a time; the first page is shown
+  // as soon as it arrives and the rest are appended behind it
   const fetchData = async () => {
+    const generation = ++fetchGenerationRef.current;
     setLoading(true);
     setError(null);
     try {
-      const flowsRes = await axios.get('/api/resources/url-flows');
-      setUrlFlows(flowsRes.data);
-      if (flowsRes.data.length > 0 && !selectedUrl) setSelectedUrl(flowsRes.data[0]);
-      else if (selectedUrl) {
-        const updated = flowsRes.data.find(f => f.record_id === selectedUrl.record_id);
-        if (updated) setSelectedUrl(updated);
-      }
-      const zones = new Set(flowsRes.data.map(f => f.zone_name || 'Unknown Zone'));
-      setExpandedZones(zones);
+      let flows = [];
+      let cursor = null;
+      do {
+        const flowsRes = await axios.get('/api/resources/url-flows/summaries', {
+          params: { limit: 500, ...(cursor ? { cursor } : {}) },
+        });
+        if (generation !== fetchGenerationRef.current) return;
+        const page = flowsRes.data.items;
+        flows = flows.concat(page);
+        cursor = flowsRes.data.next_cursor;
+        setUrlFlows(flows);
+        setSelectedUrl(prev => {
+          if (!prev) return flows[0] || null;
+          // A summary in place of the selected flow has it expanded again
+          return page.find(f => f.record_id === prev.record_id) || prev;
+        });
+        setExpandedZones(prev => {
+          const zones = new Set(prev);
+          page.forEach(f => zones.add(f.zone_name || 'Unknown Zone'));
+          return zones;
+        });
+        setLoading(false);
+      } while (cursor);
     } catch (err) {
+      if (generation !== fetchGenerationRef.current) return;
       console.error('Failed to fetch data', err);
       setError('Failed to load data. Make sure the backend is running.');
-    } finally {
       setLoading(false);
     }
   };
 
+  // Summaries carry counts only; the selected flow is expanded to its full chain on demand
+  useEffect(() => {
+    if (!selectedUrl || selectedUrl.record) return;
+    let cancelled = false;
+    axios.get(`/api/resources/url-flows/${selectedUrl.record_id}`)
+      .then(res => {
+        if (cancelled) return;
+        setSelectedUrl(prev => (prev?.record_id === res.data.record_id ? res.data : prev));
+      })
+      .catch(err => console.error('Failed to load URL flow', err));
+    return () => { cancelled = true; };
+  }, [selectedUrl]);
+
   const groupingOptions = useMemo(() => {
     const accounts = new Set();
     const lbs = new Set();
@@ -320,7 +353,8 @@ function ResourcesNavigator() {
 
   // Build columns for the flow diagram
   const flowColumns = useMemo(() => {
-    if (!selectedUrl) return [];
+    // Nothing to draw until a summary has been expanded to its chain
+    if (!selectedUrl?.record) return [];
     const cols = [];
     cols.push({ label: 'DNS Record', items: [{ ...selectedUrl.record, _label: selectedUrl.url }] });
     const cloudfront = selectedUrl.cloudfront || [];
@@ -615,8 +649,8 @@ function ResourcesNavigator() {
               <span className="text-[10px] px-1.5 py-0.5 bg-slate-700 text-slate-400 rounded">{selectedUrl.record_type}</span>
               <ArrowRight className="w-3 h-3 text-slate-500" />
               <span className="text-[10px] text-slate-500 truncate">{selectedUrl.record_values?.join(', ')}</span>
-              {selectedUrl.connections?.length > 0 && (
-                <span className="text-[10px] px-1.5 py-0.5 bg-blue-900/40 text-blue-300 rounded">{selectedUrl.connections.length} links</span>
+              {(selectedUrl.counts?.connections ?? selectedUrl.connections?.length) > 0 && (
+                <span className="text-[10px] px-1.5 py-0.5 bg-blue-900/40 text-blue-300 rounded">{selectedUrl.counts?.connections ?? selectedUrl.connections.length} links</span>
               )}
               <div className="ml-auto flex items-center gap-2">
                 {!editMode && (
@@ -956,7 +990,8 @@ function ResourcesNavigator() {
                     <span className="text-[10px] text-slate-500 bg-slate-700 px-1.5 py-0.5 rounded">{records.length}</span>
                   </button>
                   {expandedZones.has(zone) && records.map((flow, idx) => {
-                    const totalConn = (flow.albs?.length || 0) + (flow.ec2_instances?.length || 0) + (flow.databases?.length || 0) + (flow.s3_buckets?.length || 0) + (flow.pipelines?.length || 0) + (flow.cloudfront?.length || 0) + (flow.other?.length || 0);
+                    const counts = flow.counts || {};
+                    const totalConn = (counts.albs || 0) + (counts.ec2_instances || 0) + (counts.databases || 0) + (counts.s3_buckets || 0) + (counts.pipelines || 0) + (counts.cloudfront || 0) + (counts.other || 0);
                     return (
                       <div
                         key={`${flow.record_id}-${idx}`}
@@ -973,9 +1008,9 @@ function ResourcesNavigator() {
                           ) : (
                             <span className="text-[9px] text-slate-500">no match</span>
                           )}
-                          {flow.albs?.length > 0 && <span className="text-[9px] px-1 bg-orange-900/40 text-orange-300 rounded">{flow.albs.length} ALB</span>}
-                          {flow.ec2_instances?.length > 0 && <span className="text-[9px] px-1 bg-yellow-900/40 text-yellow-300 rounded">{flow.ec2_instances.length} EC2</span>}
-                          {flow.pipelines?.length > 0 && <span className="text-[9px] px-1 bg-blue-900/40 text-blue-300 rounded">{flow.pipelines.length} CI/CD</span>}
+                          {counts.albs > 0 && <span className="text-[9px] px-1 bg-orange-900/40 text-orange-300 rounded">{counts.albs} ALB</span>}
+                          {counts.ec2_instances > 0 && <span className="text-[9px] px-1 bg-yellow-900/40 text-yellow-300 rounded">{counts.ec2_instances} EC2</span>}
+                          {counts.pipelines > 0 && <span className="text-[9px] px-1 bg-blue-900/40 text-blue-300 rounded">{counts.pipelines} CI/CD</span>}
                           {flow.classification?.is_certificate_validation && (
                             <span className="text-[9px] px-1 bg-cyan-900/40 text-cyan-300 rounded">cert-validation</span>
                           )}